@@ -18,14 +18,25 @@ from typing import List, Optional, Tuple, Dict, Set
 
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("../Novos/Base/sla_processor.log", encoding="utf-8"),
-        logging.StreamHandler(),
-    ],
-)
+# Log ao lado do script (não depende da pasta de onde foi chamado) e num logger próprio:
+# importado pelo agendador, não toma conta do logger raiz do processo.
+ARQUIVO_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Novos", "Base", "sla_processor.log")
+
+logger = logging.getLogger("sla_entrega_realizada")
+
+
+def _configurar_log() -> None:
+    """Handlers de arquivo + console, criados uma única vez (na primeira execução)."""
+    if logger.handlers:
+        return
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    os.makedirs(os.path.dirname(ARQUIVO_LOG), exist_ok=True)
+    fmt = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    for h in (logging.FileHandler(ARQUIVO_LOG, encoding="utf-8"), logging.StreamHandler()):
+        h.setFormatter(fmt)
+        logger.addHandler(h)
+
 
 os.environ["POLARS_MAX_THREADS"] = str(multiprocessing.cpu_count())
 
@@ -50,6 +61,9 @@ ARQUIVO_SAIDA = os.path.join(PASTA_SAIDA, f"Resumo_Consolidado_{DATA_HOJE}.xlsx"
 # ✅ Resumo Domingo (se existir)
 ARQUIVO_SAIDA_DOMINGO = os.path.join(PASTA_SAIDA, f"Resumo_Consolidado_Domingo_{DATA_HOJE}.xlsx")
 
+# Cliente HTTP dos cards (o agendador troca por uma Session compartilhada)
+HTTP = requests
+
 # Limite de linhas do Excel
 EXCEL_MAX_ROWS = 1_048_576
 
@@ -190,7 +204,7 @@ def calcular_periodo_base() -> Optional[Tuple[date, date, List[date]]]:
     dia = hoje.weekday()  # 0=Seg ... 6=Dom
 
     if dia in (5, 6):
-        logging.warning("⛔ Hoje é sábado ou domingo. Execução cancelada.")
+        logger.warning("⛔ Hoje é sábado ou domingo. Execução cancelada.")
         return None
 
     span = 3 if dia == 0 else 1
@@ -205,7 +219,7 @@ def calcular_periodo_base() -> Optional[Tuple[date, date, List[date]]]:
             feriados_removidos = [d for d in datas if is_feriado_nacional(d)]
             datas_ok = [d for d in datas if not is_feriado_nacional(d)]
             if feriados_removidos:
-                logging.info(
+                logger.info(
                     "🗓️ Feriados nacionais ignorados: "
                     + ", ".join([d.strftime("%Y-%m-%d") for d in feriados_removidos])
                 )
@@ -217,10 +231,10 @@ def calcular_periodo_base() -> Optional[Tuple[date, date, List[date]]]:
 
         tentativas += 1
         if tentativas >= 15:
-            logging.warning("⚠️ Não foi possível encontrar datas válidas após recuar 15 dias. Cancelando.")
+            logger.warning("⚠️ Não foi possível encontrar datas válidas após recuar 15 dias. Cancelando.")
             return None
 
-        logging.warning(
+        logger.warning(
             f"⚠️ Período ({formatar_periodo(inicio, fim)}) ficou vazio após remover feriados. Recuando 1 dia..."
         )
         fim = fim - timedelta(days=1)
@@ -237,9 +251,9 @@ def arquivar_relatorios_antigos(pasta_origem: str, pasta_destino: str, prefixo:
                     os.path.join(pasta_origem, arquivo),
                     os.path.join(pasta_destino, arquivo),
                 )
-                logging.info(f"📦 Arquivo antigo movido: {arquivo}")
+                logger.info(f"📦 Arquivo antigo movido: {arquivo}")
             except Exception as e:
-                logging.error(f"Erro ao mover {arquivo}: {e}")
+                logger.error(f"Erro ao mover {arquivo}: {e}")
 
 
 def arquivar_bases_antigas(pasta_origem: str, pasta_destino: str, prefixo: str) -> None:
@@ -257,9 +271,9 @@ def arquivar_bases_antigas(pasta_origem: str, pasta_destino: str, prefixo: str)
                 os.path.join(pasta_origem, arquivo),
                 os.path.join(pasta_destino, arquivo),
             )
-            logging.info(f"📦 Base antiga movida: {arquivo}")
+            logger.info(f"📦 Base antiga movida: {arquivo}")
         except Exception as e:
-            logging.error(f"Erro ao mover {arquivo}: {e}")
+            logger.error(f"Erro ao mover {arquivo}: {e}")
 
 
 def ler_planilha_rapido(caminho: str) -> pl.DataFrame:
@@ -268,7 +282,7 @@ def ler_planilha_rapido(caminho: str) -> pl.DataFrame:
             return pl.read_csv(caminho, ignore_errors=True)
         return pl.read_excel(caminho)
     except Exception as e:
-        logging.error(f"Falha ao ler {os.path.basename(caminho)}: {e}")
+        logger.error(f"Falha ao ler {os.path.basename(caminho)}: {e}")
         return pl.DataFrame()
 
 
@@ -387,7 +401,7 @@ def ajustar_periodo_por_dados(
         for i in range((novo_fim - novo_inicio).days + 1)
     ]
 
-    logging.warning(
+    logger.warning(
         f"⚠️ Nenhum registro para o período calculado ({formatar_periodo(inicio, fim)}). "
         f"Fallback para última data disponível: {formatar_periodo(novo_inicio, novo_fim)}."
     )
@@ -423,16 +437,16 @@ def exportar_base_consolidada(df_periodo: pl.DataFrame, tag: str = "") -> Dict[s
     # Sempre salva parquet
     try:
         df_periodo.write_parquet(arq_parquet)
-        logging.info(f"✅ Base consolidada (PARQUET) salva em: {arq_parquet}")
+        logger.info(f"✅ Base consolidada (PARQUET) salva em: {arq_parquet}")
     except Exception as e:
-        logging.error(f"❌ Falha ao salvar PARQUET ({nome_base}): {e}")
+        logger.error(f"❌ Falha ao salvar PARQUET ({nome_base}): {e}")
 
     # Sempre salva CSV
     try:
         df_periodo.write_csv(arq_csv)
-        logging.info(f"✅ Base consolidada (CSV) salva em: {arq_csv}")
+        logger.info(f"✅ Base consolidada (CSV) salva em: {arq_csv}")
     except Exception as e:
-        logging.error(f"❌ Falha ao salvar CSV ({nome_base}): {e}")
+        logger.error(f"❌ Falha ao salvar CSV ({nome_base}): {e}")
 
     # XLSX só se couber no Excel
     try:
@@ -440,14 +454,14 @@ def exportar_base_consolidada(df_periodo: pl.DataFrame, tag: str = "") -> Dict[s
             df_pd = df_periodo.to_pandas()
             with pd.ExcelWriter(arq_xlsx, engine="openpyxl") as w:
                 df_pd.to_excel(w, index=False, sheet_name="Base Consolidada")
-            logging.info(f"✅ Base consolidada (XLSX) salva em: {arq_xlsx}")
+            logger.info(f"✅ Base consolidada (XLSX) salva em: {arq_xlsx}")
         else:
-            logging.warning(
+            logger.warning(
                 f"⚠️ {nome_base} tem {df_periodo.height:,} linhas. Excel suporta até {EXCEL_MAX_ROWS:,}. "
                 "XLSX NÃO gerado (use PARQUET/CSV)."
             )
     except Exception as e:
-        logging.error(f"❌ Falha ao salvar XLSX ({nome_base}): {e}")
+        logger.error(f"❌ Falha ao salvar XLSX ({nome_base}): {e}")
 
     return {"parquet": arq_parquet, "csv": arq_csv, "xlsx": arq_xlsx}
 
@@ -457,7 +471,7 @@ def exportar_resumo_excel(resumo_pd: pd.DataFrame, arquivo_saida: str, prefixo:
     arquivar_relatorios_antigos(PASTA_SAIDA, PASTA_ARQUIVO, prefixo)
     with pd.ExcelWriter(arquivo_saida, engine="openpyxl") as w:
         resumo_pd.to_excel(w, index=False, sheet_name="Resumo SLA")
-    logging.info(f"✅ Resumo Excel salvo em: {arquivo_saida}")
+    logger.info(f"✅ Resumo Excel salvo em: {arquivo_saida}")
 
 
 def montar_arquivos_gerados_md(arquivo_resumo: str, paths_base: Dict[str, str]) -> str:
@@ -520,7 +534,7 @@ def enviar_card_feishu(
 ) -> bool:
     try:
         if resumo.empty:
-            logging.warning(f"⚠️ Nenhuma base para {coord}{titulo_suffix}")
+            logger.warning(f"⚠️ Nenhuma base para {coord}{titulo_suffix}")
             return False
 
         bases = resumo["Base De Entrega"].nunique()
@@ -579,26 +593,36 @@ def enviar_card_feishu(
             },
         }
 
-        r = requests.post(webhook, json=payload, timeout=15)
+        r = HTTP.post(webhook, json=payload, timeout=15)
 
         if r.status_code != 200:
-            logging.error(
+            logger.error(
                 f"❌ ERRO ao enviar card para {coord}{titulo_suffix}. Status: {r.status_code}. Resposta: {r.text}"
             )
             return False
 
-        logging.info(f"📨 Card enviado para {coord}{titulo_suffix}")
+        logger.info(f"📨 Card enviado para {coord}{titulo_suffix}")
         return True
 
     except Exception as e:
-        logging.error(f"❌ Falha no envio para {coord}{titulo_suffix}. Erro: {e}. Webhook: {webhook}")
+        logger.error(f"❌ Falha no envio para {coord}{titulo_suffix}. Erro: {e}. Webhook: {webhook}")
         return False
 # =========================
 # BLOCO 4/4 — MAIN (v2.15 — separa Domingo)
 # =========================
 
-if __name__ == "__main__":
-    logging.info("🚀 Iniciando processamento SLA (v2.15 — separa Domingo)...")
+def _atualizar_datas_execucao() -> None:
+    """Datas/nomes de saída do dia (o agendador mantém o módulo carregado entre execuções)."""
+    global DATA_HOJE, ARQUIVO_SAIDA, ARQUIVO_SAIDA_DOMINGO
+    DATA_HOJE = datetime.now().strftime("%Y%m%d")
+    ARQUIVO_SAIDA = os.path.join(PASTA_SAIDA, f"Resumo_Consolidado_{DATA_HOJE}.xlsx")
+    ARQUIVO_SAIDA_DOMINGO = os.path.join(PASTA_SAIDA, f"Resumo_Consolidado_Domingo_{DATA_HOJE}.xlsx")
+
+
+def executar() -> None:
+    _configurar_log()
+    _atualizar_datas_execucao()
+    logger.info("🚀 Iniciando processamento SLA (v2.15 — separa Domingo)...")
 
     try:
         # ✅ Garantir pastas
@@ -609,19 +633,19 @@ if __name__ == "__main__":
         # 0) Período-base (ignora feriados nacionais)
         periodo = calcular_periodo_base()
         if periodo is None:
-            raise SystemExit(0)
+            return
 
         inicio, fim, datas = periodo
         periodo_txt = formatar_periodo(inicio, fim)
         dias_txt = formatar_lista_dias(datas)
 
-        logging.info(f"📅 Período (após feriados) usado para SLA: {periodo_txt}")
-        logging.info(f"🗓️ Dias considerados: {dias_txt}")
-        logging.info(f"📌 Datas (ISO): {', '.join([d.strftime('%Y-%m-%d') for d in datas])}")
+        logger.info(f"📅 Período (após feriados) usado para SLA: {periodo_txt}")
+        logger.info(f"🗓️ Dias considerados: {dias_txt}")
+        logger.info(f"📌 Datas (ISO): {', '.join([d.strftime('%Y-%m-%d') for d in datas])}")
 
         # 1) Ler planilhas
         df = consolidar_planilhas(PASTA_ENTRADA)
-        logging.info(f"📥 Registros carregados: {df.height}")
+        logger.info(f"📥 Registros carregados: {df.height}")
 
         # 2) Padronizar nomes colunas
         df = df.rename({c: c.strip().upper() for c in df.columns})
@@ -634,9 +658,9 @@ if __name__ == "__main__":
         periodo_txt = formatar_periodo(inicio, fim)
         dias_txt = formatar_lista_dias(datas)
 
-        logging.info(f"📅 Período FINAL usado para cálculo SLA: {periodo_txt}")
-        logging.info(f"🗓️ Dias considerados (FINAL): {dias_txt}")
-        logging.info(f"📌 Datas (ISO): {', '.join([d.strftime('%Y-%m-%d') for d in datas])}")
+        logger.info(f"📅 Período FINAL usado para cálculo SLA: {periodo_txt}")
+        logger.info(f"🗓️ Dias considerados (FINAL): {dias_txt}")
+        logger.info(f"📌 Datas (ISO): {', '.join([d.strftime('%Y-%m-%d') for d in datas])}")
 
         # ✅ 4.1) Separar datas Seg–Sáb vs Domingo
         datas_seg_sab, datas_domingo = separar_seg_sab_e_domingo(datas)
@@ -648,9 +672,9 @@ if __name__ == "__main__":
         dias_txt_domingo = formatar_lista_dias(datas_domingo)
 
         if datas_domingo:
-            logging.info(f"🧩 Separação ativa: Seg–Sáb = {dias_txt_seg_sab} | Domingo = {dias_txt_domingo}")
+            logger.info(f"🧩 Separação ativa: Seg–Sáb = {dias_txt_seg_sab} | Domingo = {dias_txt_domingo}")
         else:
-            logging.info("🧩 Não há domingo no período. Vai gerar apenas Seg–Sáb.")
+            logger.info("🧩 Não há domingo no período. Vai gerar apenas Seg–Sáb.")
 
         # 5) Detectar coluna ENTREGUE NO PRAZO
         colunas = list(df.columns)
@@ -667,7 +691,7 @@ if __name__ == "__main__":
         if not col_entregue:
             raise KeyError(f"❌ Coluna ENTREGUE NO PRAZO não encontrada.\nColunas: {df.columns}")
 
-        logging.info(f"📌 Coluna detectada: {col_entregue}")
+        logger.info(f"📌 Coluna detectada: {col_entregue}")
 
         # 6) Converter Y/N → 1/0
         df = df.with_columns(
@@ -679,7 +703,7 @@ if __name__ == "__main__":
 
         # 7) Filtrar registros do período-base (tudo do período, depois separa)
         df_periodo_all = df.filter(pl.col(COL_DATA_BASE).is_in(datas))
-        logging.info(f"📊 Registros para {periodo_txt}: {df_periodo_all.height}")
+        logger.info(f"📊 Registros para {periodo_txt}: {df_periodo_all.height}")
 
         # 8) Carregar Excel dos coordenadores
         coord_df = pl.read_excel(PASTA_COORDENADOR).rename(
@@ -697,14 +721,14 @@ if __name__ == "__main__":
         # 10) JOIN
         df_periodo_all = df_periodo_all.join(coord_df, on="BASE_NORM", how="left")
         sem_coord = df_periodo_all.filter(pl.col("COORDENADOR").is_null()).height
-        logging.info(f"🧩 Registros sem coordenador após join (período total): {sem_coord}")
+        logger.info(f"🧩 Registros sem coordenador após join (período total): {sem_coord}")
 
         # ✅ 10.1) Separar DF Seg–Sáb e DF Domingo (por DATA)
         df_seg_sab = df_periodo_all.filter(pl.col(COL_DATA_BASE).is_in(datas_seg_sab)) if datas_seg_sab else pl.DataFrame()
         df_domingo = df_periodo_all.filter(pl.col(COL_DATA_BASE).is_in(datas_domingo)) if datas_domingo else pl.DataFrame()
 
-        logging.info(f"📦 Registros Seg–Sáb: {df_seg_sab.height if hasattr(df_seg_sab, 'height') else 0}")
-        logging.info(f"📦 Registros Domingo: {df_domingo.height if hasattr(df_domingo, 'height') else 0}")
+        logger.info(f"📦 Registros Seg–Sáb: {df_seg_sab.height if hasattr(df_seg_sab, 'height') else 0}")
+        logger.info(f"📦 Registros Domingo: {df_domingo.height if hasattr(df_domingo, 'height') else 0}")
 
         # =========================
         # ✅ PARTE A) SEG–SÁB (principal)
@@ -737,7 +761,7 @@ if __name__ == "__main__":
             sub = resumo_seg_sab[resumo_seg_sab["COORDENADOR"] == coord] if not resumo_seg_sab.empty else pd.DataFrame()
 
             if sub.empty:
-                logging.warning(f"⚠️ Nenhuma base encontrada para {coord} (Seg–Sáb)")
+                logger.warning(f"⚠️ Nenhuma base encontrada para {coord} (Seg–Sáb)")
                 continue
 
             total = float(sub["Total"].sum()) if "Total" in sub.columns else 0.0
@@ -763,7 +787,7 @@ if __name__ == "__main__":
                 sub = resumo_domingo[resumo_domingo["COORDENADOR"] == coord] if not resumo_domingo.empty else pd.DataFrame()
 
                 if sub.empty:
-                    logging.warning(f"⚠️ Nenhuma base encontrada para {coord} (Domingo)")
+                    logger.warning(f"⚠️ Nenhuma base encontrada para {coord} (Domingo)")
                     continue
 
                 total = float(sub["Total"].sum()) if "Total" in sub.columns else 0.0
@@ -781,7 +805,11 @@ if __name__ == "__main__":
                     titulo_suffix=" — Domingo",
                 )
 
-        logging.info("🏁 Processamento concluído (v2.15 — separa Domingo)")
+        logger.info("🏁 Processamento concluído (v2.15 — separa Domingo)")
 
     except Exception as e:
-        logging.critical(f"❌ ERRO FATAL: {e}", exc_info=True)
+        logger.critical(f"❌ ERRO FATAL: {e}", exc_info=True)
+
+
+if __name__ == "__main__":
+    executar()
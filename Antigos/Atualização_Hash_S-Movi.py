@@ -4,14 +4,29 @@ import os
 import json
 import hashlib
 import time
+import argparse
+import threading
+import sys
 import requests
-import pandas as pd
+import polars as pl
 from datetime import datetime
 from typing import Dict, Any, Optional
 from colorama import init, Fore, Style
 
+# snapshots_diarios.py fica em Novos/ (compartilhado com Retidos e Franquias)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Novos"))
+from snapshots_diarios import SnapshotsDiarios
+
 init(autoreset=True)
 
+# watchdog é opcional (sem ele o modo --vigiar cai para uma varredura leve por stat)
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except Exception:
+    Observer = None
+    FileSystemEventHandler = object
+
 # ==============================================================================
 # CONFIGURAÇÕES GERAIS
 # ==============================================================================
@@ -33,6 +48,22 @@ COORDENADOR_WEBHOOKS = {
 
 REPORTS_FOLDER_PATH = r"C:\Users\J&T-099\OneDrive - Speed Rabbit Express Ltda\Jt - Relatórios"
 HASH_FILE = os.path.join(os.path.dirname(__file__), "../Novos/Base/Antigos/ultimo_relatorio.json")
+PASTA_SNAPSHOTS = os.path.join(os.path.dirname(HASH_FILE), "Snapshots")
+
+COL_REMESSA = "Remessa"
+COL_COORDENADOR = "Coordenadores"
+COL_UNIDADE = "Unidade responsável"
+COL_MULTA = "Multa (R$)"
+
+SNAPSHOTS = SnapshotsDiarios(
+    PASTA_SNAPSHOTS, "sem_movimentacao_5d",
+    col_id=COL_REMESSA, col_base=COL_UNIDADE, colunas=[COL_COORDENADOR, COL_MULTA],
+)
+
+# Modo --vigiar
+DEBOUNCE_SEGUNDOS = 15       # OneDrive grava em pedaços: só processa após N s sem eventos/alterações
+ESPERA_MAXIMA_ESTAVEL = 300  # desiste de esperar o arquivo "assentar" após N s (tenta no próximo evento)
+INTERVALO_VARREDURA = 60     # só usado sem watchdog (apenas os.stat, sem abrir o arquivo)
 
 LINK_RELATORIO = (
     "https://jtexpressdf-my.sharepoint.com/:f:/g/personal/"
@@ -58,40 +89,136 @@ def calcular_hash_md5(file_path: str) -> str:
     return hash_md5.hexdigest()
 
 
-def carregar_snapshot_antigo() -> Optional[Dict[str, Any]]:
+def relatorio_valido(nome: str) -> bool:
+    return nome.endswith(".xlsx") and "5+ dias" in nome.lower() and not nome.startswith("~")
+
+
+def localizar_relatorio() -> Optional[str]:
+    """Relatório "5+ dias" mais recente da pasta (ou None)."""
+    arquivos = [f for f in os.listdir(REPORTS_FOLDER_PATH) if relatorio_valido(f)]
+    if not arquivos:
+        return None
+    arquivos.sort(key=lambda x: os.path.getmtime(os.path.join(REPORTS_FOLDER_PATH, x)), reverse=True)
+    return os.path.join(REPORTS_FOLDER_PATH, arquivos[0])
+
+
+def impressao_arquivo(file_path: str) -> list:
+    """Impressão barata (só os.stat): nome + tamanho + data de modificação."""
+    st = os.stat(file_path)
+    return [os.path.basename(file_path), st.st_size, st.st_mtime_ns]
+
+
+def aguardar_estabilidade(file_path: str, debounce: float = DEBOUNCE_SEGUNDOS,
+                          limite: float = ESPERA_MAXIMA_ESTAVEL) -> bool:
+    """
+    Espera o arquivo parar de mudar (mesmo tamanho/mtime por `debounce` segundos)
+    e conseguir ser aberto — o OneDrive costuma gravar a planilha em várias etapas.
+    """
+    inicio = time.monotonic()
+    anterior = None
+    while time.monotonic() - inicio < limite:
+        try:
+            atual = impressao_arquivo(file_path)
+        except OSError:
+            return False
+        if atual == anterior:
+            try:
+                with open(file_path, "rb"):
+                    return True
+            except OSError:
+                pass  # ainda bloqueado pelo sincronizador
+        anterior = atual
+        time.sleep(debounce)
+    return False
+
+
+def carregar_metadados() -> Optional[Dict[str, Any]]:
+    """
+    Hash/stat do último arquivo processado + totais por coordenador dos cards enviados
+    (o estado por pacote fica nos snapshots parquet).
+    """
     if os.path.exists(HASH_FILE):
         with open(HASH_FILE, "r", encoding="utf-8") as f:
             return json.load(f)
     return None
 
 
-def salvar_snapshot(snapshot: Dict[str, Any]):
-    with open(HASH_FILE, "w", encoding="utf-8") as f:
-        json.dump(snapshot, f, ensure_ascii=False, indent=4)
+def salvar_metadados(meta: Dict[str, Any]):
+    tmp = HASH_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=4)
+    os.replace(tmp, HASH_FILE)
+
+
+def carregar_snapshot_antigo(meta: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Snapshot por coordenador da última execução (compara com a execução anterior,
+    não só com ontem). Vem dos totais gravados no JSON, calculados sobre todas as
+    linhas do relatório; o snapshot parquet (1 linha por pacote) só é usado se o
+    JSON não os tiver.
+    """
+    if meta and "coordenadores" in meta:
+        return meta
+    data = SNAPSHOTS.data_anterior(inclusive=True)
+    if data is None:
+        return None
+    return gerar_snapshot(SNAPSHOTS.carregar(data))
 
 
-def process_report_file(file_path: str) -> pd.DataFrame:
-    df = pd.read_excel(file_path)
-    df.columns = df.columns.str.strip()
-    df.rename(columns={"运单号": "Remessa", "Coordenador": "Coordenadores"}, inplace=True)
+def salvar_snapshot(df: pl.DataFrame, meta: Dict[str, Any]):
+    SNAPSHOTS.salvar(df)
+    salvar_metadados(meta)
+
+
+def process_report_file(file_path: str) -> pl.DataFrame:
+    df = pl.read_excel(file_path)
+    df = df.rename({c: c.strip() for c in df.columns})
+    df = df.rename({"运单号": COL_REMESSA, "Coordenador": COL_COORDENADOR}, strict=False)
+    # Todas as linhas: a multa dos cards soma cada linha do relatório; a deduplicação
+    # por Remessa fica só no snapshot parquet (SNAPSHOTS.salvar)
     return df
 
 
-def gerar_snapshot(df: pd.DataFrame) -> Dict[str, Any]:
+def gerar_snapshot(df: pl.DataFrame) -> Dict[str, Any]:
     snapshot = {"timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "coordenadores": {}}
-    for coord in df["Coordenadores"].unique():
-        dfc = df[df["Coordenadores"] == coord]
-        total_pacotes = dfc["Remessa"].nunique()
-        total_multa = dfc["Multa (R$)"].sum() if "Multa (R$)" in dfc.columns else 0
-        bases = dfc.groupby("Unidade responsável")["Remessa"].nunique().to_dict()
+    if df.is_empty() or COL_COORDENADOR not in df.columns:
+        return snapshot
+
+    df = df.filter(pl.col(COL_COORDENADOR).is_not_null())
+    multa = pl.col(COL_MULTA).cast(pl.Float64, strict=False).sum() if COL_MULTA in df.columns else pl.lit(0.0)
+    totais = df.group_by(COL_COORDENADOR).agg(
+        pl.col(COL_REMESSA).drop_nulls().n_unique().alias("total_pacotes"),
+        multa.alias("total_multa"),
+    )
+    bases = (
+        df.filter(pl.col(COL_UNIDADE).is_not_null())
+        .group_by(COL_COORDENADOR, COL_UNIDADE)
+        .agg(pl.col(COL_REMESSA).drop_nulls().n_unique().alias("qtd"))
+    )
+
+    bases_por_coord: Dict[str, Dict[str, int]] = {}
+    for coord, base, qtd in bases.iter_rows():
+        bases_por_coord.setdefault(coord, {})[str(base)] = int(qtd)
+
+    for coord, total_pacotes, total_multa in totais.iter_rows():
         snapshot["coordenadores"][coord] = {
-            "total_pacotes": total_pacotes,
-            "total_multa": float(total_multa),
-            "bases": bases,
+            "total_pacotes": int(total_pacotes),
+            "total_multa": float(total_multa or 0),
+            "bases": bases_por_coord.get(coord, {}),
         }
     return snapshot
 
 
+def coordenador_mudou(snapshot_atual, snapshot_antigo, coord) -> bool:
+    """Compara só o bloco do coordenador (totais + bases) com o snapshot anterior."""
+    if not snapshot_antigo:
+        return True
+    atual = snapshot_atual["coordenadores"].get(coord, {})
+    antigo = snapshot_antigo.get("coordenadores", {}).get(coord, {})
+    # Ida e volta pelo JSON: o snapshot antigo veio do disco (chaves/valores já serializados)
+    return json.loads(json.dumps(atual, ensure_ascii=False)) != antigo
+
+
 def comparar_coordenador(snapshot_atual, snapshot_antigo, coord):
     atual = snapshot_atual["coordenadores"].get(coord, {})
     antigo = snapshot_antigo["coordenadores"].get(coord, {}) if snapshot_antigo else {}
@@ -209,44 +336,145 @@ def send_to_feishu(url: str, data: Dict[str, Any]):
 # EXECUÇÃO PRINCIPAL
 # ==============================================================================
 
-def run_main_task():
+def run_main_task(forcar: bool = True, debounce: float = DEBOUNCE_SEGUNDOS):
+    """
+    forcar=True  -> comportamento original: reenvia todos os cards a cada chamada.
+    forcar=False -> (modo --vigiar) só processa se a impressão do arquivo mudou e
+                    só envia os coordenadores cujo bloco do snapshot mudou.
+    """
     print(f"{Fore.CYAN}[{datetime.now():%Y-%m-%d %H:%M:%S}] Procurando relatórios em {REPORTS_FOLDER_PATH}")
 
-    arquivos = [f for f in os.listdir(REPORTS_FOLDER_PATH)
-                if f.endswith(".xlsx") and "5+ dias" in f.lower() and not f.startswith("~")]
-    if not arquivos:
+    full_path = localizar_relatorio()
+    if not full_path:
         print(f"{Fore.YELLOW}⚠️ Nenhum relatório encontrado.")
         return
-
-    arquivos.sort(key=lambda x: os.path.getmtime(os.path.join(REPORTS_FOLDER_PATH, x)), reverse=True)
-    file_name = arquivos[0]
-    full_path = os.path.join(REPORTS_FOLDER_PATH, file_name)
+    file_name = os.path.basename(full_path)
 
     print(f"{Fore.CYAN}📄 Último relatório detectado: {file_name}")
 
-    file_hash = calcular_hash_md5(full_path)
-    snapshot_antigo = carregar_snapshot_antigo()
-
-    # 🔁 Força reenvio mesmo que o hash não tenha mudado
-    print(f"{Fore.YELLOW}⚠️ Reenvio forçado do relatório atual.")
+    meta = carregar_metadados()
 
+    if forcar:
+        # 🔁 Força reenvio mesmo que o hash não tenha mudado
+        print(f"{Fore.YELLOW}⚠️ Reenvio forçado do relatório atual.")
+        file_stat = impressao_arquivo(full_path)
+        file_hash = calcular_hash_md5(full_path)
+    else:
+        if meta and meta.get("file_stat") == impressao_arquivo(full_path):
+            print(f"{Fore.CYAN}➖ Arquivo sem alteração (stat) — nada a fazer.")
+            return
+
+        if not aguardar_estabilidade(full_path, debounce):
+            print(f"{Fore.YELLOW}⏳ {file_name} ainda sendo sincronizado — aguardando o próximo evento.")
+            return
+        file_stat = impressao_arquivo(full_path)
+
+        file_hash = calcular_hash_md5(full_path)
+        if meta and meta.get("file_hash") == file_hash:
+            # Só o mtime mudou (ex.: OneDrive re-sincronizou o mesmo conteúdo)
+            print(f"{Fore.CYAN}➖ Conteúdo idêntico (hash) — nada a enviar.")
+            meta["file_stat"] = file_stat
+            salvar_metadados(meta)
+            return
+
+    snapshot_antigo = carregar_snapshot_antigo(meta)
     df = process_report_file(full_path)
     snapshot_atual = gerar_snapshot(df)
-    snapshot_atual["file_hash"] = file_hash
 
     for coord, url in COORDENADOR_WEBHOOKS.items():
         if coord not in snapshot_atual["coordenadores"]:
             continue
+        if not forcar and not coordenador_mudou(snapshot_atual, snapshot_antigo, coord):
+            print(f"{Fore.WHITE}⚪ {coord:<20} | sem alteração — card não reenviado")
+            continue
         dados = comparar_coordenador(snapshot_atual, snapshot_antigo, coord)
         payload = create_feishu_payload(coord, dados)
         send_to_feishu(url, payload)
         time.sleep(1)
 
-    salvar_snapshot(snapshot_atual)
+    salvar_snapshot(df, {
+        "timestamp": snapshot_atual["timestamp"],
+        "arquivo": file_name,
+        "file_hash": file_hash,
+        "file_stat": file_stat,
+        "coordenadores": snapshot_atual["coordenadores"],
+    })
 
     print(f"{Fore.CYAN}📂 Relatório mantido em {REPORTS_FOLDER_PATH}")
     print(f"{Fore.CYAN}✅ Processo concluído!")
 
+# ==============================================================================
+# MODO VIGIA (eventos do sistema de arquivos)
+# ==============================================================================
+
+class _EventosRelatorio(FileSystemEventHandler):
+    def __init__(self, sinal: threading.Event):
+        super().__init__()
+        self.sinal = sinal
+
+    def on_any_event(self, event):
+        # abrir/ler (inclusive a nossa própria leitura) não é alteração
+        if event.is_directory or event.event_type in ("opened", "closed_no_write"):
+            return
+        # OneDrive costuma gravar em temporário e renomear: vale o nome de destino
+        caminho = getattr(event, "dest_path", "") or event.src_path
+        if relatorio_valido(os.path.basename(caminho)):
+            self.sinal.set()
+
+
+def vigiar(debounce: float = DEBOUNCE_SEGUNDOS):
+    """
+    Processa quando um relatório "5+ dias" chega/muda na pasta. Rajadas de eventos
+    (gravação parcial) são agrupadas: só processa após `debounce` s sem novos eventos.
+    Parado, não lê nada — nem o stat do arquivo.
+    """
+    sinal = threading.Event()
+    sinal.set()  # processa o estado atual ao subir
+
+    observer = None
+    if Observer is not None:
+        observer = Observer()
+        observer.schedule(_EventosRelatorio(sinal), REPORTS_FOLDER_PATH, recursive=False)
+        observer.start()
+        print(f"{Fore.CYAN}👀 Vigiando {REPORTS_FOLDER_PATH} (eventos, debounce {debounce:.0f}s). Ctrl+C para sair.")
+    else:
+        print(f"{Fore.YELLOW}⚠️ watchdog não instalado — varrendo a cada {INTERVALO_VARREDURA}s (pip install watchdog).")
+
+    try:
+        while True:
+            if observer is not None:
+                sinal.wait()
+            else:
+                sinal.wait(INTERVALO_VARREDURA)
+
+            # debounce: espera a rajada de eventos acabar
+            while sinal.is_set():
+                sinal.clear()
+                if observer is not None and sinal.wait(debounce):
+                    continue
+
+            try:
+                run_main_task(forcar=False, debounce=debounce)
+            except Exception as e:
+                # Planilha truncada/bloqueada: tenta de novo no próximo evento
+                print(f"{Fore.RED}❌ Falha ao processar relatório: {e}")
+    except KeyboardInterrupt:
+        print(f"{Fore.CYAN}🛑 Vigia encerrado.")
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join(timeout=5)
+
 
 if __name__ == "__main__":
-    run_main_task()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Cards de Sem Movimentação por coordenador.")
+    parser.add_argument("--vigiar", action="store_true",
+                        help="Fica vigiando a pasta e envia só quando o relatório muda.")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SEGUNDOS,
+                        help="Segundos sem alterações antes de processar (modo --vigiar).")
+    args = parser.parse_args()
+
+    if args.vigiar:
+        vigiar(args.debounce)
+    else:
+        run_main_task()
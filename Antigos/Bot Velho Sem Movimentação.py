@@ -53,6 +53,8 @@ ARCHIVE_FOLDER_PATH = os.path.join(REPORTS_FOLDER_PATH, "Arquivo Morto")
 # A shareable link to the reports folder for the Feishu card button.
 REPORTS_SHAREABLE_LINK = os.getenv("REPORTS_SHAREABLE_LINK",
                                    "https://jtexpressdf-my.sharepoint.com/:f:/g/personal/matheus_carvalho_jtexpressdf_onmicrosoft_com/Ek3KdqMIdX5EodE-3JwCQnsBAMiJ574BsxAR--oYBNN0-g?e=dfqBzT")
+# HTTP client for the Feishu cards (the scheduler swaps in a shared Session).
+HTTP = requests
 
 
 # --- HELPER FUNCTIONS ---
@@ -302,7 +304,7 @@ def send_report_to_feishu(webhook_url: str, secret_key: Optional[str], report_da
     headers = {'Content-Type': 'application/json'}
 
     try:
-        response = requests.post(webhook_url, headers=headers, data=json.dumps(card_payload))
+        response = HTTP.post(webhook_url, headers=headers, data=json.dumps(card_payload))
         response.raise_for_status()
         result = response.json()
         if result.get("StatusCode") == 0:
@@ -29,6 +29,8 @@ WEBHOOKS: List[Dict[str, Optional[str]]] = [
 REPORTS_FOLDER_PATH = os.getenv("REPORTS_FOLDER_PATH", r"C:\Users\JT-244\Desktop\Testes\Teste Base\Sem Movimentação")
 ARCHIVE_FOLDER_PATH = os.path.join(REPORTS_FOLDER_PATH, "Arquivo Morto")
 REPORTS_SHAREABLE_LINK = os.getenv("REPORTS_SHAREABLE_LINK", "LINK_DA_PASTA_COMPARTILHADA")
+# HTTP client for the cards (the scheduler swaps in a shared Session)
+HTTP = requests
 
 # --- HELPER FUNCTIONS ---
 def send_desktop_notification(title: str, message: str):
@@ -165,7 +167,7 @@ def send_report_to_feishu(webhook_url: str, secret_key: Optional[str], report_da
     card_payload = create_feishu_card_payload(report_data, secret_key)
     headers = {'Content-Type': 'application/json'}
     try:
-        response = requests.post(webhook_url, headers=headers, data=json.dumps(card_payload))
+        response = HTTP.post(webhook_url, headers=headers, data=json.dumps(card_payload))
         response.raise_for_status()
         result = response.json()
         if result.get("StatusCode") == 0:
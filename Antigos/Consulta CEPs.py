@@ -1,20 +1,61 @@
 # -*- coding: utf-8 -*-
+"""
+Coleta de endereços por cidade (API CEP dos Correios).
+
+- Bairros buscados em paralelo (pool limitado + limite de requisições/s).
+- Cache local em SQLite com data de atualização: uma cidade já coletada dentro
+  da validade sai direto do cache, sem nenhuma chamada à API.
+- Checkpoint por bairro: se a execução cair, a próxima continua dos bairros
+  que faltaram.
+
+Uso:
+    python "Consulta CEPs.py"                      # pergunta UF e cidade
+    python "Consulta CEPs.py" --uf GO --cidade Goiânia
+    python "Consulta CEPs.py" --uf GO --cidade Goiânia --atualizar
+"""
 from __future__ import annotations
 
 import os
+import time
+import sqlite3
+import argparse
+import sys
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 from pathlib import Path
 import requests
 import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# limite_taxa.py fica em Novos/ (compartilhado com Melhor Envio)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Novos"))
+from limite_taxa import LimiteTaxa
 
 PASTA_SAIDA = Path(r"C:\Users\J&T-099\OneDrive - Speed Rabbit Express Ltda (1)\Área de Trabalho\Dez")
 ARQ_XLSX = PASTA_SAIDA / "enderecos_por_cidade.xlsx"
+CACHE_DB = PASTA_SAIDA / "cache_ceps.sqlite"
 
 BASE = "https://api.correios.com.br/cep"
 URL_LOCALIDADES = f"{BASE}/v1/localidades"
 URL_BAIRROS = f"{BASE}/v1/bairros"
 URL_ENDERECOS = f"{BASE}/v2/enderecos"
 
+# Concorrência permitida pela API (ajuste ao contrato)
+MAX_CONCORRENCIA = 8
+REQ_POR_SEGUNDO = 10
+TAMANHO_PAGINA = 200
+
+# Validade do cache (bairro coletado há mais tempo que isso é buscado de novo)
+VALIDADE_CACHE_DIAS = 30
+
+COLUNAS_ENDERECO = [
+    "UF", "Cidade", "Bairro", "Logradouro", "Complemento",
+    "CEP", "TipoCEP", "TipoLogradouro", "Abreviatura",
+]
+
+
 def _norm(s: str) -> str:
     s = (s or "").strip().lower()
     s = unicodedata.normalize("NFKD", s)
@@ -31,112 +72,400 @@ def pick_content(payload):
             return payload["items"]
     return []
 
-def main():
-    PASTA_SAIDA.mkdir(parents=True, exist_ok=True)
+def _agora() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+def _limite_validade(atualizar: bool) -> str:
+    if atualizar:
+        return "9999-12-31"  # nada do cache é considerado fresco
+    return (datetime.now() - timedelta(days=VALIDADE_CACHE_DIAS)).isoformat(timespec="seconds")
 
-    token = (os.getenv("CORREIOS_TOKEN") or "").strip()
-    if not token:
-        raise SystemExit(
-            "Defina a variável de ambiente CORREIOS_TOKEN com seu Bearer Token dos Correios."
+
+# ============================================================
+# CACHE (SQLite)
+# ============================================================
+def abrir_cache(path: Path = CACHE_DB) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS localidades (
+            uf TEXT NOT NULL,
+            cidade_norm TEXT NOT NULL,
+            localidade TEXT NOT NULL,
+            atualizado_em TEXT NOT NULL,
+            PRIMARY KEY (uf, cidade_norm)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS bairros (
+            uf TEXT NOT NULL,
+            localidade TEXT NOT NULL,
+            bairro TEXT NOT NULL,
+            atualizado_em TEXT NOT NULL,
+            PRIMARY KEY (uf, localidade, bairro)
+        )
+        """
+    )
+    # checkpoint: bairro presente aqui = todas as páginas gravadas em `enderecos`
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS bairros_coletados (
+            uf TEXT NOT NULL,
+            localidade TEXT NOT NULL,
+            bairro TEXT NOT NULL,
+            qtd_enderecos INTEGER NOT NULL,
+            coletado_em TEXT NOT NULL,
+            PRIMARY KEY (uf, localidade, bairro)
         )
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS enderecos (
+            uf_consulta TEXT NOT NULL,
+            localidade_consulta TEXT NOT NULL,
+            bairro_consulta TEXT NOT NULL,
+            {", ".join(f"{c} TEXT" for c in COLUNAS_ENDERECO)}
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_enderecos_consulta
+        ON enderecos (uf_consulta, localidade_consulta, bairro_consulta)
+        """
+    )
+    return conn
+
 
-    uf = input("UF (ex: GO): ").strip().upper()
-    cidade = input("Cidade (ex: Goiânia): ").strip()
+def localidade_em_cache(conn: sqlite3.Connection, uf: str, cidade: str, limite: str) -> str | None:
+    row = conn.execute(
+        "SELECT localidade FROM localidades WHERE uf = ? AND cidade_norm = ? AND atualizado_em >= ?",
+        (uf, _norm(cidade), limite),
+    ).fetchone()
+    return row[0] if row else None
 
-    session = requests.Session()
-    session.headers.update({
+
+def bairros_em_cache(conn: sqlite3.Connection, uf: str, localidade: str, limite: str) -> list[str] | None:
+    rows = conn.execute(
+        "SELECT bairro, atualizado_em FROM bairros WHERE uf = ? AND localidade = ?",
+        (uf, localidade),
+    ).fetchall()
+    if not rows or min(r[1] for r in rows) < limite:
+        return None
+    return [r[0] for r in rows]
+
+
+def gravar_bairros(conn: sqlite3.Connection, uf: str, localidade: str, bairros: list[str]) -> None:
+    agora = _agora()
+    with conn:
+        conn.execute("DELETE FROM bairros WHERE uf = ? AND localidade = ?", (uf, localidade))
+        conn.executemany(
+            "INSERT INTO bairros (uf, localidade, bairro, atualizado_em) VALUES (?, ?, ?, ?)",
+            [(uf, localidade, b, agora) for b in bairros],
+        )
+
+
+def bairros_frescos(conn: sqlite3.Connection, uf: str, localidade: str, limite: str) -> set[str]:
+    return {
+        r[0]
+        for r in conn.execute(
+            "SELECT bairro FROM bairros_coletados WHERE uf = ? AND localidade = ? AND coletado_em >= ?",
+            (uf, localidade, limite),
+        )
+    }
+
+
+def gravar_bairro_coletado(conn: sqlite3.Connection, uf: str, localidade: str, bairro: str, linhas: list[dict]) -> None:
+    """Substitui os endereços do bairro e marca o checkpoint na mesma transação."""
+    with conn:
+        conn.execute(
+            "DELETE FROM enderecos WHERE uf_consulta = ? AND localidade_consulta = ? AND bairro_consulta = ?",
+            (uf, localidade, bairro),
+        )
+        conn.executemany(
+            f"""
+            INSERT INTO enderecos (uf_consulta, localidade_consulta, bairro_consulta, {", ".join(COLUNAS_ENDERECO)})
+            VALUES (?, ?, ?, {", ".join("?" for _ in COLUNAS_ENDERECO)})
+            """,
+            [(uf, localidade, bairro, *(l[c] for c in COLUNAS_ENDERECO)) for l in linhas],
+        )
+        conn.execute(
+            """
+            INSERT INTO bairros_coletados (uf, localidade, bairro, qtd_enderecos, coletado_em)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(uf, localidade, bairro) DO UPDATE SET
+                qtd_enderecos = excluded.qtd_enderecos,
+                coletado_em = excluded.coletado_em
+            """,
+            (uf, localidade, bairro, len(linhas), _agora()),
+        )
+
+
+def ler_enderecos(conn: sqlite3.Connection, uf: str, localidade: str, bairros: list[str]) -> pd.DataFrame:
+    df = pd.read_sql_query(
+        f"""
+        SELECT bairro_consulta, {", ".join(COLUNAS_ENDERECO)}
+        FROM enderecos
+        WHERE uf_consulta = ? AND localidade_consulta = ?
+        ORDER BY rowid
+        """,
+        conn,
+        params=(uf, localidade),
+    )
+    df = df[df["bairro_consulta"].isin(bairros)]
+    # mesma ordem da coleta sequencial antiga: bairro (ordem alfabética), depois página
+    df = df.sort_values("bairro_consulta", kind="stable")
+    return df[COLUNAS_ENDERECO].reset_index(drop=True)
+
+
+# ============================================================
+# CLIENTE HTTP (pool + limite de taxa)
+# ============================================================
+def build_session(token: str) -> requests.Session:
+    s = requests.Session()
+    retry = Retry(
+        total=5,
+        backoff_factor=0.8,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=MAX_CONCORRENCIA, pool_maxsize=MAX_CONCORRENCIA)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers.update({
         "accept": "application/json",
         "Authorization": f"Bearer {token}",
     })
+    return s
+
+
+class ClienteCorreios:
+    def __init__(self, token: str):
+        self.session = build_session(token)
+        self.limite = LimiteTaxa(REQ_POR_SEGUNDO)
+        self.requisicoes = 0
+
+    def get(self, url: str, params: dict) -> dict | list:
+        self.limite.aguardar()
+        r = self.session.get(url, params=params, timeout=30)
+        self.requisicoes += 1
+        r.raise_for_status()
+        return r.json()
+
+
+def _linhas(content: list, uf: str, localidade: str, bairro: str) -> list[dict]:
+    return [
+        {
+            "UF": it.get("uf", uf),
+            "Cidade": it.get("localidade", localidade),
+            "Bairro": it.get("bairro", bairro),
+            "Logradouro": it.get("logradouro", ""),
+            "Complemento": it.get("complemento", ""),
+            "CEP": it.get("cep", ""),
+            "TipoCEP": it.get("tipoCEP", ""),
+            "TipoLogradouro": it.get("tipoLogradouro", ""),
+            "Abreviatura": it.get("abreviatura", ""),
+        }
+        for it in content
+    ]
+
+
+def buscar_pagina(cliente: ClienteCorreios, uf: str, localidade: str, bairro: str, page: int):
+    """Retorna (conteúdo, total de páginas ou None se a resposta não trouxer paginação)."""
+    params = {"uf": uf, "localidade": localidade, "page": page, "size": TAMANHO_PAGINA, "sort": "cep,asc"}
+    if bairro:
+        params["bairro"] = bairro
+    payload = cliente.get(URL_ENDERECOS, params)
+    page_info = payload.get("page") if isinstance(payload, dict) else None
+    total = int(page_info.get("totalPages", 1)) if page_info else None
+    return pick_content(payload), total
+
+
+def buscar_sem_paginacao(cliente: ClienteCorreios, uf: str, localidade: str, bairro: str, inicio: int) -> list:
+    """Resposta sem paginação explícita: segue até vir uma página vazia."""
+    conteudo = []
+    page = inicio
+    while True:
+        content, _ = buscar_pagina(cliente, uf, localidade, bairro, page)
+        if not content:
+            return conteudo
+        conteudo.extend(content)
+        page += 1
+
+
+def coletar_bairros(conn, cliente: ClienteCorreios, uf: str, localidade: str, bairros: list[str]) -> None:
+    """
+    1ª onda: página 0 de todos os bairros (descobre o total de páginas).
+    2ª onda: todas as páginas restantes de todos os bairros no mesmo pool.
+    Cada bairro é gravado (checkpoint) assim que a última página dele chega.
+    """
+    paginas: dict[str, dict[int, list]] = {b: {} for b in bairros}
+    faltam: dict[str, int] = {}
+
+    def concluir(bairro: str):
+        conteudo = [it for p in sorted(paginas[bairro]) for it in paginas[bairro][p]]
+        gravar_bairro_coletado(conn, uf, localidade, bairro, _linhas(conteudo, uf, localidade, bairro))
+        paginas.pop(bairro)
+        print(f"  ✅ {bairro or '(sem bairro)'}: {len(conteudo)} endereço(s)")
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCORRENCIA) as ex:
+        primeira = {ex.submit(buscar_pagina, cliente, uf, localidade, b, 0): b for b in bairros}
+        restantes = {}
+        for fut in as_completed(primeira):
+            bairro = primeira[fut]
+            try:
+                content, total = fut.result()
+            except Exception as e:
+                print(f"  ❌ {bairro or '(sem bairro)'}: {e} (fica para a próxima execução)")
+                paginas.pop(bairro)
+                continue
+
+            paginas[bairro][0] = content
+            if total is None:
+                if content:
+                    restantes[ex.submit(buscar_sem_paginacao, cliente, uf, localidade, bairro, 1)] = (bairro, 1)
+                    faltam[bairro] = 1
+                else:
+                    concluir(bairro)
+            elif total > 1:
+                for page in range(1, total):
+                    restantes[ex.submit(buscar_pagina, cliente, uf, localidade, bairro, page)] = (bairro, page)
+                faltam[bairro] = total - 1
+            else:
+                concluir(bairro)
+
+        for fut in as_completed(restantes):
+            bairro, page = restantes[fut]
+            if bairro not in paginas:
+                continue  # outra página do bairro já falhou
+            try:
+                resultado = fut.result()
+            except Exception as e:
+                print(f"  ❌ {bairro or '(sem bairro)'} (página {page}): {e} (fica para a próxima execução)")
+                paginas.pop(bairro)
+                continue
+
+            paginas[bairro][page] = resultado[0] if isinstance(resultado, tuple) else resultado
+            faltam[bairro] -= 1
+            if faltam[bairro] == 0:
+                concluir(bairro)
+
+
+# ============================================================
+# MAIN
+# ============================================================
+def main():
+    ap = argparse.ArgumentParser(description="Coleta endereços de uma cidade (API CEP dos Correios) com cache local.")
+    ap.add_argument("--uf", help="UF (ex: GO)")
+    ap.add_argument("--cidade", help="Cidade (ex: Goiânia)")
+    ap.add_argument("--atualizar", action="store_true", help="Ignora o cache e busca tudo de novo.")
+    args = ap.parse_args()
+
+    PASTA_SAIDA.mkdir(parents=True, exist_ok=True)
+
+    uf = (args.uf or input("UF (ex: GO): ")).strip().upper()
+    cidade = (args.cidade or input("Cidade (ex: Goiânia): ")).strip()
+
+    conn = abrir_cache()
+    limite = _limite_validade(args.atualizar)
+    # Com --atualizar o limite é "nada fresco"; para conferir o que foi coletado vale o início desta execução
+    limite_coletados = _agora() if args.atualizar else limite
+    cliente = None
+
+    def obter_cliente() -> ClienteCorreios:
+        # token só é exigido quando algo realmente precisa ir à API
+        nonlocal cliente
+        if cliente is None:
+            token = (os.getenv("CORREIOS_TOKEN") or "").strip()
+            if not token:
+                raise SystemExit(
+                    "Defina a variável de ambiente CORREIOS_TOKEN com seu Bearer Token dos Correios."
+                )
+            cliente = ClienteCorreios(token)
+        return cliente
 
     # 1) Descobrir a grafia/padrão exato da localidade
-    r = session.get(URL_LOCALIDADES, params={"uf": uf, "localidade": cidade, "page": 0, "size": 50}, timeout=30)
-    r.raise_for_status()
-    locs = pick_content(r.json())
-
-    if not locs:
-        raise SystemExit(f"Nenhuma localidade encontrada para UF={uf} e cidade={cidade}.")
-
-    cidade_norm = _norm(cidade)
-    best = None
-    for item in locs:
-        nome = item.get("localidade") or item.get("nome") or ""
-        if _norm(nome) == cidade_norm:
-            best = item
-            break
-    if best is None:
-        best = locs[0]
-
-    localidade_padrao = best.get("localidade") or best.get("nome") or cidade
+    localidade_padrao = localidade_em_cache(conn, uf, cidade, limite)
+    if localidade_padrao is None:
+        locs = pick_content(obter_cliente().get(URL_LOCALIDADES, {"uf": uf, "localidade": cidade, "page": 0, "size": 50}))
+
+        if not locs:
+            raise SystemExit(f"Nenhuma localidade encontrada para UF={uf} e cidade={cidade}.")
+
+        cidade_norm = _norm(cidade)
+        best = None
+        for item in locs:
+            nome = item.get("localidade") or item.get("nome") or ""
+            if _norm(nome) == cidade_norm:
+                best = item
+                break
+        if best is None:
+            best = locs[0]
+
+        localidade_padrao = best.get("localidade") or best.get("nome") or cidade
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO localidades (uf, cidade_norm, localidade, atualizado_em) VALUES (?, ?, ?, ?)
+                ON CONFLICT(uf, cidade_norm) DO UPDATE SET
+                    localidade = excluded.localidade, atualizado_em = excluded.atualizado_em
+                """,
+                (uf, _norm(cidade), localidade_padrao, _agora()),
+            )
     print(f"Localidade usada (padrão Correios): {localidade_padrao}")
 
     # 2) Listar bairros da localidade
     # Endpoint: /v1/bairros/{uf}/localidades/{localidade}
-    r = session.get(f"{URL_BAIRROS}/{uf}/localidades/{localidade_padrao}", params={"page": 0, "size": 500}, timeout=30)
-    r.raise_for_status()
-    bairros_payload = r.json()
-    bairros = pick_content(bairros_payload)
-    if not bairros:
-        # alguns retornos podem vir como lista direta
-        if isinstance(bairros_payload, list):
-            bairros = bairros_payload
-
-    # Extrai nomes
-    nomes_bairros = []
-    for b in bairros:
-        nome = b.get("bairro") or b.get("nome") or ""
-        if nome:
-            nomes_bairros.append(nome)
-
-    # Se não vier bairro, ainda dá para tentar buscar endereços só por cidade (pode ser pesado)
-    if not nomes_bairros:
-        print("Aviso: não consegui listar bairros. Vou buscar endereços apenas por UF+localidade (paginado).")
-        nomes_bairros = [""]  # busca sem filtro de bairro
-
-    # 3) Para cada bairro, pagina /v2/enderecos
-    all_rows = []
-    for bairro in sorted(set(nomes_bairros)):
-        page = 0
-        while True:
-            params = {"uf": uf, "localidade": localidade_padrao, "page": page, "size": 200, "sort": "cep,asc"}
-            if bairro:
-                params["bairro"] = bairro
-
-            r = session.get(URL_ENDERECOS, params=params, timeout=30)
-            r.raise_for_status()
-            payload = r.json()
-
-            content = pick_content(payload)
-            for it in content:
-                all_rows.append({
-                    "UF": it.get("uf", uf),
-                    "Cidade": it.get("localidade", localidade_padrao),
-                    "Bairro": it.get("bairro", bairro),
-                    "Logradouro": it.get("logradouro", ""),
-                    "Complemento": it.get("complemento", ""),
-                    "CEP": it.get("cep", ""),
-                    "TipoCEP": it.get("tipoCEP", ""),
-                    "TipoLogradouro": it.get("tipoLogradouro", ""),
-                    "Abreviatura": it.get("abreviatura", ""),
-                })
-
-            page_info = payload.get("page") if isinstance(payload, dict) else None
-            if not page_info:
-                # sem paginação explícita, quebra quando não vier mais conteúdo
-                if not content:
-                    break
-                page += 1
-                continue
+    nomes_bairros = bairros_em_cache(conn, uf, localidade_padrao, limite)
+    if nomes_bairros is None:
+        bairros_payload = obter_cliente().get(f"{URL_BAIRROS}/{uf}/localidades/{localidade_padrao}", {"page": 0, "size": 500})
+        bairros = pick_content(bairros_payload)
+        if not bairros:
+            # alguns retornos podem vir como lista direta
+            if isinstance(bairros_payload, list):
+                bairros = bairros_payload
 
-            total_pages = int(page_info.get("totalPages", 1))
-            page += 1
-            if page >= total_pages:
-                break
+        # Extrai nomes
+        nomes_bairros = []
+        for b in bairros:
+            nome = b.get("bairro") or b.get("nome") or ""
+            if nome:
+                nomes_bairros.append(nome)
 
-    if not all_rows:
-        raise SystemExit("Não retornou nenhum endereço para essa cidade (ou sua conta não tem permissão/dados).")
+        # Se não vier bairro, ainda dá para tentar buscar endereços só por cidade (pode ser pesado)
+        if not nomes_bairros:
+            print("Aviso: não consegui listar bairros. Vou buscar endereços apenas por UF+localidade (paginado).")
+            nomes_bairros = [""]  # busca sem filtro de bairro
+
+        nomes_bairros = sorted(set(nomes_bairros))
+        gravar_bairros(conn, uf, localidade_padrao, nomes_bairros)
+
+    nomes_bairros = sorted(set(nomes_bairros))
+
+    # 3) Bairros fora do cache (ou vencidos) são buscados em paralelo
+    frescos = bairros_frescos(conn, uf, localidade_padrao, limite)
+    pendentes = [b for b in nomes_bairros if b not in frescos]
+    print(f"Bairros: {len(nomes_bairros)} | em cache: {len(nomes_bairros) - len(pendentes)} | a buscar: {len(pendentes)}")
 
-    df = pd.DataFrame(all_rows)
+    if pendentes:
+        inicio = time.time()
+        coletar_bairros(conn, obter_cliente(), uf, localidade_padrao, pendentes)
+        print(f"⏱️ Coleta: {cliente.requisicoes} requisição(ões) em {time.time() - inicio:.1f}s")
+
+    faltando = set(nomes_bairros) - bairros_frescos(conn, uf, localidade_padrao, limite_coletados)
+    if faltando:
+        print(f"⚠️ {len(faltando)} bairro(s) não coletado(s) — rode de novo para continuar do checkpoint.")
+
+    df = ler_enderecos(conn, uf, localidade_padrao, nomes_bairros)
+    conn.close()
+
+    if df.empty:
+        raise SystemExit("Não retornou nenhum endereço para essa cidade (ou sua conta não tem permissão/dados).")
 
     # Aba de bairros (se houver)
     df_bairros = (
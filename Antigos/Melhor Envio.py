@@ -7,6 +7,9 @@ Script de cálculo de fretes - Melhor Envio (Sandbox + Produção)
    https://docs.melhorenvio.com.br/reference/calculo-de-fretes-por-produtos
 ✅ Testa o primeiro envio antes de processar o restante.
 ✅ Interrompe se houver falha de conexão ou autenticação.
+✅ Linhas com o mesmo (CEP destino, dimensões, peso, valor segurado) viram uma
+   única cotação; respostas ficam em cache em disco (com validade) e as
+   cotações restantes são enviadas em paralelo com limite de requisições/s.
 
 Autor: bb-assistente 😎
 """
@@ -14,11 +17,19 @@ Autor: bb-assistente 😎
 import pandas as pd
 import requests
 import json
+import os
 import time
 import sys
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 
+# limite_taxa.py fica em Novos/ (compartilhado com Consulta CEPs)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Novos"))
+from limite_taxa import LimiteTaxa
+
 # ============================================================
 # ⚙️ CONFIGURAÇÕES GERAIS
 # ============================================================
@@ -27,6 +38,7 @@ from requests.exceptions import RequestException
 ARQUIVO_ENTRADA = r"C:\Users\J&T-099\OneDrive - Speed Rabbit Express Ltda (1)\Área de Trabalho\Testes\Melhor Envio\modelo_upload_envios.xls"
 ARQUIVO_SAIDA = r"C:\Users\J&T-099\OneDrive - Speed Rabbit Express Ltda (1)\Área de Trabalho\Testes\Melhor Envio\Fretes_Calculados.xlsx"
 ARQUIVO_LOG = "melhor_envio.log"
+ARQUIVO_CACHE = os.path.join(os.path.dirname(ARQUIVO_SAIDA), "cache_cotacoes.json")
 
 # Ambiente de execução
 # 👉 Mude para "sandbox" ou "producao"
@@ -60,21 +72,38 @@ HEADERS = {
 
 TIMEOUT = 15
 
+# Cotações em paralelo
+MAX_WORKERS = 6
+REQ_POR_SEGUNDO = 2.5          # mesmo ritmo médio do antigo sleep(0.4), agora com várias em voo
+MAX_TENTATIVAS = 4             # 429 / 5xx / falha de rede
+CACHE_TTL_HORAS = 24           # preço/prazo mudam: cotação mais velha que isso é refeita
+
 # ============================================================
 # 🧠 FUNÇÕES AUXILIARES
 # ============================================================
 
+_LOG_LOCK = threading.Lock()
+
 def log(msg):
     """Imprime e salva no arquivo de log"""
-    print(msg)
-    with open(ARQUIVO_LOG, "a", encoding="utf-8") as f:
-        f.write(f"{datetime.now():%H:%M:%S} - {msg}\n")
+    with _LOG_LOCK:
+        print(msg)
+        with open(ARQUIVO_LOG, "a", encoding="utf-8") as f:
+            f.write(f"{datetime.now():%H:%M:%S} - {msg}\n")
+
+def _criar_sessao():
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+    s.mount("https://", adapter)
+    s.headers.update(HEADERS)
+    return s
+
+SESSION = _criar_sessao()
 
 def try_post(payload, verify=True):
     """Envia requisição POST para o Melhor Envio"""
     try:
-        resp = requests.post(URL_CALCULO, headers=HEADERS,
-                             data=json.dumps(payload), timeout=TIMEOUT, verify=verify)
+        resp = SESSION.post(URL_CALCULO, data=json.dumps(payload), timeout=TIMEOUT, verify=verify)
         try:
             return resp.status_code, resp.json(), resp.text
         except Exception:
@@ -82,6 +111,74 @@ def try_post(payload, verify=True):
     except RequestException as e:
         return None, None, str(e)
 
+# ============================================================
+# 🧮 CHAVE / CACHE / LIMITE DE TAXA
+# ============================================================
+
+def chave_cotacao(row):
+    """Chave normalizada da cotação: CEP com 8 dígitos + medidas arredondadas."""
+    return (
+        str(row.get("CEP DESTINO", "")).zfill(8),
+        round(float(row.get("LARGURA (CM)", 1)), 2),
+        round(float(row.get("ALTURA (CM)", 1)), 2),
+        round(float(row.get("COMPRIMENTO (CM)", 1)), 2),
+        round(float(row.get("PESO (KG)", 0.1)), 3),
+        round(float(row.get("VALOR SEGURADO", 0.0)), 2),
+    )
+
+def _chave_texto(chave):
+    # ambiente e origem entram na chave do cache: sandbox não contamina produção
+    return "|".join([AMBIENTE.lower(), CEP_ORIGEM] + [str(v) for v in chave])
+
+def montar_payload(chave, id_produto):
+    cep, largura, altura, comprimento, peso, valor = chave
+    return {
+        "from": {"postal_code": CEP_ORIGEM},
+        "to": {"postal_code": cep},
+        "products": [
+            {
+                "id": id_produto,
+                "width": largura,
+                "height": altura,
+                "length": comprimento,
+                "weight": peso,
+                "insurance_value": valor,
+                "quantity": 1
+            }
+        ],
+        "options": {"receipt": False, "own_hand": False}
+    }
+
+def carregar_cache():
+    """{chave_texto: {"em": iso, "opcoes": [...]}} só com cotações dentro da validade."""
+    try:
+        with open(ARQUIVO_CACHE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    limite = (datetime.now() - timedelta(hours=CACHE_TTL_HORAS)).isoformat(timespec="seconds")
+    return {k: v for k, v in cache.items() if v.get("em", "") >= limite}
+
+def salvar_cache(cache):
+    tmp = ARQUIVO_CACHE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp, ARQUIVO_CACHE)
+
+def cotar(chave, limite, id_produto):
+    """Uma cotação com retry/backoff para 429, 5xx e falha de rede."""
+    payload = montar_payload(chave, id_produto)
+    for tentativa in range(1, MAX_TENTATIVAS + 1):
+        limite.aguardar()
+        status, j, txt = try_post(payload, verify=True)
+        if status == 200 and isinstance(j, list):
+            return status, j, txt
+        if status is not None and status != 429 and status < 500:
+            return status, j, txt
+        if tentativa < MAX_TENTATIVAS:
+            time.sleep(min(30, 2 ** tentativa))
+    return status, j, txt
+
 def testar_primeira_requisicao(payload_teste):
     """Testa o primeiro envio antes de processar tudo"""
     log(f"🧠 Testando ambiente {AMBIENTE.upper()} com primeira requisição...")
@@ -119,71 +216,74 @@ def calcular_fretes():
         log("⚠️ Planilha vazia. Encerrando.")
         sys.exit(1)
 
-    # Cria payload do primeiro item
-    primeira = df.iloc[0]
-    payload_teste = {
-        "from": {"postal_code": CEP_ORIGEM},
-        "to": {"postal_code": str(primeira.get("CEP DESTINO", "")).zfill(8)},
-        "products": [
-            {
-                "id": "teste_1",
-                "width": float(primeira.get("LARGURA (CM)", 1)),
-                "height": float(primeira.get("ALTURA (CM)", 1)),
-                "length": float(primeira.get("COMPRIMENTO (CM)", 1)),
-                "weight": float(primeira.get("PESO (KG)", 0.1)),
-                "insurance_value": float(primeira.get("VALOR SEGURADO", 0.0)),
-                "quantity": 1
-            }
-        ],
-        "options": {"receipt": False, "own_hand": False}
-    }
+    # Chave normalizada de cada linha (linhas iguais = uma cotação só)
+    chaves = [chave_cotacao(row) for _, row in df.iterrows()]
 
-    # Testa a primeira requisição
-    if not testar_primeira_requisicao(payload_teste):
-        sys.exit(1)
+    cache = carregar_cache()
+    respostas = {}
+    for chave in dict.fromkeys(chaves):
+        item = cache.get(_chave_texto(chave))
+        if item is not None:
+            respostas[chave] = item["opcoes"]
 
-    log(f"✅ Ambiente {AMBIENTE.upper()} validado com sucesso. Iniciando envios...\n")
+    pendentes = [c for c in dict.fromkeys(chaves) if c not in respostas]
+    log(f"📊 {len(df)} linha(s) | {len(set(chaves))} cotação(ões) distinta(s) | "
+        f"{len(respostas)} em cache | {len(pendentes)} a consultar")
 
-    resultados = []
-    total = len(df)
-    for idx, row in df.iterrows():
-        i = idx + 1
-        log(f"📦 ({i}/{total}) Calculando envio...")
-
-        payload = {
-            "from": {"postal_code": CEP_ORIGEM},
-            "to": {"postal_code": str(row.get('CEP DESTINO', '')).zfill(8)},
-            "products": [
-                {
-                    "id": f"item_{i}",
-                    "width": float(row.get("LARGURA (CM)", 1)),
-                    "height": float(row.get("ALTURA (CM)", 1)),
-                    "length": float(row.get("COMPRIMENTO (CM)", 1)),
-                    "weight": float(row.get("PESO (KG)", 0.1)),
-                    "insurance_value": float(row.get("VALOR SEGURADO", 0.0)),
-                    "quantity": 1
-                }
-            ],
-            "options": {"receipt": False, "own_hand": False}
-        }
+    if pendentes:
+        # Testa a primeira requisição
+        payload_teste = montar_payload(pendentes[0], "teste_1")
+        if not testar_primeira_requisicao(payload_teste):
+            sys.exit(1)
 
-        status, j, txt = try_post(payload, verify=True)
+        log(f"✅ Ambiente {AMBIENTE.upper()} validado com sucesso. Iniciando envios...\n")
 
-        if status == 200 and isinstance(j, list):
-            log(f"✅ Frete calculado com sucesso ({len(j)} opções).")
-            for c in j:
-                resultados.append({
-                    "Ambiente": AMBIENTE.capitalize(),
-                    "CEP_DESTINO": payload["to"]["postal_code"],
-                    "Transportadora": c.get("company", {}).get("name"),
-                    "Serviço": c.get("name"),
-                    "Preço (R$)": c.get("custom_price") or c.get("price"),
-                    "Prazo (dias úteis)": c.get("custom_delivery_time") or c.get("delivery_time")
-                })
-        else:
-            log(f"⚠️ Falha no cálculo ({status}): {txt[:250]}")
-
-        time.sleep(0.4)
+        limite = LimiteTaxa(REQ_POR_SEGUNDO)
+        feitas = 0
+        registrados = set()
+
+        def registrar(fut):
+            nonlocal feitas
+            registrados.add(fut)
+            chave = futuros[fut]
+            status, j, txt = fut.result()
+            feitas += 1
+            if status == 200 and isinstance(j, list):
+                respostas[chave] = j
+                cache[_chave_texto(chave)] = {"em": datetime.now().isoformat(timespec="seconds"), "opcoes": j}
+                log(f"📦 ({feitas}/{len(pendentes)}) CEP {chave[0]}: {len(j)} opções.")
+            else:
+                log(f"⚠️ ({feitas}/{len(pendentes)}) Falha no cálculo CEP {chave[0]} ({status}): {(txt or '')[:250]}")
+
+        try:
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+                futuros = {ex.submit(cotar, chave, limite, f"item_{n}"): chave for n, chave in enumerate(pendentes, 1)}
+                try:
+                    for fut in as_completed(futuros):
+                        registrar(fut)
+                except KeyboardInterrupt:
+                    log("🛑 Interrompido — cancelando as cotações na fila e aguardando as que já estão em andamento...")
+                    ex.shutdown(wait=True, cancel_futures=True)
+                    # as que terminaram depois do Ctrl+C também entram no cache
+                    for fut in futuros:
+                        if fut not in registrados and fut.done() and not fut.cancelled() and fut.exception() is None:
+                            registrar(fut)
+                    raise
+        finally:
+            # o que já foi cotado não se perde se a execução for interrompida
+            salvar_cache(cache)
+
+    resultados = []
+    for chave in chaves:
+        for c in respostas.get(chave, []):
+            resultados.append({
+                "Ambiente": AMBIENTE.capitalize(),
+                "CEP_DESTINO": chave[0],
+                "Transportadora": c.get("company", {}).get("name"),
+                "Serviço": c.get("name"),
+                "Preço (R$)": c.get("custom_price") or c.get("price"),
+                "Prazo (dias úteis)": c.get("custom_delivery_time") or c.get("delivery_time")
+            })
 
     if resultados:
         pd.DataFrame(resultados).to_excel(ARQUIVO_SAIDA, index=False)
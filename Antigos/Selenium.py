@@ -2,7 +2,7 @@
 baixar_jms_com_retry.py
 
 Requisitos:
-    pip install selenium webdriver-manager keyring
+    pip install selenium webdriver-manager keyring watchdog
 
 Descrição:
     - Reutiliza cookies salvos para sessão persistente.
@@ -10,13 +10,27 @@ Descrição:
     - Se não houver keyring ou falhar, pede login manual na primeira execução.
     - Clica no botão de export/download, monitora se apareceu a mensagem de erro
       "导出繁忙,请稍后再试" e faz retries com backoff.
-    - Espera até o arquivo terminar de baixar (checa ausência de .crdownload).
+    - Espera o download por eventos do sistema de arquivos (watchdog): a conclusão
+      é o rename do .crdownload para o nome final. A mensagem de erro é vigiada
+      em paralelo (thread própria), sem intercalar esperas com o download.
+    - Modo --paralelo: pool de Chromes headless "quentes" que compartilham os
+      cookies salvos e exportam vários relatórios ao mesmo tempo (cada um com a
+      sua pasta de download e o seu limite de tentativas), movendo o arquivo
+      direto para a pasta de entrada do pipeline diário.
+    - Modo --stub: roda o modo paralelo contra uma página local que serve
+      arquivos e injeta a mensagem de erro (para testar sem o JMS).
 """
 
 import os
 import time
 import json
+import queue
+import shutil
+import argparse
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -31,6 +45,14 @@ try:
 except Exception:
     keyring = None
 
+# watchdog é opcional (sem ele o download é vigiado por varredura curta da pasta)
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except Exception:
+    Observer = None
+    FileSystemEventHandler = object
+
 # ----------------- CONFIGURAÇÕES -----------------
 PASTA_PROJETO = r"C:\Users\J&T-099\PycharmProjects\Bots"  # ajuste se quiser
 PASTA_DOWNLOADS = os.path.join(PASTA_PROJETO, "downloads")
@@ -57,17 +79,36 @@ TIMEOUT_ESPERA_BOTAO = 60         # espera pelo botão clicável
 TIMEOUT_DOWNLOAD = 300            # espera até o download terminar (segundos) por tentativa
 MAX_RETRIES = 5                   # número máximo de tentativas (retry)
 INITIAL_BACKOFF = 5               # segundos antes da 1ª retry
+INTERVALO_ERRO = 0.25             # frequência da checagem da mensagem de erro (thread própria)
+INTERVALO_VARREDURA = 0.2         # só usado sem watchdog
+EXTENSOES_PARCIAIS = (".crdownload", ".tmp", ".part")
+
+# ----------------- MODO PARALELO -----------------
+# Cada relatório: página de export, botão, pasta de entrada do pipeline que consome o arquivo
+# e limite próprio de tentativas. Vazio até as telas de cada relatório serem mapeadas no JMS
+# (o --paralelo se recusa a rodar sem elas). Exemplo:
+#
+#     {
+#         "nome": "entrega_realizada_franquias",
+#         "url": f"{DOMINIO_BASE}/<tela do relatório>",
+#         "xpath": "<botão de export da tela>",
+#         "pasta_destino": r"C:\...\06-  SLA Entrega Realizada Franquia",
+#         "max_retries": MAX_RETRIES,
+#     },
+RELATORIOS = []
+DRIVERS_PARALELOS = 3             # Chromes headless mantidos abertos no pool
 # --------------------------------------------------
 
 os.makedirs(PASTA_DOWNLOADS, exist_ok=True)
 os.makedirs(PASTA_COOKIES, exist_ok=True)
 
 
-def criar_driver(download_dir: str):
+def criar_driver(download_dir: str, headless: bool = False):
     """Cria driver Chrome com prefs de download."""
     options = Options()
-    # Se quiser ver o navegador, comente a linha abaixo
-    # options.add_argument("--headless=new")  # cuidado: headless pode ter diferenças no download
+    if headless:
+        # no headless o diretório de download também é fixado via CDP (definir_pasta_download)
+        options.add_argument("--headless=new")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     prefs = {
@@ -81,6 +122,11 @@ def criar_driver(download_dir: str):
     return driver
 
 
+def definir_pasta_download(driver, download_dir: str):
+    """Troca a pasta de download de um driver já aberto (usado pelo pool)."""
+    driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_dir})
+
+
 def salvar_cookies(driver, path: str):
     cookies = driver.get_cookies()
     with open(path, "w", encoding="utf-8") as f:
@@ -140,102 +186,444 @@ def tentar_login_automatico_keyring(driver, username: str = None) -> bool:
         return False
 
 
-def aguardar_export_or_error(driver, download_dir, download_timeout=TIMEOUT_DOWNLOAD):
+def _arquivo_parcial(nome: str) -> bool:
+    return nome.endswith(EXTENSOES_PARCIAIS)
+
+
+class _EventosDownload(FileSystemEventHandler):
+    def __init__(self, observador):
+        super().__init__()
+        self.observador = observador
+
+    def on_moved(self, event):
+        # Chrome baixa em "<nome>.crdownload" e renomeia ao terminar
+        if not event.is_directory:
+            self.observador._candidato(event.dest_path, renomeado=True)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.observador._candidato(event.src_path, renomeado=False)
+
+
+class ObservadorDownload:
     """
-    Espera até:
-      - arquivo concluído aparecer na pasta -> retorna ('ok', caminho)
-      - OU mensagem de erro (texto chinês) aparecer -> retorna ('error', texto)
-      - OU timeout -> ('timeout', None)
+    Vigia a pasta de download a partir do momento em que é iniciado (antes do clique).
+    Arquivos que já existiam são ignorados. `caminho` recebe o primeiro arquivo concluído
+    e o evento informado em `avisar` é disparado na hora.
     """
-    inicio = time.time()
-    while True:
-        # 1) verifica se arquivo finalizado apareceu
-        arquivos = [f for f in os.listdir(download_dir) if not f.endswith(".crdownload") and not f.endswith(".tmp")]
-        if arquivos:
-            # pega o mais recente
-            arquivos_sorted = sorted(arquivos, key=lambda n: os.path.getmtime(os.path.join(download_dir, n)), reverse=True)
-            caminho = os.path.join(download_dir, arquivos_sorted[0])
-            # garantir que o arquivo não está sendo escrito (checa tamanho estável)
+
+    def __init__(self, download_dir: str):
+        self.download_dir = download_dir
+        self.existentes = set(os.listdir(download_dir))
+        self.caminho = None
+        self._avisos = []
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._observer = None
+        self._thread = None
+
+    def iniciar(self):
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(_EventosDownload(self), self.download_dir, recursive=False)
+            self._observer.start()
+        else:
+            self._thread = threading.Thread(target=self._varrer, daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def avisar(self, evento: threading.Event):
+        with self._lock:
+            self._avisos.append(evento)
+            if self.caminho:
+                evento.set()
+
+    def _ha_parciais(self) -> bool:
+        return any(_arquivo_parcial(n) for n in os.listdir(self.download_dir))
+
+    def _candidato(self, caminho: str, renomeado: bool):
+        nome = os.path.basename(caminho)
+        if _arquivo_parcial(nome) or nome in self.existentes:
+            return
+        # arquivo criado direto com o nome final: só vale se não há download parcial em curso
+        if not renomeado and self._ha_parciais():
+            return
+        with self._lock:
+            if self.caminho:
+                return
+            self.caminho = caminho
+            for evento in self._avisos:
+                evento.set()
+
+    def _varrer(self):
+        while not self._parar.wait(INTERVALO_VARREDURA):
             try:
-                tamanho1 = os.path.getsize(caminho)
-                time.sleep(1)
-                tamanho2 = os.path.getsize(caminho)
-                if tamanho1 == tamanho2:
-                    return ("ok", caminho)
+                novos = [n for n in os.listdir(self.download_dir) if n not in self.existentes]
+            except OSError:
+                continue
+            if novos and not any(_arquivo_parcial(n) for n in novos):
+                self._candidato(os.path.join(self.download_dir, novos[0]), renomeado=True)
+                return
+
+
+class VigiaErro:
+    """Procura a mensagem de erro na página em uma thread própria até `fim` ser disparado."""
+
+    def __init__(self, driver, fim: threading.Event):
+        self.driver = driver
+        self.fim = fim
+        self.texto = None
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._vigiar, daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def parar(self):
+        # o driver só volta a ser usado pela thread principal depois do join
+        self._parar.set()
+        self._thread.join()
+
+    def _vigiar(self):
+        while not self._parar.is_set() and not self.fim.is_set():
+            try:
+                elementos = self.driver.find_elements(By.XPATH, ERROR_XPATH)
+                if elementos:
+                    self.texto = elementos[0].text or elementos[0].get_attribute("innerText")
+                    self.fim.set()
+                    return
             except Exception:
                 pass
+            self._parar.wait(INTERVALO_ERRO)
 
-        # 2) procura mensagem de erro na página (curto wait)
-        try:
-            # esperamos 1s máximo pra encontrar o elemento de erro (não bloquear muito)
-            err_el = WebDriverWait(driver, 1).until(EC.presence_of_element_located((By.XPATH, ERROR_XPATH)))
-            texto = err_el.text or err_el.get_attribute("innerText")
-            return ("error", texto)
-        except Exception:
-            pass
 
-        # 3) timeout geral
-        if time.time() - inicio > download_timeout:
-            return ("timeout", None)
+def aguardar_export_or_error(driver, download_dir, download_timeout=TIMEOUT_DOWNLOAD, observador=None):
+    """
+    Espera até:
+      - arquivo concluído aparecer na pasta -> retorna ('ok', caminho)
+      - OU mensagem de erro (texto chinês) aparecer -> retorna ('error', texto)
+      - OU timeout -> ('timeout', None)
+
+    Passe um `observador` iniciado ANTES do clique para não perder downloads rápidos.
+    """
+    proprio = observador is None
+    if proprio:
+        observador = ObservadorDownload(download_dir).iniciar()
+
+    fim = threading.Event()
+    observador.avisar(fim)
+    vigia = VigiaErro(driver, fim).iniciar()
+    try:
+        fim.wait(download_timeout)
+    finally:
+        vigia.parar()
+        if proprio:
+            observador.parar()
 
-        time.sleep(0.5)
+    if observador.caminho:
+        return ("ok", observador.caminho)
+    if vigia.texto is not None:
+        return ("error", vigia.texto)
+    return ("timeout", None)
 
 
-def tentar_export_com_retries(driver, click_xpath, download_dir, max_retries=MAX_RETRIES):
+def tentar_export_com_retries(driver, click_xpath, download_dir, max_retries=MAX_RETRIES, rotulo=""):
     """
     Tenta clicar no botão e aguardar resultado. Em caso de erro detectado, realiza retry com backoff.
     Retorna caminho do arquivo em caso de sucesso, ou lança RuntimeError ao atingir max_retries.
+    `rotulo` prefixa mensagens e arquivos de debug (exports em paralelo).
     """
+    pref = f"{rotulo}_" if rotulo else ""
+    tag = f"[{rotulo}] " if rotulo else ""
     for tentativa in range(1, max_retries + 1):
+        observador = None
         try:
             botao = WebDriverWait(driver, TIMEOUT_ESPERA_BOTAO).until(
                 EC.element_to_be_clickable((By.XPATH, click_xpath))
             )
+            # vigia a pasta antes do clique: o rename do .crdownload não se perde
+            observador = ObservadorDownload(download_dir).iniciar()
             botao.click()
-            print(f"[Tentativa {tentativa}] Botão clicado. Aguardando resultado...")
+            print(f"{tag}[Tentativa {tentativa}] Botão clicado. Aguardando resultado...")
         except Exception as e:
-            print(f"❌ Falha ao localizar/clicar no botão (tentativa {tentativa}): {e}")
+            if observador:
+                observador.parar()
+            print(f"{tag}❌ Falha ao localizar/clicar no botão (tentativa {tentativa}): {e}")
             # tirar screenshot para debug
             try:
-                driver.save_screenshot(f"screenshot_click_fail_{tentativa}.png")
+                driver.save_screenshot(f"{pref}screenshot_click_fail_{tentativa}.png")
             except Exception:
                 pass
             # decide se quer tentar novamente
             wait = min(60, INITIAL_BACKOFF * (2 ** (tentativa - 1)))
-            print(f"⏳ Aguardando {wait}s antes da próxima tentativa...")
+            print(f"{tag}⏳ Aguardando {wait}s antes da próxima tentativa...")
             time.sleep(wait)
             continue
 
         # após o clique, aguarda o download ou a mensagem de erro
-        status, payload = aguardar_export_or_error(driver, download_dir, download_timeout=TIMEOUT_DOWNLOAD)
+        try:
+            status, payload = aguardar_export_or_error(
+                driver, download_dir, download_timeout=TIMEOUT_DOWNLOAD, observador=observador
+            )
+        finally:
+            observador.parar()
         if status == "ok":
-            print("✅ Download concluído:", payload)
+            print(f"{tag}✅ Download concluído:", payload)
             return payload
         if status == "error":
-            print(f"⚠️ Erro detectado na exportação: {payload}")
+            print(f"{tag}⚠️ Erro detectado na exportação: {payload}")
             # salvar screenshot e html para debug
             try:
-                sc_name = f"screenshot_erro_t{tentativa}.png"
+                sc_name = f"{pref}screenshot_erro_t{tentativa}.png"
                 driver.save_screenshot(sc_name)
-                with open(f"page_source_erro_t{tentativa}.html", "w", encoding="utf-8") as f:
+                with open(f"{pref}page_source_erro_t{tentativa}.html", "w", encoding="utf-8") as f:
                     f.write(driver.page_source)
                 print("📸 Screenshot e page_source salvos para investigação.")
             except Exception:
                 pass
             # backoff antes da próxima tentativa
             wait = min(60, INITIAL_BACKOFF * (2 ** (tentativa - 1)))
-            print(f"⏳ Backoff: aguardando {wait}s antes de tentar novamente...")
+            print(f"{tag}⏳ Backoff: aguardando {wait}s antes de tentar novamente...")
             time.sleep(wait)
             # continua loop pra nova tentativa
             continue
         if status == "timeout":
-            print("❌ Timeout: nem arquivo nem mensagem de erro detectados.")
+            print(f"{tag}❌ Timeout: nem arquivo nem mensagem de erro detectados.")
             wait = min(60, INITIAL_BACKOFF * (2 ** (tentativa - 1)))
-            print(f"⏳ Aguardando {wait}s antes de tentar novamente...")
+            print(f"{tag}⏳ Aguardando {wait}s antes de tentar novamente...")
             time.sleep(wait)
             continue
 
-    raise RuntimeError("Máximo de tentativas atingido sem sucesso.")
+    raise RuntimeError(f"{tag}Máximo de tentativas atingido sem sucesso.")
+
+
+# ----------------- MODO PARALELO -----------------
+class PoolDrivers:
+    """
+    Chromes headless já abertos e com a sessão carregada (cookies salvos).
+    Cada export pega um driver da fila, troca a pasta de download via CDP e devolve ao terminar.
+    """
+
+    def __init__(self, tamanho: int, cookies_file=COOKIES_FILE, url_inicial=URL_INDEX, headless: bool = True):
+        self.tamanho = tamanho
+        self.cookies_file = cookies_file
+        self.url_inicial = url_inicial
+        self.headless = headless
+        self._fila = queue.Queue()
+        self._todos = []
+        self._lock = threading.Lock()
+
+    def _novo_driver(self):
+        driver = criar_driver(PASTA_DOWNLOADS, headless=self.headless)
+        with self._lock:
+            self._todos.append(driver)
+        if self.cookies_file:
+            if not carregar_cookies(driver, self.cookies_file):
+                raise RuntimeError("Sem cookies salvos: rode uma vez o modo normal para logar.")
+            driver.get(self.url_inicial)
+            if "/login" in driver.current_url:
+                raise RuntimeError("Sessão dos cookies expirou: rode o modo normal para logar de novo.")
+        return driver
+
+    def aquecer(self):
+        """Abre os drivers em paralelo (a partida do Chrome é o passo mais lento)."""
+        with ThreadPoolExecutor(max_workers=self.tamanho) as ex:
+            for driver in ex.map(lambda _: self._novo_driver(), range(self.tamanho)):
+                self._fila.put(driver)
+        print(f"🔥 {self.tamanho} navegador(es) prontos no pool.")
+        return self
+
+    def pegar(self):
+        return self._fila.get()
+
+    def devolver(self, driver, quebrado: bool = False):
+        if quebrado:
+            # driver travado/fechado: troca por um novo para não reduzir o pool
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            with self._lock:
+                if driver in self._todos:
+                    self._todos.remove(driver)
+            try:
+                driver = self._novo_driver()
+            except Exception as e:
+                print(f"⚠️ Não foi possível repor o navegador no pool: {e}")
+                driver = None  # vaga morta: quem pegar falha na hora em vez de esperar
+        self._fila.put(driver)
+
+    def fechar(self):
+        with self._lock:
+            drivers, self._todos = self._todos, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+def exportar_relatorio(pool: PoolDrivers, relatorio: dict):
+    """Um relatório: pasta de download própria + limite de tentativas próprio; move o arquivo ao destino."""
+    nome = relatorio["nome"]
+    pasta_download = os.path.join(PASTA_DOWNLOADS, nome)
+    os.makedirs(pasta_download, exist_ok=True)
+    os.makedirs(relatorio["pasta_destino"], exist_ok=True)
+
+    driver = pool.pegar()
+    if driver is None:
+        pool.devolver(None)
+        print(f"[{nome}] ❌ Sem navegador disponível no pool.")
+        return nome, None
+
+    quebrado = False
+    try:
+        definir_pasta_download(driver, pasta_download)
+        driver.get(relatorio["url"])
+        arquivo = tentar_export_com_retries(
+            driver,
+            relatorio["xpath"],
+            pasta_download,
+            max_retries=relatorio.get("max_retries", MAX_RETRIES),
+            rotulo=nome,
+        )
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return nome, None
+    except Exception as e:
+        print(f"[{nome}] ❌ Erro inesperado no navegador: {e}")
+        quebrado = True
+        return nome, None
+    finally:
+        pool.devolver(driver, quebrado=quebrado)
+
+    destino = os.path.join(relatorio["pasta_destino"], os.path.basename(arquivo))
+    shutil.move(arquivo, destino)
+    print(f"[{nome}] 📁 Entregue em: {destino}")
+    return nome, destino
+
+
+def validar_relatorios(relatorios):
+    """Sem relatórios, ou dois apontando para a mesma tela/botão, o paralelo só exportaria o mesmo arquivo duas vezes."""
+    if not relatorios:
+        raise ValueError("RELATORIOS está vazio: configure url/xpath/pasta_destino de cada relatório antes do --paralelo.")
+    vistos = {}
+    for r in relatorios:
+        chave = (r["url"], r["xpath"])
+        if chave in vistos:
+            raise ValueError(f"'{r['nome']}' e '{vistos[chave]}' usam a mesma url e o mesmo xpath — "
+                             f"exportariam o mesmo relatório.")
+        vistos[chave] = r["nome"]
+
+
+def orquestrar_exports(relatorios=RELATORIOS, drivers=DRIVERS_PARALELOS, cookies_file=COOKIES_FILE,
+                       url_inicial=URL_INDEX):
+    """Exporta todos os relatórios em paralelo. Retorna {nome: caminho final ou None}."""
+    validar_relatorios(relatorios)
+    pool = PoolDrivers(min(drivers, len(relatorios)), cookies_file=cookies_file, url_inicial=url_inicial)
+    try:
+        pool.aquecer()
+        with ThreadPoolExecutor(max_workers=pool.tamanho) as ex:
+            resultados = dict(ex.map(lambda r: exportar_relatorio(pool, r), relatorios))
+    finally:
+        pool.fechar()
+
+    ok = sum(1 for v in resultados.values() if v)
+    print(f"\n📊 {ok}/{len(resultados)} relatório(s) exportado(s).")
+    for nome, caminho in resultados.items():
+        print(f"  {'✅' if caminho else '❌'} {nome}: {caminho or 'falhou'}")
+    return resultados
+
+
+# ----------------- STUB LOCAL (TESTES) -----------------
+MENSAGEM_ERRO_STUB = "导出繁忙,请稍后再试"
+
+PAGINA_STUB = """<html><head><meta charset="utf-8"></head><body>
+<button onclick="exportar()">Download</button><div id="msg"></div>
+<script>
+function exportar() {
+  var msg = document.getElementById('msg');
+  msg.innerText = '';
+  // O texto do erro vem do servidor: escrito aqui no <script>, o ERROR_XPATH casaria com a própria página
+  fetch('/tentar/__NOME__').then(function (r) { return r.text(); }).then(function (t) {
+    if (t !== 'ok') {
+      msg.innerText = t;
+      setTimeout(function () { msg.innerText = ''; }, 2000);
+    } else {
+      window.location = '/arquivo/__NOME__.xlsx';
+    }
+  });
+}
+</script></body></html>"""
+
+
+def iniciar_servidor_stub(porta: int = 8765, falhas_por_relatorio: int = 1):
+    """
+    Página local que imita a tela de export: as `falhas_por_relatorio` primeiras tentativas
+    de cada relatório mostram a mensagem de erro; depois o arquivo é servido como download.
+    """
+    tentativas: dict[str, int] = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, corpo: bytes, tipo: str, extra=None):
+            self.send_response(200)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(corpo)))
+            for k, v in (extra or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def do_GET(self):
+            partes = self.path.strip("/").split("/")
+            if partes[0] == "relatorio" and len(partes) == 2:
+                self._responder(PAGINA_STUB.replace("__NOME__", partes[1]).encode("utf-8"), "text/html; charset=utf-8")
+            elif partes[0] == "tentar" and len(partes) == 2:
+                with lock:
+                    tentativas[partes[1]] = tentativas.get(partes[1], 0) + 1
+                    n = tentativas[partes[1]]
+                corpo = MENSAGEM_ERRO_STUB if n <= falhas_por_relatorio else "ok"
+                self._responder(corpo.encode("utf-8"), "text/plain; charset=utf-8")
+            elif partes[0] == "arquivo" and len(partes) == 2:
+                self._responder(
+                    os.urandom(256 * 1024),
+                    "application/octet-stream",
+                    {"Content-Disposition": f'attachment; filename="{partes[1]}"'},
+                )
+            else:
+                self._responder(b"<html><body>stub</body></html>", "text/html")
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def rodar_stub(porta: int = 8765, drivers: int = DRIVERS_PARALELOS, falhas: int = 1):
+    servidor = iniciar_servidor_stub(porta, falhas)
+    base = f"http://127.0.0.1:{porta}"
+    pasta_stub = os.path.join(PASTA_DOWNLOADS, "_stub_destino")
+    relatorios = [
+        {"nome": f"stub_{i}", "url": f"{base}/relatorio/stub_{i}", "xpath": XPATH_BOTAO_DOWNLOAD,
+         "pasta_destino": pasta_stub, "max_retries": falhas + 1}
+        for i in range(1, drivers + 1)
+    ]
+    try:
+        return orquestrar_exports(relatorios, drivers=drivers, cookies_file=None, url_inicial=base)
+    finally:
+        servidor.shutdown()
 
 
 def main():
@@ -300,4 +688,19 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Export do JMS com retry (um relatório ou vários em paralelo).")
+    ap.add_argument("--paralelo", action="store_true", help="Exporta RELATORIOS com um pool de Chromes headless.")
+    ap.add_argument("--drivers", type=int, default=DRIVERS_PARALELOS, help="Tamanho do pool de navegadores.")
+    ap.add_argument("--stub", action="store_true", help="Testa o modo paralelo contra a página local de stub.")
+    ap.add_argument("--stub_falhas", type=int, default=1, help="Tentativas com erro injetado por relatório no stub.")
+    args = ap.parse_args()
+
+    if args.stub:
+        rodar_stub(drivers=args.drivers, falhas=args.stub_falhas)
+    elif args.paralelo:
+        try:
+            orquestrar_exports(RELATORIOS, drivers=args.drivers)
+        except ValueError as e:
+            print(f"❌ {e}")
+    else:
+        main()
\ No newline at end of file
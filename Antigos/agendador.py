@@ -0,0 +1,427 @@
+# -*- coding: utf-8 -*-
+"""
+Agendador único dos bots periódicos.
+
+Em vez de um processo por bot (cada um com o seu while True + time.sleep, o
+seu interpretador e as suas conexões), um só processo carrega os módulos uma
+vez e dispara as tarefas registradas:
+
+- gatilho cron (5 campos: minuto hora dia mês dia-da-semana) ou dinâmico
+  (a própria tarefa devolve o datetime da próxima execução);
+- janela de dias úteis / horas ativas e jitter;
+- sem sobreposição (uma tarefa não roda duas vezes ao mesmo tempo);
+- timeout por tarefa APENAS DE AVISO: threads não podem ser interrompidas, então
+  a tarefa que passa do tempo só é logada e bloqueada para novos disparos — ela
+  continua rodando e ocupando uma das MAX_TAREFAS_SIMULTANEAS vagas até terminar;
+- uma Session HTTP compartilhada (keep-alive, retry e timeout padrão) injetada
+  no atributo HTTP de cada bot. POST (webhooks) só é repetido em falha de
+  conexão — nunca depois que o servidor recebeu a requisição (evita card duplicado).
+
+Uso:
+    python agendador.py              # roda para sempre
+    python agendador.py --listar     # mostra as próximas execuções e sai
+    python agendador.py --agora NOME # executa uma tarefa uma vez e sai
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# =========================
+# ⚙️ CONFIGURAÇÕES
+# =========================
+PASTA_BOTS = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_LOG = os.path.join(PASTA_BOTS, "agendador.log")
+
+HTTP_TIMEOUT = (5, 30)          # (conexão, leitura) em segundos — padrão de toda chamada
+HTTP_TENTATIVAS = 3
+MAX_TAREFAS_SIMULTANEAS = 4
+ESPERA_MAXIMA = 60              # segundos — o loop acorda pelo menos a cada minuto
+
+logger = logging.getLogger("agendador")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+if not logger.handlers:
+    _fmt = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    for _h in (logging.FileHandler(ARQUIVO_LOG, encoding="utf-8"), logging.StreamHandler()):
+        _h.setFormatter(_fmt)
+        logger.addHandler(_h)
+
+
+# =========================
+# 🌐 SESSÃO HTTP COMPARTILHADA
+# =========================
+class SessaoPadrao(requests.Session):
+    """Session com timeout padrão (requests não tem um) — nenhum post fica pendurado para sempre."""
+
+    def __init__(self, timeout=HTTP_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(*args, **kwargs)
+
+
+def criar_sessao() -> SessaoPadrao:
+    sessao = SessaoPadrao()
+    retry = Retry(
+        total=HTTP_TENTATIVAS,
+        backoff_factor=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        # allowed_methods padrão (só idempotentes): POST de webhook não é reenviado em erro de
+        # leitura/5xx/429 — o card pode já ter sido postado. Erro de conexão repete para todos.
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=MAX_TAREFAS_SIMULTANEAS,
+                          pool_maxsize=MAX_TAREFAS_SIMULTANEAS)
+    sessao.mount("https://", adapter)
+    sessao.mount("http://", adapter)
+    return sessao
+
+
+def carregar_bot(arquivo: str, nome: str, sessao: Optional[requests.Session] = None):
+    """Importa um script do diretório (nomes com espaço/acento) uma única vez."""
+    spec = importlib.util.spec_from_file_location(nome, os.path.join(PASTA_BOTS, arquivo))
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nome] = modulo
+    spec.loader.exec_module(modulo)
+    if sessao is not None and hasattr(modulo, "HTTP"):
+        modulo.HTTP = sessao
+    return modulo
+
+
+# =========================
+# ⏰ CRON
+# =========================
+class Cron:
+    """
+    Expressão de 5 campos: minuto hora dia mês dia-da-semana.
+    Aceita *, listas (1,15), faixas (8-18) e passos (*/2, 8-18/2).
+    Dia da semana: 0 = domingo ... 6 = sábado (7 também é domingo).
+    """
+
+    LIMITES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expressao: str):
+        campos = expressao.split()
+        if len(campos) != 5:
+            raise ValueError(f"Expressão cron inválida (precisa de 5 campos): '{expressao}'")
+        self.expressao = expressao
+        conjuntos = [self._campo(c, lo, hi) for c, (lo, hi) in zip(campos, self.LIMITES)]
+        self.minutos, self.horas, self.dias, self.meses, dows = conjuntos
+        self.dias_semana = {0 if d == 7 else d for d in dows}
+        # Semântica do cron: se dia e dia-da-semana forem restritos, vale qualquer um dos dois.
+        self._dia_livre = campos[2] == "*"
+        self._dow_livre = campos[4] == "*"
+
+    @staticmethod
+    def _campo(texto: str, lo: int, hi: int) -> set:
+        valores = set()
+        for parte in texto.split(","):
+            faixa, _, passo = parte.partition("/")
+            if faixa == "*":
+                ini, fim = lo, hi
+            elif "-" in faixa:
+                ini, fim = (int(x) for x in faixa.split("-", 1))
+            else:
+                ini = int(faixa)
+                fim = hi if passo else ini
+            if ini < lo or fim > hi or ini > fim:
+                raise ValueError(f"Campo cron fora do intervalo {lo}-{hi}: '{parte}'")
+            valores.update(range(ini, fim + 1, int(passo) if passo else 1))
+        return valores
+
+    def _dia_ok(self, dt: datetime) -> bool:
+        dow = (dt.weekday() + 1) % 7  # Python: segunda=0 -> cron: domingo=0
+        if self._dia_livre and self._dow_livre:
+            return True
+        if self._dia_livre:
+            return dow in self.dias_semana
+        if self._dow_livre:
+            return dt.day in self.dias
+        return dt.day in self.dias or dow in self.dias_semana
+
+    def proximo(self, depois: datetime) -> datetime:
+        """Primeira ocorrência estritamente depois de `depois`."""
+        dt = depois.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = dt + timedelta(days=366 * 4)
+        while dt < limite:
+            if dt.month not in self.meses:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._dia_ok(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if dt.hour not in self.horas:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+                continue
+            if dt.minute not in self.minutos:
+                dt += timedelta(minutes=1)
+                continue
+            return dt
+        raise ValueError(f"Expressão cron sem ocorrência: '{self.expressao}'")
+
+    def __repr__(self):
+        return f"Cron('{self.expressao}')"
+
+
+# =========================
+# 📋 TAREFAS
+# =========================
+def dia_util(dt: datetime) -> bool:
+    return dt.weekday() < 5
+
+
+@dataclass
+class Tarefa:
+    nome: str
+    funcao: Callable
+    gatilho: Optional[Cron] = None    # None = dinâmico: a função devolve o datetime da próxima execução
+    timeout: float = 30 * 60          # segundos — só avisa e bloqueia novos disparos, não interrompe
+    jitter: float = 0                 # segundos aleatórios somados a cada disparo
+    dias_uteis: bool = False
+    horas: Optional[range] = None     # janela de horas ativas (ex.: range(8, 22))
+    ao_iniciar: bool = False          # roda logo que o agendador sobe
+    intervalo_padrao: float = 60 * 60  # dinâmico sem retorno válido: tenta de novo após N segundos
+
+    proxima: Optional[datetime] = field(default=None, init=False)
+    futuro: object = field(default=None, init=False, repr=False)
+    inicio: Optional[float] = field(default=None, init=False, repr=False)
+    estourou: bool = field(default=False, init=False, repr=False)
+
+    def na_janela(self, dt: datetime) -> bool:
+        if self.dias_uteis and not dia_util(dt):
+            return False
+        return self.horas is None or dt.hour in self.horas
+
+    def _inicio_janela(self, dt: datetime) -> datetime:
+        """Primeiro instante >= dt dentro da janela (dias úteis / horas ativas)."""
+        if self.na_janela(dt):
+            return dt
+        cand = dt.replace(minute=0, second=0, microsecond=0)
+        for _ in range(24 * 8):
+            cand += timedelta(hours=1)
+            if self.na_janela(cand):
+                return cand
+        raise ValueError(f"Tarefa '{self.nome}' sem horário possível na janela configurada.")
+
+    def agendar(self, base: datetime, sugerida: Optional[datetime] = None) -> datetime:
+        if self.gatilho is not None:
+            prox = self.gatilho.proximo(base)
+            for _ in range(10_000):
+                if self.na_janela(prox):
+                    break
+                prox = self.gatilho.proximo(prox)
+            else:
+                raise ValueError(f"Tarefa '{self.nome}': cron nunca cai dentro da janela.")
+        else:
+            prox = sugerida if isinstance(sugerida, datetime) and sugerida > base \
+                else base + timedelta(seconds=self.intervalo_padrao)
+            prox = self._inicio_janela(prox)
+
+        if self.jitter:
+            prox += timedelta(seconds=random.uniform(0, self.jitter))
+        self.proxima = prox
+        return prox
+
+
+# =========================
+# 🔁 AGENDADOR
+# =========================
+class Agendador:
+    def __init__(self, max_simultaneas: int = MAX_TAREFAS_SIMULTANEAS):
+        self.tarefas: dict[str, Tarefa] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_simultaneas, thread_name_prefix="tarefa")
+        self._rodando = False
+
+    def registrar(self, tarefa: Tarefa) -> Tarefa:
+        if tarefa.nome in self.tarefas:
+            raise ValueError(f"Tarefa já registrada: {tarefa.nome}")
+        self.tarefas[tarefa.nome] = tarefa
+        return tarefa
+
+    # ------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------
+    def _disparar(self, tarefa: Tarefa, agora: datetime):
+        if tarefa.futuro is not None:
+            # Sem sobreposição: a execução anterior ainda não terminou.
+            logger.warning(f"⏭️ {tarefa.nome}: execução anterior ainda em andamento — disparo pulado.")
+            tarefa.agendar(agora)
+            return
+
+        logger.info(f"▶️ {tarefa.nome} iniciada.")
+        tarefa.inicio = time.monotonic()
+        tarefa.estourou = False
+        tarefa.proxima = None
+        tarefa.futuro = self._pool.submit(tarefa.funcao)
+
+    def _concluir(self, tarefa: Tarefa):
+        futuro, tarefa.futuro = tarefa.futuro, None
+        duracao = time.monotonic() - tarefa.inicio
+        agora = datetime.now()
+        resultado = None
+        try:
+            resultado = futuro.result()
+            logger.info(f"✅ {tarefa.nome} concluída em {duracao:.1f}s.")
+        except Exception as e:
+            logger.exception(f"❌ {tarefa.nome} falhou após {duracao:.1f}s: {e}")
+
+        prox = tarefa.agendar(agora, resultado)
+        logger.info(f"⏳ {tarefa.nome}: próxima execução {prox.strftime('%d/%m %H:%M:%S')}.")
+
+    def _verificar_timeouts(self):
+        for tarefa in self.tarefas.values():
+            if tarefa.futuro is None or tarefa.estourou:
+                continue
+            if time.monotonic() - tarefa.inicio > tarefa.timeout:
+                # Threads não podem ser mortas: a tarefa é marcada e não será disparada de novo
+                # até terminar, mas segue ocupando uma vaga do pool enquanto estiver travada.
+                tarefa.estourou = True
+                logger.error(f"⏱️ {tarefa.nome} passou do timeout de {tarefa.timeout:.0f}s — "
+                             f"novos disparos bloqueados até ela terminar.")
+
+    def _espera(self, agora: datetime) -> float:
+        pendentes = [t.proxima for t in self.tarefas.values() if t.futuro is None and t.proxima]
+        if not pendentes:
+            return ESPERA_MAXIMA
+        return max(0.0, min(ESPERA_MAXIMA, (min(pendentes) - agora).total_seconds()))
+
+    def executar_agora(self, nome: str):
+        tarefa = self.tarefas[nome]
+        self._disparar(tarefa, datetime.now())
+        self._concluir(tarefa)
+
+    def rodar(self):
+        agora = datetime.now()
+        for tarefa in self.tarefas.values():
+            if tarefa.ao_iniciar and tarefa.na_janela(agora):
+                tarefa.proxima = agora
+            else:
+                tarefa.agendar(agora)
+            logger.info(f"📌 {tarefa.nome}: primeira execução {tarefa.proxima.strftime('%d/%m %H:%M:%S')}.")
+
+        self._rodando = True
+        logger.info(f"🚀 Agendador iniciado com {len(self.tarefas)} tarefa(s).")
+        try:
+            while self._rodando:
+                agora = datetime.now()
+                for tarefa in self.tarefas.values():
+                    if tarefa.futuro is None and tarefa.proxima and tarefa.proxima <= agora:
+                        self._disparar(tarefa, agora)
+
+                em_execucao = {t.futuro: t for t in self.tarefas.values() if t.futuro is not None}
+                espera = self._espera(datetime.now())
+                if em_execucao:
+                    prontos, _ = wait(em_execucao, timeout=espera, return_when=FIRST_COMPLETED)
+                    for futuro in prontos:
+                        self._concluir(em_execucao[futuro])
+                else:
+                    time.sleep(espera)
+
+                self._verificar_timeouts()
+        except KeyboardInterrupt:
+            logger.info("🛑 Agendador interrompido pelo usuário.")
+        finally:
+            self._rodando = False
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def listar(self):
+        agora = datetime.now()
+        for tarefa in self.tarefas.values():
+            gatilho = tarefa.gatilho.expressao if tarefa.gatilho else "dinâmico"
+            prox = tarefa.agendar(agora)
+            print(f"• {tarefa.nome:<28} {gatilho:<18} próxima: {prox.strftime('%d/%m %H:%M')}")
+
+
+# =========================
+# 🤖 TAREFAS REGISTRADAS
+# =========================
+def montar_agendador() -> Agendador:
+    sessao = criar_sessao()
+    agendador = Agendador()
+
+    bots_teste = carregar_bot("Bots_Teste.py", "bots_teste", sessao)
+    agendador.registrar(Tarefa(
+        nome="sem_movimentacao_teste",
+        funcao=bots_teste.run_main_task,
+        gatilho=Cron("0 */2 * * *"),
+        timeout=20 * 60,
+        jitter=60,
+        ao_iniciar=True,
+    ))
+
+    bot_velho = carregar_bot("Bot Velho Sem Movimentação.py", "bot_velho_sem_movimentacao", sessao)
+    agendador.registrar(Tarefa(
+        nome="sem_movimentacao",
+        funcao=bot_velho.run_main_task,
+        gatilho=Cron("0 */2 * * *"),
+        timeout=20 * 60,
+        jitter=60,
+        ao_iniciar=True,
+    ))
+    agendador.registrar(Tarefa(
+        nome="sem_movimentacao_lembrete",
+        funcao=lambda: bot_velho.send_desktop_notification(
+            title="Update Reminder",
+            message="The report check will start in 20 minutes.",
+        ),
+        gatilho=Cron("40 1-23/2 * * *"),
+        timeout=60,
+    ))
+
+    sla = carregar_bot("3- SLA - Entrega Realizada - Ganbira.py", "sla_entrega_realizada", sessao)
+    agendador.registrar(Tarefa(
+        nome="sla_entrega_realizada",
+        funcao=sla.executar,
+        gatilho=Cron("0 9 * * 1-5"),
+        timeout=60 * 60,
+        jitter=5 * 60,
+        dias_uteis=True,
+    ))
+
+    mot = carregar_bot("motivacional_bot.py", "motivacional_bot", sessao)
+    hist = mot.load_hist()
+    frases_mot = mot.carregar_frases(mot.ARQ_MOT, mot.FALLBACK_MOT)
+    frases_des = mot.carregar_frases(mot.ARQ_DES, mot.FALLBACK_DES)
+    agendador.registrar(Tarefa(
+        nome="motivacional",
+        funcao=lambda: mot.enviar_rodada(hist, frases_mot, frases_des),
+        gatilho=None,
+        timeout=5 * 60,
+        dias_uteis=True,
+        horas=mot.HORAS_ATIVAS,
+        ao_iniciar=True,
+    ))
+
+    return agendador
+
+
+# =========================
+# ▶️ MAIN
+# =========================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agendador único dos bots periódicos.")
+    parser.add_argument("--listar", action="store_true", help="Mostra as próximas execuções e sai.")
+    parser.add_argument("--agora", metavar="TAREFA", help="Executa uma tarefa uma vez e sai.")
+    args = parser.parse_args()
+
+    agendador = montar_agendador()
+    if args.listar:
+        agendador.listar()
+    elif args.agora:
+        agendador.executar_agora(args.agora)
+    else:
+        agendador.rodar()
@@ -26,6 +26,8 @@ from datetime import datetime, timedelta
 # ⚙️ CONFIGURAÇÕES GERAIS
 # =========================
 WEBHOOK_URL = "https://open.feishu.cn/open-apis/bot/v2/hook/f3b2a254-5e45-431e-a574-5b949c94ebbc"
+# Cliente HTTP (o agendador troca por uma Session compartilhada)
+HTTP = requests
 
 # Horas ativas (24h). Ex.: range(8, 22) → 08:00..21:59
 HORAS_ATIVAS = range(8, 22)
@@ -231,7 +233,7 @@ def enviar_card(tipo: str, titulo: str, markdown: str, header=None):
         }
     }
     try:
-        r = requests.post(WEBHOOK_URL, json=card, timeout=10)
+        r = HTTP.post(WEBHOOK_URL, json=card, timeout=10)
         return r.status_code == 200, ("" if r.status_code == 200 else f"{r.status_code}: {r.text}")
     except requests.RequestException as e:
         return False, str(e)
@@ -239,6 +241,74 @@ def enviar_card(tipo: str, titulo: str, markdown: str, header=None):
 # =========================
 # 🚀 LOOP PRINCIPAL
 # =========================
+def enviar_rodada(hist, frases_mot, frases_des, agora=None) -> datetime:
+    """
+    Um envio (bom dia / boa noite / frase normal) — sem checar dia útil nem janela ativa.
+    Retorna quando deve acontecer o próximo envio (usado pelo loop abaixo e pelo agendador).
+    """
+    if agora is None:
+        agora = datetime.now()
+    ts_iso = agora.isoformat(timespec="seconds")
+
+    # mensagens especiais fixas por horário (mas aleatórias no conteúdo)
+    header_rot = random.choice(HEADERS_ROTATIVOS)
+
+    if agora.hour == 8:
+        frase = escolher_sem_repetir(frases_mot, hist)
+        titulo = "☀️ Bom dia, bb!"
+        md     = f"_{frase}_"
+        ok, err = enviar_card("mot", titulo, md, header=header_rot)
+        append_log(ts_iso, "bom_dia", frase, "ok" if ok else f"erro: {err}")
+        upsert_stats("bom_dia")
+        if ok: push_recent(frase, hist)
+        return proximo_topo_hora()
+
+    if agora.hour == 22:
+        frase = escolher_sem_repetir(frases_des, hist)
+        titulo = "🌙 Boa noite, bb!"
+        md     = f"_{frase}_"
+        ok, err = enviar_card("misto", titulo, md, header=header_rot)
+        append_log(ts_iso, "boa_noite", frase, "ok" if ok else f"erro: {err}")
+        upsert_stats("boa_noite")
+        if ok: push_recent(frase, hist)
+        return proximo_topo_hora()
+
+    # mensagem normal (mot / desmot / misto)
+    modo = random.choice(["mot", "desmot", "misto"])
+    if modo == "mot":
+        frase = escolher_sem_repetir(frases_mot, hist)
+        titulo = f"{THEME['mot']['emoji']} Frase Motivacional"
+        md     = f"_{frase}_"
+        content_to_log = frase
+
+    elif modo == "desmot":
+        frase = escolher_sem_repetir(frases_des, hist)
+        titulo = f"{THEME['desmot']['emoji']} Frase Desmotivacional"
+        md     = f"_{frase}_"
+        content_to_log = frase
+
+    else:  # misto
+        mot = escolher_sem_repetir(frases_mot, hist)
+        des = escolher_sem_repetir(frases_des, hist)
+        titulo = f"{THEME['misto']['emoji']} Yin-Yang do Dia"
+        md     = f"**💪 Motivacional:** _{mot}_\n\n**😩 Desmotivacional:** _{des}_"
+        content_to_log = f"{mot} || {des}"
+
+    ok, err = enviar_card(modo, titulo, md, header=header_rot)
+    append_log(ts_iso, modo, content_to_log, "ok" if ok else f"erro: {err}")
+    upsert_stats(modo)
+    if ok:
+        push_recent(content_to_log, hist)
+        print(f"✅ {ts_iso} [{modo}] enviado.")
+    else:
+        print(f"⚠️ {ts_iso} falha ao enviar: {err}")
+
+    # intervalo inteligente
+    horas = intervalo_inteligente(agora.hour)
+    proxima = agora.replace(minute=0, second=0, microsecond=0) + timedelta(hours=horas)
+    print(f"⏳ Próximo envio previsto ~ {proxima.strftime('%d/%m %H:%M')} ({horas}h).")
+    return proxima
+
 def rodar():
     print("🚀 MotivaBB v3.1 — iniciado.")
     hist = load_hist()
@@ -267,66 +337,7 @@ def rodar():
             dormir_ate(proximo_topo_hora())
             continue
 
-        # mensagens especiais fixas por horário (mas aleatórias no conteúdo)
-        header_rot = random.choice(HEADERS_ROTATIVOS)
-
-        if agora.hour == 8:
-            frase = escolher_sem_repetir(frases_mot, hist)
-            titulo = "☀️ Bom dia, bb!"
-            md     = f"_{frase}_"
-            ok, err = enviar_card("mot", titulo, md, header=header_rot)
-            append_log(ts_iso, "bom_dia", frase, "ok" if ok else f"erro: {err}")
-            upsert_stats("bom_dia")
-            if ok: push_recent(frase, hist)
-            dormir_ate(proximo_topo_hora())
-            continue
-
-        if agora.hour == 22:
-            frase = escolher_sem_repetir(frases_des, hist)
-            titulo = "🌙 Boa noite, bb!"
-            md     = f"_{frase}_"
-            ok, err = enviar_card("misto", titulo, md, header=header_rot)
-            append_log(ts_iso, "boa_noite", frase, "ok" if ok else f"erro: {err}")
-            upsert_stats("boa_noite")
-            if ok: push_recent(frase, hist)
-            dormir_ate(proximo_topo_hora())
-            continue
-
-        # mensagem normal (mot / desmot / misto)
-        modo = random.choice(["mot", "desmot", "misto"])
-        if modo == "mot":
-            frase = escolher_sem_repetir(frases_mot, hist)
-            titulo = f"{THEME['mot']['emoji']} Frase Motivacional"
-            md     = f"_{frase}_"
-            content_to_log = frase
-
-        elif modo == "desmot":
-            frase = escolher_sem_repetir(frases_des, hist)
-            titulo = f"{THEME['desmot']['emoji']} Frase Desmotivacional"
-            md     = f"_{frase}_"
-            content_to_log = frase
-
-        else:  # misto
-            mot = escolher_sem_repetir(frases_mot, hist)
-            des = escolher_sem_repetir(frases_des, hist)
-            titulo = f"{THEME['misto']['emoji']} Yin-Yang do Dia"
-            md     = f"**💪 Motivacional:** _{mot}_\n\n**😩 Desmotivacional:** _{des}_"
-            content_to_log = f"{mot} || {des}"
-
-        ok, err = enviar_card(modo, titulo, md, header=header_rot)
-        append_log(ts_iso, modo, content_to_log, "ok" if ok else f"erro: {err}")
-        upsert_stats(modo)
-        if ok:
-            push_recent(content_to_log, hist)
-            print(f"✅ {ts_iso} [{modo}] enviado.")
-        else:
-            print(f"⚠️ {ts_iso} falha ao enviar: {err}")
-
-        # intervalo inteligente
-        horas = intervalo_inteligente(agora.hour)
-        proxima = agora.replace(minute=0, second=0, microsecond=0) + timedelta(hours=horas)
-        print(f"⏳ Próximo envio previsto ~ {proxima.strftime('%d/%m %H:%M')} ({horas}h).")
-        dormir_ate(proxima)
+        dormir_ate(enviar_rodada(hist, frases_mot, frases_des, agora))
 
 # =========================
 # ▶️ MAIN
@@ -11,6 +11,7 @@ Correções aplicadas:
 
 import os
 import io
+import sys
 import unicodedata
 import traceback
 import hashlib
@@ -22,6 +23,10 @@ import psycopg2
 from psycopg2 import Error as PgError
 import logging
 
+# perfil_execucao.py fica em Novos/ (compartilhado pelos jobs diários)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from perfil_execucao import PerfilExecucao
+
 # ======================================================
 # CONFIG BANCO (recomendado: usar env vars)
 # ======================================================
@@ -506,7 +511,7 @@ def merge_from_staging(cur, target: str, stg: str, cols: List[str], keys: Option
             SELECT {sel_str} FROM "{stg}"
             ON CONFLICT DO NOTHING;
         """)
-def processar_pasta(con, root: str) -> Dict[str, int]:
+def processar_pasta(con, root: str, perfil: PerfilExecucao) -> Dict[str, int]:
     stats = {
         "files_total": 0,
         "files_to_process": 0,
@@ -527,20 +532,21 @@ def processar_pasta(con, root: str) -> Dict[str, int]:
     with con.cursor() as cur:
         cur.execute("SET LOCAL synchronous_commit TO OFF;")
 
-        if MODO_CARGA == "truncate":
-            to_process = []
-            for fp in files:
-                st = os.stat(fp)
-                size = int(st.st_size)
-                mtime_dt = datetime.fromtimestamp(st.st_mtime).replace(tzinfo=None)
-                fhash = sha256_file(fp) if USAR_HASH_ARQUIVO else None
-                to_process.append((fp, fhash, size, mtime_dt))
-        else:
-            to_process = []
-            for fp in files:
-                ok, fhash, size, mtime_dt = should_process_file(cur, fp)
-                if ok:
+        with perfil.etapa("varredura", linhas=len(files)):
+            if MODO_CARGA == "truncate":
+                to_process = []
+                for fp in files:
+                    st = os.stat(fp)
+                    size = int(st.st_size)
+                    mtime_dt = datetime.fromtimestamp(st.st_mtime).replace(tzinfo=None)
+                    fhash = sha256_file(fp) if USAR_HASH_ARQUIVO else None
                     to_process.append((fp, fhash, size, mtime_dt))
+            else:
+                to_process = []
+                for fp in files:
+                    ok, fhash, size, mtime_dt = should_process_file(cur, fp)
+                    if ok:
+                        to_process.append((fp, fhash, size, mtime_dt))
 
     if not to_process:
         logger.info(f"⏭ {tabela}: nenhum arquivo novo/alterado.")
@@ -568,52 +574,56 @@ def processar_pasta(con, root: str) -> Dict[str, int]:
                 cur.execute(f"SAVEPOINT {sp};")
 
                 logger.info(f"➡️ Lendo: {os.path.basename(fp)}")
-                df = read_excel_safe(fp)
-                df = normalize_columns(df)
-                df = add_computed_fields(df)
+                with perfil.etapa("leitura") as etapa:
+                    df = etapa.linhas(read_excel_safe(fp))
+                with perfil.etapa("parse_campos"):
+                    df = normalize_columns(df)
+                    df = add_computed_fields(df)
 
-                ensure_table_and_columns(cur, tabela, df.columns)
-                tabela_existe_no_final = True  # pelo menos tentou criar/garantir
+                with perfil.etapa("preparar_tabela"):
+                    ensure_table_and_columns(cur, tabela, df.columns)
+                    tabela_existe_no_final = True  # pelo menos tentou criar/garantir
 
-                if MODO_CARGA == "truncate" and not did_truncate:
-                    cur.execute(f'TRUNCATE TABLE public."{tabela}";')
-                    did_truncate = True
-                    logger.info(f"🧹 TRUNCATE: {tabela}")
+                    if MODO_CARGA == "truncate" and not did_truncate:
+                        cur.execute(f'TRUNCATE TABLE public."{tabela}";')
+                        did_truncate = True
+                        logger.info(f"🧹 TRUNCATE: {tabela}")
 
-                table_cols = get_table_columns(cur, tabela)
+                    table_cols = get_table_columns(cur, tabela)
 
-                if pk_cols_table is None:
-                    pk_cols_table = detect_pk(table_cols)
-                    if (MODO_CARGA == "upsert") and pk_cols_table:
-                        pk_ready = ensure_unique_index(cur, tabela, pk_cols_table)
-                    else:
-                        pk_ready = False
+                    if pk_cols_table is None:
+                        pk_cols_table = detect_pk(table_cols)
+                        if (MODO_CARGA == "upsert") and pk_cols_table:
+                            pk_ready = ensure_unique_index(cur, tabela, pk_cols_table)
+                        else:
+                            pk_ready = False
 
-                stg = create_temp_staging(cur, tabela)
+                    stg = create_temp_staging(cur, tabela)
 
-                missing = [c for c in table_cols if c not in df.columns]
-                if missing:
-                    df = df.with_columns([pl.lit(None).alias(c) for c in missing])
+                    missing = [c for c in table_cols if c not in df.columns]
+                    if missing:
+                        df = df.with_columns([pl.lit(None).alias(c) for c in missing])
 
-                df = df.select(table_cols)
+                    df = df.select(table_cols)
 
-                hash_cols = [c for c in table_cols if c != "row_hash"]
-                df = add_row_hash(df, hash_cols)
+                    hash_cols = [c for c in table_cols if c != "row_hash"]
+                    df = add_row_hash(df, hash_cols)
 
                 n = df.height
                 logger.info(f"📦 Linhas no arquivo: {n:,}".replace(",", "."))
 
-                for start in range(0, n, COPY_CHUNK_ROWS):
-                    length = min(COPY_CHUNK_ROWS, n - start)
-                    chunk = df.slice(start, length)
+                with perfil.etapa("copy_upsert", linhas=n):
+                    for start in range(0, n, COPY_CHUNK_ROWS):
+                        length = min(COPY_CHUNK_ROWS, n - start)
+                        chunk = df.slice(start, length)
 
-                    cur.execute(f'TRUNCATE "{stg}";')
-                    copy_df_to_table(cur, stg, chunk, table_cols)
+                        cur.execute(f'TRUNCATE "{stg}";')
+                        copy_df_to_table(cur, stg, chunk, table_cols)
 
-                    if (MODO_CARGA == "upsert") and pk_ready and pk_cols_table:
-                        merge_from_staging(cur, tabela, stg, table_cols, pk_cols_table)
-                    else:
-                        merge_from_staging(cur, tabela, stg, table_cols, keys=None)
+                        if (MODO_CARGA == "upsert") and pk_ready and pk_cols_table:
+                            merge_from_staging(cur, tabela, stg, table_cols, pk_cols_table)
+                        else:
+                            merge_from_staging(cur, tabela, stg, table_cols, keys=None)
 
                 upsert_file_meta(cur, fp, mtime_dt, size, fhash, tabela)
 
@@ -633,17 +643,18 @@ def processar_pasta(con, root: str) -> Dict[str, int]:
                     raise
 
         # Só cria índices/analyze se a tabela realmente existir
-        if table_exists(cur, tabela):
-            cols_set = set(get_table_columns(cur, tabela))
-            if "dias_num" in cols_set:
-                ensure_btree_index(cur, tabela, "dias_num")
-            if "hora_ult_ts" in cols_set:
-                ensure_btree_index(cur, tabela, "hora_ult_ts")
-
-            cur.execute(f'ANALYZE public."{tabela}";')
-            logger.info(f"📊 ANALYZE: {tabela}")
-        else:
-            logger.warning(f"⚠ Skipping ANALYZE/índices: tabela não existe ({tabela}). Provável: todos arquivos falharam.")
+        with perfil.etapa("indices_analyze"):
+            if table_exists(cur, tabela):
+                cols_set = set(get_table_columns(cur, tabela))
+                if "dias_num" in cols_set:
+                    ensure_btree_index(cur, tabela, "dias_num")
+                if "hora_ult_ts" in cols_set:
+                    ensure_btree_index(cur, tabela, "hora_ult_ts")
+
+                cur.execute(f'ANALYZE public."{tabela}";')
+                logger.info(f"📊 ANALYZE: {tabela}")
+            else:
+                logger.warning(f"⚠ Skipping ANALYZE/índices: tabela não existe ({tabela}). Provável: todos arquivos falharam.")
 
     return stats
 
@@ -653,8 +664,9 @@ def main(pasta_raiz: str) -> None:
         raise ValueError("COPY_CHUNK_ROWS deve ser > 0")
 
     logger.info("\n🚀 Iniciando ETL Incremental (PostgreSQL) — COPY + UPSERT\n")
+    perfil = PerfilExecucao("criacao_envio", log=logger.info)
 
-    with conectar() as con:
+    with perfil, conectar() as con:
         try:
             ensure_meta_table(con)
             con.commit()
@@ -664,7 +676,7 @@ def main(pasta_raiz: str) -> None:
             if PROCESSAR_SUBPASTAS:
                 for root, _, files in os.walk(pasta_raiz):
                     if any(f.lower().endswith((".xlsx", ".xls")) for f in files):
-                        st = processar_pasta(con, root)
+                        st = processar_pasta(con, root, perfil)
                         con.commit()
                         total["pastas"] += 1
                         total["files_ok"] += st["files_ok"]
@@ -672,7 +684,7 @@ def main(pasta_raiz: str) -> None:
                         total["files_skipped"] += st["files_skipped"]
                         total["files_total"] += st["files_total"]
             else:
-                st = processar_pasta(con, pasta_raiz)
+                st = processar_pasta(con, pasta_raiz, perfil)
                 con.commit()
                 total["pastas"] = 1
                 total["files_ok"] = st["files_ok"]
@@ -693,6 +705,7 @@ def main(pasta_raiz: str) -> None:
             con.rollback()
             logger.error("❌ Erro geral no ETL (rollback total)")
             logger.error(traceback.format_exc())
+            perfil.finalizar("erro: rollback")
 
     logger.info("\n🏁 Finalizado.\n")
 
@@ -7,18 +7,28 @@ Auditoria ETL – Pastas Excel x Tabelas PostgreSQL
     * Pastas com Excel SEM tabela correspondente
     * Tabelas SEM pasta correspondente
     * Tabelas sem linhas
-    * Diferença de colunas (Excel x Banco)
+    * Diferença de colunas (Excel x Banco) — cabeçalho de TODOS os arquivos
+- Catálogo do banco (tabelas + colunas) em uma única consulta, com pool de conexões
+- Contagem de linhas:
+    * rapido: estimativa do pg_class.reltuples (COUNT exato só p/ tabelas estimadas como vazias)
+    * exato : COUNT(*) em paralelo
 - Gera um JSON: relatorio_auditoria.json
+
+Uso:
+    python auditoria_etl.py                 # modo rápido
+    python auditoria_etl.py --modo exato
 """
 
 import os
+import argparse
 import unicodedata
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Set, Tuple
 
 import polars as pl
-import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
 
 # ======================================================
 # CONFIG LOG
@@ -46,6 +56,9 @@ DB_CONFIG = {
 # PASTA RAIZ DOS EXCELS
 PASTA_RAIZ = r"C:\Users\J&T-099\OneDrive - Speed Rabbit Express Ltda\QUALIDADE_ FILIAL GO - BASE DE DADOS"
 
+# Paralelismo (leitura de cabeçalhos e COUNT(*) no modo exato)
+MAX_WORKERS = 8
+
 
 # ======================================================
 # NORMALIZAÇÃO – MESMO PADRÃO DO ETL
@@ -93,63 +106,118 @@ def normalizar_colunas_excel(colunas: List[str]) -> List[str]:
 
 
 # ======================================================
-# CONEXÃO BANCO
+# CONEXÃO BANCO (POOL)
 # ======================================================
-def conectar():
-    return psycopg2.connect(**DB_CONFIG)
+_POOL: ThreadedConnectionPool = None
+
+
+def obter_pool() -> ThreadedConnectionPool:
+    global _POOL
+    if _POOL is None:
+        _POOL = ThreadedConnectionPool(1, MAX_WORKERS, **DB_CONFIG)
+    return _POOL
+
+
+def fechar_pool() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.closeall()
+        _POOL = None
+
+
+def executar(sql: str, params=None) -> List[Tuple]:
+    """Executa uma consulta com uma conexão emprestada do pool."""
+    pool = obter_pool()
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        conn.rollback()  # só leitura: encerra a transação implícita
+        return rows
+    finally:
+        pool.putconn(conn)
 
 
 # ======================================================
 # FUNÇÕES AUXILIARES DE BANCO
 # ======================================================
+def obter_catalogo(prefixo: str = "col_") -> Dict[str, List[str]]:
+    """
+    Uma única consulta ao catálogo: {tabela: [colunas na ordem]} para o schema public.
+    Tabelas sem colunas também aparecem (lista vazia).
+    """
+    rows = executar("""
+        SELECT c.relname, a.attname
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_attribute a
+               ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+        WHERE n.nspname = 'public'
+          AND c.relkind IN ('r', 'p')
+          AND c.relname LIKE %s
+        ORDER BY c.relname, a.attnum;
+    """, (prefixo.replace("_", "\\_") + "%",))
+
+    catalogo: Dict[str, List[str]] = {}
+    for tabela, coluna in rows:
+        cols = catalogo.setdefault(tabela, [])
+        if coluna is not None:
+            cols.append(coluna)
+    return catalogo
+
+
 def obter_tabelas_publico(prefixo: str = "col_") -> Set[str]:
     """Retorna o conjunto de tabelas do schema public (opcionalmente filtradas por prefixo)."""
-    conn = conectar()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT tablename FROM pg_tables WHERE schemaname = 'public';"
-        )
-        rows = cur.fetchall()
-        tabelas = {r[0] for r in rows}
-        if prefixo:
-            tabelas = {t for t in tabelas if t.startswith(prefixo)}
-        return tabelas
-    finally:
-        conn.close()
+    return set(obter_catalogo(prefixo))
+
+
+def estimar_linhas_tabelas(tabelas: Set[str]) -> Dict[str, int]:
+    """Estimativa do planner (pg_class.reltuples). -1 = tabela nunca analisada."""
+    rows = executar("""
+        SELECT c.relname, c.reltuples::bigint
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public'
+          AND c.relname = ANY(%s);
+    """, (sorted(tabelas),))
+    return {t: int(q) for t, q in rows}
 
 
 def contar_linhas_tabela(tabela: str) -> int:
-    conn = conectar()
     try:
-        cur = conn.cursor()
-        cur.execute(f'SELECT COUNT(*) FROM "{tabela}";')
-        (qtd,) = cur.fetchone()
+        ((qtd,),) = executar(f'SELECT COUNT(*) FROM "{tabela}";')
         return int(qtd)
     except Exception as e:
         logger.error(f"Erro ao contar linhas da tabela '{tabela}': {e}")
         return -1
-    finally:
-        conn.close()
+
+
+def contar_linhas_tabelas(tabelas: Set[str], modo: str = "rapido") -> Dict[str, int]:
+    """
+    modo "exato" : COUNT(*) de todas as tabelas em paralelo.
+    modo "rapido": reltuples; só as estimadas como vazias (ou nunca analisadas)
+                   passam por COUNT(*) — evita falso "sem linhas" por estatística velha.
+    """
+    if not tabelas:
+        return {}
+
+    if modo == "rapido":
+        linhas = estimar_linhas_tabelas(tabelas)
+        pendentes = sorted(t for t in tabelas if linhas.get(t, -1) <= 0)
+    else:
+        linhas = {}
+        pendentes = sorted(tabelas)
+
+    if pendentes:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(pendentes))) as ex:
+            linhas.update(zip(pendentes, ex.map(contar_linhas_tabela, pendentes)))
+
+    return {t: linhas[t] for t in sorted(tabelas)}
 
 
 def obter_colunas_tabela(tabela: str) -> List[str]:
-    conn = conectar()
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_schema = 'public'
-              AND table_name = %s
-            ORDER BY ordinal_position;
-        """, (tabela,))
-        return [r[0] for r in cur.fetchall()]
-    except Exception as e:
-        logger.error(f"Erro ao obter colunas da tabela '{tabela}': {e}")
-        return []
-    finally:
-        conn.close()
+    return obter_catalogo(tabela).get(tabela, [])
 
 
 # ======================================================
@@ -187,65 +255,122 @@ def escanear_pastas_com_excel(pasta_raiz: str) -> Dict[str, Dict]:
     return info_pastas
 
 
+# ======================================================
+# CABEÇALHOS (SEM LER OS DADOS)
+# ======================================================
+def ler_cabecalho_excel(caminho_arquivo: str) -> List[str]:
+    """Lê só a primeira linha da primeira aba."""
+    if caminho_arquivo.lower().endswith(".xlsx"):
+        try:
+            import openpyxl
+
+            wb = openpyxl.load_workbook(caminho_arquivo, read_only=True)
+            try:
+                linha = next(wb.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+            finally:
+                wb.close()
+            colunas = [c for c in linha]
+            while colunas and colunas[-1] is None:
+                colunas.pop()
+            return ["" if c is None else str(c) for c in colunas]
+        except Exception:
+            pass  # cai no calamine abaixo
+
+    return pl.read_excel(caminho_arquivo, engine="calamine", read_options={"n_rows": 0}).columns
+
+
+def ler_cabecalhos_pasta(caminho_pasta: str, arquivos_excel: List[str]) -> Dict[str, List[str]]:
+    """{arquivo: colunas normalizadas} para todos os Excel da pasta (arquivos com erro ficam de fora)."""
+    def _ler(arquivo: str):
+        caminho_arquivo = os.path.join(caminho_pasta, arquivo)
+        try:
+            return normalizar_colunas_excel(ler_cabecalho_excel(caminho_arquivo))
+        except Exception as e:
+            logger.error(f"Erro ao ler cabeçalho para comparação de colunas "
+                         f"('{caminho_arquivo}'): {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(arquivos_excel)))) as ex:
+        cabecalhos = list(ex.map(_ler, arquivos_excel))
+
+    return {a: c for a, c in zip(arquivos_excel, cabecalhos) if c is not None}
+
+
 # ======================================================
 # DIFERENÇA DE COLUNAS (EXCEL x BANCO)
 # ======================================================
 def comparar_colunas_pasta_tabela(
     caminho_pasta: str,
     arquivos_excel: List[str],
-    tabela: str
+    tabela: str,
+    cols_tabela: List[str] = None
 ) -> Dict[str, List[str]]:
     """
-    Lê o primeiro Excel da pasta e compara as colunas normalizadas com as colunas da tabela.
-    Retorna dict com listas de diferenças.
+    Lê o cabeçalho de todos os Excel da pasta e compara as colunas normalizadas
+    com as colunas da tabela (vindas do catálogo, quando informadas).
+    Retorna dict com listas de diferenças (união dos arquivos) e, quando a pasta
+    tem mais de um layout, as diferenças de cada layout.
     """
     if not arquivos_excel:
         return {}
 
-    primeiro_arquivo = arquivos_excel[0]
-    caminho_arquivo = os.path.join(caminho_pasta, primeiro_arquivo)
-
-    try:
-        df = pl.read_excel(caminho_arquivo, engine="calamine")
-    except Exception as e:
-        logger.error(f"Erro ao ler Excel para comparação de colunas "
-                     f"('{caminho_arquivo}'): {e}")
+    cabecalhos = ler_cabecalhos_pasta(caminho_pasta, arquivos_excel)
+    if not cabecalhos:
         return {}
 
-    cols_excel_orig = df.columns
-    cols_excel_norm = normalizar_colunas_excel(cols_excel_orig)
-
-    cols_tabela = obter_colunas_tabela(tabela)
-
-    set_excel = set(cols_excel_norm)
+    if cols_tabela is None:
+        cols_tabela = obter_colunas_tabela(tabela)
     set_tabela = set(cols_tabela)
 
+    # Agrupa arquivos pelo layout (conjunto de colunas normalizadas)
+    layouts: Dict[Tuple[str, ...], List[str]] = {}
+    for arquivo, cols in cabecalhos.items():
+        layouts.setdefault(tuple(sorted(set(cols))), []).append(arquivo)
+
+    set_excel: Set[str] = set()
+    diferencas_layouts = []
+    for cols, arquivos in layouts.items():
+        set_excel.update(cols)
+        somente_excel_l = sorted(set(cols) - set_tabela)
+        somente_banco_l = sorted(set_tabela - set(cols))
+        if somente_excel_l or somente_banco_l:
+            diferencas_layouts.append({
+                "arquivos": sorted(arquivos),
+                "somente_excel": somente_excel_l,
+                "somente_banco": somente_banco_l,
+            })
+
     somente_excel = sorted(list(set_excel - set_tabela))
     somente_banco = sorted(list(set_tabela - set_excel))
 
-    if not somente_excel and not somente_banco:
+    if not somente_excel and not somente_banco and not diferencas_layouts:
         return {}
 
-    return {
+    diff = {
         "somente_excel": somente_excel,
         "somente_banco": somente_banco,
-        "arquivo_base": primeiro_arquivo
+        "arquivo_base": next(iter(cabecalhos)),
+        "arquivos_auditados": len(cabecalhos),
     }
+    if len(layouts) > 1:
+        diff["layouts"] = diferencas_layouts
+    return diff
 
 
 # ======================================================
 # AUDITORIA PRINCIPAL
 # ======================================================
-def rodar_auditoria():
-    logger.info("Iniciando auditoria ETL...")
+def rodar_auditoria(modo: str = "rapido"):
+    logger.info(f"Iniciando auditoria ETL (contagem: {modo})...")
 
     # 1) Escanear pastas
     info_pastas = escanear_pastas_com_excel(PASTA_RAIZ)
     total_pastas = len(info_pastas)
     total_excels = sum(p["total_excels"] for p in info_pastas.values())
 
-    # 2) Tabelas no banco (prefixo col_)
-    tabelas_banco = obter_tabelas_publico(prefixo="col_")
+    # 2) Tabelas no banco (prefixo col_) + colunas — uma consulta ao catálogo
+    catalogo = obter_catalogo(prefixo="col_")
+    tabelas_banco = set(catalogo)
     total_tabelas = len(tabelas_banco)
 
     logger.info(f"Pastas com Excel: {total_pastas}")
@@ -277,14 +402,8 @@ def rodar_auditoria():
     tabelas_sem_pasta.sort()
 
     # 5) Tabelas sem linhas
-    tabelas_sem_linhas: List[str] = []
-    linhas_por_tabela: Dict[str, int] = {}
-
-    for tabela in sorted(tabelas_banco):
-        qtd = contar_linhas_tabela(tabela)
-        linhas_por_tabela[tabela] = qtd
-        if qtd == 0:
-            tabelas_sem_linhas.append(tabela)
+    linhas_por_tabela = contar_linhas_tabelas(tabelas_banco, modo=modo)
+    tabelas_sem_linhas: List[str] = [t for t, qtd in linhas_por_tabela.items() if qtd == 0]
 
     # 6) Diferença de colunas
     diferencas_colunas: Dict[str, Dict[str, List[str]]] = {}
@@ -297,7 +416,8 @@ def rodar_auditoria():
         diff = comparar_colunas_pasta_tabela(
             caminho_pasta=caminho,
             arquivos_excel=info["arquivos_excel"],
-            tabela=tabela
+            tabela=tabela,
+            cols_tabela=catalogo[tabela]
         )
         if diff:
             diferencas_colunas[tabela] = diff
@@ -320,6 +440,7 @@ def rodar_auditoria():
         "tabelas_sem_linhas": tabelas_sem_linhas,
         "diferencas_colunas": diferencas_colunas,
         "linhas_por_tabela": linhas_por_tabela,
+        "modo_contagem": modo,
     }
 
     # 8) Salvar JSON
@@ -377,4 +498,12 @@ def rodar_auditoria():
 # MAIN
 # ======================================================
 if __name__ == "__main__":
-    rodar_auditoria()
+    ap = argparse.ArgumentParser(description="Auditoria ETL – Pastas Excel x Tabelas PostgreSQL")
+    ap.add_argument("--modo", choices=["rapido", "exato"], default="rapido",
+                    help="rapido = estimativa do pg_class (padrão); exato = COUNT(*) em paralelo")
+    args = ap.parse_args()
+
+    try:
+        rodar_auditoria(modo=args.modo)
+    finally:
+        fechar_pool()
@@ -2,18 +2,24 @@
 # pip install polars pandas tqdm openpyxl xlsxwriter
 
 import os
+import sys
 from typing import List, Optional
 
 import polars as pl
 import pandas as pd
 from tqdm import tqdm
 
+# registro_layouts.py fica em Novos/ (compartilhado entre as consolidações)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from registro_layouts import RegistroLayouts
+
 # ======================================================
 # ⚙️ CONFIGURAÇÕES
 # ======================================================
 
 PASTA_ENTRADA = r"C:\Users\J&T-099\OneDrive - Speed Rabbit Express Ltda (1)\Área de Trabalho\Sem Movimentação"
 ARQUIVO_SAIDA = os.path.join(PASTA_ENTRADA, "Bases_Filtradas.xlsx")
+PASTA_LAYOUTS = os.path.join(os.path.expanduser("~"), "SemMov_Layouts", "fluvial")  # local, fora do OneDrive
 
 BASES_ALVO = [
     "CZS -AC", "SMD -AC", "TAR -AC", "F BSL-AC",
@@ -54,64 +60,30 @@ def encontrar_coluna_unidade(df: pl.DataFrame) -> Optional[str]:
     return None
 
 
-def ler_excel_com_origem(path: str) -> Optional[pl.DataFrame]:
-    """Lê Excel com Polars e adiciona coluna de origem."""
+def ler_excel(path: str) -> Optional[pl.DataFrame]:
+    """Lê Excel com Polars (a origem é adicionada na consolidação)."""
     try:
-        df = pl.read_excel(path)
-        df = df.with_columns(
-            pl.lit(os.path.basename(path)).alias("Arquivo_Origem")
-        )
-        return df
+        return pl.read_excel(path)
     except Exception as e:
         print(f"❌ Erro ao ler '{os.path.basename(path)}': {e}")
         return None
 
 
-def concat_flex(dfs: List[pl.DataFrame]) -> pl.DataFrame:
+def consolidar(arquivos: List[str]) -> pl.DataFrame:
     """
-    Concatena dataframes mesmo com colunas faltantes.
-    1) Tenta diagonal_relaxed (melhor opção, se disponível).
-    2) Fallback: alinha colunas manualmente e concatena.
+    Classifica os arquivos pelo cabeçalho, lê e concatena com o esquema
+    resolvido pelo registro de layouts (colunas faltantes viram null).
     """
-    if not dfs:
-        return pl.DataFrame()
+    registro = RegistroLayouts(PASTA_LAYOUTS)
+    impressoes = registro.classificar_arquivos(arquivos)
 
-    # 1) Melhor cenário: Polars moderno
-    try:
-        return pl.concat(dfs, how="diagonal_relaxed")
-    except TypeError:
-        pass
-    except Exception:
-        pass
-
-    # 2) Fallback manual
-    all_cols = []
-    seen = set()
-    for df in dfs:
-        for c in df.columns:
-            if c not in seen:
-                seen.add(c)
-                all_cols.append(c)
-
-    aligned = []
-    for df in dfs:
-        missing = [c for c in all_cols if c not in df.columns]
-        if missing:
-            df = df.with_columns([pl.lit(None).alias(c) for c in missing])
-        df = df.select(all_cols)
-        aligned.append(df)
+    lidos = []
+    for arquivo in tqdm(arquivos, desc="📖 Lendo planilhas", ncols=80):
+        df = ler_excel(arquivo)
+        if df is not None and df.height > 0:
+            lidos.append((arquivo, df))
 
-    try:
-        return pl.concat(aligned)
-    except pl.exceptions.InvalidOperationError:
-        aligned2 = []
-        for d in aligned:
-            d2 = d.with_columns([
-                pl.col(c).cast(pl.String, strict=False).alias(c)
-                for c in all_cols
-            ])
-            aligned2.append(d2)
-        return pl.concat(aligned2)
+    return registro.consolidar(lidos, impressoes, coluna_origem="Arquivo_Origem")
 
 
 def remover_status_se_existir(
@@ -146,19 +118,13 @@ def main():
         print(f"  • {os.path.basename(a)}")
     print("")
 
-    dfs = []
-    for arquivo in tqdm(arquivos, desc="📖 Lendo planilhas", ncols=80):
-        df = ler_excel_com_origem(arquivo)
-        if df is not None and df.height > 0:
-            dfs.append(df)
+    print("🧩 Unindo arquivos pelo registro de layouts...")
+    df_total = consolidar(arquivos)
 
-    if not dfs:
+    if df_total.is_empty():
         print("⚠️ Nenhum dado carregado.")
         return
 
-    print("🧩 Unindo arquivos com concat flexível...")
-    df_total = concat_flex(dfs)
-
     print(f"\n📊 Total de linhas consolidadas: {df_total.height:,}\n".replace(",", "."))
 
     # Encontrar coluna alvo
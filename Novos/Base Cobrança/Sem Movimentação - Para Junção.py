@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
 
 import os
+import sys
 import math
 import polars as pl
 import pandas as pd
 from tqdm import tqdm
 
+# registro_layouts.py fica em Novos/ (compartilhado entre as consolidações)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from registro_layouts import RegistroLayouts
+
 # ======================================================
 # ⚙️ CONFIGURAÇÕES
 # ======================================================
@@ -13,6 +18,15 @@ from tqdm import tqdm
 PASTA_ENTRADA = r"C:\Users\J&T-099\OneDrive - Speed Rabbit Express Ltda (1)\Área de Trabalho\Sem Movimentação"
 ARQUIVO_SAIDA = os.path.join(PASTA_ENTRADA, "Bases_Unificadas.xlsx")
 LIMITE_EXCEL = 1_048_000  # limite seguro por aba (~1 milhão de linhas)
+PASTA_LAYOUTS = os.path.join(os.path.expanduser("~"), "SemMov_Layouts", "juncao")  # local, fora do OneDrive
+
+# Colunas que são a mesma informação com nomes diferentes.
+# Regra: a coluna canônica recebe COALESCE(candidatas...) e as candidatas extras somem.
+# ✅ Ajuste aqui conforme você encontrar novos casos (e suba VERSAO_LAYOUTS)
+SINONIMOS = {
+    "Remessa": ["Remessa", "Número de pedido JMS 运单号"],
+}
+VERSAO_LAYOUTS = "1"
 
 # ======================================================
 # 🧠 FUNÇÕES AUXILIARES
@@ -31,39 +45,6 @@ def listar_planilhas(pasta: str):
         ):
             arquivos.append(os.path.join(pasta, f))
     return arquivos
-
-
-def harmonizar_sinonimos(df: pl.DataFrame) -> pl.DataFrame:
-    """
-    Une colunas que são a mesma informação com nomes diferentes.
-    Regra: cria/atualiza a coluna canônica com COALESCE(candidatas...) e remove as candidatas extras.
-    """
-
-    # ✅ Ajuste aqui conforme você encontrar novos casos
-    SINONIMOS = {
-        "Remessa": ["Remessa", "Número de pedido JMS 运单号"],
-    }
-
-    for canonica, candidatas in SINONIMOS.items():
-        existentes = [c for c in candidatas if c in df.columns]
-        if not existentes:
-            continue
-
-        if canonica in df.columns:
-            # canonica já existe: coalesce(canonica, outras...)
-            cols = [pl.col(canonica)] + [pl.col(c) for c in existentes if c != canonica]
-            df = df.with_columns(pl.coalesce(cols).alias(canonica))
-        else:
-            # canonica não existe: cria a partir das candidatas
-            cols = [pl.col(c) for c in existentes]
-            df = df.with_columns(pl.coalesce(cols).alias(canonica))
-
-        # remove candidatas extras (mantém apenas a canônica)
-        drop_cols = [c for c in existentes if c != canonica]
-        if drop_cols:
-            df = df.drop(drop_cols)
-
-    return df
 # ======================================================
 # 🚀 EXECUÇÃO PRINCIPAL
 # ======================================================
@@ -81,39 +62,34 @@ def main():
         print(f"  • {os.path.basename(a)}")
     print("")
 
-    dfs_lazy = []
+    # Layouts conhecidos pelo cabeçalho: nomes equivalentes (ex.: 运单号 -> Remessa)
+    # e tipos já vêm resolvidos do cache
+    registro = RegistroLayouts(PASTA_LAYOUTS, sinonimos=SINONIMOS, versao=VERSAO_LAYOUTS)
+    impressoes = registro.classificar_arquivos(arquivos)
+
+    lidos = []
     resumo_arquivos = []
 
     for arquivo in tqdm(arquivos, desc="📖 Lendo planilhas", ncols=80):
         nome = os.path.basename(arquivo)
         try:
-            # Lê UMA vez (antes você lia 2x por arquivo)
             df_eager = pl.read_excel(arquivo)
-
-            # Harmoniza nomes equivalentes (ex.: 运单号 -> Remessa)
-            df_eager = harmonizar_sinonimos(df_eager)
-
-            # Adiciona coluna de origem
-            df_eager = df_eager.with_columns(pl.lit(nome).alias("Arquivo_Origem"))
-
-            # Lazy para permitir concat com otimizações
-            dfs_lazy.append(df_eager.lazy())
-
+            lidos.append((arquivo, df_eager))
             resumo_arquivos.append({"Arquivo": nome, "Linhas": df_eager.height})
 
         except Exception as e:
             print(f"❌ Erro ao ler '{nome}': {e}")
 
-    if not dfs_lazy:
+    if not lidos:
         print("⚠️ Nenhum dado carregado.")
         return
 
-    print("🧩 Combinando tudo com Polars (concat seguro)...")
+    print("🧩 Combinando tudo com o esquema do registro de layouts...")
 
     # ✅ Importante:
-    # how="diagonal_relaxed" une colunas diferentes e preenche faltantes com null,
-    # além de tentar compatibilizar tipos quando necessário.
-    df_total = pl.concat(dfs_lazy, how="diagonal_relaxed").collect()
+    # cada planilha é convertida uma vez para o esquema canônico (colunas
+    # faltantes = null) e a concatenação é vertical simples.
+    df_total = registro.consolidar(lidos, impressoes, coluna_origem="Arquivo_Origem")
 
     total_linhas, total_colunas = df_total.shape
     print(f"\n📊 Total consolidado: {total_linhas:,} linhas e {total_colunas} colunas\n".replace(",", "."))
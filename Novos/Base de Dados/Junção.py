@@ -4,6 +4,7 @@ import argparse
 import fnmatch
 import logging
 import re
+import tempfile
 from datetime import datetime
 from math import ceil
 from pathlib import Path
@@ -212,6 +213,22 @@ def read_excel_all_sheets_to_polars(fp: Path) -> List[pl.DataFrame]:
         out.append(df)
 
     return out
+
+
+def read_any_to_polars(fp: Path, encoding: str, separator: str) -> List[pl.DataFrame]:
+    """Lê um arquivo (CSV ou todas as abas do Excel) e devolve suas tabelas."""
+    ext = fp.suffix.lower()
+
+    if ext in CSV_EXTS:
+        return [read_csv_to_polars(fp, encoding=encoding, separator=separator)]
+
+    if ext in EXCEL_EXTS:
+        sheets = read_excel_all_sheets_to_polars(fp)
+        if not sheets:
+            log.warning(f"Excel sem dados úteis: {fp.name}")
+        return sheets
+
+    return []
 # =========================
 # BLOCO 3/4 — SALVAR SAÍDA (FIX DO LIMITE EXCEL)
 # =========================
@@ -274,6 +291,131 @@ def save_output(df: pl.DataFrame, output: Path, xlsx_max_rows: int, xlsx_sheet_p
         return
 
     raise ValueError(f"Extensão não suportada: {ext} (use .csv, .parquet ou .xlsx)")
+# =========================
+# MODO STREAMING (um arquivo por vez -> parquet intermediário)
+# =========================
+def stage_files(
+    files: List[Path], staging_dir: Path, encoding: str, separator: str
+) -> List[Tuple[Path, dict, int]]:
+    """
+    Lê um arquivo por vez e grava cada tabela em parquet na pasta intermediária.
+    Retorna [(parquet, schema, linhas)]; só um arquivo fica em memória por vez.
+    """
+    parts: List[Tuple[Path, dict, int]] = []
+
+    for i, fp in enumerate(files, start=1):
+        log.info(f"[{i}/{len(files)}] Lendo: {fp.name}")
+
+        try:
+            tables = read_any_to_polars(fp, encoding=encoding, separator=separator)
+        except Exception as e:
+            log.error(f"Falhou ao ler {fp.name}: {e}")
+            continue
+
+        for df in tables:
+            part = staging_dir / f"{len(parts):05d}.parquet"
+            df.write_parquet(part)
+            parts.append((part, dict(df.schema), df.height))
+
+        del tables
+
+    return parts
+
+
+def common_schema(schemas: List[dict]) -> dict:
+    """Mesmo schema que o safe_pl_concat produziria, calculado só com os schemas (sem dados)."""
+    empties = [pl.DataFrame(schema=s) for s in schemas]
+
+    for how in ("diagonal_relaxed", "diagonal"):
+        try:
+            return dict(pl.concat(empties, how=how).schema)  # type: ignore[arg-type]
+        except Exception:
+            pass
+
+    # tipos incompatíveis: tudo vira texto
+    all_cols = sorted({c for s in schemas for c in s})
+    return {c: pl.Utf8 for c in all_cols}
+
+
+def align_to_schema(lf: pl.LazyFrame, present: dict, schema: dict) -> pl.LazyFrame:
+    return lf.select([
+        pl.col(c).cast(t, strict=False) if c in present else pl.lit(None, dtype=t).alias(c)
+        for c, t in schema.items()
+    ])
+
+
+def _save_xlsx_streaming(
+    frames: List[pl.LazyFrame], columns: List[str], n_rows: int, output: Path, max_rows_excel: int, sheet_prefix: str
+) -> None:
+    """
+    Igual ao _save_xlsx_chunked (mesmos nomes de aba e limite com cabeçalho),
+    mas grava linha a linha em modo write_only, uma parte por vez.
+    """
+    from openpyxl import Workbook
+
+    max_data_rows = max(1, int(max_rows_excel) - 1)  # reserva 1 linha para o cabeçalho
+    split = n_rows > max_data_rows
+    if split:
+        log.warning(
+            f"⚠️ Excel limite por aba: {max_rows_excel:,} (inclui cabeçalho). "
+            f"Dados por aba: {max_data_rows:,}. Base tem {n_rows:,} linhas -> dividindo em {ceil(n_rows / max_data_rows)} abas."
+        )
+
+    wb = Workbook(write_only=True)
+    ws = None
+    sheet_rows = 0
+    sheet_i = 0
+
+    def new_sheet():
+        nonlocal ws, sheet_rows, sheet_i
+        sheet_i += 1
+        sheet_name = f"{sheet_prefix}_{sheet_i:04d}"[:31] if split else "BASE_UNIFICADA"
+        log.info(f"Exportando aba {sheet_name}")
+        ws = wb.create_sheet(title=sheet_name)
+        ws.append(columns)
+        sheet_rows = 0
+
+    new_sheet()
+    for lf in frames:
+        for row in lf.collect().iter_rows():
+            if sheet_rows >= max_data_rows:
+                new_sheet()
+            ws.append(row)
+            sheet_rows += 1
+
+    wb.save(output)
+
+
+def save_output_streaming(
+    parts: List[Tuple[Path, dict, int]], output: Path, xlsx_max_rows: int, xlsx_sheet_prefix: str
+) -> None:
+    output.parent.mkdir(parents=True, exist_ok=True)
+    ext = output.suffix.lower()
+
+    schema = common_schema([s for _, s, _ in parts])
+    n_rows = sum(h for _, _, h in parts)
+    frames = [align_to_schema(pl.scan_parquet(part), s, schema) for part, s, _ in parts]
+
+    log.info(f"Linhas: {n_rows:,} | Colunas: {len(schema):,}")
+    log.info(f"Salvando em: {output}")
+
+    if ext == ".parquet":
+        pl.concat(frames, how="vertical").sink_parquet(output)
+        return
+
+    if ext == ".csv":
+        with open(output, "wb") as fh:
+            for i, lf in enumerate(frames):
+                lf.collect().write_csv(fh, include_header=(i == 0))
+        return
+
+    if ext == ".xlsx":
+        _save_xlsx_streaming(frames, list(schema), n_rows, output, xlsx_max_rows, xlsx_sheet_prefix)
+        return
+
+    raise ValueError(f"Extensão não suportada: {ext} (use .csv, .parquet ou .xlsx)")
+
+
 # =========================
 # BLOCO 4/4 — MAIN
 # =========================
@@ -289,6 +431,8 @@ def main():
     ap.add_argument("--xlsx-max-rows", type=int, default=XLSX_MAX_ROWS_DEFAULT,
                     help=f"Máximo de linhas por aba no Excel (inclui cabeçalho). Padrão: {XLSX_MAX_ROWS_DEFAULT}")
     ap.add_argument("--xlsx-sheet-prefix", default="BASE", help="Prefixo das abas quando dividir (padrão: BASE)")
+    ap.add_argument("--streaming", action="store_true",
+                    help="Lê um arquivo por vez (via parquet intermediário); memória limitada ao maior arquivo")
 
     args = ap.parse_args()
 
@@ -323,22 +467,31 @@ def main():
     log.info(f"Pasta: {input_dir}")
     log.info(f"Arquivos encontrados: {len(files)}")
 
+    if args.streaming:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="juncao_", dir=output.parent) as staging:
+            parts = stage_files(files, Path(staging), encoding=args.csv_encoding, separator=args.csv_sep)
+            if not parts:
+                log.warning("Nenhuma tabela foi carregada (tudo falhou ou vazio).")
+                return
+
+            save_output_streaming(
+                parts,
+                output,
+                xlsx_max_rows=int(args.xlsx_max_rows),
+                xlsx_sheet_prefix=str(args.xlsx_sheet_prefix),
+            )
+
+        log.info("✅ Concluído.")
+        return
+
     dfs: List[pl.DataFrame] = []
 
     for i, fp in enumerate(files, start=1):
-        ext = fp.suffix.lower()
         log.info(f"[{i}/{len(files)}] Lendo: {fp.name}")
 
         try:
-            if ext in CSV_EXTS:
-                dfs.append(read_csv_to_polars(fp, encoding=args.csv_encoding, separator=args.csv_sep))
-
-            elif ext in EXCEL_EXTS:
-                sheets = read_excel_all_sheets_to_polars(fp)
-                if sheets:
-                    dfs.extend(sheets)
-                else:
-                    log.warning(f"Excel sem dados úteis: {fp.name}")
+            dfs.extend(read_any_to_polars(fp, encoding=args.csv_encoding, separator=args.csv_sep))
 
         except Exception as e:
             log.error(f"Falhou ao ler {fp.name}: {e}")
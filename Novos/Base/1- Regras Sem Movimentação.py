@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import pandas as pd
+import polars as pl
 import os
+import sys
 import numpy as np
 from tqdm import tqdm
 from datetime import datetime
@@ -9,6 +11,12 @@ import logging
 import time
 from typing import List, Dict, Optional, Any
 
+# snapshots_diarios.py / delta_pacotes.py ficam em Novos/ (compartilhados com o card de Franquias)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from snapshots_diarios import SnapshotsDiarios
+from delta_pacotes import classificar_pacotes, delta_por_base, resumo_delta
+from perfil_execucao import PerfilExecucao
+
 # ==============================================================================
 # --- CONFIGURAÇÃO GERAL ---
 # ==============================================================================
@@ -27,6 +35,7 @@ ARQUIVO_MAPEAMENTO_COORDENADORES = os.path.join(COORDENADOR_BASE_PATH, 'Base_Atu
 # --- 3. Pastas de Saída ---
 PATH_OUTPUT_REPORTS = OUTPUT_BASE_PATH
 PATH_OUTPUT_ARQUIVO_MORTO = os.path.join(OUTPUT_BASE_PATH, "Arquivo Morto")
+PATH_SNAPSHOTS = os.path.join(OUTPUT_BASE_PATH, "Snapshots")
 
 # --- 4. Nomes de Arquivos e Colunas ---
 FILENAME_START_MAIN = 'Monitoramento de movimentação em tempo real'
@@ -601,6 +610,54 @@ def salvar_relatorios(df_final: pd.DataFrame, pasta_saida: str) -> pd.DataFrame:
     return df_principal
 
 
+def gerar_delta_pacotes(df_principal: pd.DataFrame, pasta_saida: str) -> pd.DataFrame:
+    """
+    Delta por pacote contra o último snapshot (novos / resolvidos / mudaram de faixa / mudaram de status),
+    resumido por base. Salva o snapshot de hoje e a tabela "Delta por Base" (Excel + parquet do snapshot).
+    """
+    if df_principal.empty:
+        logging.warning("⚠️ Sem dados para o delta por pacote.")
+        return pd.DataFrame()
+
+    snapshots = SnapshotsDiarios(
+        PATH_SNAPSHOTS, "lm_sem_movimentacao",
+        col_id=COL_REMESSA, col_base=COLUNA_CHAVE_PRINCIPAL,
+        colunas=[COL_DIAS_PARADO, COL_STATUS, NOVA_COLUNA_COORDENADOR],
+        log=logging.info,
+    )
+
+    df_unico = df_principal.loc[:, ~df_principal.columns.duplicated()]
+    colunas = [c for c in (COL_REMESSA, COLUNA_CHAVE_PRINCIPAL, COL_DIAS_PARADO, COL_STATUS, NOVA_COLUNA_COORDENADOR)
+               if c in df_unico.columns]
+    atual = pl.from_pandas(df_unico[colunas].astype({COL_REMESSA: str}))
+
+    data_ref, anterior = snapshots.carregar_anterior(colunas=[COLUNA_CHAVE_PRINCIPAL, COL_DIAS_PARADO, COL_STATUS])
+    classificados = classificar_pacotes(
+        atual, anterior, COL_REMESSA, COLUNA_CHAVE_PRINCIPAL,
+        col_dias=COL_DIAS_PARADO, col_status=COL_STATUS,
+    )
+    delta = delta_por_base(classificados, COLUNA_CHAVE_PRINCIPAL)
+
+    if NOVA_COLUNA_COORDENADOR in atual.columns:
+        coordenadores = atual.select(COLUNA_CHAVE_PRINCIPAL, NOVA_COLUNA_COORDENADOR).unique(
+            subset=[COLUNA_CHAVE_PRINCIPAL], keep="first")
+        delta = delta.join(coordenadores, on=COLUNA_CHAVE_PRINCIPAL, how="left")
+
+    resumo = resumo_delta(classificados)
+    referencia = data_ref.strftime("%d/%m/%Y") if data_ref else "sem snapshot anterior"
+    logging.info(f"📊 Delta por pacote (vs {referencia}): {resumo}")
+
+    snapshots.salvar(atual)
+    snapshots.salvar_tabela("delta_bases", delta)
+
+    data_hoje = datetime.now().strftime("%Y-%m-%d")
+    df_delta = delta.to_pandas()
+    arquivo_delta = os.path.join(pasta_saida, f"Delta por Base_{data_hoje}.xlsx")
+    df_delta.to_excel(arquivo_delta, index=False)
+    logging.info(f"✅ Delta por base salvo: {arquivo_delta}")
+    return df_delta
+
+
 def mover_para_arquivo_morto(pasta_origem: str, pasta_destino: str):
     if not os.path.exists(pasta_destino):
         os.makedirs(pasta_destino)
@@ -630,29 +687,41 @@ def mover_para_arquivo_morto(pasta_origem: str, pasta_destino: str):
 
 def main():
     t0 = time.perf_counter()
+    perfil = PerfilExecucao("lm_sem_movimentacao", log=logging.info)
     logging.info("--- INICIANDO PROCESSO DE GERAÇÃO DE RELATÓRIOS ---")
 
     try:
-        caminho_arquivo_original = encontrar_arquivo_principal(PATH_INPUT_MAIN, FILENAME_START_MAIN)
-        if not caminho_arquivo_original:
-            logging.critical("Arquivo principal não encontrado. Processo interrompido.")
-            raise FileNotFoundError("Arquivo principal não encontrado.")
-
-        df_main = pd.read_excel(caminho_arquivo_original)
-        df_problematicos = carregar_planilhas_de_pasta(PATH_INPUT_PROBLEMATICOS, "Consolidando problemáticos")
-        df_devolucao = carregar_planilhas_de_pasta(PATH_INPUT_DEVOLUCAO, "Consolidando devoluções")
-
-        df_final = processar_dados(df_main, df_problematicos, df_devolucao)
-        df_final = adicionar_info_coordenador(df_final)
-
-        # Move relatórios antigos antes de salvar novos
-        mover_para_arquivo_morto(PATH_OUTPUT_REPORTS, PATH_OUTPUT_ARQUIVO_MORTO)
-
-        # Salva relatórios e pega o DF PRINCIPAL (SEM incompletos) para o Feishu
-        df_para_feishu = salvar_relatorios(df_final, PATH_OUTPUT_REPORTS)
-
-        logging.info(f"DF para Feishu (principal, sem incompletos): {len(df_para_feishu)} linhas")
-        logging.info("--- PROCESSO CONCLUÍDO COM SUCESSO! ---")
+        with perfil:
+            caminho_arquivo_original = encontrar_arquivo_principal(PATH_INPUT_MAIN, FILENAME_START_MAIN)
+            if not caminho_arquivo_original:
+                logging.critical("Arquivo principal não encontrado. Processo interrompido.")
+                raise FileNotFoundError("Arquivo principal não encontrado.")
+
+            with perfil.etapa("leitura") as etapa:
+                df_main = etapa.linhas(pd.read_excel(caminho_arquivo_original))
+            with perfil.etapa("leitura_auxiliares") as etapa:
+                df_problematicos = carregar_planilhas_de_pasta(PATH_INPUT_PROBLEMATICOS, "Consolidando problemáticos")
+                df_devolucao = carregar_planilhas_de_pasta(PATH_INPUT_DEVOLUCAO, "Consolidando devoluções")
+                etapa.linhas(len(df_problematicos) + len(df_devolucao))
+
+            with perfil.etapa("regras") as etapa:
+                df_final = etapa.linhas(processar_dados(df_main, df_problematicos, df_devolucao))
+            with perfil.etapa("join_coordenador") as etapa:
+                df_final = etapa.linhas(adicionar_info_coordenador(df_final))
+
+            # Move relatórios antigos antes de salvar novos
+            mover_para_arquivo_morto(PATH_OUTPUT_REPORTS, PATH_OUTPUT_ARQUIVO_MORTO)
+
+            # Salva relatórios e pega o DF PRINCIPAL (SEM incompletos) para o Feishu
+            with perfil.etapa("salvar_relatorios") as etapa:
+                df_para_feishu = etapa.linhas(salvar_relatorios(df_final, PATH_OUTPUT_REPORTS))
+
+            logging.info(f"DF para Feishu (principal, sem incompletos): {len(df_para_feishu)} linhas")
+
+            # Movimentação por pacote contra a última execução (por base)
+            with perfil.etapa("delta_pacotes") as etapa:
+                etapa.linhas(gerar_delta_pacotes(df_para_feishu, PATH_OUTPUT_REPORTS))
+            logging.info("--- PROCESSO CONCLUÍDO COM SUCESSO! ---")
 
         dt = time.perf_counter() - t0
         avisar_termino(
@@ -5,6 +5,7 @@
 
 import os
 import re
+import sys
 import json
 import time
 import warnings
@@ -17,6 +18,9 @@ import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from perfil_execucao import PerfilExecucao
+
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
 # ======================================================
@@ -861,179 +865,190 @@ def enviar_card_somente_nome_com_imagem(
     return post_json(webhook, payload, timeout=(10, 45), tag="[WEBHOOK_CARD]")
 
 def main():
-    require_env()
-    print("🚀 Iniciando consolidação de custos...\n")
-
-    file_path = encontrar_arquivo_entrada(BASE_DIR)
-    print(f"📂 Arquivo selecionado: {os.path.basename(file_path)}")
-
-    df = carregar_excel_auto(file_path)
-    print(f"📄 Planilha carregada ({len(df):,} linhas)".replace(",", "."))
-
-    # remover remessas no formato: 888001568747917-001 (número + hífen + 3 dígitos)
-    if "Remessa" in df.columns:
-        s = df["Remessa"].astype(str).str.strip()
-
-        # casa a STRING INTEIRA (evita falso-positivo em textos)
-        # aceita hífen normal "-" e também “–” / “—”
-        padrao = r"^\d{6,}[-–—]\s*\d{3}$"
-
-        mask = s.str.match(padrao, na=False)
-        df = df[~mask]
-
-        print(f"🧹 Removidas {int(mask.sum())} remessas no padrão 'numero-000' (ex: 888...-001).")
-
-    # filtrar regionais
-    if "Regional responsável" not in df.columns:
-        raise RuntimeError("❌ Coluna 'Regional responsável' não encontrada.")
-    df["Regional responsável"] = df["Regional responsável"].fillna("").astype(str).str.upper().str.strip()
-    df = df[df["Regional responsável"].isin(REGIONAIS_PERMITIDAS)]
-
-    # vincular coordenadores
-    df_coord = pd.read_excel(COORDENADOR_PATH, engine="openpyxl")
-    col_coord = "Coordenadores" if "Coordenadores" in df_coord.columns else "Coordenador"
-    if col_coord not in df_coord.columns:
-        raise RuntimeError("❌ No arquivo coordenador, não achei 'Coordenadores' nem 'Coordenador'.")
-    if "Nome da base" not in df_coord.columns:
-        raise RuntimeError("❌ No arquivo coordenador, não achei 'Nome da base'.")
-
-    df_coord = df_coord.rename(columns={col_coord: "Coordenadores"}).copy()
-
-    if "Base responsável" not in df.columns:
-        raise RuntimeError("❌ Coluna 'Base responsável' não encontrada na base de custos.")
-
-    df["Base responsável"] = df["Base responsável"].fillna("").astype(str).str.upper().str.strip()
-    df_coord["Nome da base"] = df_coord["Nome da base"].fillna("").astype(str).str.upper().str.strip()
-
-    # ✅ CORREÇÃO: evitar duplicação no merge (many-to-many)
-    dup_count = df_coord["Nome da base"].duplicated().sum()
-    if dup_count > 0:
-        print(f"⚠️ Atenção: {dup_count} bases duplicadas em Base_Atualizada.xlsx (usando a 1ª ocorrência).")
-        df_coord = df_coord.drop_duplicates(subset=["Nome da base"], keep="first")
-
-    antes_merge = len(df)
-    df = (
-        pd.merge(
-            df,
-            df_coord[["Nome da base", "Coordenadores"]],
-            left_on="Base responsável",
-            right_on="Nome da base",
-            how="left",
-        )
-        .drop(columns=["Nome da base"], errors="ignore")
-    )
-    depois_merge = len(df)
-    print("👥 Coordenadores vinculados.")
-    if depois_merge != antes_merge:
-        print(f"⚠️ Linhas antes merge: {antes_merge} | depois merge: {depois_merge} (verifique duplicidade no coordenador).")
-
-    # custo
-    if "Valor a pagar (yuan)" in df.columns:
-        if PARSE_DEBUG:
-            exemplos = df["Valor a pagar (yuan)"].dropna().astype(str).head(10).tolist()
-            print("🔎 Exemplos crus (Valor a pagar):", exemplos)
-
-        df["Custo_R$"] = to_float_safe(df["Valor a pagar (yuan)"])
-
-        if PARSE_DEBUG:
-            conv = df["Custo_R$"].head(10).tolist()
-            print("🔎 Convertidos (float):", conv)
-            print("🔎 Max Custo_R$:", float(df["Custo_R$"].max()))
-    else:
-        df["Custo_R$"] = 0.0
-
-    # pastas
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    os.makedirs(ARQUIVO_MORTO, exist_ok=True)
-    os.makedirs(IMAGENS_DIR, exist_ok=True)
-
-    # mover antigos
-    for arquivo in os.listdir(OUTPUT_DIR):
-        if arquivo.lower().endswith(".xlsx") and arquivo.startswith("Custos_Consolidado_"):
-            os.replace(os.path.join(OUTPUT_DIR, arquivo), os.path.join(ARQUIVO_MORTO, arquivo))
-
-    # salvar excel
-    with pd.ExcelWriter(ARQUIVO_SAIDA, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Base_Processada")
-    print(f"💾 Arquivo salvo em:\n{ARQUIVO_SAIDA}\n")
-
-    # por coordenador -> manda no webhook dele
-    print("📤 Enviando por coordenador (cada um no seu webhook)...\n")
-    coords = sorted(df["Coordenadores"].dropna().astype(str).unique())
-
-    enviados = 0
-    falhas = 0
-
-    for coord in coords:
-        coord = safe_str(coord)
-        if not coord:
-            continue
-
-        webhook_coord = get_webhook_do_coordenador(coord)
-        if not webhook_coord:
-            print(f"⚠️ Sem webhook para: {coord} (defina em COORDENADOR_WEBHOOKS ou FEISHU_WEBHOOK_URL)")
-            continue
-
-        try:
-            df_c = df[df["Coordenadores"].astype(str) == coord].copy()
-            if df_c.empty:
-                continue
-
-            total_pedidos = len(df_c)
-            custo_total = float(df_c["Custo_R$"].sum())
-            total_bases = int(df_c["Base responsável"].nunique(dropna=True))
-
-            tbl_all = (
-                df_c.groupby("Base responsável", dropna=False)
-                .agg(Qtd=("Base responsável", "size"), Custo=("Custo_R$", "sum"))
-                .reset_index()
-                .sort_values("Custo", ascending=False)
-            )
-
-            rows_all: List[Tuple[str, int, float]] = [
-                (safe_str(r["Base responsável"]), int(r["Qtd"]), float(r["Custo"]))
-                for _, r in tbl_all.iterrows()
-            ]
-
-            img_paths = gerar_imagens_todas_as_bases_dark(
-                coord=coord,
-                indicador_nome=INDICADOR_NOME,
-                total_pedidos=total_pedidos,
-                custo_total=custo_total,
-                total_bases=total_bases,
-                rows_all=rows_all,
-                out_dir=IMAGENS_DIR,
-                rows_per_page=ROWS_PER_PAGE,
-            )
-
-            total_pages = len(img_paths)
-
-            for idx, img_path in enumerate(img_paths, start=1):
-                img_key = upload_image_get_key(img_path)
-                page_label = f"Página {idx}/{total_pages}"
-
-                resp = enviar_card_somente_nome_com_imagem(
-                    webhook=webhook_coord,
-                    nome_coord=coord,
-                    indicador_nome=INDICADOR_NOME,
-                    total_pedidos=total_pedidos,
-                    custo_total=custo_total,
-                    bases_avaliadas=total_bases,
-                    data_humana=DATA_HUMANA,
-                    img_key=img_key,
-                    page_label=page_label,
+    with PerfilExecucao("custo_lm") as perfil:
+        require_env()
+        print("🚀 Iniciando consolidação de custos...\n")
+
+        with perfil.etapa("leitura") as etapa:
+            file_path = encontrar_arquivo_entrada(BASE_DIR)
+            print(f"📂 Arquivo selecionado: {os.path.basename(file_path)}")
+
+            df = etapa.linhas(carregar_excel_auto(file_path))
+            print(f"📄 Planilha carregada ({len(df):,} linhas)".replace(",", "."))
+
+        # remover remessas no formato: 888001568747917-001 (número + hífen + 3 dígitos)
+        with perfil.etapa("filtros") as etapa:
+            if "Remessa" in df.columns:
+                s = df["Remessa"].astype(str).str.strip()
+
+                # casa a STRING INTEIRA (evita falso-positivo em textos)
+                # aceita hífen normal "-" e também “–” / “—”
+                padrao = r"^\d{6,}[-–—]\s*\d{3}$"
+
+                mask = s.str.match(padrao, na=False)
+                df = df[~mask]
+
+                print(f"🧹 Removidas {int(mask.sum())} remessas no padrão 'numero-000' (ex: 888...-001).")
+
+            # filtrar regionais
+            if "Regional responsável" not in df.columns:
+                raise RuntimeError("❌ Coluna 'Regional responsável' não encontrada.")
+            df["Regional responsável"] = df["Regional responsável"].fillna("").astype(str).str.upper().str.strip()
+            df = etapa.linhas(df[df["Regional responsável"].isin(REGIONAIS_PERMITIDAS)])
+
+        # vincular coordenadores
+        with perfil.etapa("join_coordenador") as etapa:
+            df_coord = pd.read_excel(COORDENADOR_PATH, engine="openpyxl")
+            col_coord = "Coordenadores" if "Coordenadores" in df_coord.columns else "Coordenador"
+            if col_coord not in df_coord.columns:
+                raise RuntimeError("❌ No arquivo coordenador, não achei 'Coordenadores' nem 'Coordenador'.")
+            if "Nome da base" not in df_coord.columns:
+                raise RuntimeError("❌ No arquivo coordenador, não achei 'Nome da base'.")
+
+            df_coord = df_coord.rename(columns={col_coord: "Coordenadores"}).copy()
+
+            if "Base responsável" not in df.columns:
+                raise RuntimeError("❌ Coluna 'Base responsável' não encontrada na base de custos.")
+
+            df["Base responsável"] = df["Base responsável"].fillna("").astype(str).str.upper().str.strip()
+            df_coord["Nome da base"] = df_coord["Nome da base"].fillna("").astype(str).str.upper().str.strip()
+
+            # ✅ CORREÇÃO: evitar duplicação no merge (many-to-many)
+            dup_count = df_coord["Nome da base"].duplicated().sum()
+            if dup_count > 0:
+                print(f"⚠️ Atenção: {dup_count} bases duplicadas em Base_Atualizada.xlsx (usando a 1ª ocorrência).")
+                df_coord = df_coord.drop_duplicates(subset=["Nome da base"], keep="first")
+
+            antes_merge = len(df)
+            df = (
+                pd.merge(
+                    df,
+                    df_coord[["Nome da base", "Coordenadores"]],
+                    left_on="Base responsável",
+                    right_on="Nome da base",
+                    how="left",
                 )
-                print(f"✅ {coord} -> {page_label} | retorno: {resp}")
-                time.sleep(SLEEP_ENTRE_PAGINAS)
-
-            enviados += 1
-            time.sleep(SLEEP_ENTRE_COORDS)
-
-        except Exception as e:
-            falhas += 1
-            print(f"❌ Falhou ({coord}): {e}")
-
-    print(f"\n🏁 Finalizado! Coordenadores enviados: {enviados} | Falhas: {falhas}")
+                .drop(columns=["Nome da base"], errors="ignore")
+            )
+            depois_merge = etapa.linhas(len(df))
+            print("👥 Coordenadores vinculados.")
+            if depois_merge != antes_merge:
+                print(f"⚠️ Linhas antes merge: {antes_merge} | depois merge: {depois_merge} (verifique duplicidade no coordenador).")
+
+        # custo
+        with perfil.etapa("custo"):
+            if "Valor a pagar (yuan)" in df.columns:
+                if PARSE_DEBUG:
+                    exemplos = df["Valor a pagar (yuan)"].dropna().astype(str).head(10).tolist()
+                    print("🔎 Exemplos crus (Valor a pagar):", exemplos)
+
+                df["Custo_R$"] = to_float_safe(df["Valor a pagar (yuan)"])
+
+                if PARSE_DEBUG:
+                    conv = df["Custo_R$"].head(10).tolist()
+                    print("🔎 Convertidos (float):", conv)
+                    print("🔎 Max Custo_R$:", float(df["Custo_R$"].max()))
+            else:
+                df["Custo_R$"] = 0.0
+
+        # pastas
+        with perfil.etapa("salvar_excel"):
+            os.makedirs(OUTPUT_DIR, exist_ok=True)
+            os.makedirs(ARQUIVO_MORTO, exist_ok=True)
+            os.makedirs(IMAGENS_DIR, exist_ok=True)
+
+            # mover antigos
+            for arquivo in os.listdir(OUTPUT_DIR):
+                if arquivo.lower().endswith(".xlsx") and arquivo.startswith("Custos_Consolidado_"):
+                    os.replace(os.path.join(OUTPUT_DIR, arquivo), os.path.join(ARQUIVO_MORTO, arquivo))
+
+            # salvar excel
+            with pd.ExcelWriter(ARQUIVO_SAIDA, engine="openpyxl") as writer:
+                df.to_excel(writer, index=False, sheet_name="Base_Processada")
+            print(f"💾 Arquivo salvo em:\n{ARQUIVO_SAIDA}\n")
+
+        # por coordenador -> manda no webhook dele
+        print("📤 Enviando por coordenador (cada um no seu webhook)...\n")
+        with perfil.etapa("envio"):
+            coords = sorted(df["Coordenadores"].dropna().astype(str).unique())
+
+            enviados = 0
+            falhas = 0
+
+            for coord in coords:
+                coord = safe_str(coord)
+                if not coord:
+                    continue
+
+                webhook_coord = get_webhook_do_coordenador(coord)
+                if not webhook_coord:
+                    print(f"⚠️ Sem webhook para: {coord} (defina em COORDENADOR_WEBHOOKS ou FEISHU_WEBHOOK_URL)")
+                    continue
+
+                try:
+                    with perfil.etapa("agregacao"):
+                        df_c = df[df["Coordenadores"].astype(str) == coord].copy()
+                        if df_c.empty:
+                            continue
+
+                        total_pedidos = len(df_c)
+                        custo_total = float(df_c["Custo_R$"].sum())
+                        total_bases = int(df_c["Base responsável"].nunique(dropna=True))
+
+                        tbl_all = (
+                            df_c.groupby("Base responsável", dropna=False)
+                            .agg(Qtd=("Base responsável", "size"), Custo=("Custo_R$", "sum"))
+                            .reset_index()
+                            .sort_values("Custo", ascending=False)
+                        )
+
+                        rows_all: List[Tuple[str, int, float]] = [
+                            (safe_str(r["Base responsável"]), int(r["Qtd"]), float(r["Custo"]))
+                            for _, r in tbl_all.iterrows()
+                        ]
+
+                    with perfil.etapa("render"):
+                        img_paths = gerar_imagens_todas_as_bases_dark(
+                            coord=coord,
+                            indicador_nome=INDICADOR_NOME,
+                            total_pedidos=total_pedidos,
+                            custo_total=custo_total,
+                            total_bases=total_bases,
+                            rows_all=rows_all,
+                            out_dir=IMAGENS_DIR,
+                            rows_per_page=ROWS_PER_PAGE,
+                        )
+
+                    total_pages = len(img_paths)
+
+                    for idx, img_path in enumerate(img_paths, start=1):
+                        with perfil.etapa("upload"):
+                            img_key = upload_image_get_key(img_path)
+                        page_label = f"Página {idx}/{total_pages}"
+
+                        with perfil.etapa("envio_card"):
+                            resp = enviar_card_somente_nome_com_imagem(
+                                webhook=webhook_coord,
+                                nome_coord=coord,
+                                indicador_nome=INDICADOR_NOME,
+                                total_pedidos=total_pedidos,
+                                custo_total=custo_total,
+                                bases_avaliadas=total_bases,
+                                data_humana=DATA_HUMANA,
+                                img_key=img_key,
+                                page_label=page_label,
+                            )
+                        print(f"✅ {coord} -> {page_label} | retorno: {resp}")
+                        time.sleep(SLEEP_ENTRE_PAGINAS)
+
+                    enviados += 1
+                    time.sleep(SLEEP_ENTRE_COORDS)
+
+                except Exception as e:
+                    falhas += 1
+                    print(f"❌ Falhou ({coord}): {e}")
+
+        print(f"\n🏁 Finalizado! Coordenadores enviados: {enviados} | Falhas: {falhas}")
 
 if __name__ == "__main__":
     main()
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import os
+import sys
 import json
 import mimetypes
 import warnings
@@ -23,6 +24,9 @@ import polars as pl
 import requests
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from perfil_execucao import PerfilExecucao
+
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
 # ============================================================
@@ -1874,6 +1878,8 @@ def enviar_card_feishu(
 # ============================================================
 if __name__ == "__main__":
     logging.info("🚀 Iniciando processamento SLA por competência...")
+    # Sem "with": o script roda no nível do módulo e sai por SystemExit no modo RESUMO_ARQUIVO
+    perfil = PerfilExecucao("sla_bases_lm", log=logging.info)
 
     try:
         inicio, fim = obter_competencia()
@@ -1891,98 +1897,108 @@ if __name__ == "__main__":
         # MODO 1: RESUMO PRONTO
         # =====================================================
         if FONTE_DADOS == "RESUMO_ARQUIVO":
-            resumo_geral = ler_resumo_pronto(ARQUIVO_RESUMO)
-            resumo_com_coord = anexar_coordenador_no_resumo(resumo_geral, CAMINHO_COORDENADOR)
-
-            sem_coord = resumo_com_coord["COORDENADOR"].isna().sum()
-            logging.info(f"🧩 Bases sem coordenador após join: {int(sem_coord)}")
-
-            resumo_por_coord = gerar_resumo_por_coordenador(resumo_com_coord)
-            paths_base = exportar_base_consolidada(resumo_geral)
-            exportar_resumo_excel(resumo_geral, resumo_por_coord, ARQUIVO_SAIDA)
-            arquivos_md = montar_arquivos_gerados_md(ARQUIVO_SAIDA, paths_base)
-
-            for coord, webhook in COORDENADOR_WEBHOOKS.items():
-                coord_norm = normalizar(coord)
-                sub = resumo_com_coord[resumo_com_coord["COORD_NORM"] == coord_norm].copy()
-
-                if sub.empty:
-                    logging.warning(f"⚠️ Nenhum dado encontrado para {coord} na competência.")
-                    continue
-
-                resumo_coord = sub[["Base", "Recebido", "Entregue", "SLA"]].copy()
-                if "SLA_Anterior" in sub.columns:
-                    resumo_coord["SLA_Anterior"] = sub["SLA_Anterior"]
-                resumo_coord = resumo_coord.sort_values(by=["SLA", "Base"], ascending=[True, True], na_position="last")
-
-                bases    = int(resumo_coord["Base"].nunique())
-                recebido = int(pd.to_numeric(resumo_coord["Recebido"], errors="coerce").fillna(0).sum())
-                entregue = int(pd.to_numeric(resumo_coord["Entregue"], errors="coerce").fillna(0).sum())
-                sla      = (entregue / recebido) if recebido > 0 else 0.0
+            with perfil.etapa("leitura_resumo") as etapa:
+                resumo_geral = etapa.linhas(ler_resumo_pronto(ARQUIVO_RESUMO))
+                resumo_com_coord = anexar_coordenador_no_resumo(resumo_geral, CAMINHO_COORDENADOR)
+
+                sem_coord = resumo_com_coord["COORDENADOR"].isna().sum()
+                logging.info(f"🧩 Bases sem coordenador após join: {int(sem_coord)}")
+
+            with perfil.etapa("exportar"):
+                resumo_por_coord = gerar_resumo_por_coordenador(resumo_com_coord)
+                paths_base = exportar_base_consolidada(resumo_geral)
+                exportar_resumo_excel(resumo_geral, resumo_por_coord, ARQUIVO_SAIDA)
+                arquivos_md = montar_arquivos_gerados_md(ARQUIVO_SAIDA, paths_base)
+
+            with perfil.etapa("envio"):
+                for coord, webhook in COORDENADOR_WEBHOOKS.items():
+                    coord_norm = normalizar(coord)
+                    sub = resumo_com_coord[resumo_com_coord["COORD_NORM"] == coord_norm].copy()
+
+                    if sub.empty:
+                        logging.warning(f"⚠️ Nenhum dado encontrado para {coord} na competência.")
+                        continue
+
+                    resumo_coord = sub[["Base", "Recebido", "Entregue", "SLA"]].copy()
+                    if "SLA_Anterior" in sub.columns:
+                        resumo_coord["SLA_Anterior"] = sub["SLA_Anterior"]
+                    resumo_coord = resumo_coord.sort_values(by=["SLA", "Base"], ascending=[True, True], na_position="last")
+
+                    bases    = int(resumo_coord["Base"].nunique())
+                    recebido = int(pd.to_numeric(resumo_coord["Recebido"], errors="coerce").fillna(0).sum())
+                    entregue = int(pd.to_numeric(resumo_coord["Entregue"], errors="coerce").fillna(0).sum())
+                    sla      = (entregue / recebido) if recebido > 0 else 0.0
+
+                    with perfil.etapa("grade"):
+                        grade_coord, colunas_neutras, subtitulo_base = construir_grade_mensal_simples(
+                            resumo_pd=resumo_coord,
+                            inicio=inicio,
+                            inicio_ant=inicio_ant,
+                        )
 
-                grade_coord, colunas_neutras, subtitulo_base = construir_grade_mensal_simples(
-                    resumo_pd=resumo_coord,
-                    inicio=inicio,
-                    inicio_ant=inicio_ant,
-                )
+                    with perfil.etapa("render"):
+                        img_paths = gerar_imagens_grade_analitica(
+                            coord=coord,
+                            grade_pd=grade_coord,
+                            subtitulo_base=subtitulo_base,
+                            out_dir=PASTA_IMAGENS,
+                            rows_per_page=IMG_ROWS_PER_PAGE,
+                            colunas_neutras=colunas_neutras,
+                            colunas_domingo=[],
+                        )
 
-                img_paths = gerar_imagens_grade_analitica(
-                    coord=coord,
-                    grade_pd=grade_coord,
-                    subtitulo_base=subtitulo_base,
-                    out_dir=PASTA_IMAGENS,
-                    rows_per_page=IMG_ROWS_PER_PAGE,
-                    colunas_neutras=colunas_neutras,
-                    colunas_domingo=[],
-                )
-
-                if img_paths and _feishu_enabled():
-                    for i, p in enumerate(img_paths, start=1):
-                        try:
-                            img_key = feishu_upload_image_get_key(p)
-                            enviar_card_feishu(
-                                webhook=webhook,
-                                coord=coord,
-                                periodo_txt=periodo_txt,
-                                sla=sla,
-                                bases=bases,
-                                recebido=recebido,
-                                entregue=entregue,
-                                arquivos_gerados_md=arquivos_md,
-                                image_key=img_key,
-                                page_label=f"{i}/{len(img_paths)}",
-                            )
-                        except Exception as e:
-                            logging.error(f"⚠️ Falha no upload/envio da imagem para {coord}: {e}")
-                            enviar_card_feishu(
-                                webhook=webhook,
-                                coord=coord,
-                                periodo_txt=periodo_txt,
-                                sla=sla,
-                                bases=bases,
-                                recebido=recebido,
-                                entregue=entregue,
-                                arquivos_gerados_md=arquivos_md,
-                            )
-                        time.sleep(0.35)
+                    if img_paths and _feishu_enabled():
+                        for i, p in enumerate(img_paths, start=1):
+                            try:
+                                with perfil.etapa("upload"):
+                                    img_key = feishu_upload_image_get_key(p)
+                                with perfil.etapa("envio_card"):
+                                    enviar_card_feishu(
+                                        webhook=webhook,
+                                        coord=coord,
+                                        periodo_txt=periodo_txt,
+                                        sla=sla,
+                                        bases=bases,
+                                        recebido=recebido,
+                                        entregue=entregue,
+                                        arquivos_gerados_md=arquivos_md,
+                                        image_key=img_key,
+                                        page_label=f"{i}/{len(img_paths)}",
+                                    )
+                            except Exception as e:
+                                logging.error(f"⚠️ Falha no upload/envio da imagem para {coord}: {e}")
+                                enviar_card_feishu(
+                                    webhook=webhook,
+                                    coord=coord,
+                                    periodo_txt=periodo_txt,
+                                    sla=sla,
+                                    bases=bases,
+                                    recebido=recebido,
+                                    entregue=entregue,
+                                    arquivos_gerados_md=arquivos_md,
+                                )
+                            time.sleep(0.35)
 
             logging.info("🏁 Processamento concluído com sucesso.")
+            perfil.finalizar()
             raise SystemExit(0)
 
         # =====================================================
         # MODO 2: PASTA BRUTA
         # =====================================================
-        df = consolidar_planilhas(PASTA_ENTRADA)
-        logging.info(f"📥 Registros carregados: {df.height}")
+        with perfil.etapa("leitura") as etapa:
+            df = etapa.linhas(consolidar_planilhas(PASTA_ENTRADA))
+            logging.info(f"📥 Registros carregados: {df.height}")
 
         df = df.rename({c: c.strip().upper() for c in df.columns})
 
-        mostrar_amostra_coluna_data(df, COL_DATA_BASE)
-        df = garantir_coluna_data(df, COL_DATA_BASE)
-        diagnosticar_coluna_data(df, COL_DATA_BASE)
+        with perfil.etapa("parse_datas"):
+            mostrar_amostra_coluna_data(df, COL_DATA_BASE)
+            df = garantir_coluna_data(df, COL_DATA_BASE)
+            diagnosticar_coluna_data(df, COL_DATA_BASE)
 
-        min_data = df.select(pl.col(COL_DATA_BASE).min()).item()
-        max_data = df.select(pl.col(COL_DATA_BASE).max()).item()
+            min_data = df.select(pl.col(COL_DATA_BASE).min()).item()
+            max_data = df.select(pl.col(COL_DATA_BASE).max()).item()
 
         inicio, fim, competencia_ajustada = ajustar_competencia_pelos_dados(inicio, fim, df, COL_DATA_BASE)
         if competencia_ajustada:
@@ -2015,87 +2031,92 @@ if __name__ == "__main__":
         )
 
         # ── coordenador ──────────────────────────────────────────────────────
-        arquivo_coord = localizar_arquivo_coordenador(CAMINHO_COORDENADOR)
-        coord_df = pl.read_excel(arquivo_coord)
-
-        logging.info(f"📎 Base de coordenadores carregada: {arquivo_coord}")
-        logging.info(f"📥 Registros base coordenador: {coord_df.height}")
-
-        coord_df = coord_df.rename({c: c.strip() for c in coord_df.columns})
-
-        rename_map = {}
-        if "Nome da base" in coord_df.columns:
-            rename_map["Nome da base"] = "BASE DE ENTREGA"
-        if "NOME DA BASE" in coord_df.columns:
-            rename_map["NOME DA BASE"] = "BASE DE ENTREGA"
-        if "Coordenadores" in coord_df.columns:
-            rename_map["Coordenadores"] = "COORDENADOR"
-        if "COORDENADORES" in coord_df.columns:
-            rename_map["COORDENADORES"] = "COORDENADOR"
-        if "Coordenador" in coord_df.columns and "COORDENADOR" not in rename_map.values():
-            rename_map["Coordenador"] = "COORDENADOR"
-
-        if rename_map:
-            coord_df = coord_df.rename(rename_map)
-
-        cols_norm = {normalizar(c): c for c in coord_df.columns}
-
-        if "BASE DE ENTREGA" not in coord_df.columns:
-            if "NOME DA BASE" in cols_norm:
-                coord_df = coord_df.rename({cols_norm["NOME DA BASE"]: "BASE DE ENTREGA"})
-            elif "BASE DE ENTREGA" in cols_norm:
-                coord_df = coord_df.rename({cols_norm["BASE DE ENTREGA"]: "BASE DE ENTREGA"})
-
-        if "COORDENADOR" not in coord_df.columns:
-            if "COORDENADORES" in cols_norm:
-                coord_df = coord_df.rename({cols_norm["COORDENADORES"]: "COORDENADOR"})
-            elif "COORDENADOR" in cols_norm:
-                coord_df = coord_df.rename({cols_norm["COORDENADOR"]: "COORDENADOR"})
-
-        if "BASE DE ENTREGA" not in coord_df.columns or "COORDENADOR" not in coord_df.columns:
-            raise KeyError(
-                f"❌ O arquivo de coordenador precisa ter 'BASE DE ENTREGA' e 'COORDENADOR'. "
-                f"Colunas encontradas: {coord_df.columns}"
-            )
+        with perfil.etapa("join_coordenador") as etapa:
+            arquivo_coord = localizar_arquivo_coordenador(CAMINHO_COORDENADOR)
+            coord_df = pl.read_excel(arquivo_coord)
+
+            logging.info(f"📎 Base de coordenadores carregada: {arquivo_coord}")
+            logging.info(f"📥 Registros base coordenador: {coord_df.height}")
+
+            coord_df = coord_df.rename({c: c.strip() for c in coord_df.columns})
+
+            rename_map = {}
+            if "Nome da base" in coord_df.columns:
+                rename_map["Nome da base"] = "BASE DE ENTREGA"
+            if "NOME DA BASE" in coord_df.columns:
+                rename_map["NOME DA BASE"] = "BASE DE ENTREGA"
+            if "Coordenadores" in coord_df.columns:
+                rename_map["Coordenadores"] = "COORDENADOR"
+            if "COORDENADORES" in coord_df.columns:
+                rename_map["COORDENADORES"] = "COORDENADOR"
+            if "Coordenador" in coord_df.columns and "COORDENADOR" not in rename_map.values():
+                rename_map["Coordenador"] = "COORDENADOR"
+
+            if rename_map:
+                coord_df = coord_df.rename(rename_map)
+
+            cols_norm = {normalizar(c): c for c in coord_df.columns}
+
+            if "BASE DE ENTREGA" not in coord_df.columns:
+                if "NOME DA BASE" in cols_norm:
+                    coord_df = coord_df.rename({cols_norm["NOME DA BASE"]: "BASE DE ENTREGA"})
+                elif "BASE DE ENTREGA" in cols_norm:
+                    coord_df = coord_df.rename({cols_norm["BASE DE ENTREGA"]: "BASE DE ENTREGA"})
+
+            if "COORDENADOR" not in coord_df.columns:
+                if "COORDENADORES" in cols_norm:
+                    coord_df = coord_df.rename({cols_norm["COORDENADORES"]: "COORDENADOR"})
+                elif "COORDENADOR" in cols_norm:
+                    coord_df = coord_df.rename({cols_norm["COORDENADOR"]: "COORDENADOR"})
+
+            if "BASE DE ENTREGA" not in coord_df.columns or "COORDENADOR" not in coord_df.columns:
+                raise KeyError(
+                    f"❌ O arquivo de coordenador precisa ter 'BASE DE ENTREGA' e 'COORDENADOR'. "
+                    f"Colunas encontradas: {coord_df.columns}"
+                )
 
-        df = df.with_columns(
-            pl.col("BASE DE ENTREGA").map_elements(normalizar, return_dtype=pl.Utf8).alias("BASE_NORM")
-        )
-        coord_df = coord_df.with_columns(
-            pl.col("BASE DE ENTREGA").map_elements(normalizar, return_dtype=pl.Utf8).alias("BASE_NORM")
-        )
+            df = df.with_columns(
+                pl.col("BASE DE ENTREGA").map_elements(normalizar, return_dtype=pl.Utf8).alias("BASE_NORM")
+            )
+            coord_df = coord_df.with_columns(
+                pl.col("BASE DE ENTREGA").map_elements(normalizar, return_dtype=pl.Utf8).alias("BASE_NORM")
+            )
 
-        coord_df = coord_df.unique(subset=["BASE_NORM"], keep="first")
+            coord_df = coord_df.unique(subset=["BASE_NORM"], keep="first")
 
-        df_com_coord = (
-            df.join(
-                coord_df.select(["BASE_NORM", "COORDENADOR"]),
-                on="BASE_NORM",
-                how="left",
-            )
-            .with_columns(
-                pl.when(pl.col("COORDENADOR").is_not_null())
-                .then(pl.col("COORDENADOR").map_elements(normalizar, return_dtype=pl.Utf8))
-                .otherwise(None)
-                .alias("COORD_NORM")
+            df_com_coord = (
+                df.join(
+                    coord_df.select(["BASE_NORM", "COORDENADOR"]),
+                    on="BASE_NORM",
+                    how="left",
+                )
+                .with_columns(
+                    pl.when(pl.col("COORDENADOR").is_not_null())
+                    .then(pl.col("COORDENADOR").map_elements(normalizar, return_dtype=pl.Utf8))
+                    .otherwise(None)
+                    .alias("COORD_NORM")
+                )
             )
-        )
+            etapa.linhas(df_com_coord)
 
         # ── SLA do mês anterior (lido da pasta, não dos dados brutos) ─────────
-        sla_anterior_df = ler_sla_mes_anterior_da_pasta(PASTA_MES_ANTERIOR, inicio_ant)
+        with perfil.etapa("sla_anterior") as etapa:
+            sla_anterior_df = etapa.linhas(ler_sla_mes_anterior_da_pasta(PASTA_MES_ANTERIOR, inicio_ant))
 
         # ── filtro competência atual ──────────────────────────────────────────
-        ano_ref = inicio.year
-        mes_ref = inicio.month
-
-        df_periodo = df_com_coord.filter(
-            pl.col(COL_DATA_BASE).is_not_null()
-            & (pl.col(COL_DATA_BASE).dt.year() == ano_ref)
-            & (pl.col(COL_DATA_BASE).dt.month() == mes_ref)
-        )
+        with perfil.etapa("filtro_competencia") as etapa:
+            ano_ref = inicio.year
+            mes_ref = inicio.month
+
+            df_periodo = df_com_coord.filter(
+                pl.col(COL_DATA_BASE).is_not_null()
+                & (pl.col(COL_DATA_BASE).dt.year() == ano_ref)
+                & (pl.col(COL_DATA_BASE).dt.month() == mes_ref)
+            )
 
-        df_periodo, df_removidos = separar_pedidos_removidos(df_periodo)
-        caminho_planilha_removidos = exportar_planilha_pedidos_removidos(df_removidos)
+            df_periodo, df_removidos = separar_pedidos_removidos(df_periodo)
+            etapa.linhas(df_periodo)
+            caminho_planilha_removidos = exportar_planilha_pedidos_removidos(df_removidos)
 
         logging.info(f"📊 Registros da competência após filtro: {df_periodo.height}")
 
@@ -2108,151 +2129,161 @@ if __name__ == "__main__":
                 f"Faixa encontrada na coluna {COL_DATA_BASE}: {min_data} a {max_data}."
             )
 
-        resumo_geral = (
-            df_periodo.group_by("BASE DE ENTREGA")
-            .agg(
-                [
-                    pl.len().alias("Recebido"),
-                    pl.col("_ENTREGUE_PRAZO").sum().alias("Entregue"),
-                ]
-            )
-            .with_columns(
-                pl.when(pl.col("Recebido") > 0)
-                .then(pl.col("Entregue") / pl.col("Recebido"))
-                .otherwise(0.0)
-                .alias("SLA")
+        with perfil.etapa("agregacao", linhas=df_periodo.height):
+            resumo_geral = (
+                df_periodo.group_by("BASE DE ENTREGA")
+                .agg(
+                    [
+                        pl.len().alias("Recebido"),
+                        pl.col("_ENTREGUE_PRAZO").sum().alias("Entregue"),
+                    ]
+                )
+                .with_columns(
+                    pl.when(pl.col("Recebido") > 0)
+                    .then(pl.col("Entregue") / pl.col("Recebido"))
+                    .otherwise(0.0)
+                    .alias("SLA")
+                )
+                .sort("BASE DE ENTREGA")
+                .to_pandas()
+                .rename(columns={"BASE DE ENTREGA": "Base"})
             )
-            .sort("BASE DE ENTREGA")
-            .to_pandas()
-            .rename(columns={"BASE DE ENTREGA": "Base"})
-        )
 
-        resumo_geral = resumo_geral[["Base", "Recebido", "Entregue", "SLA"]]
-
-        # ── join com SLA anterior (do arquivo da pasta) ───────────────────────
-        if not sla_anterior_df.empty:
-            sla_anterior_df["BASE_NORM_ANT"] = sla_anterior_df["Base"].astype(str).map(normalizar)
-            resumo_geral["BASE_NORM_ANT"]    = resumo_geral["Base"].astype(str).map(normalizar)
-            resumo_geral = resumo_geral.merge(
-                sla_anterior_df[["BASE_NORM_ANT", "SLA_Anterior"]],
-                on="BASE_NORM_ANT",
-                how="left",
-            ).drop(columns=["BASE_NORM_ANT"])
-            logging.info("✅ SLA do mês anterior vinculado ao resumo geral.")
-        else:
-            resumo_geral["SLA_Anterior"] = float("nan")
+            resumo_geral = resumo_geral[["Base", "Recebido", "Entregue", "SLA"]]
+
+            # ── join com SLA anterior (do arquivo da pasta) ───────────────────────
+            if not sla_anterior_df.empty:
+                sla_anterior_df["BASE_NORM_ANT"] = sla_anterior_df["Base"].astype(str).map(normalizar)
+                resumo_geral["BASE_NORM_ANT"]    = resumo_geral["Base"].astype(str).map(normalizar)
+                resumo_geral = resumo_geral.merge(
+                    sla_anterior_df[["BASE_NORM_ANT", "SLA_Anterior"]],
+                    on="BASE_NORM_ANT",
+                    how="left",
+                ).drop(columns=["BASE_NORM_ANT"])
+                logging.info("✅ SLA do mês anterior vinculado ao resumo geral.")
+            else:
+                resumo_geral["SLA_Anterior"] = float("nan")
 
         resumo_com_coord = anexar_coordenador_no_resumo(resumo_geral, CAMINHO_COORDENADOR)
 
         sem_coord = resumo_com_coord["COORDENADOR"].isna().sum()
         logging.info(f"🧩 Bases sem coordenador após join: {int(sem_coord)}")
 
-        resumo_por_coord = gerar_resumo_por_coordenador(resumo_com_coord)
-        paths_base       = exportar_base_consolidada(resumo_geral)
-        exportar_resumo_excel(resumo_geral, resumo_por_coord, ARQUIVO_SAIDA)
-        arquivos_md      = montar_arquivos_gerados_md(ARQUIVO_SAIDA, paths_base)
+        with perfil.etapa("exportar"):
+            resumo_por_coord = gerar_resumo_por_coordenador(resumo_com_coord)
+            paths_base       = exportar_base_consolidada(resumo_geral)
+            exportar_resumo_excel(resumo_geral, resumo_por_coord, ARQUIVO_SAIDA)
+            arquivos_md      = montar_arquivos_gerados_md(ARQUIVO_SAIDA, paths_base)
 
-        analitico_comp = preparar_analitico_competencia(
-            df_periodo=df_periodo,
-            col_data_base=COL_DATA_BASE,
-            ultimos_dias=7,
-        )
+        with perfil.etapa("analitico"):
+            analitico_comp = preparar_analitico_competencia(
+                df_periodo=df_periodo,
+                col_data_base=COL_DATA_BASE,
+                ultimos_dias=7,
+            )
 
-        for coord, webhook in COORDENADOR_WEBHOOKS.items():
-            coord_norm = normalizar(coord)
-            sub = resumo_com_coord[resumo_com_coord["COORD_NORM"] == coord_norm].copy()
+        with perfil.etapa("envio"):
+            for coord, webhook in COORDENADOR_WEBHOOKS.items():
+                coord_norm = normalizar(coord)
+                sub = resumo_com_coord[resumo_com_coord["COORD_NORM"] == coord_norm].copy()
 
-            if sub.empty:
-                logging.warning(f"⚠️ Nenhum dado encontrado para {coord} na competência.")
-                continue
+                if sub.empty:
+                    logging.warning(f"⚠️ Nenhum dado encontrado para {coord} na competência.")
+                    continue
 
-            colunas_coord = ["Base", "Recebido", "Entregue", "SLA"]
-            if "SLA_Anterior" in sub.columns:
-                colunas_coord.append("SLA_Anterior")
-
-            resumo_coord = sub[colunas_coord].copy()
-            resumo_coord = resumo_coord.sort_values(by=["SLA", "Base"], ascending=[True, True], na_position="last")
-
-            bases    = int(resumo_coord["Base"].nunique())
-            recebido = int(pd.to_numeric(resumo_coord["Recebido"], errors="coerce").fillna(0).sum())
-            entregue = int(pd.to_numeric(resumo_coord["Entregue"], errors="coerce").fillna(0).sum())
-            sla      = (entregue / recebido) if recebido > 0 else 0.0
-
-            # SLA anterior consolidado do coordenador (média simples das bases)
-            sla_ant_coord: Optional[float] = None
-            if "SLA_Anterior" in resumo_coord.columns:
-                vals_ant = pd.to_numeric(resumo_coord["SLA_Anterior"], errors="coerce").dropna()
-                if not vals_ant.empty:
-                    sla_ant_coord = float(vals_ant.mean())
-
-            grade_coord, colunas_neutras, subtitulo_base = construir_grade_analitica_coord(
-                coord=coord,
-                resumo_com_coord=resumo_com_coord,
-                analitico=analitico_comp,
-                inicio=inicio,
-                inicio_ant=inicio_ant,
-            )
+                colunas_coord = ["Base", "Recebido", "Entregue", "SLA"]
+                if "SLA_Anterior" in sub.columns:
+                    colunas_coord.append("SLA_Anterior")
 
-            if grade_coord.empty:
-                grade_coord, colunas_neutras, subtitulo_base = construir_grade_mensal_simples(
-                    resumo_pd=resumo_coord,
-                    inicio=inicio,
-                    inicio_ant=inicio_ant,
-                )
+                resumo_coord = sub[colunas_coord].copy()
+                resumo_coord = resumo_coord.sort_values(by=["SLA", "Base"], ascending=[True, True], na_position="last")
+
+                bases    = int(resumo_coord["Base"].nunique())
+                recebido = int(pd.to_numeric(resumo_coord["Recebido"], errors="coerce").fillna(0).sum())
+                entregue = int(pd.to_numeric(resumo_coord["Entregue"], errors="coerce").fillna(0).sum())
+                sla      = (entregue / recebido) if recebido > 0 else 0.0
 
-            img_paths = gerar_imagens_grade_analitica(
-                coord=coord,
-                grade_pd=grade_coord,
-                subtitulo_base=subtitulo_base,
-                out_dir=PASTA_IMAGENS,
-                rows_per_page=IMG_ROWS_PER_PAGE,
-                colunas_neutras=colunas_neutras,
-                colunas_domingo=list(
-                    analitico_comp.get(
-                        "special_day_labels",
-                        analitico_comp.get("sunday_labels", []),
+                # SLA anterior consolidado do coordenador (média simples das bases)
+                sla_ant_coord: Optional[float] = None
+                if "SLA_Anterior" in resumo_coord.columns:
+                    vals_ant = pd.to_numeric(resumo_coord["SLA_Anterior"], errors="coerce").dropna()
+                    if not vals_ant.empty:
+                        sla_ant_coord = float(vals_ant.mean())
+
+                with perfil.etapa("grade"):
+                    grade_coord, colunas_neutras, subtitulo_base = construir_grade_analitica_coord(
+                        coord=coord,
+                        resumo_com_coord=resumo_com_coord,
+                        analitico=analitico_comp,
+                        inicio=inicio,
+                        inicio_ant=inicio_ant,
                     )
-                ),
-            )
 
-            if img_paths and _feishu_enabled():
-                for i, p in enumerate(img_paths, start=1):
-                    try:
-                        img_key = feishu_upload_image_get_key(p)
-                        enviar_card_feishu(
-                            webhook=webhook,
-                            coord=coord,
-                            periodo_txt=periodo_txt,
-                            sla=sla,
-                            bases=bases,
-                            recebido=recebido,
-                            entregue=entregue,
-                            arquivos_gerados_md=arquivos_md,
-                            image_key=img_key,
-                            page_label=f"{i}/{len(img_paths)}",
-                            sla_anterior=sla_ant_coord,
-                            periodo_anterior_txt=periodo_anterior_txt,
-                        )
-                    except Exception as e:
-                        logging.error(f"⚠️ Falha no upload/envio da imagem para {coord}: {e}")
-                        enviar_card_feishu(
-                            webhook=webhook,
-                            coord=coord,
-                            periodo_txt=periodo_txt,
-                            sla=sla,
-                            bases=bases,
-                            recebido=recebido,
-                            entregue=entregue,
-                            arquivos_gerados_md=arquivos_md,
-                            sla_anterior=sla_ant_coord,
-                            periodo_anterior_txt=periodo_anterior_txt,
+                    if grade_coord.empty:
+                        grade_coord, colunas_neutras, subtitulo_base = construir_grade_mensal_simples(
+                            resumo_pd=resumo_coord,
+                            inicio=inicio,
+                            inicio_ant=inicio_ant,
                         )
-                    time.sleep(0.35)
+
+                with perfil.etapa("render"):
+                    img_paths = gerar_imagens_grade_analitica(
+                        coord=coord,
+                        grade_pd=grade_coord,
+                        subtitulo_base=subtitulo_base,
+                        out_dir=PASTA_IMAGENS,
+                        rows_per_page=IMG_ROWS_PER_PAGE,
+                        colunas_neutras=colunas_neutras,
+                        colunas_domingo=list(
+                            analitico_comp.get(
+                                "special_day_labels",
+                                analitico_comp.get("sunday_labels", []),
+                            )
+                        ),
+                    )
+
+                if img_paths and _feishu_enabled():
+                    for i, p in enumerate(img_paths, start=1):
+                        try:
+                            with perfil.etapa("upload"):
+                                img_key = feishu_upload_image_get_key(p)
+                            with perfil.etapa("envio_card"):
+                                enviar_card_feishu(
+                                    webhook=webhook,
+                                    coord=coord,
+                                    periodo_txt=periodo_txt,
+                                    sla=sla,
+                                    bases=bases,
+                                    recebido=recebido,
+                                    entregue=entregue,
+                                    arquivos_gerados_md=arquivos_md,
+                                    image_key=img_key,
+                                    page_label=f"{i}/{len(img_paths)}",
+                                    sla_anterior=sla_ant_coord,
+                                    periodo_anterior_txt=periodo_anterior_txt,
+                                )
+                        except Exception as e:
+                            logging.error(f"⚠️ Falha no upload/envio da imagem para {coord}: {e}")
+                            enviar_card_feishu(
+                                webhook=webhook,
+                                coord=coord,
+                                periodo_txt=periodo_txt,
+                                sla=sla,
+                                bases=bases,
+                                recebido=recebido,
+                                entregue=entregue,
+                                arquivos_gerados_md=arquivos_md,
+                                sla_anterior=sla_ant_coord,
+                                periodo_anterior_txt=periodo_anterior_txt,
+                            )
+                        time.sleep(0.35)
 
         logging.info("🏁 Processamento concluído com sucesso.")
+        perfil.finalizar()
 
     except SystemExit:
         raise
     except Exception as e:
         logging.critical(f"❌ ERRO FATAL: {e}", exc_info=True)
+        perfil.finalizar(f"erro: {type(e).__name__}")
         raise
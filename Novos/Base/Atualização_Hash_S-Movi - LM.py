@@ -1,5 +1,6 @@
 import os
 import re
+import json
 import math
 import unicodedata
 from pathlib import Path
@@ -20,6 +21,7 @@ PASTA_RAIZ = Path(
 )
 
 PASTA_SAIDA = PASTA_RAIZ / "Imagens_Retidos"
+CAMINHO_INDICE_ARQUIVOS = PASTA_SAIDA / "_indice_arquivos.json"
 
 TITULO = "Jose Marlon — Retidos por Base"
 NOME_ARQUIVO_SAIDA = "Jose_Marlon_Retidos_por_Base"
@@ -514,6 +516,117 @@ def texto_esquerda(draw, caixa, texto, fonte, fill, padding=10):
     draw.text((x1 + padding, y), texto, font=fonte, fill=fill)
 
 
+# ============================================================
+# ÍNDICE DE ARQUIVOS (FAIXA DE DATAS POR ARQUIVO)
+# ============================================================
+
+# A pasta acumula meses de exportações, mas o resumo só usa do primeiro dia
+# do mês anterior até D-1. O índice guarda a faixa de datas de cada arquivo
+# (chave = caminho + tamanho + data de modificação) para que os arquivos
+# inteiramente fora dessa janela nem sejam abertos nas próximas execuções.
+
+def obter_janela_analise():
+    data_limite_d1 = obter_data_limite_d1()
+
+    primeiro_dia_mes_atual = data_limite_d1.replace(day=1)
+    ultimo_dia_mes_anterior = primeiro_dia_mes_atual - timedelta(days=1)
+
+    return ultimo_dia_mes_anterior.replace(day=1), data_limite_d1
+
+
+def carregar_indice_arquivos():
+    try:
+        with open(CAMINHO_INDICE_ARQUIVOS, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def salvar_indice_arquivos(indice):
+    try:
+        PASTA_SAIDA.mkdir(parents=True, exist_ok=True)
+
+        temporario = CAMINHO_INDICE_ARQUIVOS.with_suffix(".tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(indice, f, ensure_ascii=False, indent=2)
+
+        os.replace(temporario, CAMINHO_INDICE_ARQUIVOS)
+    except Exception as e:
+        print(f"⚠️ Não foi possível salvar o índice de arquivos: {e}")
+
+
+def assinatura_arquivo(arquivo):
+    info = arquivo.stat()
+    return info.st_size, info.st_mtime_ns
+
+
+def faixa_datas_indice(indice, arquivo):
+    """(data mínima, data máxima) do arquivo sem abri-lo, ou None se ainda não for conhecida."""
+    registro = indice.get(str(arquivo))
+
+    if not registro:
+        return None
+
+    if (registro["tamanho"], registro["mtime"]) != assinatura_arquivo(arquivo):
+        return None
+
+    return pd.Timestamp(registro["data_min"]), pd.Timestamp(registro["data_max"])
+
+
+def faixa_datas_df(df):
+    coluna_data = encontrar_coluna(df, COLUNA_DATA_PREVISTA)
+
+    if not coluna_data:
+        return None
+
+    valores = pd.Series(df[coluna_data].dropna().unique(), dtype=object)
+    datas = converter_data_coluna(valores).dropna()
+
+    if datas.empty:
+        return None
+
+    return datas.min(), datas.max()
+
+
+def registrar_no_indice(indice, arquivo, df):
+    faixa = faixa_datas_df(df)
+
+    if faixa is None:
+        indice.pop(str(arquivo), None)
+        return
+
+    tamanho, mtime = assinatura_arquivo(arquivo)
+
+    indice[str(arquivo)] = {
+        "tamanho": tamanho,
+        "mtime": mtime,
+        "data_min": faixa[0].strftime("%Y-%m-%d"),
+        "data_max": faixa[1].strftime("%Y-%m-%d"),
+    }
+
+
+def filtrar_arquivos_por_periodo(arquivos, indice, inicio, fim):
+    selecionados = []
+    ignorados = 0
+
+    for arquivo in arquivos:
+        faixa = faixa_datas_indice(indice, arquivo)
+
+        if faixa and (faixa[1] < inicio or faixa[0] > fim):
+            ignorados += 1
+            continue
+
+        selecionados.append(arquivo)
+
+    if ignorados:
+        print(
+            f"⏭️ {ignorados} arquivo(s) fora do período "
+            f"{inicio.strftime('%d/%m/%Y')} a {fim.strftime('%d/%m/%Y')} — não serão abertos."
+        )
+
+    return selecionados
+
+
 # ============================================================
 # LEITURA DOS ARQUIVOS
 # ============================================================
@@ -579,6 +692,13 @@ def carregar_base():
 
     print(f"📁 Arquivos encontrados: {len(arquivos)}")
 
+    indice = carregar_indice_arquivos()
+    inicio, fim = obter_janela_analise()
+    arquivos = filtrar_arquivos_por_periodo(arquivos, indice, inicio, fim)
+
+    if not arquivos:
+        raise RuntimeError("Nenhum arquivo com datas dentro do período de análise.")
+
     frames = []
 
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
@@ -593,8 +713,11 @@ def carregar_base():
 
             if df is not None and not df.empty:
                 frames.append(df)
+                registrar_no_indice(indice, arquivo, df)
                 print(f"✅ Lido: {arquivo.name}")
 
+    salvar_indice_arquivos(indice)
+
     if not frames:
         raise RuntimeError("Nenhum arquivo válido foi carregado.")
 
@@ -853,130 +976,109 @@ def montar_resumo_geral(df):
     df_periodo_base = df[
         (df["__data_prevista"] >= primeiro_dia_mes_anterior)
         & (df["__data_prevista"] <= data_limite_d1)
-    ].copy()
+    ]
 
     bases = sorted(df_periodo_base["__base"].dropna().unique())
-    resumo = pd.DataFrame({"Base": bases})
 
-    if resumo.empty:
+    if not bases:
         raise ValueError("Nenhuma base encontrada para o período analisado.")
 
-    # ========================================================
-    # MÊS ANTERIOR
-    # ========================================================
-
-    df_mes_anterior = df[
-        (df["__data_prevista"] >= primeiro_dia_mes_anterior)
-        & (df["__data_prevista"] <= ultimo_dia_mes_anterior)
-    ].copy()
-
-    cont_mes_anterior = (
-        df_mes_anterior
-        .groupby("__base")["__retidos_total"]
+    # Uma única agregação base x dia; meses, semanas e dias saem dela.
+    por_dia = (
+        df_periodo_base
+        .groupby(["__base", "__data_prevista"], as_index=False)["__retidos_total"]
         .sum()
-        .rename(label_mes_anterior)
-        .reset_index()
-        .rename(columns={"__base": "Base"})
     )
 
-    resumo = resumo.merge(cont_mes_anterior, on="Base", how="left")
-
-    # ========================================================
-    # MÊS ATUAL
-    # ========================================================
-
-    df_mes_atual = df[
-        (df["__data_prevista"] >= primeiro_dia_mes_atual)
-        & (df["__data_prevista"] <= data_limite_d1)
-    ].copy()
-
-    cont_mes_atual = (
-        df_mes_atual
-        .groupby("__base")["__retidos_total"]
-        .sum()
-        .rename(label_mes_atual)
-        .reset_index()
-        .rename(columns={"__base": "Base"})
-    )
-
-    resumo = resumo.merge(cont_mes_atual, on="Base", how="left")
-
     # ========================================================
     # SEMANAS W
     # ========================================================
 
     semanas = obter_semanas_para_exibir(
-        df=df,
+        df=por_dia,
         primeiro_dia_mes_atual=primeiro_dia_mes_atual,
         data_limite_d1=data_limite_d1
     )
 
-    colunas_semanas = []
-
-    for semana in semanas:
-        label_semana = semana["label"]
-        colunas_semanas.append(label_semana)
-
-        cont_semana = (
-            df[
-                (df["__data_prevista"] >= semana["inicio"])
-                & (df["__data_prevista"] <= semana["fim"])
-            ]
-            .groupby("__base")["__retidos_total"]
-            .sum()
-            .rename(label_semana)
-            .reset_index()
-            .rename(columns={"__base": "Base"})
-        )
-
-        resumo = resumo.merge(cont_semana, on="Base", how="left")
+    colunas_semanas = [semana["label"] for semana in semanas]
 
     # ========================================================
     # DIAS
     # ========================================================
 
     datas_para_exibir = obter_datas_para_exibir(
-        df=df,
+        df=por_dia,
         primeiro_dia_mes_atual=primeiro_dia_mes_atual,
         data_limite_d1=data_limite_d1
     )
 
     colunas_dias = []
     colunas_fim_semana = set()
+    rotulos_dias = {}
 
     for dia in datas_para_exibir:
         dia = pd.Timestamp(dia).normalize()
         label_dia = formatar_label_dia(dia)
         colunas_dias.append(label_dia)
+        rotulos_dias[dia] = label_dia
 
         if dia.weekday() in [5, 6]:
             colunas_fim_semana.add(label_dia)
 
-        cont_dia = (
-            df[df["__data_prevista"].dt.date == dia.date()]
-            .groupby("__base")["__retidos_total"]
-            .sum()
-            .rename(label_dia)
-            .reset_index()
-            .rename(columns={"__base": "Base"})
-        )
+    # ========================================================
+    # PIVÔ ÚNICO
+    # ========================================================
 
-        resumo = resumo.merge(cont_dia, on="Base", how="left")
+    # Cada data recebe as colunas em que entra (mês, semana W e dia exibido);
+    # os rótulos são calculados por data distinta, não por linha.
+    rotulos = pd.DataFrame({"__data_prevista": por_dia["__data_prevista"].drop_duplicates()})
+    datas = rotulos["__data_prevista"]
+
+    rotulos["mes"] = [
+        label_mes_anterior if data <= ultimo_dia_mes_anterior else label_mes_atual
+        for data in datas
+    ]
+    rotulos["semana"] = [
+        formatar_label_semana(data) if data >= primeiro_dia_mes_atual else None
+        for data in datas
+    ]
+    rotulos["dia"] = datas.map(rotulos_dias)
+
+    longo = (
+        por_dia
+        .merge(rotulos, on="__data_prevista")
+        .melt(
+            id_vars=["__base", "__retidos_total"],
+            value_vars=["mes", "semana", "dia"],
+            value_name="coluna"
+        )
+        .dropna(subset=["coluna"])
+    )
 
     # ========================================================
     # FINALIZAÇÃO
     # ========================================================
 
-    colunas_valores = [col for col in resumo.columns if col != "Base"]
-    resumo[colunas_valores] = resumo[colunas_valores].fillna(0).astype(int)
-
     colunas_ordenadas = (
         ["Base", label_mes_anterior, label_mes_atual]
         + colunas_semanas
         + colunas_dias
     )
 
-    resumo = resumo[colunas_ordenadas].copy()
+    resumo = (
+        longo
+        .pivot_table(
+            index="__base",
+            columns="coluna",
+            values="__retidos_total",
+            aggfunc="sum"
+        )
+        .reindex(index=bases, columns=colunas_ordenadas[1:])
+        .fillna(0)
+        .astype(int)
+        .rename_axis(index="Base", columns=None)
+        .reset_index()
+    )
 
     resumo = resumo.sort_values(
         by=[label_mes_atual, label_mes_anterior],
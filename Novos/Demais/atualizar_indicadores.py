@@ -2,9 +2,10 @@
 import argparse
 import os
 import re
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from typing import Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 
@@ -23,6 +24,9 @@ PESOS = {
 LIMITE_MELHORANDO = 5.0
 LIMITE_PIORANDO = -5.0
 
+# Quantos dias do histórico vão para a aba HISTORICO_DIARIO (o histórico completo fica no store parquet)
+JANELA_HISTORICO_EXCEL_DIAS = 35
+
 
 # -------------------------
 # UTIL
@@ -159,12 +163,40 @@ def load_base_nomes(excel_path: str) -> pd.DataFrame:
 # -------------------------
 # CÁLCULO RESUMO SEMANAL
 # -------------------------
-def _rate_per_1000(n: float, denom: float) -> float:
-    if denom is None or pd.isna(denom) or denom == 0:
-        return float("nan")
-    if n is None or pd.isna(n):
-        return float("nan")
-    return (float(n) / float(denom)) * 1000.0
+COLUNAS_RESUMO = [
+    "semana_iso",
+    "Nome da base",
+    "UF",
+    "SLA_inicio",
+    "SLA_atual",
+    "ΔSLA_pp",
+    "SemMov5d_inicio",
+    "SemMov5d_atual",
+    "Melhoria_SemMov5d",
+    "Retidos10d_inicio",
+    "Retidos10d_atual",
+    "Melhoria_Retidos10d",
+    "PNR_inicio",
+    "PNR_atual",
+    "Melhoria_PNR",
+    "Custos_inicio",
+    "Custos_atual",
+    "Melhoria_Custos",
+    "Score",
+    "Status",
+]
+
+
+def _coluna_num(df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[col], errors="coerce")
+
+
+def _rate_per_1000(n: pd.Series, denom: pd.Series) -> pd.Series:
+    """Taxa por 1000; NaN se denominador vazio/zero ou numerador vazio."""
+    valido = denom.notna() & (denom != 0) & n.notna()
+    return (n / denom.where(valido) * 1000.0).where(valido)
 
 
 def calcula_resumo_semana(df_hist: pd.DataFrame, semana_iso: str) -> pd.DataFrame:
@@ -176,115 +208,61 @@ def calcula_resumo_semana(df_hist: pd.DataFrame, semana_iso: str) -> pd.DataFram
     """
     w = df_hist[df_hist["semana_iso"] == semana_iso].copy()
     if w.empty:
-        return pd.DataFrame(
-            columns=[
-                "semana_iso",
-                "Nome da base",
-                "UF",
-                "SLA_inicio",
-                "SLA_atual",
-                "ΔSLA_pp",
-                "SemMov5d_inicio",
-                "SemMov5d_atual",
-                "Melhoria_SemMov5d",
-                "Retidos10d_inicio",
-                "Retidos10d_atual",
-                "Melhoria_Retidos10d",
-                "PNR_inicio",
-                "PNR_atual",
-                "Melhoria_PNR",
-                "Custos_inicio",
-                "Custos_atual",
-                "Melhoria_Custos",
-                "Score",
-                "Status",
-            ]
-        )
+        return pd.DataFrame(columns=COLUNAS_RESUMO)
 
     w["data_ref"] = pd.to_datetime(w["data_ref"]).dt.date
 
-    rows = []
-    for base, g in w.groupby("Nome da base", dropna=False):
-        g = g.sort_values("data_ref")
-
-        first = g.iloc[0]
-        last = g.iloc[-1]
-
-        uf = last.get("UF", "")
-        sla_ini = first.get("SLA")
-        sla_atual = last.get("SLA")
-
-        delta_sla_pp = None
-        if pd.notna(sla_ini) and pd.notna(sla_atual):
-            delta_sla_pp = (float(sla_atual) - float(sla_ini)) * 100.0
-
-        # Taxas por 1000, usando Qtd a entregar como denominador
-        den_ini = first.get("Qtd a entregar")
-        den_atual = last.get("Qtd a entregar")
-
-        sem_ini = _rate_per_1000(first.get("Sem Mov.>5d"), den_ini)
-        sem_atual = _rate_per_1000(last.get("Sem Mov.>5d"), den_atual)
-        mel_sem = sem_ini - sem_atual if pd.notna(sem_ini) and pd.notna(sem_atual) else float("nan")
-
-        ret_ini = _rate_per_1000(first.get("Retidos > 10d"), den_ini)
-        ret_atual = _rate_per_1000(last.get("Retidos > 10d"), den_atual)
-        mel_ret = ret_ini - ret_atual if pd.notna(ret_ini) and pd.notna(ret_atual) else float("nan")
-
-        pnr_ini = _rate_per_1000(first.get("Total de PNR"), den_ini)
-        pnr_atual = _rate_per_1000(last.get("Total de PNR"), den_atual)
-        mel_pnr = pnr_ini - pnr_atual if pd.notna(pnr_ini) and pd.notna(pnr_atual) else float("nan")
-
-        cus_ini = _rate_per_1000(first.get("Custos de Ressarcimento"), den_ini)
-        cus_atual = _rate_per_1000(last.get("Custos de Ressarcimento"), den_atual)
-        mel_cus = cus_ini - cus_atual if pd.notna(cus_ini) and pd.notna(cus_atual) else float("nan")
-
-        # Score (trate NaN como 0 para não quebrar)
-        score = 0.0
-        score += PESOS["sla"] * (delta_sla_pp if delta_sla_pp is not None and pd.notna(delta_sla_pp) else 0.0)
-        score += PESOS["semmov"] * (mel_sem if pd.notna(mel_sem) else 0.0)
-        score += PESOS["retidos"] * (mel_ret if pd.notna(mel_ret) else 0.0)
-        score += PESOS["pnr"] * (mel_pnr if pd.notna(mel_pnr) else 0.0)
-        score += PESOS["custos"] * (mel_cus if pd.notna(mel_cus) else 0.0)
-
-        if score >= LIMITE_MELHORANDO:
-            status = "Melhorando"
-        elif score <= LIMITE_PIORANDO:
-            status = "Piorando"
-        else:
-            status = "Estável"
-
-        rows.append(
-            {
-                "semana_iso": semana_iso,
-                "Nome da base": base,
-                "UF": uf,
-                "SLA_inicio": sla_ini,
-                "SLA_atual": sla_atual,
-                "ΔSLA_pp": delta_sla_pp,
-                "SemMov5d_inicio": sem_ini,
-                "SemMov5d_atual": sem_atual,
-                "Melhoria_SemMov5d": mel_sem,
-                "Retidos10d_inicio": ret_ini,
-                "Retidos10d_atual": ret_atual,
-                "Melhoria_Retidos10d": mel_ret,
-                "PNR_inicio": pnr_ini,
-                "PNR_atual": pnr_atual,
-                "Melhoria_PNR": mel_pnr,
-                "Custos_inicio": cus_ini,
-                "Custos_atual": cus_atual,
-                "Melhoria_Custos": mel_cus,
-                "Score": score,
-                "Status": status,
-            }
-        )
+    # 1º e último snapshot de cada base, todas as bases de uma vez
+    w = w.sort_values("data_ref", kind="stable")
+    first = w.drop_duplicates("Nome da base", keep="first").set_index("Nome da base").sort_index()
+    last = w.drop_duplicates("Nome da base", keep="last").set_index("Nome da base").sort_index()
+
+    out = pd.DataFrame(index=first.index)
+    out.insert(0, "semana_iso", semana_iso)
+    out["UF"] = last["UF"] if "UF" in last.columns else ""
+
+    out["SLA_inicio"] = _coluna_num(first, "SLA")
+    out["SLA_atual"] = _coluna_num(last, "SLA")
+    out["ΔSLA_pp"] = (out["SLA_atual"] - out["SLA_inicio"]) * 100.0
+
+    # Taxas por 1000, usando Qtd a entregar como denominador
+    den_ini = _coluna_num(first, "Qtd a entregar")
+    den_atual = _coluna_num(last, "Qtd a entregar")
+
+    metricas = [
+        ("SemMov5d", "Sem Mov.>5d", "semmov"),
+        ("Retidos10d", "Retidos > 10d", "retidos"),
+        ("PNR", "Total de PNR", "pnr"),
+        ("Custos", "Custos de Ressarcimento", "custos"),
+    ]
+
+    # Score (trate NaN como 0 para não quebrar)
+    score = PESOS["sla"] * out["ΔSLA_pp"].fillna(0.0)
 
-    out = pd.DataFrame(rows)
+    for nome, col, peso in metricas:
+        ini = _rate_per_1000(_coluna_num(first, col), den_ini)
+        atual = _rate_per_1000(_coluna_num(last, col), den_atual)
+
+        out[f"{nome}_inicio"] = ini
+        out[f"{nome}_atual"] = atual
+        out[f"Melhoria_{nome}"] = ini - atual
+
+        score = score + PESOS[peso] * out[f"Melhoria_{nome}"].fillna(0.0)
+
+    out["Score"] = score
+    out["Status"] = np.select(
+        [score >= LIMITE_MELHORANDO, score <= LIMITE_PIORANDO],
+        ["Melhorando", "Piorando"],
+        default="Estável",
+    )
+
+    out = out.reset_index()[COLUNAS_RESUMO]
     out = out.sort_values(["Status", "Score"], ascending=[True, False])
     return out
 
 
 # -------------------------
-# HISTÓRICO (append + dedup)
+# HISTÓRICO (store parquet: um arquivo por data_ref, chave data_ref + Nome da base)
 # -------------------------
 def read_sheet_if_exists(path_xlsx: str, sheet_name: str) -> pd.DataFrame:
     try:
@@ -293,11 +271,85 @@ def read_sheet_if_exists(path_xlsx: str, sheet_name: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def pasta_historico(arquivo_base: str) -> str:
+    raiz, _ = os.path.splitext(arquivo_base)
+    return f"{raiz}_historico"
+
+
+def _arquivo_do_dia(pasta: str, d: date) -> str:
+    return os.path.join(pasta, f"data_ref={d.isoformat()}.parquet")
+
+
+def datas_no_historico(pasta: str) -> list:
+    if not os.path.isdir(pasta):
+        return []
+    datas = []
+    for f in os.listdir(pasta):
+        m = re.fullmatch(r"data_ref=(\d{4}-\d{2}-\d{2})\.parquet", f)
+        if m:
+            datas.append(date.fromisoformat(m.group(1)))
+    return sorted(datas)
+
+
+def gravar_snapshot(pasta: str, d: date, df_dia: pd.DataFrame) -> None:
+    """
+    Grava o snapshot de um dia. Regravar o mesmo dia substitui só aquele arquivo
+    (chave data_ref + Nome da base); os demais dias nunca são reescritos.
+    """
+    os.makedirs(pasta, exist_ok=True)
+
+    df_dia = df_dia.copy()
+    if "Nome da base" in df_dia.columns:
+        df_dia = df_dia.drop_duplicates(subset=["Nome da base"], keep="last")
+
+    # parquet exige nomes de coluna texto e colunas de tipo único
+    df_dia.columns = [str(c) for c in df_dia.columns]
+    for c in df_dia.columns:
+        if df_dia[c].dtype == object:
+            df_dia[c] = df_dia[c].astype("string")
+
+    destino = _arquivo_do_dia(pasta, d)
+    tmp = destino + ".tmp"
+    df_dia.to_parquet(tmp, index=False)
+    os.replace(tmp, destino)
+
+
+def ler_historico(pasta: str, inicio: Optional[date] = None, fim: Optional[date] = None) -> pd.DataFrame:
+    """Lê só os dias do intervalo pedido (cada dia é um arquivo)."""
+    arquivos = [
+        _arquivo_do_dia(pasta, d)
+        for d in datas_no_historico(pasta)
+        if (inicio is None or d >= inicio) and (fim is None or d <= fim)
+    ]
+    if not arquivos:
+        return pd.DataFrame()
+    return pd.concat([pd.read_parquet(a) for a in arquivos], ignore_index=True)
+
+
+def migrar_historico_excel(arquivo_base: str, pasta: str) -> None:
+    """Primeira execução: leva a aba HISTORICO_DIARIO antiga do workbook para o store."""
+    if datas_no_historico(pasta):
+        return
+
+    df_hist = read_sheet_if_exists(arquivo_base, "HISTORICO_DIARIO")
+    if df_hist.empty or "data_ref" not in df_hist.columns:
+        return
+
+    df_hist["data_ref"] = pd.to_datetime(df_hist["data_ref"], errors="coerce")
+    df_hist = df_hist[df_hist["data_ref"].notna()]
+
+    for d, g in df_hist.groupby(df_hist["data_ref"].dt.date):
+        gravar_snapshot(pasta, d, g)
+
+    print(f"Histórico do workbook migrado para {pasta} ({df_hist['data_ref'].nunique()} dias).")
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--arquivo_dia", required=True, help="Relatório do dia (xlsx)")
     ap.add_argument("--arquivo_base", required=True, help="Workbook base com HISTORICO_DIARIO/RESUMO_SEMANA")
     ap.add_argument("--data", required=False, help="Data do snapshot (YYYY-MM-DD). Se omitido, tenta extrair do nome do arquivo.")
+    ap.add_argument("--historico_completo", action="store_true", help="Exporta o histórico inteiro na aba HISTORICO_DIARIO")
     args = ap.parse_args()
 
     arquivo_dia = args.arquivo_dia
@@ -338,24 +390,23 @@ def main():
     df_today.insert(1, "semana_iso", semana)
     df_today.insert(2, "dia_semana", dia_semana)
 
-    # Ler histórico existente
-    df_hist = read_sheet_if_exists(arquivo_base, "HISTORICO_DIARIO")
-    if not df_hist.empty:
-        # Normalizar data_ref
-        df_hist["data_ref"] = pd.to_datetime(df_hist["data_ref"], errors="coerce")
+    # Gravar no store (só o arquivo do dia; o histórico antigo não é relido nem reescrito)
+    pasta = pasta_historico(arquivo_base)
+    migrar_historico_excel(arquivo_base, pasta)
+    gravar_snapshot(pasta, dt, df_today)
 
-    # Append + dedup
-    df_all = pd.concat([df_hist, df_today], ignore_index=True)
-    if "Nome da base" in df_all.columns and "data_ref" in df_all.columns:
-        df_all["data_ref"] = pd.to_datetime(df_all["data_ref"], errors="coerce")
-        df_all = df_all.drop_duplicates(subset=["data_ref", "Nome da base"], keep="last")
+    # Resumo semana (lê só os dias da semana ISO)
+    inicio_semana = dt - timedelta(days=dt.weekday())
+    df_semana = ler_historico(pasta, inicio_semana, inicio_semana + timedelta(days=6))
+    df_resumo = calcula_resumo_semana(df_semana, semana)
 
-    # Resumo semana
-    df_resumo = calcula_resumo_semana(df_all, semana)
+    # Workbook = visão de exportação: últimos dias do histórico + resumo da semana
+    inicio_export = None if args.historico_completo else dt - timedelta(days=JANELA_HISTORICO_EXCEL_DIAS - 1)
+    df_export = ler_historico(pasta, inicio_export, None if args.historico_completo else dt)
 
     # Gravar no arquivo_base (substitui as abas)
     with pd.ExcelWriter(arquivo_base, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-        df_all.to_excel(writer, sheet_name="HISTORICO_DIARIO", index=False)
+        df_export.to_excel(writer, sheet_name="HISTORICO_DIARIO", index=False)
         df_resumo.to_excel(writer, sheet_name="RESUMO_SEMANA", index=False)
 
     print(f"OK: histórico atualizado para {dt} ({semana}).")
@@ -5,6 +5,7 @@ import io
 import sys
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 import plotly.express as px
@@ -87,6 +88,38 @@ def normalizar_numero(valor) -> float:
         return 0.0
 
 
+def normalizar_serie_numerica(serie: pd.Series) -> pd.Series:
+    """Versão vetorizada de `normalizar_numero` para uma coluna inteira."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float).fillna(0.0)
+
+    serie = serie.astype(object)
+    eh_texto = serie.map(lambda v: isinstance(v, str))
+    # Só os valores que são texto passam pelo .str (coluna object pode trazer int/data/bool)
+    texto = serie.where(eh_texto).astype("string").str.strip()
+
+    convertido = pd.to_numeric(
+        texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False),
+        errors="coerce",
+    )
+    numerico = pd.to_numeric(serie.where(~eh_texto), errors="coerce")
+
+    return convertido.astype(float).fillna(numerico).fillna(0.0).astype(float)
+
+
+def dividir_seguro(numerador: pd.Series, denominador: pd.Series) -> np.ndarray:
+    """Divide coluna a coluna, retornando 0 onde o denominador não é positivo."""
+    num = numerador.to_numpy(dtype=float)
+    den = denominador.to_numpy(dtype=float)
+    return np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+
+
+def adicionar_percentuais(df: pd.DataFrame) -> pd.DataFrame:
+    df["Pct recebimento"] = dividir_seguro(df[COL_REC], df[COL_TOTAL_BIPAR])
+    df["Pct saída"] = dividir_seguro(df[COL_SAI], df[COL_TOTAL_BIPAR])
+    return df
+
+
 def formatar_inteiro(valor: int | float) -> str:
     try:
         return f"{int(valor):,}".replace(",", ".")
@@ -145,11 +178,11 @@ def preparar_dados(df: pd.DataFrame) -> tuple[pd.DataFrame, bool]:
     df[COL_DATA] = pd.to_datetime(df[COL_DATA], errors="coerce", dayfirst=True)
     df[COL_BASE] = df[COL_BASE].astype(str).str.strip()
 
-    df[COL_REC] = df[COL_REC].apply(normalizar_numero)
-    df[COL_SAI] = df[COL_SAI].apply(normalizar_numero)
+    df[COL_REC] = normalizar_serie_numerica(df[COL_REC])
+    df[COL_SAI] = normalizar_serie_numerica(df[COL_SAI])
 
     if usa_total_bipar:
-        df[COL_TOTAL_BIPAR] = df[COL_TOTAL_BIPAR].apply(normalizar_numero)
+        df[COL_TOTAL_BIPAR] = normalizar_serie_numerica(df[COL_TOTAL_BIPAR])
 
     df = df.dropna(subset=[COL_DATA])
     df = df[df[COL_BASE] != ""].copy()
@@ -175,19 +208,13 @@ def consolidar_periodo(df: pd.DataFrame, usa_total_bipar: bool) -> pd.DataFrame:
         df.groupby([COL_DATA, COL_BASE], as_index=False)[colunas_soma]
         .sum()
         .sort_values([COL_DATA, COL_BASE])
+        .reset_index(drop=True)
     )
 
     base["Total faltas"] = base[COL_REC] + base[COL_SAI]
 
     if usa_total_bipar:
-        base["Pct recebimento"] = base.apply(
-            lambda x: x[COL_REC] / x[COL_TOTAL_BIPAR] if x[COL_TOTAL_BIPAR] > 0 else 0,
-            axis=1,
-        )
-        base["Pct saída"] = base.apply(
-            lambda x: x[COL_SAI] / x[COL_TOTAL_BIPAR] if x[COL_TOTAL_BIPAR] > 0 else 0,
-            axis=1,
-        )
+        base = adicionar_percentuais(base)
 
     return base
 
@@ -204,14 +231,7 @@ def resumo_por_base(df_consolidado: pd.DataFrame, usa_total_bipar: bool) -> pd.D
     )
 
     if usa_total_bipar:
-        base["Pct recebimento"] = base.apply(
-            lambda x: x[COL_REC] / x[COL_TOTAL_BIPAR] if x[COL_TOTAL_BIPAR] > 0 else 0,
-            axis=1,
-        )
-        base["Pct saída"] = base.apply(
-            lambda x: x[COL_SAI] / x[COL_TOTAL_BIPAR] if x[COL_TOTAL_BIPAR] > 0 else 0,
-            axis=1,
-        )
+        base = adicionar_percentuais(base)
 
     return base
 
@@ -228,41 +248,77 @@ def resumo_diario(df_consolidado: pd.DataFrame, usa_total_bipar: bool) -> pd.Dat
     )
 
     if usa_total_bipar:
-        diario["Pct recebimento"] = diario.apply(
-            lambda x: x[COL_REC] / x[COL_TOTAL_BIPAR] if x[COL_TOTAL_BIPAR] > 0 else 0,
-            axis=1,
-        )
-        diario["Pct saída"] = diario.apply(
-            lambda x: x[COL_SAI] / x[COL_TOTAL_BIPAR] if x[COL_TOTAL_BIPAR] > 0 else 0,
-            axis=1,
-        )
+        diario = adicionar_percentuais(diario)
 
     return diario
 
 
-def calcular_delta_periodo(df_consolidado: pd.DataFrame, data_ini, data_fim, usa_total_bipar: bool) -> dict:
-    dias_periodo = max((data_fim - data_ini).days + 1, 1)
+def construir_motor_consolidacao(df: pd.DataFrame, usa_total_bipar: bool) -> dict:
+    """
+    Monta, uma única vez por upload, a tabela dia x base e as somas
+    acumuladas por dia usadas nos filtros e nos comparativos de período.
+    """
+    consolidado = consolidar_periodo(df, usa_total_bipar)
+
+    colunas_soma = [COL_REC, COL_SAI, "Total faltas"]
+    if usa_total_bipar:
+        colunas_soma.append(COL_TOTAL_BIPAR)
+
+    diario = consolidado.groupby(COL_DATA)[colunas_soma].sum().sort_index()
+
+    # Linha zero na frente: soma de [i, j) = acumulado[j] - acumulado[i]
+    acumulado = {
+        col: np.concatenate(([0], diario[col].to_numpy(dtype=np.float64).cumsum()))
+        for col in colunas_soma
+    }
+
+    return {
+        "consolidado": consolidado,
+        "usa_total_bipar": usa_total_bipar,
+        "datas_linhas": consolidado[COL_DATA].to_numpy(),
+        "datas_dias": diario.index.to_numpy(),
+        "acumulado": acumulado,
+    }
+
+
+def fatiar_periodo(motor: dict, data_ini, data_fim, bases: list[str] | None = None) -> pd.DataFrame:
+    """Recorta o consolidado (ordenado por data) por busca binária, sem varrer a tabela."""
+    datas = motor["datas_linhas"]
+    ini = np.searchsorted(datas, np.datetime64(pd.Timestamp(data_ini)), side="left")
+    fim = np.searchsorted(datas, np.datetime64(pd.Timestamp(data_fim)), side="right")
+
+    recorte = motor["consolidado"].iloc[ini:fim]
+
+    if bases:
+        recorte = recorte[recorte[COL_BASE].isin(bases)]
 
-    atual = df_consolidado[
-        (df_consolidado[COL_DATA] >= pd.Timestamp(data_ini))
-        & (df_consolidado[COL_DATA] <= pd.Timestamp(data_fim))
-    ]
+    return recorte.copy()
 
+
+def _somar_intervalo(motor: dict, coluna: str, inicio: pd.Timestamp, fim: pd.Timestamp) -> int:
+    datas = motor["datas_dias"]
+    i = np.searchsorted(datas, np.datetime64(inicio), side="left")
+    j = np.searchsorted(datas, np.datetime64(fim), side="right")
+    acumulado = motor["acumulado"][coluna]
+    # Arredonda o ruído de ponto flutuante da diferença antes de truncar como o int(soma) original
+    return int(round(acumulado[j] - acumulado[i], 6)) if j > i else 0
+
+
+def calcular_delta_periodo(motor: dict, data_ini, data_fim, usa_total_bipar: bool) -> dict:
+    dias_periodo = max((data_fim - data_ini).days + 1, 1)
+
+    ini_atual = pd.Timestamp(data_ini)
+    fim_atual = pd.Timestamp(data_fim)
     ini_ant = pd.Timestamp(data_ini) - pd.Timedelta(days=dias_periodo)
     fim_ant = pd.Timestamp(data_ini) - pd.Timedelta(days=1)
 
-    anterior = df_consolidado[
-        (df_consolidado[COL_DATA] >= ini_ant)
-        & (df_consolidado[COL_DATA] <= fim_ant)
-    ]
+    rec_atual = _somar_intervalo(motor, COL_REC, ini_atual, fim_atual)
+    sai_atual = _somar_intervalo(motor, COL_SAI, ini_atual, fim_atual)
+    total_atual = _somar_intervalo(motor, "Total faltas", ini_atual, fim_atual)
 
-    rec_atual = int(atual[COL_REC].sum())
-    sai_atual = int(atual[COL_SAI].sum())
-    total_atual = int(atual["Total faltas"].sum())
-
-    rec_ant = int(anterior[COL_REC].sum())
-    sai_ant = int(anterior[COL_SAI].sum())
-    total_ant = int(anterior["Total faltas"].sum())
+    rec_ant = _somar_intervalo(motor, COL_REC, ini_ant, fim_ant)
+    sai_ant = _somar_intervalo(motor, COL_SAI, ini_ant, fim_ant)
+    total_ant = _somar_intervalo(motor, "Total faltas", ini_ant, fim_ant)
 
     retorno = {
         "rec_atual": rec_atual,
@@ -276,8 +332,8 @@ def calcular_delta_periodo(df_consolidado: pd.DataFrame, data_ini, data_fim, usa
     }
 
     if usa_total_bipar:
-        total_bipar_atual = int(atual[COL_TOTAL_BIPAR].sum())
-        total_bipar_ant = int(anterior[COL_TOTAL_BIPAR].sum())
+        total_bipar_atual = _somar_intervalo(motor, COL_TOTAL_BIPAR, ini_atual, fim_atual)
+        total_bipar_ant = _somar_intervalo(motor, COL_TOTAL_BIPAR, ini_ant, fim_ant)
 
         pct_rec_atual = (rec_atual / total_bipar_atual) if total_bipar_atual > 0 else 0
         pct_sai_atual = (sai_atual / total_bipar_atual) if total_bipar_atual > 0 else 0
@@ -383,6 +439,8 @@ if not uploaded_file:
 # =========================================================
 # LEITURA
 # =========================================================
+aba_escolhida = None
+
 try:
     if uploaded_file.name.lower().endswith((".xlsx", ".xls")):
         xls = pd.ExcelFile(uploaded_file)
@@ -399,8 +457,20 @@ try:
     else:
         df_raw = carregar_arquivo(uploaded_file)
 
-    df, usa_total_bipar = preparar_dados(df_raw)
-    df_consolidado = consolidar_periodo(df, usa_total_bipar)
+    # O motor só é reconstruído quando muda o arquivo ou a aba; mudar filtros reaproveita tudo.
+    chave_upload = (
+        getattr(uploaded_file, "file_id", uploaded_file.name),
+        uploaded_file.size,
+        aba_escolhida,
+    )
+    if st.session_state.get("chave_motor") != chave_upload:
+        df, usa_total_bipar = preparar_dados(df_raw)
+        st.session_state["motor"] = construir_motor_consolidacao(df, usa_total_bipar)
+        st.session_state["chave_motor"] = chave_upload
+
+    motor = st.session_state["motor"]
+    usa_total_bipar = motor["usa_total_bipar"]
+    df_consolidado = motor["consolidado"]
 
 except Exception as e:
     st.error(f"Erro ao ler/preparar a planilha: {e}")
@@ -454,13 +524,7 @@ with col_f3:
     if not usa_total_bipar:
         st.caption("A coluna 'Qtd pedidos a bipar' não foi encontrada. Ranking por porcentagem indisponível.")
 
-df_filtrado = df_consolidado[
-    (df_consolidado[COL_DATA] >= pd.Timestamp(data_ini))
-    & (df_consolidado[COL_DATA] <= pd.Timestamp(data_fim))
-].copy()
-
-if bases_selecionadas:
-    df_filtrado = df_filtrado[df_filtrado[COL_BASE].isin(bases_selecionadas)].copy()
+df_filtrado = fatiar_periodo(motor, data_ini, data_fim, bases_selecionadas)
 
 if df_filtrado.empty:
     st.warning("Não há dados para os filtros selecionados.")
@@ -472,7 +536,7 @@ if df_filtrado.empty:
 # =========================================================
 df_resumo_base = resumo_por_base(df_filtrado, usa_total_bipar)
 df_diario = resumo_diario(df_filtrado, usa_total_bipar)
-comparativo = calcular_delta_periodo(df_consolidado, data_ini, data_fim, usa_total_bipar)
+comparativo = calcular_delta_periodo(motor, data_ini, data_fim, usa_total_bipar)
 
 lider_rec = encontrar_base_lider_e_dias(df_filtrado, COL_REC)
 lider_sai = encontrar_base_lider_e_dias(df_filtrado, COL_SAI)
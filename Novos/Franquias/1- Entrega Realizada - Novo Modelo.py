@@ -2,6 +2,7 @@
 # BLOCO 1/4 — IMPORTS / CONFIG / VARIÁVEIS
 # =========================
 import os
+import sys
 import requests
 import warnings
 import polars as pl
@@ -10,6 +11,10 @@ import multiprocessing
 import logging
 from datetime import datetime, timedelta, date
 
+# registro_layouts.py fica em Novos/ (compartilhado entre as consolidações)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from registro_layouts import RegistroLayouts
+
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
 # ==========================================================
@@ -41,7 +46,10 @@ COL_DATA_ORIGINAL = "Data prevista de entrega"
 COL_DATA_UPPER = "DATA PREVISTA DE ENTREGA"
 COL_DATA_REF = "DATA_REF"
 
-# Ative para logar diferenças de schema por arquivo
+# Cache de layouts (impressão do cabeçalho -> mapeamento + tipos) — pasta local, fora do OneDrive
+PASTA_LAYOUTS = os.path.join(os.path.expanduser("~"), "SLA_Franquias_Layouts")
+
+# Ative para logar diferenças de schema por layout
 DIAGNOSTICO_SCHEMA = True
 # =========================
 # BLOCO 2/4 — BASES + HELPERS + LEITURA/CONSOLIDAÇÃO
@@ -96,66 +104,43 @@ def _make_unique_columns(cols: list[str]) -> list[str]:
     return out
 
 
-def _normalize_columns(df: pl.DataFrame) -> pl.DataFrame:
+def _normalize_names(cols: list[str]) -> list[str]:
     """
     Normaliza nomes: strip + UPPER e resolve duplicatas.
+    (também é o mapeamento usado pelo registro de layouts para cada cabeçalho)
     """
-    if df.is_empty():
-        return df
-
     cols_norm = []
-    for c in df.columns:
+    for c in cols:
         c2 = (c if c is not None else "").strip().upper()
         cols_norm.append(c2 if c2 != "" else "COL")
 
-    cols_unique = _make_unique_columns(cols_norm)
+    return _make_unique_columns(cols_norm)
 
-    if cols_unique != df.columns:
-        df = df.rename({old: new for old, new in zip(df.columns, cols_unique)})
 
-    return df
-
-
-def _align_schemas(dfs: list[pl.DataFrame]) -> list[pl.DataFrame]:
+def _normalize_columns(df: pl.DataFrame) -> pl.DataFrame:
     """
-    Faz a união de colunas entre todos dfs e adiciona colunas faltantes como NULL,
-    retornando todos com a MESMA ordem de colunas.
+    Normaliza nomes do DataFrame (ver _normalize_names).
     """
-    if not dfs:
-        return dfs
+    if df.is_empty():
+        return df
 
-    all_cols: list[str] = []
-    seen = set()
-    for df in dfs:
-        for c in df.columns:
-            if c not in seen:
-                seen.add(c)
-                all_cols.append(c)
+    cols_unique = _normalize_names(df.columns)
 
-    aligned = []
-    for df in dfs:
-        missing = [c for c in all_cols if c not in df.columns]
-        if missing:
-            df = df.with_columns([pl.lit(None).alias(c) for c in missing])
-        df = df.select(all_cols)
-        aligned.append(df)
+    if cols_unique != df.columns:
+        df = df.rename({old: new for old, new in zip(df.columns, cols_unique)})
 
-    return aligned
+    return df
 
 
 # ==========================================================
 # FUNÇÕES DE PROCESSAMENTO DE DADOS
 # ==========================================================
 def ler_planilha_rapido(caminho: str) -> pl.DataFrame:
-    """Lê um arquivo (Excel ou CSV) de forma rápida e segura + normaliza colunas."""
+    """Lê um arquivo (Excel ou CSV) de forma rápida e segura (nomes normalizados pelo registro de layouts)."""
     try:
         if caminho.lower().endswith(".csv"):
-            df = pl.read_csv(caminho)
-        else:
-            df = pl.read_excel(caminho)
-
-        df = _normalize_columns(df)
-        return df
+            return pl.read_csv(caminho)
+        return pl.read_excel(caminho)
 
     except Exception as e:
         logging.error(f"Erro ao ler {caminho}: {e}")
@@ -173,8 +158,36 @@ def consolidar_planilhas(pasta: str) -> pl.DataFrame:
     if not arquivos:
         raise FileNotFoundError("Nenhum arquivo encontrado na pasta de entrada.")
 
-    dfs: list[pl.DataFrame] = []
-    schemas_info = []  # (arquivo, n_cols, cols)
+    registro = RegistroLayouts(
+        PASTA_LAYOUTS,
+        normalizar=_normalize_names,
+        log=logging.info,
+    )
+
+    # Classificação só pelo cabeçalho: o diagnóstico sai antes de ler os dados
+    impressoes = registro.classificar_arquivos(arquivos)
+
+    if DIAGNOSTICO_SCHEMA and impressoes:
+        layouts = list(dict.fromkeys(impressoes.values()))
+        base_nome = next(os.path.basename(a) for a, i in impressoes.items() if i == layouts[0])
+        base_cols = registro.colunas_layout(layouts[0])
+        set_base = set(base_cols)
+        for impressao in layouts[1:]:
+            nomes = [os.path.basename(a) for a, i in impressoes.items() if i == impressao]
+            cols = registro.colunas_layout(impressao)
+            rotulo = f"{nomes[0]} (+{len(nomes) - 1} arquivo(s) no mesmo layout)" if len(nomes) > 1 else nomes[0]
+            if len(cols) != len(base_cols):
+                logging.warning(f"⚠️ Schema diferente: {rotulo} tem {len(cols)} colunas (base {base_nome} tem {len(base_cols)}).")
+
+            set_cols = set(cols)
+            missing = sorted(list(set_base - set_cols))
+            extra = sorted(list(set_cols - set_base))
+            if missing:
+                logging.warning(f"   - {rotulo} faltando colunas: {missing[:20]}{'...' if len(missing) > 20 else ''}")
+            if extra:
+                logging.warning(f"   - {rotulo} colunas extras: {extra[:20]}{'...' if len(extra) > 20 else ''}")
+
+    lidos: list[tuple[str, pl.DataFrame]] = []
 
     logging.info(f"📂 Encontrados {len(arquivos)} arquivos. Iniciando leitura sequencial...")
 
@@ -185,36 +198,15 @@ def consolidar_planilhas(pasta: str) -> pl.DataFrame:
         df = ler_planilha_rapido(arquivo)
 
         if not df.is_empty():
-            df = df.with_columns(pl.lit(nome).alias("_ARQUIVO_ORIGEM"))
-            dfs.append(df)
-            schemas_info.append((nome, len(df.columns), df.columns))
+            lidos.append((arquivo, df))
         else:
             logging.warning(f"Arquivo ignorado (vazio ou erro de leitura): {nome}")
 
-    if not dfs:
+    if not lidos:
         raise ValueError("Nenhum DataFrame válido foi lido dos arquivos.")
 
-    if DIAGNOSTICO_SCHEMA:
-        base_nome, base_n, base_cols = schemas_info[0]
-        for nome, n, cols in schemas_info[1:]:
-            if n != base_n:
-                logging.warning(f"⚠️ Schema diferente: {nome} tem {n} colunas (base {base_nome} tem {base_n}).")
-
-            set_base = set(base_cols)
-            set_cols = set(cols)
-            missing = sorted(list(set_base - set_cols))
-            extra = sorted(list(set_cols - set_base))
-            if missing or extra:
-                if missing:
-                    logging.warning(f"   - {nome} faltando colunas: {missing[:20]}{'...' if len(missing) > 20 else ''}")
-                if extra:
-                    logging.warning(f"   - {nome} colunas extras: {extra[:20]}{'...' if len(extra) > 20 else ''}")
-
-    logging.info("🔄 Todos os arquivos lidos. Alinhando schemas (união de colunas) ...")
-    dfs = _align_schemas(dfs)
-
-    logging.info("🔄 Schemas alinhados. Iniciando concatenação...")
-    df_final = pl.concat(dfs, how="vertical_relaxed")
+    logging.info("🔄 Todos os arquivos lidos. Convertendo para o esquema canônico e concatenando...")
+    df_final = registro.consolidar(lidos, impressoes, coluna_origem="_ARQUIVO_ORIGEM")
 
     logging.info(f"📂 Base consolidada com {df_final.height} linhas e {len(df_final.columns)} colunas.")
     return df_final
@@ -1,11 +1,17 @@
 import polars as pl
 import os
+import sys
 import logging
 import requests
 import shutil
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 
+# snapshots_diarios.py fica em Novos/ (compartilhado com Retidos e o bot de hash)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from snapshots_diarios import SnapshotsDiarios
+from delta_pacotes import classificar_pacotes, delta_por_base, resumo_delta, NOVO, RESOLVIDO, ENVELHECEU, MUDOU_STATUS
+
 # =====================================================================
 # CONFIGURAÇÕES GERAIS
 # =====================================================================
@@ -19,6 +25,10 @@ PATH_INPUT_MAIN = BASE_PATH
 
 PATH_OUTPUT_REPORTS = OUTPUT_BASE_PATH
 PATH_OUTPUT_ARQUIVO_MORTO = os.path.join(OUTPUT_BASE_PATH, "Arquivo Morto")
+PATH_SNAPSHOTS = os.path.join(OUTPUT_BASE_PATH, "Snapshots")
+
+# Data fixa para a comparação ("AAAA-MM-DD"); None = último snapshot antes de hoje
+DATA_REFERENCIA = None
 
 FILENAME_START_MAIN = 'Monitoramento de movimentação em tempo real'
 WEBHOOK_URL = "https://open.feishu.cn/open-apis/bot/v2/hook/18eed487-c172-4b86-95cf-bfbe1cd21df1"
@@ -59,6 +69,13 @@ BASES_VALIDAS = [
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+SNAPSHOTS = SnapshotsDiarios(
+    PATH_SNAPSHOTS, "franquias_sem_movimentacao",
+    col_id=COL_REMESSA, col_base=COL_BASE_RECENTE,
+    colunas=[COL_DIAS_PARADO, COL_STATUS, COL_TRANSITO],
+    log=logging.info,
+)
+
 
 def aplicar_regras_transito(df: pl.DataFrame) -> pl.DataFrame:
     if COL_BASE_RECENTE not in df.columns:
@@ -99,7 +116,26 @@ def aplicar_regras_status(df: pl.DataFrame) -> pl.DataFrame:
     )
 
 
-def carregar_relatorio_anterior(pasta: str) -> Optional[pl.DataFrame]:
+def carregar_relatorio_anterior(data_ref: Optional[str] = None) -> Optional[pl.DataFrame]:
+    """Estado por pacote do snapshot de referência (só Remessa + base)."""
+    if data_ref:
+        data = datetime.strptime(data_ref, "%Y-%m-%d").date()
+        if not SNAPSHOTS.existe(data):
+            logging.warning(f"Snapshot de {data:%d/%m/%Y} não encontrado — sem comparação.")
+            return None
+    else:
+        data = SNAPSHOTS.data_anterior()
+        if data is None:
+            # Ainda sem snapshots (primeira execução após a troca): usa o último Excel gerado
+            return _carregar_relatorio_excel_legado(PATH_OUTPUT_REPORTS)
+        if data != (datetime.now() - timedelta(days=1)).date():
+            logging.warning(f"Nenhum snapshot de ontem — usando o mais recente disponível ({data:%d/%m/%Y}).")
+
+    logging.info(f"📂 Comparando com snapshot de {data:%d/%m/%Y}")
+    return SNAPSHOTS.carregar(data, colunas=[COL_BASE_RECENTE, COL_DIAS_PARADO, COL_STATUS])
+
+
+def _carregar_relatorio_excel_legado(pasta: str) -> Optional[pl.DataFrame]:
     if not os.path.exists(pasta):
         logging.warning(f"Pasta de relatórios não encontrada: {pasta}")
         return None
@@ -121,53 +157,23 @@ def carregar_relatorio_anterior(pasta: str) -> Optional[pl.DataFrame]:
 
 
 def comparar_relatorios(df_atual: pl.DataFrame, df_anterior: Optional[pl.DataFrame]):
-    atual = (
-        df_atual
-        .group_by(COL_BASE_RECENTE)
-        .count()
-        .rename({"count": "QtdAtual"})
-        .with_columns(pl.col("QtdAtual").cast(pl.Int64))
+    """Delta por pacote (Remessa) resumido por base — ver delta_pacotes.py."""
+    classificados = classificar_pacotes(
+        df_atual, df_anterior, COL_REMESSA, COL_BASE_RECENTE,
+        col_dias=COL_DIAS_PARADO, col_status=COL_STATUS,
     )
+    df_comp = delta_por_base(classificados, COL_BASE_RECENTE)
 
-    if df_anterior is not None:
-        df_anterior = df_anterior.unique(subset=[COL_REMESSA])
-        anterior = (
-            df_anterior
-            .group_by(COL_BASE_RECENTE)
-            .count()
-            .rename({"count": "QtdAnterior"})
-            .with_columns(pl.col("QtdAnterior").cast(pl.Int64))
-        )
-        df_comp = atual.join(anterior, on=COL_BASE_RECENTE, how="outer").fill_null(0)
-    else:
-        df_comp = atual.with_columns(pl.lit(0).alias("QtdAnterior"))
+    qtd_total = int(df_comp["Qtd_Atual"].sum())
+    variacao_total = int(df_comp["Variacao"].sum())
 
-    df_comp = df_comp.with_columns([
-        (pl.col("QtdAtual") - pl.col("QtdAnterior")).cast(pl.Int64).alias("Diferenca")
-    ])
+    piores = df_comp.sort("Qtd_Atual", descending=True).head(5)
+    melhores = df_comp.filter(pl.col("Variacao") < 0).sort("Variacao").head(5)
 
-    qtd_total = int(df_comp["QtdAtual"].sum())
-    variacao_total = int(df_comp["Diferenca"].sum())
+    piores_list = [(r[COL_BASE_RECENTE], int(r["Qtd_Atual"])) for r in piores.iter_rows(named=True)]
+    melhores_list = [(r[COL_BASE_RECENTE], int(r["Variacao"])) for r in melhores.iter_rows(named=True)]
 
-    piores = (
-        df_comp
-        .sort("QtdAtual", descending=True)
-        .head(5)
-        .select([COL_BASE_RECENTE, "QtdAtual"])
-    )
-
-    melhores = (
-        df_comp
-        .filter(pl.col("Diferenca") < 0)
-        .sort("Diferenca")
-        .head(5)
-        .select([COL_BASE_RECENTE, "Diferenca"])
-    )
-
-    piores_list = [(r[COL_BASE_RECENTE], int(r["QtdAtual"])) for r in piores.iter_rows(named=True)]
-    melhores_list = [(r[COL_BASE_RECENTE], int(r["Diferenca"])) for r in melhores.iter_rows(named=True)]
-
-    return qtd_total, variacao_total, piores_list, melhores_list
+    return qtd_total, variacao_total, piores_list, melhores_list, df_comp, resumo_delta(classificados)
 
 
 def mover_para_arquivo_morto():
@@ -203,7 +209,16 @@ def _formatar_melhores(melhores: List[tuple]) -> str:
     return "\n".join([f"- {b}: {q} (Redução)" for b, q in melhores])
 
 
-def montar_card_franquias(data, qtd_total, variacao, piores, melhores, link):
+def _formatar_movimento(movimento: Optional[Dict[str, int]]) -> str:
+    if not movimento:
+        return ""
+    return (
+        f"**Movimentação:** 🆕 {movimento[NOVO]} novos | ✅ {movimento[RESOLVIDO]} resolvidos | "
+        f"⏫ {movimento[ENVELHECEU]} mudaram de faixa | 🔄 {movimento[MUDOU_STATUS]} mudaram de status\n"
+    )
+
+
+def montar_card_franquias(data, qtd_total, variacao, piores, melhores, link, movimento=None):
     texto_piores = _formatar_piores(piores)
     texto_melhores = _formatar_melhores(melhores)
 
@@ -216,7 +231,8 @@ def montar_card_franquias(data, qtd_total, variacao, piores, melhores, link):
                     f"**📊 Relatório Sem Movimentação (5+ dias)**\n"
                     f"**Data:** {data}\n"
                     f"**Total Pacotes:** {qtd_total}\n"
-                    f"**Variação:** {variacao}\n"}},
+                    f"**Variação:** {variacao}\n"
+                    f"{_formatar_movimento(movimento)}"}},
                 {"tag": "hr"},
                 {"tag": "div", "text": {"tag": "lark_md", "content": "**🔴 5 Piores Franquias (Mais Pacotes)**"}},
                 {"tag": "div", "text": {"tag": "lark_md", "content": texto_piores}},
@@ -275,7 +291,8 @@ def main():
     df_final = aplicar_regras_status(df_main)
     df_final = aplicar_regras_transito(df_final)
 
-    df_ant = carregar_relatorio_anterior(PATH_OUTPUT_REPORTS)
+    df_ant = carregar_relatorio_anterior(DATA_REFERENCIA)
+    SNAPSHOTS.salvar(df_final)
     mover_para_arquivo_morto()
 
     data_hoje = datetime.now().strftime("%Y-%m-%d")
@@ -283,8 +300,16 @@ def main():
     df_final.write_excel(output_path)
     logging.info(f"✅ Relatório salvo: {output_path}")
 
+    # Card = 5+ dias dos dois lados (o pacote que passou de 4 para 5 dias conta como novo)
     df_card = df_final.filter(pl.col(COL_DIAS_PARADO) >= 5)
-    qtd_total, variacao_total, piores, melhores = comparar_relatorios(df_card, df_ant)
+    if df_ant is not None and COL_DIAS_PARADO in df_ant.columns:
+        df_ant = df_ant.filter(pl.col(COL_DIAS_PARADO).cast(pl.Int64, strict=False) >= 5)
+    qtd_total, variacao_total, piores, melhores, df_delta, movimento = comparar_relatorios(df_card, df_ant)
+    SNAPSHOTS.salvar_tabela("delta_bases_5d", df_delta)
+    logging.info(
+        f"📊 Movimentação (5+ dias): {movimento[NOVO]} novos | {movimento[RESOLVIDO]} resolvidos | "
+        f"{movimento[ENVELHECEU]} mudaram de faixa | {movimento[MUDOU_STATUS]} mudaram de status"
+    )
 
     variacao = (
         f"⬇️ Diminuiu {abs(variacao_total)} pacotes" if variacao_total < 0 else
@@ -295,7 +320,8 @@ def main():
     data_atual = datetime.now().strftime("%d/%m/%Y %H:%M")
     card_payload = montar_card_franquias(
         data_atual, qtd_total, variacao, piores, melhores,
-        "https://jtexpressdf-my.sharepoint.com/:f:/g/personal/matheus_carvalho_jtexpressdf_onmicrosoft_com/EoLsAM3uwAJKiLmuU53XrzMBUqXMQQOvGtGJeVpp8JLLFA?e=N31EhA"
+        "https://jtexpressdf-my.sharepoint.com/:f:/g/personal/matheus_carvalho_jtexpressdf_onmicrosoft_com/EoLsAM3uwAJKiLmuU53XrzMBUqXMQQOvGtGJeVpp8JLLFA?e=N31EhA",
+        movimento=movimento,
     )
 
     enviar_card(card_payload, WEBHOOK_URL)
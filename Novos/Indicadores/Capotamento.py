@@ -6,9 +6,11 @@ Relatório de Capotamento (por mês, por base, com dias seguidos + lista de dias
 """
 
 import os
+import time
 import argparse
 from datetime import timedelta
 
+import numpy as np
 import pandas as pd
 
 
@@ -122,6 +124,134 @@ def streak_days_str(inicio, fim) -> str:
     return "; ".join(str(x.day) for x in rng)
 
 
+# =========================
+# SEQUÊNCIAS (VETORIZADO)
+# =========================
+def streak_table(cap: pd.DataFrame, keys: list[str]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Todas as sequências de dias seguidos de todos os grupos em uma passada:
+    ordena (grupo, dia) uma vez, marca quebra onde o grupo muda ou a diferença
+    entre dias != 1 e numera os segmentos com cumsum.
+
+    Retorna (dias únicos por grupo com o nº do segmento, segmentos).
+    """
+    unicos = (
+        cap[keys + ["_dia"]]
+        .dropna(subset=["_dia"])
+        .drop_duplicates()
+        .sort_values(keys + ["_dia"])
+        .reset_index(drop=True)
+    )
+
+    novo_grupo = unicos[keys].ne(unicos[keys].shift()).any(axis=1)
+    quebra = novo_grupo | unicos["_dia"].diff().ne(pd.Timedelta(days=1))
+    unicos["_seg"] = quebra.cumsum()
+
+    segmentos = (
+        unicos.groupby("_seg")
+        .agg(
+            **{k: (k, "first") for k in keys},
+            inicio=("_dia", "first"),
+            fim=("_dia", "last"),
+            dias=("_dia", "size"),
+        )
+        .reset_index()
+    )
+    return unicos, segmentos
+
+
+def summarize_streaks(cap: pd.DataFrame, keys: list[str]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Por grupo: maior sequência (a primeira, em caso de empate), lista de dias e dias
+    da maior sequência — mesmas saídas de summarize_streak/days_list_str/streak_days_str.
+
+    Retorna (resumo por grupo, segmentos).
+    """
+    unicos, segmentos = streak_table(cap, keys)
+
+    melhor = (
+        segmentos
+        .sort_values(keys + ["dias", "_seg"], ascending=[True] * len(keys) + [False, True])
+        .drop_duplicates(keys)
+    )
+
+    unicos["_dia_str"] = unicos["_dia"].dt.day.astype(str)
+    dias_capotamento = unicos.groupby(keys)["_dia_str"].agg("; ".join).rename("dias_capotamento")
+    dias_maior = (
+        unicos[unicos["_seg"].isin(melhor["_seg"])]
+        .groupby(keys)["_dia_str"].agg("; ".join)
+        .rename("dias_maior_sequencia")
+    )
+
+    resumo = (
+        melhor[keys + ["dias", "inicio", "fim"]]
+        .rename(columns={"dias": "maior_seq_dias", "inicio": "inicio_seq", "fim": "fim_seq"})
+        .merge(dias_capotamento.reset_index(), on=keys, how="left")
+        .merge(dias_maior.reset_index(), on=keys, how="left")
+    )
+    return resumo, segmentos
+
+
+def _streaks_referencia(cap: pd.DataFrame, keys: list[str]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Versão grupo a grupo (laço Python), mantida só para conferência no benchmark."""
+    resumo = cap.groupby(keys, dropna=False).apply(lambda g: summarize_streak(g["_dia"])).reset_index()
+    dias = cap.groupby(keys, dropna=False)["_dia"].apply(days_list_str).rename("dias_capotamento").reset_index()
+    resumo = resumo.merge(dias, on=keys, how="left")
+    resumo["dias_maior_sequencia"] = resumo.apply(
+        lambda r: streak_days_str(r["inicio_seq"], r["fim_seq"]) if int(r["maior_seq_dias"]) > 0 else "",
+        axis=1
+    )
+
+    rows = []
+    for chave, g in cap.groupby(keys, dropna=False):
+        for ini, fim, dias_seg in build_streak_segments(g["_dia"]):
+            rows.append({**dict(zip(keys, chave)), "inicio": ini, "fim": fim, "dias": dias_seg})
+    return resumo, pd.DataFrame(rows)
+
+
+def benchmark_streaks(n_bases: int = 400, n_meses: int = 6, repeticoes: int = 3, seed: int = 0):
+    """Compara laço por grupo x motor vetorizado numa base sintética (todas as bases, vários meses)."""
+    rng = np.random.default_rng(seed)
+    dias = pd.date_range("2025-01-01", periods=n_meses * 30, freq="D")
+
+    cap = pd.DataFrame({
+        "_base": np.repeat([f"BASE {i:04d}" for i in range(n_bases)], len(dias)),
+        "_dia": np.tile(dias, n_bases),
+    })
+    cap = cap[rng.random(len(cap)) < 0.45]
+    cap = cap.loc[cap.index.repeat(rng.integers(1, 4, len(cap)))].reset_index(drop=True)
+    cap["_mes"] = cap["_dia"].dt.to_period("M").astype(str)
+
+    print(f"📊 Benchmark: {cap['_base'].nunique()} bases, {n_meses} meses, {len(cap):,} linhas capotadas")
+
+    for keys in (["_mes", "_base"], ["_mes"]):
+        tempos = {}
+        for nome, func in (("laço por grupo", _streaks_referencia), ("vetorizado", summarize_streaks)):
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                resumo, segmentos = func(cap, keys)
+            tempos[nome] = (time.perf_counter() - inicio) / repeticoes
+            if nome == "laço por grupo":
+                ref_resumo, ref_segmentos = resumo, segmentos
+
+        cols = keys + ["maior_seq_dias", "inicio_seq", "fim_seq", "dias_capotamento", "dias_maior_sequencia"]
+        pd.testing.assert_frame_equal(
+            ref_resumo[cols].astype(str).reset_index(drop=True),
+            resumo[cols].astype(str).reset_index(drop=True),
+        )
+        cols = keys + ["inicio", "fim", "dias"]
+        pd.testing.assert_frame_equal(
+            ref_segmentos[cols].astype(str).reset_index(drop=True),
+            segmentos[cols].astype(str).reset_index(drop=True),
+        )
+
+        ganho = tempos["laço por grupo"] / tempos["vetorizado"]
+        print(
+            f"   - {' + '.join(keys)}: laço {tempos['laço por grupo']:.3f}s | "
+            f"vetorizado {tempos['vetorizado']:.3f}s | {ganho:.1f}x (saídas idênticas)"
+        )
+
+
 # =========================
 # MAIN
 # =========================
@@ -133,8 +263,13 @@ def main():
     parser.add_argument("--col-capot", default=COL_CAPOT, help="Nome da coluna Y/N (capotou)")
     parser.add_argument("--output", default=None, help="Caminho do Excel de saída (opcional)")
     parser.add_argument("--salvar-dados", action="store_true", help="Salvar aba Dados_Consolidados")
+    parser.add_argument("--benchmark", action="store_true", help="Só roda o benchmark das sequências e sai")
     args = parser.parse_args()
 
+    if args.benchmark:
+        benchmark_streaks()
+        return
+
     pasta = args.pasta
     col_base = args.col_base
     col_data = args.col_data
@@ -214,12 +349,8 @@ def main():
             .rename(columns={"_mes": "Mes", "_base": "Base"})
         )
 
-        streak_base = (
-            cap.groupby(["_mes", "_base"], dropna=False)
-            .apply(lambda g: summarize_streak(g["_dia"]))
-            .reset_index()
-            .rename(columns={"_mes": "Mes", "_base": "Base"})
-        )
+        streak_base, segmentos = summarize_streaks(cap, ["_mes", "_base"])
+        streak_base = streak_base.rename(columns={"_mes": "Mes", "_base": "Base"})
 
         por_base_mes = por_base_mes.merge(streak_base, on=["Mes", "Base"], how="left")
         por_base_mes = ensure_cols(por_base_mes, {
@@ -231,31 +362,19 @@ def main():
             por_base_mes["maior_seq_dias"], errors="coerce"
         ).fillna(0).astype(int)
 
-        # ✅ lista de dias (só DIA)
-        dias_lista_base = (
-            cap.groupby(["_mes", "_base"], dropna=False)["_dia"]
-            .apply(days_list_str)
-            .reset_index()
-            .rename(columns={"_mes": "Mes", "_base": "Base", "_dia": "dias_capotamento"})
-        )
-        por_base_mes = por_base_mes.merge(dias_lista_base, on=["Mes", "Base"], how="left")
+        # ✅ lista de dias e dias da maior sequência (só DIA)
         por_base_mes["dias_capotamento"] = por_base_mes["dias_capotamento"].fillna("")
-
-        # ✅ dias da maior sequência (só DIA)
-        por_base_mes["dias_maior_sequencia"] = por_base_mes.apply(
-            lambda r: streak_days_str(r["inicio_seq"], r["fim_seq"]) if int(r["maior_seq_dias"]) > 0 else "",
-            axis=1
-        )
+        por_base_mes["dias_maior_sequencia"] = por_base_mes["dias_maior_sequencia"].fillna("")
 
         # Sequências completas (mantém data completa aqui porque é auditoria)
-        rows = []
-        for (mes, base), g in cap.groupby(["_mes", "_base"], dropna=False):
-            segs = build_streak_segments(g["_dia"])
-            for ini, fim, dias in segs:
-                rows.append({"Mes": mes, "Base": base, "Inicio": ini, "Fim": fim, "Dias_Seguidos": dias})
-        sequencias = pd.DataFrame(rows)
-        if not sequencias.empty:
-            sequencias = sequencias.sort_values(["Mes", "Base", "Dias_Seguidos"], ascending=[True, True, False])
+        sequencias = (
+            segmentos[["_mes", "_base", "inicio", "fim", "dias"]]
+            .rename(columns={
+                "_mes": "Mes", "_base": "Base",
+                "inicio": "Inicio", "fim": "Fim", "dias": "Dias_Seguidos",
+            })
+            .sort_values(["Mes", "Base", "Dias_Seguidos"], ascending=[True, True, False], kind="stable")
+        )
 
     # =========================
     # GERAL / MÊS
@@ -281,25 +400,13 @@ def main():
             .rename(columns={"_mes": "Mes"})
         )
 
-        streak_geral = (
-            cap.groupby("_mes", dropna=False)
-            .apply(lambda g: summarize_streak(g["_dia"]))
-            .reset_index()
-            .rename(columns={"_mes": "Mes"})
-        )
-
-        dias_lista_geral = (
-            cap.groupby("_mes", dropna=False)["_dia"]
-            .apply(days_list_str)
-            .reset_index()
-            .rename(columns={"_mes": "Mes", "_dia": "dias_capotamento"})
-        )
+        streak_geral, _ = summarize_streaks(cap, ["_mes"])
+        streak_geral = streak_geral.rename(columns={"_mes": "Mes"})
 
         geral_mes = (
             geral_mes
             .merge(geral_agg, on="Mes", how="left")
             .merge(streak_geral, on="Mes", how="left")
-            .merge(dias_lista_geral, on="Mes", how="left")
         )
 
         geral_mes = ensure_cols(geral_mes, {
@@ -315,11 +422,7 @@ def main():
         geral_mes["dias_com_capot"] = pd.to_numeric(geral_mes["dias_com_capot"], errors="coerce").fillna(0).astype(int)
         geral_mes["maior_seq_dias"] = pd.to_numeric(geral_mes["maior_seq_dias"], errors="coerce").fillna(0).astype(int)
         geral_mes["dias_capotamento"] = geral_mes["dias_capotamento"].fillna("")
-
-        geral_mes["dias_maior_sequencia"] = geral_mes.apply(
-            lambda r: streak_days_str(r["inicio_seq"], r["fim_seq"]) if int(r["maior_seq_dias"]) > 0 else "",
-            axis=1
-        )
+        geral_mes["dias_maior_sequencia"] = geral_mes["dias_maior_sequencia"].fillna("")
 
     # Ordenar
     geral_mes = geral_mes.sort_values(["Mes"], ascending=True)
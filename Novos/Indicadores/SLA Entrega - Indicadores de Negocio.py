@@ -7,7 +7,9 @@ import polars as pl
 import pandas as pd
 import multiprocessing
 import logging
+import math
 import shutil
+import tempfile
 from datetime import datetime, timedelta
 from concurrent.futures import ProcessPoolExecutor
 
@@ -26,6 +28,9 @@ logging.basicConfig(
 # CONFIG
 os.environ["POLARS_MAX_THREADS"] = str(multiprocessing.cpu_count())
 
+# Leitura em processos: cada worker recebe ~este volume de arquivos (abaixo disso, lê no próprio processo)
+BYTES_POR_WORKER = 20 * 1024 * 1024
+
 # PASTAS
 PASTA_ENTRADA = r"C:\Users\J&T-099\OneDrive - Speed Rabbit Express Ltda (1)\Área de Trabalho\Testes\Indicadores de Negocio\SLA Entrega"
 PASTA_SAIDA   = r"C:\Users\J&T-099\OneDrive - Speed Rabbit Express Ltda\Indicadores de Negocio\SLA Entrega"
@@ -74,6 +79,25 @@ def ler_planilha_rapido(caminho):
         return pl.read_excel(caminho)
     except:
         return pl.DataFrame()
+def ler_planilha_para_ipc(args):
+    """Worker: lê a planilha e grava em Arrow IPC na pasta temporária; devolve só o caminho."""
+    caminho, pasta_tmp, indice = args
+    df = ler_planilha_rapido(caminho)
+    if df.is_empty():
+        return None
+
+    destino = os.path.join(pasta_tmp, f"{indice:04d}.arrow")
+    df.write_ipc(destino, compression="uncompressed")
+    return destino
+
+
+def calcular_workers(arquivos):
+    """Processos conforme quantidade e volume dos arquivos, nunca mais que os núcleos."""
+    total_bytes = sum(os.path.getsize(a) for a in arquivos)
+    por_volume = math.ceil(total_bytes / BYTES_POR_WORKER)
+    return max(1, min(len(arquivos), multiprocessing.cpu_count(), por_volume))
+
+
 def consolidar_planilhas(pasta):
     arquivos = [
         os.path.join(pasta, f)
@@ -84,12 +108,29 @@ def consolidar_planilhas(pasta):
     if not arquivos:
         raise FileNotFoundError("Nenhum arquivo encontrado na pasta de entrada.")
 
-    with ProcessPoolExecutor(max_workers=multiprocessing.cpu_count()) as ex:
-        dfs = list(ex.map(ler_planilha_rapido, arquivos))
+    workers = calcular_workers(arquivos)
+    logging.info(f"📂 {len(arquivos)} arquivo(s) | {workers} processo(s) de leitura")
+
+    if workers == 1:
+        dfs = [ler_planilha_rapido(a) for a in arquivos]
+        dfs = [df for df in dfs if not df.is_empty()]
+        return pl.concat(dfs, how="vertical_relaxed")
+
+    # Os workers não devolvem o DataFrame (pickle + cópia); gravam IPC e o processo
+    # principal lê os arquivos mapeados em memória (padrão do scan_ipc) e concatena.
+    with tempfile.TemporaryDirectory(prefix="sla_entrega_") as pasta_tmp:
+        tarefas = [(a, pasta_tmp, i) for i, a in enumerate(arquivos)]
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            caminhos = [c for c in ex.map(ler_planilha_para_ipc, tarefas) if c]
+
+        lazy = [pl.scan_ipc(c) for c in caminhos]
+        df = pl.concat(lazy, how="vertical_relaxed").collect()
+        # Solta os scans antes de apagar a pasta: no Windows, arquivo ainda mapeado dá WinError 32 no rmtree
+        del lazy
+
+    return df
 
-    dfs = [df for df in dfs if not df.is_empty()]
 
-    return pl.concat(dfs, how="vertical_relaxed")
 def calcular_sla_completo(df: pl.DataFrame) -> pd.DataFrame:
 
     colunas = [c.upper() for c in df.columns]
@@ -9,11 +9,14 @@ from datetime import datetime
 import calendar
 from tqdm import tqdm
 import warnings
-import contextlib
-import io
 import unicodedata
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
+
+from registro_entradas import RegistroEntradas, ler_excel_primeira_aba, maior_dia_cluster
+
+# Avisos de estilo/formatação do openpyxl nas leituras de Excel — filtro no topo,
+# já que as planilhas são lidas em threads (ver read_excel_silent)
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
 # ==========================================================
 # 📂 Caminhos
@@ -38,6 +41,8 @@ DIR_COORDENADOR = r"C:\Users\J&T-099\OneDrive - Speed Rabbit Express Ltda (1)\Á
 DIR_OUT = os.path.join(BASE_ROOT, "Resultados")
 os.makedirs(DIR_OUT, exist_ok=True)
 
+DIR_CACHE_ENTRADAS = os.path.join(DIR_OUT, "_cache_entradas")
+
 # ==========================================================
 # ⚙️ Configurações
 # ==========================================================
@@ -77,13 +82,13 @@ def diagnosticar_normalizacao():
     print("🔍 DIAGNÓSTICO DE NORMALIZAÇÃO")
     print("==============================")
 
-    arquivos = [f for f in os.listdir(DIR_COLETA) if f.endswith((".xlsx", ".xls"))]
+    arquivos = ENTRADAS.por_arquivo("coleta")
     if not arquivos:
         print("❌ Nenhum arquivo de Coleta encontrado para diagnosticar.")
         return
 
-    path_arquivo = os.path.join(DIR_COLETA, arquivos[0])
-    df_raw = read_excel_silent(path_arquivo)
+    nome_arquivo, lf_raw = arquivos[0]
+    df_raw = lf_raw.collect()
 
     if df_raw.is_empty() or "Nome da base" not in df_raw.columns and "Nome da base de entrega" not in df_raw.columns:
         print("❌ O arquivo de Coleta não possui uma coluna de base identificável.")
@@ -95,7 +100,7 @@ def diagnosticar_normalizacao():
     df_normalizado = df_raw.rename({col_base: "Nome da base"}).pipe(_normalize_base)
     nomes_normalizados = sorted([str(n) for n in df_normalizado["Nome da base"].unique().to_list() if n])
 
-    print(f"📊 Arquivo analisado: {os.path.basename(path_arquivo)}")
+    print(f"📊 Arquivo analisado: {nome_arquivo}")
     print(f"   - Nomes de base únicos ORIGINAIS: {len(nomes_originais)}")
     print(f"   - Nomes de base únicos NORMALIZADOS: {len(nomes_normalizados)}")
     print(f"\n🔍 Redução de {len(nomes_originais) - len(nomes_normalizados)} nomes após a normalização.")
@@ -178,19 +183,19 @@ def to_float(col):
 
 
 def read_excel_silent(path):
-    with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
-            io.StringIO()):
-        warnings.simplefilter("ignore")
-        try:
-            df = pl.read_excel(path)
-            if all("__UNNAMED__" in c or c == "Responsáveis" for c in df.columns):
-                df = pl.read_excel(path, has_header=False)
-                headers = [str(x) for x in df.row(0)]
-                df = df.slice(1)
-                df.columns = headers
-            return df
-        except Exception:
-            return pl.DataFrame()
+    # Roda em paralelo no RegistroEntradas: nada de redirect_stdout/catch_warnings aqui
+    # (trocam sys.stdout / warnings.filters globais e não são thread-safe). Os avisos
+    # do openpyxl ficam filtrados de uma vez no topo do script.
+    try:
+        df = pl.read_excel(path)
+        if all("__UNNAMED__" in c or c == "Responsáveis" for c in df.columns):
+            df = pl.read_excel(path, has_header=False)
+            headers = [str(x) for x in df.row(0)]
+            df = df.slice(1)
+            df.columns = headers
+        return df
+    except Exception:
+        return pl.DataFrame()
 
 
 def detectar_coluna(df, candidatos):
@@ -236,33 +241,20 @@ def converter_datetime(df: pl.DataFrame, coluna: str) -> pl.DataFrame:
     return df
 
 
-def ler_planilhas(pasta, nome_base):
-    if not os.path.exists(pasta):
-        print(f"\033[91m❌ Pasta '{pasta}' não encontrada.\033[0m")
-        return pl.DataFrame()
-
-    arquivos = [
-        os.path.join(pasta, f)
-        for f in os.listdir(pasta)
-        if f.lower().endswith((".xls", ".xlsx")) and not f.startswith("~$")
-    ]
-
-    if not arquivos:
-        print(f"\033[93m⚠️ Nenhum arquivo Excel encontrado em {nome_base}.\033[0m")
-        return pl.DataFrame()
-
-    print(f"📂 {len(arquivos)} arquivo(s) encontrado(s) em {nome_base}:")
-    dfs = []
-    for arq in arquivos:
-        try:
-            df_raw = pl.read_excel(arq)
-            df = next(iter(df_raw.values())) if isinstance(df_raw, dict) else df_raw
-            dfs.append(df)
-            print(f"   ✅ {os.path.basename(arq)} ({df.height} linhas)")
-        except Exception as e:
-            print(f"\033[91m   ❌ Erro ao ler {os.path.basename(arq)}: {e}\033[0m")
+# ==========================================================
+# 🗂️ Registro de entradas (cada pasta é lida uma única vez)
+# ==========================================================
 
-    return pl.concat(dfs, how="diagonal_relaxed") if dfs else pl.DataFrame()
+ENTRADAS = RegistroEntradas(DIR_CACHE_ENTRADAS)
+ENTRADAS.registrar("coleta", DIR_COLETA, leitor=read_excel_silent)
+ENTRADAS.registrar("t0", DIR_T0, leitor=read_excel_silent, extensoes=(".xls", ".xlsx", ".csv"))
+ENTRADAS.registrar("ressarcimento", DIR_RESS, leitor=read_excel_silent)
+ENTRADAS.registrar("sem_mov", DIR_SEMMOV, leitor=read_excel_silent)
+ENTRADAS.registrar("retidos", DIR_RETIDOS, leitor=ler_excel_primeira_aba)
+ENTRADAS.registrar("devolucao", DIR_DEVOLUCAO, leitor=ler_excel_primeira_aba)
+ENTRADAS.registrar("problematicos", DIR_PROBLEMATICOS, leitor=ler_excel_primeira_aba)
+ENTRADAS.registrar("custodia", DIR_CUSTODIA, leitor=ler_excel_primeira_aba)
+ENTRADAS.registrar("base_lista", DIR_BASE_LISTA, leitor=pl.read_excel)
 
 
 # ==========================================================
@@ -270,23 +262,12 @@ def ler_planilhas(pasta, nome_base):
 # ==========================================================
 
 def pacotes_sem_mov():
-    arquivos = [f for f in os.listdir(DIR_SEMMOV) if f.endswith((".xlsx", ".xls"))]
+    arquivos = ENTRADAS.arquivos("sem_mov")
     if not arquivos:
         return pl.DataFrame(), 0
 
-    dfs = []
-    for arq in tqdm(arquivos, desc="🟥 Lendo Sem Movimentação", colour="red"):
-        df = read_excel_silent(os.path.join(DIR_SEMMOV, arq))
-        if not df.is_empty():
-            dfs.append(df)
-
-    if not dfs:
-        return pl.DataFrame(), 0
-
-    df = pl.concat(dfs, how="diagonal_relaxed")
-
     rename_map = {}
-    for c in df.columns:
+    for c in ENTRADAS.esquema("sem_mov").columns:
         if "责任所属代理区" in c or c == "Regional responsável":
             rename_map[c] = "Regional responsável"
         elif "责任机构" in c or c in ("Unidade responsável", "Unidade responsável责任机构"):
@@ -296,7 +277,10 @@ def pacotes_sem_mov():
         elif "JMS" in c or "运单号" in c or c == "Número de pedido JMS 运单号":
             rename_map[c] = "Remessa"
 
-    df = df.rename(rename_map)
+    if not rename_map:
+        return pl.DataFrame(), 0
+
+    df = ENTRADAS.ler("sem_mov", colunas=list(rename_map)).rename(rename_map)
 
     obrig = ["Regional responsável", "Nome da base", "Aging", "Remessa"]
     if not all(c in df.columns for c in obrig):
@@ -327,18 +311,29 @@ def coleta_expedicao():
     print("🔍 INICIANDO LEITURA DE COLETA + EXPEDIÇÃO (MODO CORRIGIDO)")
     print("=" * 50 + "\n")
 
-    arquivos = [f for f in os.listdir(DIR_COLETA) if f.endswith((".xlsx", ".xls"))]
+    arquivos = ENTRADAS.por_arquivo("coleta")
     dfs = []
 
     if not arquivos:
         print("❌ Nenhum arquivo .xlsx ou .xls encontrado na pasta de Coleta.")
         return pl.DataFrame()
 
-    for arq in tqdm(arquivos, desc="🟦 Lendo Coleta + Expedição", colour="blue"):
-        df = read_excel_silent(os.path.join(DIR_COLETA, arq))
-        if df.is_empty():
+    obrig_antigo = ["Nome da base", "Quantidade coletada", "Quantidade com saída para entrega",
+                    "Quantidade entregue com assinatura"]
+
+    for arq, lf in tqdm(arquivos, desc="🟦 Lendo Coleta + Expedição", colour="blue"):
+        cols = lf.collect_schema().names()
+        if not cols:
             continue
 
+        # Projeção: só as colunas que cada formato usa
+        if "Nome da base de entrega" in cols and "Qtd a entregar há mais de 10 dias" in cols:
+            df = lf.select(["Nome da base de entrega"] + [c for c in cols if c.startswith("Qtd a entregar")]).collect()
+        elif all(c in cols for c in obrig_antigo):
+            df = lf.select(obrig_antigo).collect()
+        else:
+            df = lf.head(0).collect()
+
         # Verifica se é o NOVO formato de relatório
         if "Nome da base de entrega" in df.columns and "Qtd a entregar há mais de 10 dias" in df.columns:
             print(f"   ✅ Arquivo '{arq}' com novo formato detectado.")
@@ -370,8 +365,6 @@ def coleta_expedicao():
             dfs.append(df.select(cols_sel))
         else:
             # Se não for o novo formato, verifica se é o antigo (caso tenha arquivos misturados)
-            obrig_antigo = ["Nome da base", "Quantidade coletada", "Quantidade com saída para entrega",
-                            "Quantidade entregue com assinatura"]
             if all(c in df.columns for c in obrig_antigo):
                 print(f"   ✅ Arquivo '{arq}' com formato antigo detectado.")
                 df = _normalize_base(df).with_columns([
@@ -407,11 +400,15 @@ def coleta_expedicao():
 
 
 def ressarcimento_por_pacote(df_coleta):
-    arquivos = [f for f in os.listdir(DIR_RESS) if f.endswith((".xlsx", ".xls"))]
+    arquivos = ENTRADAS.arquivos("ressarcimento")
     if not arquivos:
         return pl.DataFrame()
 
-    df = read_excel_silent(os.path.join(DIR_RESS, sorted(arquivos)[-1]))
+    df = ENTRADAS.ler(
+        "ressarcimento",
+        colunas=["Regional responsável", "Valor a pagar (yuan)", "Base responsável"],
+        arquivos=arquivos[-1:],
+    )
     if df.is_empty() or "Regional responsável" not in df.columns:
         return pl.DataFrame()
 
@@ -437,25 +434,21 @@ def taxa_t0():
     """
     Taxa T-0 baseada no motor v2.8.
     """
-    arquivos = [
-        os.path.join(DIR_T0, f)
-        for f in os.listdir(DIR_T0)
-        if f.lower().endswith((".xls", ".xlsx", ".csv")) and not f.startswith("~$")
-    ]
-
-    if not arquivos:
+    if not ENTRADAS.arquivos("t0"):
         print("⚠️ Nenhum arquivo T0 encontrado.")
         return pl.DataFrame({"Nome da base": [], "SLA (%)": []})
 
-    with ThreadPoolExecutor(max_workers=min(16, len(arquivos))) as ex:
-        dfs = list(ex.map(read_excel_silent, arquivos))
-
-    dfs = [df for df in dfs if not df.is_empty()]
-    if not dfs:
+    originais = ENTRADAS.esquema("t0").columns
+    if not originais:
         print("⚠️ Falha ao ler arquivos T0.")
         return pl.DataFrame({"Nome da base": [], "SLA (%)": []})
 
-    df = pl.concat(dfs, how="vertical_relaxed")
+    # Projeção: só as colunas de base e de prazo (em qualquer grafia)
+    possiveis = {"BASE DE ENTREGA", "NOME DA BASE", "BASE", "UNIDADE", "UNIDADE RESPONSÁVEL",
+                 "ENTREGUE NO PRAZO?", "ENTREGUE NO PRAZO？", "ENTREGUE NO PRAZO"}
+    usadas = [c for c in originais if c.strip().upper() in possiveis]
+
+    df = ENTRADAS.ler("t0", colunas=usadas)
     df = df.rename({c: c.strip().upper() for c in df.columns})
 
     possiveis_base = ["BASE DE ENTREGA", "NOME DA BASE", "BASE", "UNIDADE", "UNIDADE RESPONSÁVEL"]
@@ -500,36 +493,30 @@ def analisar_retidos_motor_antigo():
 
     removidos_cluster = removidos_dev = removidos_prob = removidos_cust = 0
 
-    df_ret = ler_planilhas(DIR_RETIDOS, "Retidos")
+    esquema_ret = ENTRADAS.esquema("retidos")
+    col_cluster = safe_pick(esquema_ret, "Dias Retidos 滞留日", ["滞留", "dias", "retidos"])
+    col_pedido_ret = safe_pick(esquema_ret, "Número do Pedido JMS 运单号", ["pedido", "运单", "jms"])
+    col_data_ret = safe_pick(esquema_ret, "Data da Atualização 更新日期", ["data", "atualiza", "更新"])
+    col_regional = safe_pick(esquema_ret, "Regional 区域", ["regional", "区域"])
+    col_base_entrega = safe_pick(esquema_ret, "Base de Entrega 派件网点", ["base", "网点", "派件"])
+
+    df_ret = ENTRADAS.ler(
+        "retidos",
+        colunas=list(dict.fromkeys([col_cluster, col_pedido_ret, col_data_ret, col_regional, col_base_entrega])),
+    )
     if df_ret.is_empty():
         print("❌ Nenhum dado em Retidos.")
         return pl.DataFrame({"Nome da base": [], "Qtd Retidos": []})
 
     # 1) CLUSTER > 6 DIAS
-    col_cluster = safe_pick(df_ret, "Dias Retidos 滞留日", ["滞留", "dias", "retidos"])
     if col_cluster and col_cluster in df_ret.columns:
         total_antes = df_ret.height
         df_ret = df_ret.with_columns(pl.col(col_cluster).cast(pl.Utf8, strict=False))
-
-        def extrair_maior_dia(texto: str) -> int:
-            if texto is None:
-                return 999
-            nums = re.findall(r"\d+", str(texto))
-            return max(int(n) for n in nums) if nums else 999
-
-        df_ret = df_ret.with_columns(
-            pl.col(col_cluster).map_elements(extrair_maior_dia, return_dtype=pl.Int64).alias("dias_max")
-        )
-        df_ret = df_ret.filter(pl.col("dias_max") > 6).drop("dias_max")
+        df_ret = df_ret.filter(maior_dia_cluster(col_cluster) > 6)
         removidos_cluster = total_antes - df_ret.height
         print(f"\033[95m🧹 Removidos (0–6 dias): {removidos_cluster} | Mantidos: {df_ret.height}\033[0m")
 
     # 2) COLUNAS PRINCIPAIS
-    col_pedido_ret = safe_pick(df_ret, "Número do Pedido JMS 运单号", ["pedido", "运单", "jms"])
-    col_data_ret = safe_pick(df_ret, "Data da Atualização 更新日期", ["data", "atualiza", "更新"])
-    col_regional = safe_pick(df_ret, "Regional 区域", ["regional", "区域"])
-    col_base_entrega = safe_pick(df_ret, "Base de Entrega 派件网点", ["base", "网点", "派件"])
-
     cols = [c for c in [col_pedido_ret, col_data_ret, col_regional, col_base_entrega] if c]
     df_ret = df_ret.select(cols).rename({
         col_pedido_ret: "PEDIDO",
@@ -548,12 +535,13 @@ def analisar_retidos_motor_antigo():
     print(f"\033[92m🟢 Retidos filtrados ({', '.join(REGIONAIS_DESEJADAS)}): {total_inicial}\033[0m")
 
     # 3) DEVOLUÇÃO
-    df_dev = ler_planilhas(DIR_DEVOLUCAO, "Devolução")
-    if not df_dev.is_empty():
-        col_pedido_dev = safe_pick(df_dev, "Número de pedido JMS", ["pedido", "jms"])
-        col_data_dev = safe_pick(df_dev, "Tempo de solicitação", ["solicit", "tempo", "data"])
+    esquema = ENTRADAS.esquema("devolucao")
+    if esquema.columns:
+        col_pedido_dev = safe_pick(esquema, "Número de pedido JMS", ["pedido", "jms"])
+        col_data_dev = safe_pick(esquema, "Tempo de solicitação", ["solicit", "tempo", "data"])
 
         if col_pedido_dev and col_data_dev:
+            df_dev = ENTRADAS.ler("devolucao", colunas=[col_pedido_dev, col_data_dev])
             df_dev = (
                 df_dev.select([col_pedido_dev, col_data_dev])
                 .rename({col_pedido_dev: "PEDIDO_DEV", col_data_dev: "DATA_DEV"})
@@ -576,12 +564,13 @@ def analisar_retidos_motor_antigo():
             print(f"\033[93m🟡 Devolução → Removidos: {removidos_dev} | Mantidos: {df_ret.height}\033[0m")
 
     # 4) PROBLEMÁTICOS
-    df_prob = ler_planilhas(DIR_PROBLEMATICOS, "Problemáticos")
-    if not df_prob.is_empty():
-        col_pedido_prob = safe_pick(df_prob, "Número de pedido JMS", ["pedido", "jms", "运单"])
-        col_data_prob = safe_pick(df_prob, "data de registro", ["registro", "data", "异常"])
+    esquema = ENTRADAS.esquema("problematicos")
+    if esquema.columns:
+        col_pedido_prob = safe_pick(esquema, "Número de pedido JMS", ["pedido", "jms", "运单"])
+        col_data_prob = safe_pick(esquema, "data de registro", ["registro", "data", "异常"])
 
         if col_pedido_prob and col_data_prob:
+            df_prob = ENTRADAS.ler("problematicos", colunas=[col_pedido_prob, col_data_prob])
             df_prob = (
                 df_prob.select([col_pedido_prob, col_data_prob])
                 .rename({col_pedido_prob: "PEDIDO_PROB", col_data_prob: "DATA_PROB"})
@@ -603,12 +592,13 @@ def analisar_retidos_motor_antigo():
                                                                                 strict=False)
             print(f"\033[38;5;208m🟠 Problemáticos → Removidos: {removidos_prob} | Mantidos: {df_ret.height}\033[0m")
     # 5) CUSTÓDIA
-    df_cust = ler_planilhas(DIR_CUSTODIA, "Custódia")
-    if not df_cust.is_empty():
-        col_pedido_c = safe_pick(df_cust, "Número de pedido JMS", ["pedido", "jms"])
-        col_data_c = safe_pick(df_cust, "data de registro", ["registro", "data"])
+    esquema = ENTRADAS.esquema("custodia")
+    if esquema.columns:
+        col_pedido_c = safe_pick(esquema, "Número de pedido JMS", ["pedido", "jms"])
+        col_data_c = safe_pick(esquema, "data de registro", ["registro", "data"])
 
         if col_pedido_c and col_data_c:
+            df_cust = ENTRADAS.ler("custodia", colunas=[col_pedido_c, col_data_c])
             df_cust = (
                 df_cust.select([col_pedido_c, col_data_c])
                 .rename({col_pedido_c: "PEDIDO_CUST", col_data_c: "DATA_CUST"})
@@ -710,29 +700,13 @@ def ler_qtd_maior_10_dias():
     print("🔍 Lendo Qtd. > 10 dias (LÓGICA CORRIGIDA)")
     print("=" * 50 + "\n")
 
-    if not os.path.exists(DIR_BASE_LISTA):
-        print(f"❌ Pasta '{DIR_BASE_LISTA}' não encontrada.")
+    if not ENTRADAS.arquivos("base_lista"):
         return pl.DataFrame()
 
-    arquivos = [os.path.join(DIR_BASE_LISTA, f) for f in os.listdir(DIR_BASE_LISTA) if f.endswith((".xlsx", ".xls"))]
-
-    if not arquivos:
-        print(f"⚠️ Nenhum arquivo Excel encontrado em {DIR_BASE_LISTA}.")
+    df_total = ENTRADAS.ler("base_lista", colunas=["Nome da base de entrega", "Qtd a entregar há mais de 10 dias"])
+    if df_total.is_empty() and not df_total.columns:
         return pl.DataFrame()
 
-    dfs = []
-    for arq in arquivos:
-        try:
-            df = pl.read_excel(arq)
-            dfs.append(df)
-        except Exception as e:
-            print(f"Erro ao ler {arq}: {e}")
-
-    if not dfs:
-        return pl.DataFrame()
-
-    df_total = pl.concat(dfs, how="diagonal_relaxed")
-
     # Verifica se as colunas esperadas existem ANTES de renomear
     # >>>>> PONTO CHAVE DA CORREÇÃO <<<<<
     if "Nome da base de entrega" not in df_total.columns or "Qtd a entregar há mais de 10 dias" not in df_total.columns:
@@ -948,6 +922,8 @@ def main():
 
     print(f"✅ Relatório final gerado com sucesso!\n📂 {out}")
 
+    ENTRADAS.limpar_cache()
+
 
 # ==========================================================
 # Execução do Script
@@ -1,13 +1,22 @@
 # -*- coding: utf-8 -*-
 import os
+import sys
 import json
 import re
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import polars as pl
 # CORREÇÃO 1: Importar timedelta junto com datetime
 from datetime import datetime, timedelta
 import requests
 
+from registro_entradas import RegistroEntradas, maior_dia_cluster
+
+# snapshots_diarios.py fica em Novos/ (compartilhado com Franquias e o bot de hash)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from snapshots_diarios import SnapshotsDiarios
+from perfil_execucao import PerfilExecucao
+
 
 # ============================================================
 # 🧩 FUNÇÕES AUXILIARES (GLOBAIS)
@@ -74,39 +83,6 @@ def limpar_pedidos(df: pl.DataFrame, coluna: str) -> pl.DataFrame:
     return df
 
 
-def ler_planilhas(pasta: str, nome: str) -> pl.DataFrame:
-    if not os.path.exists(pasta):
-        logging.error(f"❌ Pasta '{pasta}' não existe.")
-        return pl.DataFrame()
-
-    arquivos = [a for a in os.listdir(pasta)
-                if a.lower().endswith((".xls", ".xlsx"))
-                and not a.startswith("~$")]
-
-    if not arquivos:
-        logging.warning(f"⚠️ Nenhum arquivo .xls ou .xlsx encontrado na pasta '{pasta}'.")
-        return pl.DataFrame()
-
-    logging.info(f"📂 {len(arquivos)} arquivos encontrados em '{nome}' para leitura.")
-
-    dfs = []
-    for arq in arquivos:
-        path = os.path.join(pasta, arq)
-        try:
-            raw = pl.read_excel(path)
-            df = next(iter(raw.values())) if isinstance(raw, dict) else raw
-            dfs.append(df)
-            logging.info(f"   ✔️ Arquivo '{arq}' lido com sucesso ({df.height} linhas).")
-        except Exception as e:
-            logging.error(f"   ❌ Erro ao ler o arquivo '{arq}': {e}")
-
-    if not dfs:
-        logging.warning(f"⚠️ Não foi possível ler nenhum arquivo da pasta '{pasta}'.")
-        return pl.DataFrame()
-
-    return pl.concat(dfs, how="diagonal_relaxed")
-
-
 def salvar_resultado(df: pl.DataFrame, pasta: str, nome: str, limit: int):
     os.makedirs(pasta, exist_ok=True)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -140,13 +116,72 @@ def limpar_nome(nome: str) -> str:
     return nome.strip()
 
 
-def salvar_relatorio_intermediario(df: pl.DataFrame, nome: str, config: dict):
-    """Função auxiliar para salvar os DataFrames intermediários."""
-    pasta_saida = config["caminhos"]["pasta_saida"]
-    os.makedirs(pasta_saida, exist_ok=True)
-    caminho = os.path.join(pasta_saida, f"{nome}.parquet")
-    df.write_parquet(caminho)
-    logging.info(f"📄 Relatório intermediário salvo: {caminho}")
+class GravadorIntermediarios:
+    """
+    Grava os relatórios intermediários (auditoria dos filtros) em segundo plano.
+
+    Níveis (config["parametros"]["relatorios_intermediarios"]["nivel"]):
+      - "off": não grava nada
+      - "resumo": só a contagem de pacotes por base de cada etapa
+      - "completo": o DataFrame inteiro de cada etapa
+    Formato padrão parquet; "excel" apenas quando pedido.
+    """
+
+    NIVEIS = ("off", "resumo", "completo")
+    COL_BASE = "Base de Entrega 派件网点"
+
+    def __init__(self, config: dict):
+        params = config["parametros"]
+        opcoes = params.get("relatorios_intermediarios", {})
+
+        # Compatibilidade com a flag antiga (true/false)
+        nivel_padrao = "completo" if params.get("gerar_relatorios_intermediarios", True) else "off"
+        self.nivel = opcoes.get("nivel", nivel_padrao)
+        self.formato = opcoes.get("formato", "parquet")
+        self.pasta_saida = config["caminhos"]["pasta_saida"]
+
+        if self.nivel not in self.NIVEIS:
+            logging.warning(f"⚠️ Nível de relatório intermediário '{self.nivel}' inválido. Usando '{nivel_padrao}'.")
+            self.nivel = nivel_padrao
+
+        self._executor = ThreadPoolExecutor(max_workers=1) if self.nivel != "off" else None
+        self._pendentes = []
+
+    def salvar(self, df: pl.DataFrame, nome: str):
+        if self._executor is None:
+            return
+
+        if self.nivel == "resumo":
+            nome = f"{nome}_resumo"
+            if self.COL_BASE in df.columns:
+                df = df.group_by(self.COL_BASE).agg(pl.len().alias("Qtd")).sort("Qtd", descending=True)
+            else:
+                df = pl.DataFrame({"Qtd": [df.height]})
+
+        self._pendentes.append(self._executor.submit(self._gravar, df, nome))
+
+    def _gravar(self, df: pl.DataFrame, nome: str):
+        os.makedirs(self.pasta_saida, exist_ok=True)
+        if self.formato == "excel":
+            caminho = os.path.join(self.pasta_saida, f"{nome}.xlsx")
+            df.write_excel(caminho)
+        else:
+            caminho = os.path.join(self.pasta_saida, f"{nome}.parquet")
+            df.write_parquet(caminho)
+        logging.info(f"📄 Relatório intermediário salvo: {caminho}")
+
+    def finalizar(self):
+        """Espera as gravações pendentes (chamado só depois das contagens finais)."""
+        if self._executor is None:
+            return
+        for futuro in self._pendentes:
+            try:
+                futuro.result()
+            except Exception as e:
+                logging.error(f"❌ Falha ao gravar relatório intermediário: {e}")
+        self._pendentes.clear()
+        self._executor.shutdown(wait=True)
+        self._executor = None
 
 
 class AnaliseRetidos:
@@ -162,6 +197,31 @@ class AnaliseRetidos:
         with open(path, "r", encoding="utf-8") as f:
             self.config = json.load(f)
 
+        caminhos = self.config["caminhos"]
+        self.entradas = RegistroEntradas(
+            caminhos.get("pasta_cache", os.path.join(caminhos["pasta_saida"], "_cache_entradas")),
+            log=logging.info,
+        )
+        self.entradas.registrar("retidos", caminhos["pasta_retidos"])
+        self.entradas.registrar("devolucao", caminhos["pasta_devolucao"])
+        self.entradas.registrar("problematicos", caminhos["pasta_problematicos"])
+        self.entradas.registrar("custodia", caminhos["pasta_custodia"])
+
+        self.intermediarios = GravadorIntermediarios(self.config)
+        self.perfil = PerfilExecucao("retidos", log=logging.info)
+
+        # Estado diário por pacote (parquet particionado por data)
+        cfg_snap = self.config.get("snapshots", {})
+        self.snapshots = SnapshotsDiarios(
+            os.path.join(caminhos["pasta_saida"], "Snapshots"), "retidos",
+            col_id=self.config["colunas"]["col_pedido_ret"], col_base="Base_Normalizada",
+            deduplicar=False,  # os totais/variações contam linhas, como o DataFrame do dia
+            log=logging.info,
+        )
+        # Data fixa para comparar (AAAA-MM-DD); vazio = último snapshot antes de hoje
+        self.data_referencia = cfg_snap.get("data_referencia") or None
+        self._migrar_snapshots_legados()
+
         self.removidos = {"cluster": 0, "devolucao": 0, "problematicos": 0, "custodia": 0}
         self.total_inicial_filtrado = 0
         self.df_total_por_base = pl.DataFrame()
@@ -169,6 +229,13 @@ class AnaliseRetidos:
     def executar(self):
         logging.info("🚀 Iniciando análise de pacotes retidos...")
 
+        try:
+            with self.perfil:
+                self._executar()
+        finally:
+            self.intermediarios.finalizar()
+
+    def _executar(self):
         df = self._processar_dados()
 
         if df.is_empty():
@@ -177,7 +244,8 @@ class AnaliseRetidos:
 
         logging.info(f"📊 DataFrame final possui {df.height} linhas e {len(df.columns)} colunas.")
 
-        df = self._enriquecer_com_coordenadores(df)
+        with self.perfil.etapa("join_coordenador") as etapa:
+            df = etapa.linhas(self._enriquecer_com_coordenadores(df))
 
         if "Coordenador" not in df.columns:
             logging.error(
@@ -191,40 +259,52 @@ class AnaliseRetidos:
 
         logging.info(f"📊 Coordenadores encontrados para envio: {len(coordenadores_encontrados)}")
 
-        df_anterior = self._carregar_snapshot_anterior()
+        with self.perfil.etapa("snapshot_referencia") as etapa:
+            data_ref, df_anterior = self._carregar_snapshot_referencia()
+            etapa.linhas(df_anterior)
         if df_anterior.is_empty():
-            logging.info("📂 Nenhum snapshot do dia anterior encontrado. A variação será zero.")
+            logging.info("📂 Nenhum snapshot anterior encontrado. A variação será zero.")
         else:
-            logging.info(f"📂 Snapshot do dia anterior carregado com {df_anterior.height} linhas.")
+            logging.info(f"📂 Snapshot de {data_ref:%d/%m/%Y} carregado com {df_anterior.height} linhas.")
 
-        self._gerar_log_comparativo(df, df_anterior)
+        with self.perfil.etapa("comparativo"):
+            self._gerar_log_comparativo(df, df_anterior, data_ref)
 
-        self._enviar_card_completo(df, df_anterior)
+        with self.perfil.etapa("envio"):
+            self._enviar_card_completo(df, df_anterior)
 
-        self._salvar_snapshot_diario(df)
+        with self.perfil.etapa("snapshot_salvar", linhas=df.height):
+            self.snapshots.salvar(df)
 
-        caminho_final = self._salvar_resultado_final(df)
+        with self.perfil.etapa("salvar_resultado", linhas=df.height):
+            caminho_final = self._salvar_resultado_final(df)
         self._exibir_resumo_console(caminho_final)
 
+        self.entradas.limpar_cache()
+
     # ============================================================
     # 🔧 PROCESSO PRINCIPAL — PIPELINE COMPLETO
     # ============================================================
     def _processar_dados(self):
-        df = self._ler_e_preparar_retidos()
+        with self.perfil.etapa("leitura") as etapa:
+            df = etapa.linhas(self._ler_e_preparar_retidos())
         if df.is_empty():
             logging.error("❌ Nenhum dado retido inicial foi lido. Abortando processamento.")
             return pl.DataFrame()
 
         logging.info(f"📊 Após leitura inicial: {df.height} pacotes retidos.")
-        salvar_relatorio_intermediario(df, "00_Retidos_Iniciais", self.config)
+        self.intermediarios.salvar(df, "00_Retidos_Iniciais")
 
-        df = self._aplicar_filtro_devolucao(df)
+        with self.perfil.etapa("filtro_devolucao") as etapa:
+            df = etapa.linhas(self._aplicar_filtro_devolucao(df))
         logging.info(f"📊 Após filtro de devolução: {df.height} pacotes restantes.")
 
-        df = self._aplicar_filtro_problematicos(df)
+        with self.perfil.etapa("filtro_problematicos") as etapa:
+            df = etapa.linhas(self._aplicar_filtro_problematicos(df))
         logging.info(f"📊 Após filtro de problemáticos: {df.height} pacotes restantes.")
 
-        df = self._aplicar_filtro_custodia(df)
+        with self.perfil.etapa("filtro_custodia") as etapa:
+            df = etapa.linhas(self._aplicar_filtro_custodia(df))
         logging.info(f"📊 Após filtro de custódia: {df.height} pacotes restantes (FINAL).")
 
         return df
@@ -233,19 +313,29 @@ class AnaliseRetidos:
     # 📥 Leitura + organização dos retidos
     # ============================================================
     def _ler_e_preparar_retidos(self):
-        df = ler_planilhas(self.config["caminhos"]["pasta_retidos"], "Retidos")
+        esquema = self.entradas.esquema("retidos")
+        if not esquema.columns:
+            return pl.DataFrame()
+
+        col_dias = safe_pick(esquema, "Dias Retidos 滞留日", ["滞留", "dias"])
+        col_base = safe_pick(esquema, "Base de Entrega 派件网点", ["base", "网点"])
+        col_pedido = safe_pick(esquema, self.config["colunas"]["col_pedido_ret"], ["pedido", "运单"])
+        col_data = safe_pick(esquema, self.config["colunas"]["col_data_atualizacao_ret"], ["data", "更新"])
+        col_regional = safe_pick(esquema, self.config["colunas"]["col_regional_ret"], ["regional", "区域"])
+
+        df = self.entradas.ler(
+            "retidos",
+            colunas=list(dict.fromkeys([col_dias, col_base, col_pedido, col_data, col_regional])),
+        )
         if df.is_empty():
             return pl.DataFrame()
 
-        col_dias = safe_pick(df, "Dias Retidos 滞留日", ["滞留", "dias"])
         if col_dias:
             antes = df.height
-            df = df.with_columns(pl.col(col_dias).cast(pl.Int64, strict=False))
-            df = df.filter(pl.col(col_dias) > 6)
+            df = df.filter(maior_dia_cluster(col_dias) > 6)
             self.removidos["cluster"] = antes - df.height
             logging.info(f"🔵 Filtro de >6 dias aplicado. Removidos: {self.removidos['cluster']}.")
 
-        col_base = safe_pick(df, "Base de Entrega 派件网点", ["base", "网点"])
         if col_base:
             self.df_total_por_base = (
                 df.with_columns(
@@ -257,10 +347,6 @@ class AnaliseRetidos:
                 .agg(pl.len().alias("Total de Pedidos"))
             )
 
-        col_pedido = safe_pick(df, self.config["colunas"]["col_pedido_ret"], ["pedido", "运单"])
-        col_data = safe_pick(df, self.config["colunas"]["col_data_atualizacao_ret"], ["data", "更新"])
-        col_regional = safe_pick(df, self.config["colunas"]["col_regional_ret"], ["regional", "区域"])
-
         if not all([col_pedido, col_data, col_regional, col_base]):
             logging.error(
                 "❌ Uma ou mais colunas essenciais não foram encontradas na planilha de Retidos. Verifique o config.json e os nomes das colunas.")
@@ -288,19 +374,24 @@ class AnaliseRetidos:
     # 🔵 Filtro: Devolução
     # ============================================================
     def _aplicar_filtro_devolucao(self, df):
-        df_dev = ler_planilhas(self.config["caminhos"]["pasta_devolucao"], "Devolução")
-        if df_dev.is_empty():
+        esquema = self.entradas.esquema("devolucao")
+        if not esquema.columns:
             logging.warning("⚠️ Planilha de devolução não encontrada ou vazia. Pulando este filtro.")
             return df
 
-        col_pedido = safe_pick(df_dev, self.config["colunas"]["col_pedido_dev"], ["pedido"])
-        col_data = safe_pick(df_dev, self.config["colunas"]["col_data_solicitacao_dev"], ["tempo", "solic"])
+        col_pedido = safe_pick(esquema, self.config["colunas"]["col_pedido_dev"], ["pedido"])
+        col_data = safe_pick(esquema, self.config["colunas"]["col_data_solicitacao_dev"], ["tempo", "solic"])
 
         if not col_pedido or not col_data:
             logging.warning(
                 "⚠️ Colunas de pedido ou data não encontradas na planilha de devolução. Pulando este filtro.")
             return df
 
+        df_dev = self.entradas.ler("devolucao", colunas=[col_pedido, col_data])
+        if df_dev.is_empty():
+            logging.warning("⚠️ Planilha de devolução sem linhas. Pulando este filtro.")
+            return df
+
         df_dev = (
             df_dev.select([col_pedido, col_data])
             .rename({
@@ -327,7 +418,7 @@ class AnaliseRetidos:
             pl.col(self.config["colunas"]["col_data_solicitacao_dev"]).is_not_null()
         )
 
-        salvar_relatorio_intermediario(df_rem, "01_Removidos_Devolucao", self.config)
+        self.intermediarios.salvar(df_rem, "01_Removidos_Devolucao")
 
         remover = df_rem.select(self.config["colunas"]["col_pedido_ret"]).to_series()
         self.removidos["devolucao"] = remover.len()
@@ -339,19 +430,24 @@ class AnaliseRetidos:
     # 🟣 Filtro: Problemáticos
     # ============================================================
     def _aplicar_filtro_problematicos(self, df):
-        df_prob = ler_planilhas(self.config["caminhos"]["pasta_problematicos"], "Problemáticos")
-        if df_prob.is_empty():
+        esquema = self.entradas.esquema("problematicos")
+        if not esquema.columns:
             logging.warning("⚠️ Planilha de problemáticos não encontrada ou vazia. Pulando este filtro.")
             return df
 
-        col_pedido = safe_pick(df_prob, "Número de pedido JMS", ["pedido", "运单"])
-        col_data = safe_pick(df_prob, "data de registro", ["registro", "异常"])
+        col_pedido = safe_pick(esquema, "Número de pedido JMS", ["pedido", "运单"])
+        col_data = safe_pick(esquema, "data de registro", ["registro", "异常"])
 
         if not col_pedido or not col_data:
             logging.warning(
                 "⚠️ Colunas de pedido ou data não encontradas na planilha de problemáticos. Pulando este filtro.")
             return df
 
+        df_prob = self.entradas.ler("problematicos", colunas=[col_pedido, col_data])
+        if df_prob.is_empty():
+            logging.warning("⚠️ Planilha de problemáticos sem linhas. Pulando este filtro.")
+            return df
+
         df_prob = (
             df_prob.select([col_pedido, col_data])
             .rename({
@@ -375,7 +471,7 @@ class AnaliseRetidos:
             pl.col("Registro_Prob") >= pl.col(self.config["colunas"]["col_data_atualizacao_ret"])
         )
 
-        salvar_relatorio_intermediario(df_rem, "02_Removidos_Problematicos", self.config)
+        self.intermediarios.salvar(df_rem, "02_Removidos_Problematicos")
 
         remover = df_rem.select(self.config["colunas"]["col_pedido_ret"]).to_series()
         self.removidos["problematicos"] = remover.len()
@@ -387,19 +483,24 @@ class AnaliseRetidos:
     # 🟦 Filtro: Custódia
     # ============================================================
     def _aplicar_filtro_custodia(self, df):
-        df_cust = ler_planilhas(self.config["caminhos"]["pasta_custodia"], "Custódia")
-        if df_cust.is_empty():
+        esquema = self.entradas.esquema("custodia")
+        if not esquema.columns:
             logging.warning("⚠️ Planilha de custódia não encontrada ou vazia. Pulando este filtro.")
             return df
 
-        col_pedido = safe_pick(df_cust, self.config["colunas"]["col_pedido_cust"], ["pedido"])
-        col_data = safe_pick(df_cust, self.config["colunas"]["col_data_registro_cust"], ["registro"])
+        col_pedido = safe_pick(esquema, self.config["colunas"]["col_pedido_cust"], ["pedido"])
+        col_data = safe_pick(esquema, self.config["colunas"]["col_data_registro_cust"], ["registro"])
 
         if not col_pedido or not col_data:
             logging.warning(
                 "⚠️ Colunas de pedido ou data não encontradas na planilha de custódia. Pulando este filtro.")
             return df
 
+        df_cust = self.entradas.ler("custodia", colunas=[col_pedido, col_data])
+        if df_cust.is_empty():
+            logging.warning("⚠️ Planilha de custódia sem linhas. Pulando este filtro.")
+            return df
+
         df_cust = (
             df_cust.select([col_pedido, col_data])
             .rename({
@@ -439,7 +540,7 @@ class AnaliseRetidos:
 
         df_rem = dfj.filter(pl.col("Status_Custodia") == "Dentro")
 
-        salvar_relatorio_intermediario(df_rem, "03_Removidos_Custodia", self.config)
+        self.intermediarios.salvar(df_rem, "03_Removidos_Custodia")
 
         self.removidos["custodia"] = df_rem.height
         logging.info(f"🟦 Filtro de custódia aplicado. Removidos: {self.removidos['custodia']}.")
@@ -503,9 +604,11 @@ class AnaliseRetidos:
     # ============================================================
     # 🆕 RELATÓRIO DE COMPARAÇÃO (NOVO)
     # ============================================================
-    def _gerar_log_comparativo(self, df_atual: pl.DataFrame, df_anterior: pl.DataFrame):
+    def _gerar_log_comparativo(self, df_atual: pl.DataFrame, df_anterior: pl.DataFrame, data_ref=None):
         logging.info("📈 Gerando relatório de comparação com o dia anterior...")
 
+        delta = self.snapshots.diferenca(df_atual, data_ref)
+
         total_atual = df_atual.height
         total_anterior = df_anterior.height if not df_anterior.is_empty() else 0
         diff_total = total_atual - total_anterior
@@ -537,6 +640,9 @@ class AnaliseRetidos:
             f"  - Total de Retidos (Hoje): {total_atual}",
             f"  - Total de Retidos (Ontem): {total_anterior}",
             f"  - Variação Geral: {'+' if diff_total >= 0 else ''}{diff_total} ({'Aumento' if diff_total > 0 else 'Redução' if diff_total < 0 else 'Estável'})",
+            f"  - Novos: {delta['novos'].height} | Resolvidos: {delta['resolvidos'].height} | "
+            f"Ainda retidos: {delta['em_aberto'].height}"
+            + (f" (referência {data_ref:%d/%m/%Y})" if data_ref else ""),
             "",
             "🔴 **TOP 5 BASES COM MAIOR AUMENTO:**",
         ]
@@ -600,46 +706,37 @@ class AnaliseRetidos:
         logging.info("===========================================")
 
     # ============================================================
-    # 💾 Salvar snapshot do dia
+    # 📂 Snapshot de referência (ontem ou data configurada)
     # ============================================================
-    def _salvar_snapshot_diario(self, df: pl.DataFrame):
+    def _carregar_snapshot_referencia(self):
+        if self.data_referencia:
+            data_ref = datetime.strptime(self.data_referencia, "%Y-%m-%d").date()
+            if not self.snapshots.existe(data_ref):
+                logging.warning(f"⚠️ Snapshot de {data_ref:%d/%m/%Y} não encontrado. A comparação não será feita.")
+                return None, pl.DataFrame()
+            return data_ref, self.snapshots.carregar(data_ref)
+
+        data_ref, df = self.snapshots.carregar_anterior()
+        if data_ref is not None and data_ref != (datetime.now() - timedelta(days=1)).date():
+            logging.warning(f"⚠️ Sem snapshot de ontem — comparando com o último disponível ({data_ref:%d/%m/%Y}).")
+        return data_ref, df
+
+    def _migrar_snapshots_legados(self):
+        """Converte os antigos Snapshots/retidos_AAAAMMDD.parquet para partições do SnapshotsDiarios (os originais ficam)."""
         pasta = os.path.join(self.config["caminhos"]["pasta_saida"], "Snapshots")
-        os.makedirs(pasta, exist_ok=True)
-
-        hoje = datetime.now().strftime("%Y%m%d")
-        caminho = os.path.join(pasta, f"retidos_{hoje}.parquet")
-
-        df.write_parquet(caminho)
-        logging.info(f"📦 Snapshot diário salvo em: {caminho}")
-        return caminho
-
-    # ============================================================
-    # 📂 Carregar snapshot anterior (VERSÃO MELHORADA E MAIS CONFIÁVEL)
-    # ============================================================
-    def _carregar_snapshot_anterior(self) -> pl.DataFrame:
-        pasta = os.path.join(self.config["caminhos"]["pasta_saida"], "Snapshots")
-
-        if not os.path.exists(pasta):
-            logging.info("📂 Pasta de Snapshots não existe. Nenhum dado anterior para comparar.")
-            return pl.DataFrame()
-
-        # CORREÇÃO 2: Usar timedelta do Python para calcular a data de ontem
-        ontem = datetime.now() - timedelta(days=1)
-        nome_arquivo_anterior = ontem.strftime("retidos_%Y%m%d.parquet")
-        caminho_anterior = os.path.join(pasta, nome_arquivo_anterior)
-
-        if os.path.exists(caminho_anterior):
+        if not os.path.isdir(pasta):
+            return
+        for nome in sorted(os.listdir(pasta)):
+            m = re.fullmatch(r"retidos_(\d{8})\.parquet", nome)
+            if not m:
+                continue
+            data = datetime.strptime(m.group(1), "%Y%m%d").date()
+            caminho = os.path.join(pasta, nome)
             try:
-                df = pl.read_parquet(caminho_anterior)
-                logging.info(f"📂 Snapshot do dia anterior ('{nome_arquivo_anterior}') carregado com sucesso.")
-                return df
+                if not self.snapshots.existe(data):
+                    self.snapshots.salvar(pl.read_parquet(caminho), data)
             except Exception as e:
-                logging.error(f"❌ Falha ao ler o snapshot do dia anterior '{nome_arquivo_anterior}': {e}")
-                return pl.DataFrame()
-        else:
-            logging.warning(
-                f"⚠️ Snapshot do dia anterior ('{nome_arquivo_anterior}') não foi encontrado. A comparação não será feita.")
-            return pl.DataFrame()
+                logging.error(f"❌ Falha ao migrar snapshot legado '{nome}': {e}")
 
     # ============================================================
     # 📮 CARD COMPLETO POR COORDENADOR (Webhook fixo) - VERSÃO CORRIGIDA
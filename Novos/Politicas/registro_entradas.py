@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Registro de entradas das políticas (Bonificação / Retidos).
+
+Cada pasta de origem é registrada uma vez com o seu leitor. Na primeira vez
+que uma etapa pede os dados, cada planilha é convertida para parquet em uma
+pasta de cache (chave = caminho + tamanho + data de modificação). A partir
+daí as etapas recebem LazyFrames sobre esses parquets, com projeção apenas
+das colunas que usam — o Excel de centenas de MB é aberto uma única vez,
+e nem isso quando o arquivo não mudou desde a última execução.
+"""
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import polars as pl
+
+EXTENSOES_EXCEL = (".xls", ".xlsx")
+MAX_WORKERS_LEITURA = 8
+
+
+def ler_excel_primeira_aba(path: str) -> pl.DataFrame:
+    raw = pl.read_excel(path)
+    return next(iter(raw.values())) if isinstance(raw, dict) else raw
+
+
+def maior_dia_cluster(coluna: str) -> pl.Expr:
+    """Maior número do rótulo de cluster ("7-10 dias" -> 10); sem número ou nulo -> 999."""
+    return (
+        pl.col(coluna)
+        .cast(pl.Utf8, strict=False)
+        .str.extract_all(r"\d+")
+        .list.eval(pl.element().cast(pl.Int64, strict=False))
+        .list.max()
+        .fill_null(999)
+    )
+
+
+def listar_arquivos(pasta: str, extensoes=EXTENSOES_EXCEL) -> list[str]:
+    return sorted(
+        os.path.join(pasta, f)
+        for f in os.listdir(pasta)
+        if f.lower().endswith(extensoes) and not f.startswith("~$")
+    )
+
+
+def _chave_arquivo(path: str) -> str:
+    st = os.stat(path)
+    bruto = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.md5(bruto.encode("utf-8")).hexdigest()
+
+
+class RegistroEntradas:
+    def __init__(self, pasta_cache: str, log=print):
+        self.pasta_cache = pasta_cache
+        self.log = log
+        self._fontes: dict[str, dict] = {}
+        self._parquets: dict[str, str] = {}  # arquivo de origem -> parquet em cache
+
+    def registrar(self, nome: str, pasta: str, leitor=ler_excel_primeira_aba, extensoes=EXTENSOES_EXCEL):
+        self._fontes[nome] = {"pasta": pasta, "leitor": leitor, "extensoes": extensoes, "arquivos": None}
+
+    # ------------------------------------------------------------
+    # Descoberta
+    # ------------------------------------------------------------
+    def arquivos(self, nome: str) -> list[str]:
+        fonte = self._fontes[nome]
+        if fonte["arquivos"] is None:
+            pasta = fonte["pasta"]
+            if not os.path.exists(pasta):
+                self.log(f"❌ Pasta '{pasta}' não encontrada.")
+                fonte["arquivos"] = []
+            else:
+                fonte["arquivos"] = listar_arquivos(pasta, fonte["extensoes"])
+                if not fonte["arquivos"]:
+                    self.log(f"⚠️ Nenhum arquivo encontrado em {nome}.")
+        return fonte["arquivos"]
+
+    # ------------------------------------------------------------
+    # Materialização (uma leitura por arquivo)
+    # ------------------------------------------------------------
+    def _converter(self, leitor, arquivo: str) -> str | None:
+        destino = os.path.join(self.pasta_cache, f"{_chave_arquivo(arquivo)}.parquet")
+        if os.path.exists(destino):
+            self.log(f"   ♻️ {os.path.basename(arquivo)} (cache)")
+            return destino
+
+        try:
+            df = leitor(arquivo)
+        except Exception as e:
+            self.log(f"   ❌ Erro ao ler {os.path.basename(arquivo)}: {e}")
+            return None
+
+        if df.is_empty() and not df.columns:
+            return None
+
+        tmp = destino + ".tmp"
+        df.write_parquet(tmp)
+        os.replace(tmp, destino)
+        self.log(f"   ✅ {os.path.basename(arquivo)} ({df.height} linhas)")
+        return destino
+
+    def _materializar(self, nome: str, arquivos: list[str]) -> list[str]:
+        pendentes = [a for a in arquivos if a not in self._parquets]
+        if pendentes:
+            os.makedirs(self.pasta_cache, exist_ok=True)
+            leitor = self._fontes[nome]["leitor"]
+            self.log(f"📂 {len(pendentes)} arquivo(s) encontrado(s) em {nome}:")
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS_LEITURA, len(pendentes))) as ex:
+                for arq, destino in zip(pendentes, ex.map(lambda a: self._converter(leitor, a), pendentes)):
+                    if destino:
+                        self._parquets[arq] = destino
+
+        return [self._parquets[a] for a in arquivos if a in self._parquets]
+
+    # ------------------------------------------------------------
+    # Acesso pelas etapas
+    # ------------------------------------------------------------
+    def por_arquivo(self, nome: str, colunas: list[str] | None = None, arquivos: list[str] | None = None):
+        """Lista de (nome do arquivo, LazyFrame) — para etapas que tratam cada planilha à parte."""
+        arquivos = self.arquivos(nome) if arquivos is None else arquivos
+        self._materializar(nome, arquivos)
+
+        saida = []
+        for arq in arquivos:
+            if arq not in self._parquets:
+                continue
+            lf = pl.scan_parquet(self._parquets[arq])
+            if colunas is not None:
+                presentes = set(lf.collect_schema().names())
+                lf = lf.select([c for c in colunas if c and c in presentes])
+            saida.append((os.path.basename(arq), lf))
+        return saida
+
+    def lazy(self, nome: str, colunas: list[str] | None = None, arquivos: list[str] | None = None) -> pl.LazyFrame:
+        frames = [lf for _, lf in self.por_arquivo(nome, colunas, arquivos)]
+        if not frames:
+            return pl.LazyFrame()
+        return pl.concat(frames, how="diagonal_relaxed")
+
+    def ler(self, nome: str, colunas: list[str] | None = None, arquivos: list[str] | None = None) -> pl.DataFrame:
+        return self.lazy(nome, colunas, arquivos).collect()
+
+    def esquema(self, nome: str) -> pl.DataFrame:
+        """DataFrame vazio com a união das colunas da fonte (para detectar colunas sem ler dados)."""
+        return self.lazy(nome).head(0).collect()
+
+    def limpar_cache(self, max_dias: int = 15):
+        if not os.path.exists(self.pasta_cache):
+            return
+        em_uso = set(self._parquets.values())
+        limite = time.time() - max_dias * 86400
+        for f in os.listdir(self.pasta_cache):
+            path = os.path.join(self.pasta_cache, f)
+            if path not in em_uso and os.path.getmtime(path) < limite:
+                os.remove(path)
@@ -7,6 +7,8 @@ from pathlib import Path
 import traceback
 import glob
 import re
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Caminho da pasta ---
 CAMINHO_PASTA_RELATORIO = Path(
@@ -24,6 +26,12 @@ COL_PRAZO_COLETA = 'Horário de término do prazo de coleta'  # NOVA COLUNA
 # ✅ ALTERAÇÃO: quantidade de bases nos rankings
 TOP_N_BASES = 10
 
+# Leitura paralela das planilhas diárias
+MAX_WORKERS = min(8, os.cpu_count() or 4)
+
+COL_ARQUIVO = 'Arquivo_Origem'
+COLUNAS_TEXTO = [COL_NOME_BASE, COL_REMESSA, COL_STATUS_ENTREGA]
+
 # --- Variações para mapear colunas (PT/中文) ---
 VARIACOES = {
     COL_NOME_BASE: {'Nome da base', '网点名称', '所属网点', '网点', 'filial', 'unidade', 'base'},
@@ -83,49 +91,69 @@ def _normaliza_status_serie(serie: pd.Series) -> pd.Series:
     return out
 
 
+def _ler_arquivo(arq: str) -> pd.DataFrame | None:
+    """Lê e normaliza uma planilha, mantendo só as colunas-alvo."""
+    nome = Path(arq).name
+    try:
+        print(f"→ Lendo: {nome}")
+        df = pd.read_excel(arq, dtype=object)
+        if df.empty:
+            print(f"   ⚠️ Planilha vazia: {nome} (ignorando)")
+            return None
+        df = _mapear(df)
+        df = df.loc[:, ~df.columns.duplicated()]
+        df = df[[c for c in VARIACOES if c in df.columns]].copy()
+        if COL_STATUS_ENTREGA in df.columns:
+            df[COL_STATUS_ENTREGA] = _normaliza_status_serie(df[COL_STATUS_ENTREGA]).to_numpy()
+        for c in [COL_SIGNED, COL_SHOULD]:
+            if c in df.columns:
+                df[c] = pd.to_numeric(df[c], errors='coerce')
+        df[COL_ARQUIVO] = nome
+        return df
+    except Exception as e:
+        print(f"❌ Erro ao ler {arq}: {e}")
+        return None
+
+
 class ReportProcessor:
     def __init__(self, relatorio_path: Path):
         self.relatorio_path = relatorio_path
         print("🚀 Iniciando processamento T-0 consolidado")
         print(f"📂 Pasta: {self.relatorio_path}")
 
-    def _carregar(self) -> tuple[pd.DataFrame | None, list[tuple[str, pd.DataFrame]]]:
-        """Lê todos os arquivos e retorna o DF consolidado e uma lista de DFs por arquivo."""
+    def _carregar(self) -> tuple[pd.DataFrame | None, dict[str, set[str]]]:
+        """Lê todos os arquivos em paralelo e retorna um único DF consolidado.
+
+        Só as colunas usadas no SLA são mantidas; textos ficam em string[pyarrow] e a
+        origem vira a coluna categórica 'Arquivo_Origem'. O dicionário devolvido diz
+        quais colunas cada arquivo trazia (o SLA por arquivo depende disso).
+        """
         arquivos = sorted(glob.glob(str(self.relatorio_path / '*.xls*')))
         if not arquivos:
             print("⚠️ Nenhum arquivo encontrado na pasta!")
-            return None, []
+            return None, {}
         print(f"📄 {len(arquivos)} arquivo(s) encontrado(s). Lendo todos...")
 
-        dfs_consolidados = []
-        dados_por_arquivo = []
-        for arq in arquivos:
-            try:
-                nome = Path(arq).name
-                print(f"→ Lendo: {nome}")
-                df = pd.read_excel(arq, dtype=object)
-                if df.empty:
-                    print(f"   ⚠️ Planilha vazia: {nome} (ignorando)")
-                    continue
-                df = _mapear(df)
-                if COL_STATUS_ENTREGA in df.columns:
-                    df[COL_STATUS_ENTREGA] = _normaliza_status_serie(df[COL_STATUS_ENTREGA])
-                for c in [COL_SIGNED, COL_SHOULD]:
-                    if c in df.columns:
-                        df[c] = pd.to_numeric(df[c], errors='coerce')
-                df['Arquivo_Origem'] = nome
-                dfs_consolidados.append(df)
-                dados_por_arquivo.append((nome, df))
-            except Exception as e:
-                print(f"❌ Erro ao ler {arq}: {e}")
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(arquivos))) as ex:
+            lidos = [df for df in ex.map(_ler_arquivo, arquivos) if df is not None]
 
-        if not dfs_consolidados:
+        if not lidos:
             print("⚠️ Nenhuma planilha pôde ser lida.")
-            return None, []
+            return None, {}
+
+        nomes = [df[COL_ARQUIVO].iat[0] for df in lidos]
+        colunas_por_arquivo = {nome: set(df.columns) - {COL_ARQUIVO} for nome, df in zip(nomes, lidos)}
+
+        df_consolidado = pd.concat(lidos, ignore_index=True)
+        del lidos
+
+        df_consolidado[COL_ARQUIVO] = pd.Categorical(df_consolidado[COL_ARQUIVO], categories=nomes)
+        for c in COLUNAS_TEXTO:
+            if c in df_consolidado.columns:
+                df_consolidado[c] = df_consolidado[c].astype('string[pyarrow]')
 
-        df_consolidado = pd.concat(dfs_consolidados, ignore_index=True)
         print(f"✅ Total combinado: {len(df_consolidado):,} linhas.")
-        return df_consolidado, dados_por_arquivo
+        return df_consolidado, colunas_por_arquivo
 
     def _sla_por_base_contadores(self, df: pd.DataFrame):
         """Calcula SLA por base usando colunas T日 (已签收量 / 应签收量)."""
@@ -201,6 +229,36 @@ class ReportProcessor:
         _, sla_geral = self._sla_por_base_fallback_status(df)
         return sla_geral
 
+    def _sla_geral_por_grupo(self, df: pd.DataFrame, chaves: list[str]) -> pd.Series:
+        """Mesma regra de _calcular_sla_para_df, aplicada a cada grupo de `chaves` num único group-by."""
+        cols = set(df.columns)
+        indice = df.groupby(chaves, dropna=False, observed=True, sort=False).size().index
+
+        if {COL_NOME_BASE, COL_SIGNED, COL_SHOULD} <= cols:
+            soma = df.groupby(chaves, dropna=False, observed=True, sort=False)[[COL_SIGNED, COL_SHOULD]].sum()
+            entregues, deveriam = soma[COL_SIGNED], soma[COL_SHOULD]
+        elif COL_NOME_BASE not in cols or (COL_REMESSA not in cols and COL_STATUS_ENTREGA not in cols):
+            return pd.Series(np.nan, index=indice)
+        else:
+            # Fallback por Status/Remessa: Σ por base de remessas distintas (bases nulas ficam de fora)
+            base = df[df[COL_NOME_BASE].notna()]
+            if COL_REMESSA in cols:
+                base = base[base[COL_REMESSA].notna()]
+
+            def _contar(parte: pd.DataFrame) -> pd.Series:
+                if COL_REMESSA in cols:
+                    parte = parte.drop_duplicates(chaves + [COL_NOME_BASE, COL_REMESSA])
+                return parte.groupby(chaves, dropna=False, observed=True, sort=False).size().reindex(indice, fill_value=0)
+
+            deveriam = _contar(base)
+            if COL_STATUS_ENTREGA in cols:
+                entregues = _contar(base[base[COL_STATUS_ENTREGA] == 'ENTREGUE'])
+            else:
+                entregues = pd.Series(0, index=indice)
+
+        sla = np.where(deveriam > 0, entregues / deveriam.where(deveriam > 0) * 100, np.nan)
+        return pd.Series(sla, index=deveriam.index)
+
     # ✅ ALTERAÇÃO: generaliza Top N (antes era Top 5)
     def _mostrar_topn(self, grp: pd.DataFrame, sla_geral: float, n: int = 10):
         print(
@@ -236,31 +294,46 @@ class ReportProcessor:
             print("\n📌 SLA Geral: n/d")
 
     def run(self):
-        df_consolidado, dados_por_arquivo = self._carregar()
+        df_consolidado, colunas_por_arquivo = self._carregar()
         if df_consolidado is None:
             return
 
         # 1) Calcular e mostrar SLA por dia (arquivo) e por prazo de coleta
         print("\n" + "=" * 50)
         print("📅 --- SLA por Arquivo (Dia) e Prazo de Coleta ---")
-        for nome_arq, df_arq in dados_por_arquivo:
+
+        # Arquivos com o mesmo layout de colunas são calculados juntos, agrupando por arquivo (e prazo)
+        layouts: dict[frozenset, list[str]] = {}
+        for nome_arq, cols in colunas_por_arquivo.items():
+            layouts.setdefault(frozenset(cols), []).append(nome_arq)
+
+        sla_por_arquivo = {}
+        for cols, nomes in layouts.items():
+            chaves = [COL_ARQUIVO] + ([COL_PRAZO_COLETA] if COL_PRAZO_COLETA in cols else [])
+            parte = df_consolidado.loc[df_consolidado[COL_ARQUIVO].isin(nomes), [COL_ARQUIVO, *sorted(cols)]]
+            sla = self._sla_geral_por_grupo(parte, chaves)
+            for nome_arq in nomes:
+                if len(chaves) > 1:
+                    sla_por_arquivo[nome_arq] = sla.xs(nome_arq, level=0)
+                else:
+                    sla_por_arquivo[nome_arq] = sla.get(nome_arq)
+
+        for nome_arq, cols in colunas_por_arquivo.items():
             print(f"\n📊 Arquivo: {nome_arq}")
+            sla_arq = sla_por_arquivo[nome_arq]
 
             # Verifica se a coluna de prazo de coleta existe no arquivo
-            if COL_PRAZO_COLETA not in df_arq.columns:
+            if COL_PRAZO_COLETA not in cols:
                 print("   ⚠️ Coluna de prazo de coleta não encontrada. Calculando SLA geral do arquivo.")
-                sla_geral_arq = self._calcular_sla_para_df(df_arq)
-                if sla_geral_arq is not None and pd.notna(sla_geral_arq):
-                    print(f"   - SLA Geral: {sla_geral_arq:.2f}%")
+                if sla_arq is not None and pd.notna(sla_arq):
+                    print(f"   - SLA Geral: {sla_arq:.2f}%")
                 else:
                     print("   - SLA Geral: n/d (dados insuficientes)")
                 continue  # Pula para o próximo arquivo
 
-            # Agrupa pelo horário de prazo de coleta e calcula o SLA para cada grupo
+            # SLA de cada horário de prazo de coleta
             try:
-                for prazo, grupo_df in df_arq.groupby(COL_PRAZO_COLETA, dropna=False):
-                    sla_prazo = self._calcular_sla_para_df(grupo_df)
-
+                for prazo, sla_prazo in sla_arq.sort_index().items():
                     prazo_str = str(prazo)
                     if pd.isna(prazo):
                         prazo_str = 'Prazo Não Definido'
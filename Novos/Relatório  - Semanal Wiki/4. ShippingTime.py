@@ -5,6 +5,7 @@ import pandas as pd
 import os
 import glob
 import re
+import hashlib
 from datetime import datetime
 from tqdm import tqdm
 import warnings
@@ -16,6 +17,9 @@ BASE_DIR = r"C:\Users\mathe_70oz1qs\OneDrive\Desktop\Testes\Semanal\1. Shipping
 OUTPUT_DIR = os.path.join(BASE_DIR, "Output")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Histórico: uma partição (pasta) por semana com os tempos agregados por PDD e dia
+HISTORICO_DIR = os.path.join(OUTPUT_DIR, "Historico_Semanal")
+
 UFS_PERMITIDAS = ["PA", "MT", "GO", "AM", "MS", "RO", "TO", "DF", "RR", "AC", "AP"]
 LIMITE_EXCEL = 1_048_000
 
@@ -31,6 +35,17 @@ COL_ETAPA_6 = "Tempo trânsito SC Destino->Base Entrega"
 COL_ETAPA_7 = "Tempo médio processamento Base Entrega"
 COL_ETAPA_8 = "Tempo médio Saída para Entrega->Entrega"
 COL_TEMPO_TOTAL = "Tempo Total (h)"
+COL_SEMANA = "Semana"
+COL_CHAVE_SEMANA = "Chave Semana"
+COL_QTD = "Qtd"
+
+# Etapa -> coluna de origem; no histórico cada etapa vira "<etapa> soma"
+ETAPAS = {
+    "Etapa 6": COL_ETAPA_6,
+    "Etapa 7": COL_ETAPA_7,
+    "Etapa 8": COL_ETAPA_8,
+    "Tempo Total": COL_TEMPO_TOTAL,
+}
 
 
 def _arquivos_excel_na_pasta(pasta: str):
@@ -106,6 +121,15 @@ def _extrair_data_do_nome(nome_pasta: str):
     return None
 
 
+def _chave_temporal(pasta: str, arquivos: list[str]):
+    chave_nome = _extrair_data_do_nome(os.path.basename(pasta))
+    if chave_nome is not None:
+        return chave_nome, "nome_da_pasta"
+
+    ultimo_mtime = max(os.path.getmtime(a) for a in arquivos)
+    return datetime.fromtimestamp(ultimo_mtime), "mtime_do_excel"
+
+
 def encontrar_duas_ultimas_pastas(path: str):
     """
     Versão robusta:
@@ -126,15 +150,7 @@ def encontrar_duas_ultimas_pastas(path: str):
         if not arquivos:
             continue
 
-        chave_nome = _extrair_data_do_nome(p)
-        if chave_nome is not None:
-            chave = chave_nome
-            fonte = "nome_da_pasta"
-        else:
-            ultimo_mtime = max(os.path.getmtime(a) for a in arquivos)
-            chave = datetime.fromtimestamp(ultimo_mtime)
-            fonte = "mtime_do_excel"
-
+        chave, fonte = _chave_temporal(full, arquivos)
         candidatos.append((chave, full, p, fonte))
 
     candidatos.sort(key=lambda x: x[0], reverse=True)
@@ -148,6 +164,8 @@ def encontrar_duas_ultimas_pastas(path: str):
         print(f"  - {nome} | chave={chave.strftime('%Y-%m-%d %H:%M:%S')} | fonte={fonte}")
 
     return [c[1] for c in candidatos[:2]]
+
+
 def ler_todos_excel(pasta):
     arquivos = _arquivos_excel_na_pasta(pasta)
 
@@ -198,7 +216,7 @@ def limpar_coluna_num(df, col):
     )
 
 
-def calcular_tempo_medio(df):
+def limpar_tempos(df):
     for col in [COL_ETAPA_6, COL_ETAPA_7, COL_ETAPA_8]:
         if col not in df.columns:
             df = df.with_columns(pl.lit(0).alias(col))
@@ -209,30 +227,129 @@ def calcular_tempo_medio(df):
         limpar_coluna_num(df, COL_ETAPA_8).alias(COL_ETAPA_8),
     ])
 
-    df = df.with_columns([
+    return df.with_columns([
         (pl.col(COL_ETAPA_6) + pl.col(COL_ETAPA_7) + pl.col(COL_ETAPA_8)).alias(COL_TEMPO_TOTAL)
     ])
 
-    agrupado = (
-        df.group_by(COL_PDD_ENTREGA)
-        .agg([
-            pl.mean(COL_ETAPA_6).alias("Etapa 6 (h)"),
-            pl.mean(COL_ETAPA_7).alias("Etapa 7 (h)"),
-            pl.mean(COL_ETAPA_8).alias("Etapa 8 (h)"),
-            pl.mean(COL_TEMPO_TOTAL).alias("Tempo Total (h)")
-        ])
+
+def agregar_semana(df):
+    """Base limpa -> somas e quantidade por PDD e dia (o que vai para o histórico)."""
+    if COL_DATA in df.columns:
+        data = pl.col(COL_DATA).str.slice(0, 10)
+    else:
+        data = pl.lit(None, dtype=pl.Utf8)
+
+    return (
+        df.with_columns(data.alias(COL_DATA))
+        .group_by([COL_PDD_ENTREGA, COL_DATA])
+        .agg(
+            [pl.len().alias(COL_QTD)]
+            + [pl.col(col).sum().alias(f"{etapa} soma") for etapa, col in ETAPAS.items()]
+        )
         .rename({COL_PDD_ENTREGA: "Base Entrega"})
     )
 
-    total = agrupado.select([
-        pl.lit("TOTAL GERAL").alias("Base Entrega"),
-        pl.col("Etapa 6 (h)").mean(),
-        pl.col("Etapa 7 (h)").mean(),
-        pl.col("Etapa 8 (h)").mean(),
-        pl.col("Tempo Total (h)").mean()
+
+def _medias():
+    """Média de cada etapa a partir das somas agregadas (igual à média das linhas originais)."""
+    return [
+        (pl.col(f"{etapa} soma").sum() / pl.col(COL_QTD).sum()).alias(f"{etapa} (h)")
+        for etapa in ETAPAS
+    ]
+
+
+# =================== HISTÓRICO SEMANAL (PARQUET) ===================
+def _assinatura_semana(arquivos):
+    partes = [",".join(UFS_PERMITIDAS)]
+    for arq in sorted(arquivos):
+        st = os.stat(arq)
+        partes.append(f"{os.path.basename(arq)}|{st.st_size}|{st.st_mtime_ns}")
+    return hashlib.md5("\n".join(partes).encode("utf-8")).hexdigest()
+
+
+def _parquet_da_semana(pasta):
+    arquivos = _arquivos_excel_na_pasta(pasta)
+    if not arquivos:
+        return None, arquivos
+    destino = os.path.join(HISTORICO_DIR, os.path.basename(pasta), f"{_assinatura_semana(arquivos)}.parquet")
+    return destino, arquivos
+
+
+def semana_no_historico(pasta) -> bool:
+    destino, _ = _parquet_da_semana(pasta)
+    return destino is not None and os.path.exists(destino)
+
+
+def salvar_semana_historico(pasta, df_limpo):
+    """Grava a partição da semana, substituindo versões antigas (arquivos Excel alterados)."""
+    destino, arquivos = _parquet_da_semana(pasta)
+    if destino is None:
+        return
+
+    chave, _ = _chave_temporal(pasta, arquivos)
+    agregado = agregar_semana(df_limpo).with_columns([
+        pl.lit(os.path.basename(pasta)).alias(COL_SEMANA),
+        pl.lit(chave).alias(COL_CHAVE_SEMANA),
     ])
 
-    return pl.concat([agrupado, total], how="vertical"), df
+    particao = os.path.dirname(destino)
+    os.makedirs(particao, exist_ok=True)
+    for antigo in glob.glob(os.path.join(particao, "*.parquet")):
+        if antigo != destino:
+            os.remove(antigo)
+
+    agregado.write_parquet(destino)
+    print(f"🗂️ Semana {os.path.basename(pasta)} gravada no histórico ({agregado.height:,} linhas agregadas)")
+
+
+def garantir_semana_no_historico(pasta) -> bool:
+    """Só lê os Excel da semana se ela ainda não estiver no histórico (ou se os arquivos mudaram)."""
+    if semana_no_historico(pasta):
+        print(f"♻️ Semana {os.path.basename(pasta)} já está no histórico (Excel não relido)")
+        return True
+
+    df = ler_todos_excel(pasta)
+    if df is None:
+        return False
+
+    salvar_semana_historico(pasta, limpar_tempos(filtrar_por_uf(df)))
+    return True
+
+
+def carregar_historico():
+    arquivos = glob.glob(os.path.join(HISTORICO_DIR, "*", "*.parquet"))
+    if not arquivos:
+        return None
+    return pl.concat([pl.scan_parquet(a) for a in arquivos], how="diagonal_relaxed").collect()
+
+
+def semana_do_historico(hist, pasta):
+    return hist.filter(pl.col(COL_SEMANA) == os.path.basename(pasta))
+
+
+def calcular_tempo_medio(agregado):
+    agrupado = (
+        agregado.group_by("Base Entrega")
+        .agg(_medias())
+    )
+
+    total = agrupado.select(
+        [pl.lit("TOTAL GERAL").alias("Base Entrega")]
+        + [pl.col(f"{etapa} (h)").mean() for etapa in ETAPAS]
+    )
+
+    return pl.concat([agrupado, total], how="vertical")
+
+
+def calcular_tendencia_semanal(hist):
+    """TOTAL GERAL (média das bases) de cada semana do histórico, em ordem cronológica."""
+    return (
+        hist.group_by([COL_SEMANA, COL_CHAVE_SEMANA, "Base Entrega"])
+        .agg(_medias())
+        .group_by([COL_SEMANA, COL_CHAVE_SEMANA])
+        .agg([pl.col(f"{etapa} (h)").mean() for etapa in ETAPAS] + [pl.len().alias("Bases")])
+        .sort(COL_CHAVE_SEMANA)
+    )
 
 
 def gerar_comparativo(ant, atual):
@@ -248,44 +365,25 @@ def gerar_comparativo(ant, atual):
     return comp
 
 
-def calcular_media_por_dia(df):
-    if COL_DATA not in df.columns:
+def calcular_media_por_dia(agregado):
+    if agregado[COL_DATA].null_count() == agregado.height:
         return None
 
-    df = df.with_columns(pl.col(COL_DATA).str.slice(0, 10).alias(COL_DATA))
-
     return (
-        df.group_by(COL_DATA)
-        .agg([
-            pl.mean(COL_ETAPA_6).alias("Etapa 6 (h)"),
-            pl.mean(COL_ETAPA_7).alias("Etapa 7 (h)"),
-            pl.mean(COL_ETAPA_8).alias("Etapa 8 (h)"),
-            pl.mean(COL_TEMPO_TOTAL).alias("Tempo Total (h)")
-        ])
+        agregado.group_by(COL_DATA)
+        .agg(_medias())
         .sort(COL_DATA)
     )
 
 
-def separar_por_data(df):
-    if COL_DATA not in df.columns:
+def separar_por_data(agregado):
+    if agregado[COL_DATA].null_count() == agregado.height:
         return {}
 
-    df = df.with_columns(pl.col(COL_DATA).str.slice(0, 10).alias(COL_DATA))
-    datas = df.select(COL_DATA).unique().to_series().to_list()
-
     out = {}
-    for d in datas:
-        sub = df.filter(pl.col(COL_DATA) == d)
-        out[d] = (
-            sub.group_by(COL_PDD_ENTREGA)
-            .agg([
-                pl.mean(COL_ETAPA_6).alias("Etapa 6 (h)"),
-                pl.mean(COL_ETAPA_7).alias("Etapa 7 (h)"),
-                pl.mean(COL_ETAPA_8).alias("Etapa 8 (h)"),
-                pl.mean(COL_TEMPO_TOTAL).alias("Tempo Total (h)")
-            ])
-            .rename({COL_PDD_ENTREGA: "Base Entrega"})
-        )
+    com_data = agregado.filter(pl.col(COL_DATA).is_not_null()).sort(COL_DATA)
+    for (d,), sub in com_data.group_by([COL_DATA], maintain_order=True):
+        out[d] = sub.group_by("Base Entrega").agg(_medias())
 
     return out
 
@@ -453,23 +551,28 @@ def main():
         print(f"  - Semana ATUAL:    {os.path.basename(sem_atual_pasta)}")
         print(f"  - Semana ANTERIOR: {os.path.basename(sem_ant_pasta)}")
 
+    # Semana atual: sempre lida (a base consolidada vai para o Excel) e regravada no histórico.
+    # Semana anterior: vem do histórico; os Excel só são lidos se ela ainda não estiver lá.
     df_atual = ler_todos_excel(sem_atual_pasta)
-    df_ant = ler_todos_excel(sem_ant_pasta)
-
-    if df_atual is None or df_ant is None:
+    if df_atual is None or not garantir_semana_no_historico(sem_ant_pasta):
         print("❌ Falha ao ler semanas.")
         return
 
-    df_atual = filtrar_por_uf(df_atual)
-    df_ant = filtrar_por_uf(df_ant)
+    df_atual_limpo = limpar_tempos(filtrar_por_uf(df_atual))
+    salvar_semana_historico(sem_atual_pasta, df_atual_limpo)
+
+    hist = carregar_historico()
+    agg_atual = semana_do_historico(hist, sem_atual_pasta)
+    agg_ant = semana_do_historico(hist, sem_ant_pasta)
 
-    sem_at, df_atual_limpo = calcular_tempo_medio(df_atual)
-    sem_ant, _ = calcular_tempo_medio(df_ant)
+    sem_at = calcular_tempo_medio(agg_atual)
+    sem_ant = calcular_tempo_medio(agg_ant)
 
     comp = gerar_comparativo(sem_ant, sem_at)
 
-    media_dia = calcular_media_por_dia(df_atual_limpo)
-    por_data = separar_por_data(df_atual_limpo)
+    media_dia = calcular_media_por_dia(agg_atual)
+    por_data = separar_por_data(agg_atual)
+    tendencia = calcular_tendencia_semanal(hist)
 
     # =================== NOVO: TOP 10 PIORAS (Δ>0) para exportar no Excel ===================
     top10_e7 = top_n_pioras_por_etapa(comp, "Etapa 7", n=10)
@@ -488,6 +591,8 @@ def main():
         if media_dia is not None:
             media_dia.to_pandas().to_excel(writer, "Média por Dia", index=False)
 
+        tendencia.to_pandas().to_excel(writer, "Histórico Semanal", index=False)
+
         for d, df_dia in por_data.items():
             aba = str(d).replace("/", "-")[:31]
             df_dia.to_pandas().to_excel(writer, aba, index=False)
@@ -3,11 +3,13 @@ from __future__ import annotations
 import json
 import os
 import sqlite3
+import zlib
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 from urllib.parse import urlencode
 
+import numpy as np
 import pandas as pd
 import requests
 import streamlit as st
@@ -33,6 +35,10 @@ st.set_page_config(
 )
 
 DB_PATH = Path("rotas.db")
+
+# Simplificação da rota (Douglas–Peucker) antes de renderizar o mapa
+ROUTE_PIXEL_TOLERANCE = 1.0  # desvio máximo aceito, em pixels de tela
+ROUTE_ZOOM_MARGIN = 2  # níveis de zoom acima do inicial que continuam nítidos
 STOP_COLUMNS = [
     "sequencia",
     "pedido",
@@ -88,6 +94,18 @@ def init_db() -> None:
         """
     )
 
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rotas_geometria (
+            id_rota INTEGER PRIMARY KEY,
+            n_pontos INTEGER NOT NULL,
+            pontos BLOB NOT NULL,
+            atualizado_em TEXT,
+            FOREIGN KEY (id_rota) REFERENCES rotas(id_rota)
+        )
+        """
+    )
+
     conn.commit()
     conn.close()
 
@@ -250,6 +268,7 @@ def delete_route(route_id: int) -> None:
     conn = get_conn()
     cur = conn.cursor()
     cur.execute("DELETE FROM paradas WHERE id_rota = ?", (route_id,))
+    cur.execute("DELETE FROM rotas_geometria WHERE id_rota = ?", (route_id,))
     cur.execute("DELETE FROM rotas WHERE id_rota = ?", (route_id,))
     conn.commit()
     conn.close()
@@ -447,44 +466,140 @@ def parse_duration_seconds(duration_str: str) -> int:
     return int(float(duration_str.replace("s", "").strip()))
 
 
+def decode_polyline_array(encoded: str) -> np.ndarray:
+    """Decodifica um polyline do Google em um array (n, 2) de lat/lng, sem loop por caractere."""
+    if not encoded:
+        return np.empty((0, 2), dtype=np.float64)
+
+    chunks = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+
+    # Cada valor termina no primeiro bloco de 5 bits sem o bit de continuação (0x20)
+    is_last = chunks < 0x20
+    ends = np.flatnonzero(is_last)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+
+    value_id = np.repeat(np.arange(len(starts)), ends - starts + 1)
+    pos_in_value = np.arange(len(chunks)) - starts[value_id]
+    shifted = (chunks & 0x1F) << (5 * pos_in_value)
+    values = np.add.reduceat(shifted, starts)
+
+    deltas = np.where(values & 1, ~(values >> 1), values >> 1)
+    deltas = deltas[: len(deltas) // 2 * 2].reshape(-1, 2)
+
+    return np.cumsum(deltas, axis=0) / 1e5
+
+
 def decode_polyline(encoded: str) -> list[list[float]]:
-    points: list[list[float]] = []
-    index = 0
-    lat = 0
-    lng = 0
+    return decode_polyline_array(encoded).tolist()
+
+
+def encode_polyline(points: np.ndarray | list[list[float]]) -> str:
+    """Codifica pontos lat/lng no formato polyline do Google (precisão 1e-5)."""
+    coords = np.round(np.asarray(points, dtype=np.float64).reshape(-1, 2) * 1e5).astype(np.int64)
+    if coords.size == 0:
+        return ""
+
+    deltas = np.diff(coords, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    # Até 7 blocos de 5 bits cobrem qualquer coordenada válida (|valor| < 2^34)
+    shifts = 5 * np.arange(7)
+    blocks = (values[:, None] >> shifts) & 0x1F
+    n_blocks = 1 + (values[:, None] >= (32 ** np.arange(1, 7))).sum(axis=1)
+    valid = np.arange(7) < n_blocks[:, None]
+    has_next = np.arange(7) < (n_blocks[:, None] - 1)
+
+    chars = (blocks | np.where(has_next, 0x20, 0)) + 63
+    return chars[valid].astype(np.uint8).tobytes().decode("ascii")
+
+
+def simplify_douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas–Peucker iterativo; a distância de cada segmento é calculada em bloco com numpy."""
+    pts = np.asarray(points, dtype=np.float64)
+    n = len(pts)
+    if n <= 2 or tolerance <= 0:
+        return pts
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
 
-    while index < len(encoded):
-        shift = 0
-        result = 0
+        a = pts[first]
+        seg = pts[last] - a
+        inner = pts[first + 1:last] - a
+        seg_len = float(np.hypot(seg[0], seg[1]))
+
+        if seg_len == 0.0:
+            dist = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            dist = np.abs(seg[0] * inner[:, 1] - seg[1] * inner[:, 0]) / seg_len
+
+        idx = int(np.argmax(dist))
+        if dist[idx] > tolerance:
+            split = first + 1 + idx
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    return pts[keep]
+
+
+def zoom_tolerance_degrees(zoom: int, latitude: float, pixel_tolerance: float = ROUTE_PIXEL_TOLERANCE) -> float:
+    """Converte uma tolerância em pixels no zoom informado para graus (Web Mercator)."""
+    meters_per_pixel = 156543.03392 * np.cos(np.radians(latitude)) / (2 ** zoom)
+    return float(pixel_tolerance * meters_per_pixel / 111_320)
 
-        while True:
-            b = ord(encoded[index]) - 63
-            index += 1
-            result |= (b & 0x1F) << shift
-            shift += 5
-            if b < 0x20:
-                break
 
-        dlat = ~(result >> 1) if (result & 1) else (result >> 1)
-        lat += dlat
+def simplify_route_for_zoom(route_points: np.ndarray | list[list[float]], zoom: int) -> np.ndarray:
+    pts = np.asarray(route_points, dtype=np.float64).reshape(-1, 2)
+    if len(pts) <= 2:
+        return pts
 
-        shift = 0
-        result = 0
+    detail_zoom = min(19, zoom + ROUTE_ZOOM_MARGIN)
+    tolerance = zoom_tolerance_degrees(detail_zoom, float(pts[:, 0].mean()))
+    return simplify_douglas_peucker(pts, tolerance)
+
+
+def save_route_geometry(route_id: int, route_points: np.ndarray) -> None:
+    """Grava a geometria como deltas int32 (1e-5 grau) comprimidos com zlib."""
+    coords = np.round(np.asarray(route_points, dtype=np.float64).reshape(-1, 2) * 1e5).astype(np.int64)
+    deltas = np.diff(coords, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).astype("<i4")
+    blob = zlib.compress(deltas.tobytes(), level=6)
+
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO rotas_geometria (id_rota, n_pontos, pontos, atualizado_em)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(id_rota) DO UPDATE SET
+            n_pontos = excluded.n_pontos,
+            pontos = excluded.pontos,
+            atualizado_em = excluded.atualizado_em
+        """,
+        (route_id, int(len(coords)), sqlite3.Binary(blob), now_str()),
+    )
+    conn.commit()
+    conn.close()
 
-        while True:
-            b = ord(encoded[index]) - 63
-            index += 1
-            result |= (b & 0x1F) << shift
-            shift += 5
-            if b < 0x20:
-                break
 
-        dlng = ~(result >> 1) if (result & 1) else (result >> 1)
-        lng += dlng
+def load_route_geometry(route_id: int) -> np.ndarray | None:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT n_pontos, pontos FROM rotas_geometria WHERE id_rota = ?", (route_id,))
+    row = cur.fetchone()
+    conn.close()
 
-        points.append([lat / 1e5, lng / 1e5])
+    if not row:
+        return None
 
-    return points
+    deltas = np.frombuffer(zlib.decompress(row["pontos"]), dtype="<i4").reshape(-1, 2)
+    return np.cumsum(deltas.astype(np.int64), axis=0) / 1e5
 
 
 def compute_optimized_route(
@@ -549,7 +664,7 @@ def compute_optimized_route(
     route = data["routes"][0]
     optimized_indices = route.get("optimizedIntermediateWaypointIndex", [])
     encoded_polyline = route.get("polyline", {}).get("encodedPolyline", "")
-    route_points = decode_polyline(encoded_polyline) if encoded_polyline else []
+    route_points = decode_polyline_array(encoded_polyline)
 
     distance_km = round(route["distanceMeters"] / 1000, 2)
     duration_seconds = parse_duration_seconds(route.get("duration", "0s"))
@@ -580,7 +695,7 @@ def generate_google_maps_link(origem: str, destino: str, paradas: list[str]) ->
 
 
 def build_map_html(
-    route_points: list[list[float]],
+    route_points: np.ndarray | list[list[float]],
     origem: str,
     destino: str,
     stop_labels: list[str],
@@ -588,10 +703,12 @@ def build_map_html(
     speed_ms: int,
     zoom_start: int,
 ) -> str:
-    if not route_points:
+    if len(route_points) == 0:
         return "<p>Sem rota para exibir.</p>"
 
-    route_json = json.dumps(route_points, ensure_ascii=False)
+    # Só envia ao navegador os pontos visíveis no zoom escolhido, com a precisão do polyline
+    simplified = np.round(simplify_route_for_zoom(route_points, zoom_start), 5)
+    route_json = json.dumps(simplified.tolist(), ensure_ascii=False, separators=(",", ":"))
     labels_json = json.dumps(stop_labels, ensure_ascii=False)
     addresses_json = json.dumps(stop_addresses, ensure_ascii=False)
     origem_json = json.dumps(origem, ensure_ascii=False)
@@ -1081,6 +1198,8 @@ with tab3:
                             routing_preference=routing_preference,
                         )
 
+                        save_route_geometry(selected_map_id, result["route_points"])
+
                         optimized_stops_df = reorder_stops_df(stops_df, result["optimized_indices"])
                         optimized_addresses = stops_to_addresses(optimized_stops_df)
                         optimized_labels = build_labels(optimized_stops_df)
@@ -1100,7 +1219,7 @@ with tab3:
                         st.session_state["selected_route_id"] = selected_map_id
                         st.session_state["map_result"] = {
                             "route_id": selected_map_id,
-                            "result": result,
+                            "result": {k: v for k, v in result.items() if k != "route_points"},
                             "optimized_stops_df": optimized_stops_df.to_dict(orient="records"),
                             "optimized_addresses": optimized_addresses,
                             "optimized_labels": optimized_labels,
@@ -1155,8 +1274,12 @@ with tab3:
                     st.dataframe(view_df, use_container_width=True, hide_index=True)
 
                     st.markdown("**Mapa interativo**")
+                    route_points = load_route_geometry(selected_map_id)
+                    if route_points is None:
+                        route_points = decode_polyline_array(result["encoded_polyline"])
+
                     html = build_map_html(
-                        route_points=result["route_points"],
+                        route_points=route_points,
                         origem=map_result["origem"],
                         destino=map_result["destino"],
                         stop_labels=optimized_labels,
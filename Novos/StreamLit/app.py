@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import sqlite3
 from pathlib import Path
 import pandas as pd
 import streamlit as st
@@ -17,6 +18,9 @@ PASTA_DADOS = Path(
     r"C:\Users\mathe_70oz1qs\OneDrive - Speed Rabbit Express Ltda\Área de Trabalho\Testes\03 - SLA - Entrega Realizada LM"
 )
 
+# Estado deduplicado por remessa, atualizado só com os arquivos novos/alterados/removidos
+ESTADO_DB = Path("estado_remessas.db")
+
 COL_REMESSA = "Remessa"
 COL_BASE = "Base de entrega"
 COL_PREVISTA = "Data prevista de entrega"
@@ -149,50 +153,21 @@ def validar_colunas(df: pd.DataFrame) -> None:
         raise ValueError(f"Colunas ausentes: {faltando}")
 
 
-@st.cache_data(show_spinner="Carregando base...")
-def carregar_base() -> tuple[pd.DataFrame, list[str]]:
-    arquivos = listar_arquivos(PASTA_DADOS)
-
-    if not arquivos:
-        return pd.DataFrame(), []
-
-    frames = []
-
-    for arquivo in arquivos:
-        try:
-            df = ler_arquivo(arquivo)
-            if df.empty:
-                continue
-
-            validar_colunas(df)
-            df["__arquivo__"] = arquivo.name
-            frames.append(df)
-        except Exception:
-            continue
-
-    if not frames:
-        return pd.DataFrame(), []
-
-    bruto = pd.concat(frames, ignore_index=True, sort=False).copy()
-
+def preparar_arquivo(bruto: pd.DataFrame, nome_arquivo: str) -> pd.DataFrame:
+    """Padroniza um arquivo e deixa uma linha por remessa (a de entrega mais recente)."""
     df = pd.DataFrame()
     df["remessa"] = bruto[COL_REMESSA].astype(str).str.strip()
     df["base"] = bruto[COL_BASE].astype(str).str.strip()
     df["entregador"] = bruto[COL_ENTREGADOR].astype(str).str.strip()
     df["cidade"] = bruto[COL_CIDADE].astype(str).str.strip()
-    df["arquivo"] = bruto["__arquivo__"].astype(str)
+    df["arquivo"] = nome_arquivo
 
-    df["data_prevista"] = pd.to_datetime(
-        bruto[COL_PREVISTA],
-        errors="coerce",
-        dayfirst=True,
-    ).dt.date
+    data_prevista = pd.to_datetime(bruto[COL_PREVISTA], errors="coerce", dayfirst=True).dt.normalize()
+    data_entrega = pd.to_datetime(bruto[COL_ENTREGA], errors="coerce", dayfirst=True).dt.normalize()
 
-    df["data_entrega"] = pd.to_datetime(
-        bruto[COL_ENTREGA],
-        errors="coerce",
-        dayfirst=True,
-    ).dt.date
+    # Datas em ISO (texto) no banco: comparação de texto == comparação de data
+    df["data_prevista"] = data_prevista.dt.strftime("%Y-%m-%d")
+    df["data_entrega"] = data_entrega.dt.strftime("%Y-%m-%d")
 
     # Higienização
     df["remessa"] = df["remessa"].replace({"": pd.NA, "nan": pd.NA})
@@ -200,31 +175,196 @@ def carregar_base() -> tuple[pd.DataFrame, list[str]]:
     df["entregador"] = df["entregador"].replace({"": "SEM MOTORISTA", "nan": "SEM MOTORISTA"})
     df["cidade"] = df["cidade"].replace({"": "SEM CIDADE", "nan": "SEM CIDADE"})
 
-    # Remove linhas sem remessa
-    df = df.dropna(subset=["remessa"]).copy()
+    # Indicadores (gravados no estado, não recalculados na abertura do app)
+    df["entregue"] = data_entrega.notna().astype(int)
+    df["no_prazo"] = (
+        data_entrega.notna()
+        & data_prevista.notna()
+        & (data_entrega <= data_prevista)
+    ).astype(int)
+    df["ano_previsto"] = data_prevista.dt.year.astype("Int64")
+    df["mes_previsto"] = data_prevista.dt.month.astype("Int64")
+
+    df = df.dropna(subset=["remessa"])
 
-    # Se existir remessa repetida, mantém a linha mais recente
-    df["ordem_dt"] = pd.to_datetime(df["data_entrega"], errors="coerce")
-    df = (
-        df.sort_values(["remessa", "ordem_dt"], ascending=[True, True])
+    # Dentro do arquivo, mantém a linha com a entrega mais recente
+    return (
+        df.sort_values(["remessa", "data_entrega"], na_position="first", kind="stable")
           .drop_duplicates(subset=["remessa"], keep="last")
-          .drop(columns=["ordem_dt"])
-          .reset_index(drop=True)
     )
 
-    # Indicadores
-    df["entregue"] = df["data_entrega"].notna().astype(int)
 
-    df["no_prazo"] = (
-        df["data_entrega"].notna()
-        & df["data_prevista"].notna()
-        & (df["data_entrega"] <= df["data_prevista"])
-    ).astype(int)
+# ============================================================
+# ESTADO POR REMESSA (SQLite)
+# ============================================================
+COLUNAS_ESTADO = [
+    "remessa", "base", "entregador", "cidade", "arquivo",
+    "data_prevista", "data_entrega", "entregue", "no_prazo",
+    "ano_previsto", "mes_previsto",
+]
+
+
+def abrir_estado() -> sqlite3.Connection:
+    conn = sqlite3.connect(ESTADO_DB)
+    # Linhas de cada arquivo (uma por remessa dentro do arquivo) — permite tirar/refazer um arquivo
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS linhas_arquivo (
+            remessa TEXT NOT NULL,
+            base TEXT,
+            entregador TEXT,
+            cidade TEXT,
+            arquivo TEXT NOT NULL,
+            data_prevista TEXT,
+            data_entrega TEXT,
+            entregue INTEGER NOT NULL,
+            no_prazo INTEGER NOT NULL,
+            ano_previsto INTEGER,
+            mes_previsto INTEGER,
+            PRIMARY KEY (arquivo, remessa)
+        )
+        """
+    )
+    # Estado consolidado (uma linha por remessa), reconstruído a partir de linhas_arquivo
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS remessas (
+            remessa TEXT PRIMARY KEY,
+            base TEXT,
+            entregador TEXT,
+            cidade TEXT,
+            arquivo TEXT,
+            data_prevista TEXT,
+            data_entrega TEXT,
+            entregue INTEGER NOT NULL,
+            no_prazo INTEGER NOT NULL,
+            ano_previsto INTEGER,
+            mes_previsto INTEGER
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS arquivos_processados (
+            nome TEXT PRIMARY KEY,
+            tamanho INTEGER NOT NULL,
+            modificado_ns INTEGER NOT NULL
+        )
+        """
+    )
+    # Banco da versão anterior (só a tabela consolidada): sem as linhas por arquivo, relê tudo
+    if conn.execute("SELECT 1 FROM linhas_arquivo LIMIT 1").fetchone() is None:
+        with conn:
+            conn.execute("DELETE FROM arquivos_processados")
+    return conn
+
+
+def gravar_linhas_arquivo(conn: sqlite3.Connection, nome_arquivo: str, df: pd.DataFrame) -> None:
+    """Substitui as linhas do arquivo (remessas que saíram dele deixam de contar)."""
+    conn.execute("DELETE FROM linhas_arquivo WHERE arquivo = ?", (nome_arquivo,))
+    registros = df[COLUNAS_ESTADO].astype(object).where(df[COLUNAS_ESTADO].notna(), None)
+    colunas = ", ".join(COLUNAS_ESTADO)
+    marcadores = ", ".join("?" for _ in COLUNAS_ESTADO)
+    conn.executemany(
+        f"INSERT INTO linhas_arquivo ({colunas}) VALUES ({marcadores})",
+        registros.itertuples(index=False, name=None),
+    )
 
-    df["ano_previsto"] = pd.to_datetime(df["data_prevista"], errors="coerce").dt.year
-    df["mes_previsto"] = pd.to_datetime(df["data_prevista"], errors="coerce").dt.month
 
-    return df, [a.name for a in arquivos]
+def remover_arquivo(conn: sqlite3.Connection, nome_arquivo: str) -> None:
+    conn.execute("DELETE FROM linhas_arquivo WHERE arquivo = ?", (nome_arquivo,))
+    conn.execute("DELETE FROM arquivos_processados WHERE nome = ?", (nome_arquivo,))
+
+
+def reconstruir_remessas(conn: sqlite3.Connection) -> None:
+    """
+    Uma linha por remessa: a de entrega mais recente; sem entrega só ganha se nenhum
+    arquivo tiver entrega; empate -> arquivo modificado por último.
+    """
+    colunas = ", ".join(COLUNAS_ESTADO)
+    conn.execute("DELETE FROM remessas")
+    conn.execute(
+        f"""
+        INSERT INTO remessas ({colunas})
+        SELECT {colunas} FROM (
+            SELECT l.*, ROW_NUMBER() OVER (
+                PARTITION BY l.remessa
+                ORDER BY l.data_entrega IS NULL, l.data_entrega DESC, a.modificado_ns DESC
+            ) AS ordem
+            FROM linhas_arquivo l
+            JOIN arquivos_processados a ON a.nome = l.arquivo
+        )
+        WHERE ordem = 1
+        """
+    )
+
+
+def sincronizar_estado(conn: sqlite3.Connection, arquivos: list[Path]) -> None:
+    """Relê só arquivos novos ou alterados e tira do estado os que saíram da pasta."""
+    conhecidos = {
+        nome: (tamanho, modificado)
+        for nome, tamanho, modificado in conn.execute(
+            "SELECT nome, tamanho, modificado_ns FROM arquivos_processados"
+        )
+    }
+    alterou = False
+
+    presentes = {a.name for a in arquivos}
+    for nome in sorted(set(conhecidos) - presentes):
+        with conn:
+            remover_arquivo(conn, nome)
+        alterou = True
+
+    for arquivo in sorted(arquivos, key=lambda a: a.stat().st_mtime_ns):
+        info = arquivo.stat()
+        if conhecidos.get(arquivo.name) == (info.st_size, info.st_mtime_ns):
+            continue
+
+        try:
+            bruto = ler_arquivo(arquivo)
+            if not bruto.empty:
+                validar_colunas(bruto)
+        except Exception:
+            # Arquivo ilegível (ex.: ainda sendo gravado): mantém o que já havia dele
+            continue
+
+        linhas = preparar_arquivo(bruto, arquivo.name) if not bruto.empty else pd.DataFrame(columns=COLUNAS_ESTADO)
+        with conn:
+            gravar_linhas_arquivo(conn, arquivo.name, linhas)
+            conn.execute(
+                """
+                INSERT INTO arquivos_processados (nome, tamanho, modificado_ns) VALUES (?, ?, ?)
+                ON CONFLICT(nome) DO UPDATE SET tamanho = excluded.tamanho, modificado_ns = excluded.modificado_ns
+                """,
+                (arquivo.name, info.st_size, info.st_mtime_ns),
+            )
+        alterou = True
+
+    if alterou:
+        with conn:
+            reconstruir_remessas(conn)
+
+
+@st.cache_data(show_spinner="Carregando base...")
+def carregar_base(assinatura_pasta: tuple) -> tuple[pd.DataFrame, list[str]]:
+    """`assinatura_pasta` só serve de chave do cache: muda quando entra ou muda um arquivo."""
+    arquivos = listar_arquivos(PASTA_DADOS)
+
+    conn = abrir_estado()
+    try:
+        sincronizar_estado(conn, arquivos)
+        df = pd.read_sql_query(f"SELECT {', '.join(COLUNAS_ESTADO)} FROM remessas", conn)
+        nomes = [r[0] for r in conn.execute("SELECT nome FROM arquivos_processados ORDER BY nome")]
+    finally:
+        conn.close()
+
+    if df.empty:
+        return pd.DataFrame(), nomes
+
+    df["data_prevista"] = pd.to_datetime(df["data_prevista"], errors="coerce").dt.date
+    df["data_entrega"] = pd.to_datetime(df["data_entrega"], errors="coerce").dt.date
+
+    return df, nomes
 
 
 def resumo_geral(df: pd.DataFrame) -> dict:
@@ -291,7 +431,10 @@ if not PASTA_DADOS.exists():
     st.error(f"Pasta não encontrada: {PASTA_DADOS}")
     st.stop()
 
-df, arquivos = carregar_base()
+assinatura_pasta = tuple(
+    sorted((a.name, a.stat().st_size, a.stat().st_mtime_ns) for a in listar_arquivos(PASTA_DADOS))
+)
+df, arquivos = carregar_base(assinatura_pasta)
 
 if df.empty:
     st.error("Nenhum arquivo válido foi carregado.")
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Delta por pacote entre duas execuções do Sem Movimentação.
+
+Um único full join pela Remessa classifica cada pacote:
+
+    NOVO          está hoje e não estava na referência
+    RESOLVIDO     estava na referência e sumiu hoje
+    MUDOU STATUS  está nas duas, com status diferente
+    ENVELHECEU    está nas duas e passou para uma faixa de dias parado maior
+    ESTÁVEL       está nas duas, sem mudança de status nem de faixa
+
+`delta_por_base` resume isso por base (Qtd atual/anterior + contagem de cada
+classe), no formato usado pelo card de Franquias e pelo relatório do LM.
+"""
+import polars as pl
+
+NOVO = "NOVO"
+RESOLVIDO = "RESOLVIDO"
+MUDOU_STATUS = "MUDOU STATUS"
+ENVELHECEU = "ENVELHECEU"
+ESTAVEL = "ESTÁVEL"
+
+# Faixas de dias parado (mesmos degraus da multa): 5, 7-9, 10-13, 14-29, 30+
+FAIXAS_DIAS = (5, 7, 10, 14, 30)
+
+COL_CLASSE = "Delta"
+COL_BASE_ATUAL = "Base_Atual"
+COL_BASE_ANTERIOR = "Base_Anterior"
+
+
+def _faixa(coluna: str, faixas=FAIXAS_DIAS) -> pl.Expr:
+    """Índice da faixa de dias (0 = abaixo da primeira)."""
+    expr = pl.lit(0, dtype=pl.Int32)
+    for limite in faixas:
+        expr = expr + (pl.col(coluna) >= limite).cast(pl.Int32)
+    return expr
+
+
+def _preparar(df: pl.DataFrame, col_id: str, col_base: str, col_dias, col_status, sufixo: str) -> pl.DataFrame:
+    colunas = {col_id: col_id, col_base: f"base{sufixo}"}
+    if col_dias and col_dias in df.columns:
+        colunas[col_dias] = f"dias{sufixo}"
+    if col_status and col_status in df.columns:
+        colunas[col_status] = f"status{sufixo}"
+
+    return (
+        df.select(list(colunas))
+        .rename(colunas)
+        .with_columns(pl.col(col_id).cast(pl.Utf8), pl.lit(True).alias(f"presente{sufixo}"))
+        .filter(pl.col(col_id).is_not_null())
+        .unique(subset=[col_id], keep="first")
+    )
+
+
+def classificar_pacotes(atual: pl.DataFrame, anterior: pl.DataFrame | None, col_id: str, col_base: str,
+                        col_dias: str | None = None, col_status: str | None = None,
+                        faixas=FAIXAS_DIAS) -> pl.DataFrame:
+    """
+    Retorna uma linha por pacote (união de hoje e da referência) com:
+    id, Base_Atual, Base_Anterior, dias/status de cada lado (quando informados) e a coluna Delta.
+    """
+    a = _preparar(atual, col_id, col_base, col_dias, col_status, "")
+    if anterior is None or anterior.is_empty() or col_id not in anterior.columns or col_base not in anterior.columns:
+        b = pl.DataFrame(schema={col_id: pl.Utf8, "base_ant": a.schema["base"], "presente_ant": pl.Boolean})
+    else:
+        b = _preparar(anterior, col_id, col_base, col_dias, col_status, "_ant")
+
+    df = a.join(b, on=col_id, how="full", coalesce=True)
+    for col, dtype in (("dias", pl.Int64), ("dias_ant", pl.Int64), ("status", pl.Utf8), ("status_ant", pl.Utf8)):
+        if col not in df.columns:
+            df = df.with_columns(pl.lit(None, dtype=dtype).alias(col))
+
+    presente = pl.col("presente").fill_null(False)
+    presente_ant = pl.col("presente_ant").fill_null(False)
+    mudou_status = (
+        pl.col("status").is_not_null() & pl.col("status_ant").is_not_null()
+        & (pl.col("status") != pl.col("status_ant"))
+    )
+    envelheceu = (
+        pl.col("dias").is_not_null() & pl.col("dias_ant").is_not_null()
+        & (_faixa("dias", faixas) > _faixa("dias_ant", faixas))
+    )
+
+    return df.select(
+        pl.col(col_id),
+        pl.col("base").alias(COL_BASE_ATUAL),
+        pl.col("base_ant").alias(COL_BASE_ANTERIOR),
+        pl.col("dias"), pl.col("dias_ant"),
+        pl.col("status"), pl.col("status_ant"),
+        pl.when(~presente_ant).then(pl.lit(NOVO))
+        .when(~presente).then(pl.lit(RESOLVIDO))
+        .when(mudou_status).then(pl.lit(MUDOU_STATUS))
+        .when(envelheceu).then(pl.lit(ENVELHECEU))
+        .otherwise(pl.lit(ESTAVEL))
+        .alias(COL_CLASSE),
+    )
+
+
+def delta_por_base(classificados: pl.DataFrame, col_base: str = "Base") -> pl.DataFrame:
+    """
+    Tabela por base: Qtd_Atual, Qtd_Anterior, Variacao, Novos, Resolvidos, Envelheceram, Mudaram_Status.
+    Atual/Novos/Envelheceram/Mudaram_Status contam pela base de hoje; Anterior/Resolvidos pela base da referência.
+    """
+    classe = pl.col(COL_CLASSE)
+    atuais = (
+        classificados.filter(classe != RESOLVIDO)
+        .group_by(COL_BASE_ATUAL)
+        .agg(
+            pl.len().alias("Qtd_Atual"),
+            (classe == NOVO).sum().alias("Novos"),
+            (classe == ENVELHECEU).sum().alias("Envelheceram"),
+            (classe == MUDOU_STATUS).sum().alias("Mudaram_Status"),
+        )
+        .rename({COL_BASE_ATUAL: col_base})
+    )
+    anteriores = (
+        classificados.filter(classe != NOVO)
+        .group_by(COL_BASE_ANTERIOR)
+        .agg(
+            pl.len().alias("Qtd_Anterior"),
+            (classe == RESOLVIDO).sum().alias("Resolvidos"),
+        )
+        .rename({COL_BASE_ANTERIOR: col_base})
+    )
+
+    contagens = ["Qtd_Atual", "Qtd_Anterior", "Novos", "Resolvidos", "Envelheceram", "Mudaram_Status"]
+    return (
+        atuais.join(anteriores, on=col_base, how="full", coalesce=True)
+        .filter(pl.col(col_base).is_not_null())
+        .with_columns([pl.col(c).fill_null(0).cast(pl.Int64) for c in contagens])
+        .with_columns((pl.col("Qtd_Atual") - pl.col("Qtd_Anterior")).alias("Variacao"))
+        .select(col_base, "Qtd_Atual", "Qtd_Anterior", "Variacao",
+                "Novos", "Resolvidos", "Envelheceram", "Mudaram_Status")
+        .sort("Qtd_Atual", descending=True)
+    )
+
+
+def resumo_delta(classificados: pl.DataFrame) -> dict:
+    """Totais por classe (todas as classes presentes, mesmo com zero)."""
+    contagem = dict(classificados.group_by(COL_CLASSE).len().iter_rows())
+    return {c: int(contagem.get(c, 0)) for c in (NOVO, RESOLVIDO, MUDOU_STATUS, ENVELHECEU, ESTAVEL)}
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Limite de requisições por segundo compartilhado entre threads (token bucket).
+
+Usado pelos scripts que consultam APIs externas em paralelo
+(Antigos/Consulta CEPs.py, Antigos/Melhor Envio.py).
+"""
+import threading
+import time
+
+
+class LimiteTaxa:
+    """Token bucket compartilhado entre as threads."""
+
+    def __init__(self, por_segundo: float, rajada: int | None = None):
+        self.taxa = float(por_segundo)
+        self.capacidade = float(rajada or max(1, int(por_segundo)))
+        self.tokens = self.capacidade
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+
+    def aguardar(self) -> None:
+        with self.lock:
+            agora = time.monotonic()
+            self.tokens = min(self.capacidade, self.tokens + (agora - self.ultimo) * self.taxa)
+            self.ultimo = agora
+            self.tokens -= 1  # reserva a vez (pode ficar negativo = fila)
+            espera = -self.tokens / self.taxa if self.tokens < 0 else 0.0
+        if espera > 0:
+            time.sleep(espera)
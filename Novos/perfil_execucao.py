@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""
+Perfil de execução dos jobs diários (tempo por etapa).
+
+Uso:
+    perfil = PerfilExecucao("custo_lm")
+    with perfil:                                  # fecha o relatório mesmo se der erro
+        with perfil.etapa("leitura") as e:
+            df = ler(...)
+            e.linhas(df)
+        df = perfil.medir("agregacao")(agregar)(df)   # ou @perfil.medir("agregacao")
+
+Cada etapa registra tempo de relógio, CPU do processo, RSS no fim, pico de RSS
+do processo até ali e linhas. Etapas repetidas num laço (ex.: uma por coordenador)
+são somadas num registro só, com o número de vezes. No fim grava:
+
+    <pasta>/<job>/<AAAAmmdd_HHMMSS_ffffff>_<pid>.json   relatório da execução
+    <pasta>/historico.csv                               uma linha por etapa (todas as execuções)
+    <PERFIL_PROMETHEUS>/<job>.prom                      opcional (textfile collector do node_exporter)
+
+<pasta> padrão: ~/Perfil_Execucoes (fora do repositório/OneDrive); troque com PERFIL_PASTA.
+
+e avisa quando uma etapa ficou bem mais lenta que a mediana das últimas execuções.
+Custo: duas leituras de relógio/CPU/memória por etapa — pode ficar sempre ligado.
+"""
+import csv
+import json
+import os
+import re
+import socket
+import statistics
+import sys
+import time
+from datetime import datetime
+from functools import wraps
+
+# psutil é opcional: sem ele a memória vem de resource (Linux/macOS) ou fica em branco (Windows)
+try:
+    import psutil
+except Exception:
+    psutil = None
+
+try:
+    import resource
+except Exception:
+    resource = None
+
+PASTA_PADRAO = os.getenv("PERFIL_PASTA") or os.path.join(os.path.expanduser("~"), "Perfil_Execucoes")
+PASTA_PROMETHEUS = os.getenv("PERFIL_PROMETHEUS") or None
+DESLIGADO = os.getenv("PERFIL_DESLIGADO", "").strip().lower() in ("1", "true", "sim")
+
+HISTORICO_CSV = "historico.csv"
+CAMPOS_CSV = ["execucao", "job", "etapa", "nivel", "inicio", "wall_s", "cpu_s",
+              "rss_mb", "rss_pico_mb", "linhas", "vezes", "status", "host"]
+
+# Regressão: etapa > FATOR x mediana das últimas N execuções (e pelo menos MINIMO_S segundos a mais)
+REGRESSAO_JANELA = 10
+REGRESSAO_FATOR = 1.5
+REGRESSAO_MINIMO_S = 5.0
+
+
+# ======================================================
+# 📏 MEMÓRIA
+# ======================================================
+
+def _mb(valor_bytes) -> float | None:
+    return None if valor_bytes is None else round(valor_bytes / (1024 * 1024), 1)
+
+
+def rss_atual() -> int | None:
+    if psutil is not None:
+        try:
+            return psutil.Process().memory_info().rss
+        except Exception:
+            return None
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except Exception:
+            return None
+    return None
+
+
+def rss_pico() -> int | None:
+    """Maior RSS do processo até agora (high-water mark do sistema, sem amostragem)."""
+    if psutil is not None:
+        # Só o Windows tem pico no psutil (peak_wset); no Linux/macOS o rss dele é o atual -> resource
+        try:
+            pico = getattr(psutil.Process().memory_info(), "peak_wset", None)
+            if pico:
+                return pico
+        except Exception:
+            pass
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico if sys.platform == "darwin" else pico * 1024  # Linux devolve KiB
+    return None
+
+
+def contar_linhas(obj) -> int | None:
+    """Linhas de DataFrames polars/pandas (ou de qualquer coisa com len); None se não souber."""
+    if obj is None:
+        return None
+    altura = getattr(obj, "height", None)
+    if isinstance(altura, int):
+        return altura
+    if hasattr(obj, "shape") and getattr(obj, "shape", None):
+        return int(obj.shape[0])
+    try:
+        return len(obj)
+    except Exception:
+        return None
+
+
+# ======================================================
+# ⏱️ ETAPA
+# ======================================================
+
+class Etapa:
+    def __init__(self, perfil, nome: str, nivel: int, linhas=None):
+        self.perfil = perfil
+        self.nome = nome
+        self.nivel = nivel
+        self._linhas = linhas
+        self.status = "ok"
+
+    def linhas(self, valor):
+        """Informa o volume da etapa: um número ou o DataFrame resultante."""
+        self._linhas = valor if isinstance(valor, int) else contar_linhas(valor)
+        return valor
+
+    def __enter__(self):
+        self.perfil._pilha.append(self.nome.rsplit("/", 1)[-1])
+        self.inicio = datetime.now()
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._t0
+        cpu = time.process_time() - self._c0
+        self.perfil._pilha.pop()
+        if exc_type is not None:
+            self.status = f"erro: {exc_type.__name__}"
+
+        registro = {
+            "etapa": self.nome,
+            "nivel": self.nivel,
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "wall_s": round(wall, 3),
+            "cpu_s": round(cpu, 3),
+            "rss_mb": _mb(rss_atual()),
+            "rss_pico_mb": _mb(rss_pico()),
+            "linhas": self._linhas,
+            "vezes": 1,
+            "status": self.status,
+        }
+        # Etapa repetida (laço por coordenador/página): soma no mesmo registro e não loga cada volta
+        anterior = self.perfil._por_nome.get(self.nome)
+        if anterior is not None:
+            anterior["wall_s"] = round(anterior["wall_s"] + registro["wall_s"], 3)
+            anterior["cpu_s"] = round(anterior["cpu_s"] + registro["cpu_s"], 3)
+            anterior["rss_mb"] = registro["rss_mb"]
+            anterior["rss_pico_mb"] = registro["rss_pico_mb"]
+            if registro["linhas"] is not None:
+                anterior["linhas"] = (anterior["linhas"] or 0) + registro["linhas"]
+            anterior["vezes"] += 1
+            if self.status != "ok":
+                anterior["status"] = self.status
+            return False
+        self.perfil.etapas.append(registro)
+        self.perfil._por_nome[self.nome] = registro
+
+        linhas_txt = f" | {self._linhas:,} linhas".replace(",", ".") if self._linhas is not None else ""
+        mem_txt = f" | pico {registro['rss_pico_mb']} MB" if registro["rss_pico_mb"] is not None else ""
+        self.perfil.log(f"⏱️ [{self.perfil.job}] {'  ' * self.nivel}{self.nome.rsplit('/', 1)[-1]}: "
+                        f"{wall:.2f}s (CPU {cpu:.2f}s){mem_txt}{linhas_txt}")
+        return False
+
+
+class _EtapaNula:
+    def linhas(self, valor):
+        return valor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+# ======================================================
+# 📋 PERFIL DA EXECUÇÃO
+# ======================================================
+
+class PerfilExecucao:
+    def __init__(self, job: str, pasta: str | None = None, prometheus: str | None = None,
+                 log=print, ativo: bool | None = None):
+        self.job = job
+        self.pasta = pasta or PASTA_PADRAO
+        self.prometheus = prometheus if prometheus is not None else PASTA_PROMETHEUS
+        self.log = log
+        self.ativo = (not DESLIGADO) if ativo is None else ativo
+
+        self.etapas: list[dict] = []
+        self._por_nome: dict[str, dict] = {}
+        self._pilha: list[str] = []
+        self.inicio = datetime.now()
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+        # Microssegundos + PID: duas execuções no mesmo segundo não sobrescrevem o mesmo JSON
+        self.execucao = f"{self.inicio:%Y%m%d_%H%M%S_%f}_{os.getpid()}"
+        self._finalizado = False
+
+    # ------------------------------------------------------------
+    # Instrumentação
+    # ------------------------------------------------------------
+    def etapa(self, nome: str, linhas=None):
+        if not self.ativo:
+            return _EtapaNula()
+        # Etapas aninhadas ficam "pai/filho" (o histórico compara sempre o mesmo caminho)
+        return Etapa(self, "/".join([*self._pilha, nome]), len(self._pilha), linhas)
+
+    def medir(self, nome: str | None = None, contar: bool = True):
+        """Decorator: mede a função como uma etapa; conta as linhas do retorno quando for DataFrame."""
+        def decorador(func):
+            rotulo = nome or func.__name__
+
+            @wraps(func)
+            def envolvida(*args, **kwargs):
+                with self.etapa(rotulo) as e:
+                    resultado = func(*args, **kwargs)
+                    if contar:
+                        e.linhas(resultado if hasattr(resultado, "shape") or hasattr(resultado, "height") else None)
+                    return resultado
+            return envolvida
+        return decorador
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finalizar("ok" if exc_type is None else f"erro: {exc_type.__name__}")
+        return False
+
+    # ------------------------------------------------------------
+    # Relatórios
+    # ------------------------------------------------------------
+    def finalizar(self, status: str = "ok") -> str | None:
+        if self._finalizado or not self.ativo:
+            return None
+        self._finalizado = True
+
+        total = {
+            "wall_s": round(time.perf_counter() - self._t0, 3),
+            "cpu_s": round(time.process_time() - self._c0, 3),
+            "rss_pico_mb": _mb(rss_pico()),
+        }
+        relatorio = {
+            "job": self.job,
+            "execucao": self.execucao,
+            "host": socket.gethostname(),
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "fim": datetime.now().isoformat(timespec="seconds"),
+            "status": status,
+            "total": total,
+            "etapas": self.etapas,
+        }
+
+        try:
+            caminho = self._gravar_json(relatorio)
+            regressoes = self._regressoes()
+            self._gravar_csv(relatorio)
+            if self.prometheus:
+                self._gravar_prometheus(relatorio)
+        except OSError as e:
+            self.log(f"⚠️ [{self.job}] Não foi possível gravar o perfil da execução: {e}")
+            return None
+
+        for e in self.etapas:
+            if e["vezes"] > 1:
+                self.log(f"⏱️ [{self.job}] {e['etapa']}: {e['wall_s']:.2f}s em {e['vezes']} vezes (CPU {e['cpu_s']:.2f}s)")
+        self.log(f"⏱️ [{self.job}] Total: {total['wall_s']:.1f}s (CPU {total['cpu_s']:.1f}s) — perfil em {caminho}")
+        for etapa, atual, mediana in regressoes:
+            self.log(f"🐢 [{self.job}] '{etapa}' levou {atual:.1f}s (mediana recente {mediana:.1f}s).")
+        return caminho
+
+    def _gravar_json(self, relatorio: dict) -> str:
+        pasta = os.path.join(self.pasta, self.job)
+        os.makedirs(pasta, exist_ok=True)
+        caminho = os.path.join(pasta, f"{self.execucao}.json")
+        tmp = caminho + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, caminho)
+        return caminho
+
+    def _linhas_csv(self, relatorio: dict):
+        total = relatorio["total"]
+        yield {
+            "execucao": self.execucao, "job": self.job, "etapa": "TOTAL", "nivel": -1,
+            "inicio": relatorio["inicio"], "wall_s": total["wall_s"], "cpu_s": total["cpu_s"],
+            "rss_mb": "", "rss_pico_mb": total["rss_pico_mb"], "linhas": "",
+            "status": relatorio["status"], "host": relatorio["host"],
+        }
+        for e in self.etapas:
+            yield {"execucao": self.execucao, "job": self.job, "host": relatorio["host"], **e}
+
+    def _gravar_csv(self, relatorio: dict):
+        os.makedirs(self.pasta, exist_ok=True)
+        caminho = os.path.join(self.pasta, HISTORICO_CSV)
+        novo = not os.path.exists(caminho)
+        with open(caminho, "a", encoding="utf-8", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=CAMPOS_CSV, delimiter=";", extrasaction="ignore")
+            if novo:
+                w.writeheader()
+            for linha in self._linhas_csv(relatorio):
+                w.writerow({k: ("" if v is None else v) for k, v in linha.items()})
+
+    def _regressoes(self) -> list[tuple[str, float, float]]:
+        """Etapas desta execução muito acima da mediana das últimas execuções bem-sucedidas."""
+        caminho = os.path.join(self.pasta, HISTORICO_CSV)
+        if not os.path.exists(caminho):
+            return []
+
+        historico: dict[str, list[float]] = {}
+        with open(caminho, "r", encoding="utf-8", newline="") as f:
+            for linha in csv.DictReader(f, delimiter=";"):
+                if linha.get("job") != self.job or linha.get("status") != "ok":
+                    continue
+                try:
+                    historico.setdefault(linha["etapa"], []).append(float(linha["wall_s"]))
+                except (TypeError, ValueError):
+                    continue
+
+        saida = []
+        for e in self.etapas:
+            anteriores = historico.get(e["etapa"], [])[-REGRESSAO_JANELA:]
+            if len(anteriores) < 3:
+                continue
+            mediana = statistics.median(anteriores)
+            if e["wall_s"] > mediana * REGRESSAO_FATOR and e["wall_s"] - mediana > REGRESSAO_MINIMO_S:
+                saida.append((e["etapa"], e["wall_s"], mediana))
+        return saida
+
+    def _gravar_prometheus(self, relatorio: dict):
+        def rotulo(valor) -> str:
+            return str(valor).replace("\\", "\\\\").replace('"', '\\"')
+
+        job = rotulo(self.job)
+        linhas = [
+            "# HELP etl_execucao_duracao_segundos Duração total da última execução do job.",
+            "# TYPE etl_execucao_duracao_segundos gauge",
+            f'etl_execucao_duracao_segundos{{job="{job}"}} {relatorio["total"]["wall_s"]}',
+            "# HELP etl_execucao_sucesso 1 se a última execução terminou sem erro.",
+            "# TYPE etl_execucao_sucesso gauge",
+            f'etl_execucao_sucesso{{job="{job}"}} {1 if relatorio["status"] == "ok" else 0}',
+            "# HELP etl_execucao_timestamp_segundos Fim da última execução (epoch).",
+            "# TYPE etl_execucao_timestamp_segundos gauge",
+            f'etl_execucao_timestamp_segundos{{job="{job}"}} {int(time.time())}',
+        ]
+        metricas = (
+            ("etl_etapa_duracao_segundos", "wall_s", "Tempo de relógio da etapa."),
+            ("etl_etapa_cpu_segundos", "cpu_s", "Tempo de CPU do processo durante a etapa."),
+            ("etl_etapa_rss_pico_mb", "rss_pico_mb", "Pico de RSS do processo ao fim da etapa (MB)."),
+            ("etl_etapa_linhas", "linhas", "Linhas processadas na etapa."),
+            ("etl_etapa_vezes", "vezes", "Quantas vezes a etapa rodou na execução."),
+        )
+        for nome, campo, ajuda in metricas:
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} gauge"]
+            for e in self.etapas:
+                if e.get(campo) is not None:
+                    linhas.append(f'{nome}{{job="{job}",etapa="{rotulo(e["etapa"])}"}} {e[campo]}')
+
+        os.makedirs(self.prometheus, exist_ok=True)
+        arquivo = re.sub(r"[^A-Za-z0-9_.-]", "_", self.job) + ".prom"
+        caminho = os.path.join(self.prometheus, arquivo)
+        tmp = caminho + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(linhas) + "\n")
+        os.replace(tmp, caminho)
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Registro de layouts das exportações consolidadas.
+
+Cada arquivo é classificado pela impressão digital da sua linha de cabeçalho
+(lida sem carregar os dados). Para cada impressão o registro guarda, em uma
+pasta de cache, o mapeamento posição -> coluna canônica (normalização de
+nomes + sinônimos) e os tipos vistos para aquele layout na última execução.
+Na consolidação o esquema final é resolvido uma única vez a partir dos
+layouts dos arquivos presentes e cada
+planilha é convertida direto para ele — sem unificação "relaxed" de
+supertipos sobre dezenas de DataFrames.
+"""
+import hashlib
+import json
+import os
+
+import polars as pl
+
+NOME_INDICE = "layouts.json"
+
+
+# ======================================================
+# 🔎 CABEÇALHO / IMPRESSÃO DIGITAL
+# ======================================================
+
+def ler_cabecalho(path: str) -> list:
+    """Lê apenas a linha de cabeçalho (sem carregar os dados da planilha)."""
+    nome = path.lower()
+
+    if nome.endswith(".csv"):
+        return pl.read_csv(path, n_rows=0).columns
+
+    if nome.endswith(".xlsx"):
+        import openpyxl
+
+        wb = openpyxl.load_workbook(path, read_only=True)
+        try:
+            linha = next(wb.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+        finally:
+            wb.close()
+        colunas = list(linha)
+        while colunas and colunas[-1] is None:
+            colunas.pop()
+        return colunas
+
+    return pl.read_excel(path, read_options={"n_rows": 0}).columns
+
+
+def impressao_cabecalho(colunas: list, versao: str = "1") -> str:
+    bruto = versao + "\x1f" + "\x1f".join("" if c is None else str(c) for c in colunas)
+    return hashlib.md5(bruto.encode("utf-8")).hexdigest()
+
+
+def unificar_esquemas(esquemas: list[dict]) -> dict:
+    """União de esquemas (ordem de primeira aparição) com o supertipo de cada coluna."""
+    esquemas = [e for e in esquemas if e]
+    if not esquemas:
+        return {}
+
+    try:
+        vazios = [pl.DataFrame(schema=e) for e in esquemas]
+        return dict(pl.concat(vazios, how="diagonal_relaxed").schema)
+    except Exception:
+        # Tipos incompatíveis (ex.: Date x Int64): a coluna em conflito vira texto.
+        saida: dict = {}
+        for e in esquemas:
+            for col, dtype in e.items():
+                if col not in saida or saida[col] == pl.Null:
+                    saida[col] = dtype
+                elif dtype != pl.Null and saida[col] != dtype:
+                    saida[col] = pl.String
+        return saida
+
+
+# ======================================================
+# 🗂️ REGISTRO
+# ======================================================
+
+class RegistroLayouts:
+    def __init__(self, pasta_cache: str, normalizar=None, sinonimos: dict | None = None,
+                 versao: str = "1", log=print):
+        """
+        normalizar: função lista de nomes -> lista de nomes canônicos (mesmo tamanho).
+        sinonimos:  {coluna canônica: [nomes equivalentes]} — aplicado após normalizar;
+                    quando mais de um aparece no mesmo arquivo, os valores são unidos (coalesce).
+        versao:     mude quando as regras de normalização/sinônimos mudarem (invalida o cache).
+        """
+        self.pasta_cache = pasta_cache
+        self.normalizar = normalizar
+        self.sinonimos = sinonimos or {}
+        self.versao = versao
+        self.log = log
+
+        self._indice = self._carregar_indice()
+        self._alterado = False
+
+    # ------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------
+    def _caminho_indice(self) -> str:
+        return os.path.join(self.pasta_cache, NOME_INDICE)
+
+    def _caminho_esquema(self, impressao: str) -> str:
+        return os.path.join(self.pasta_cache, f"{impressao}.arrow")
+
+    def _carregar_indice(self) -> dict:
+        try:
+            with open(self._caminho_indice(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def salvar(self):
+        if not self._alterado:
+            return
+        os.makedirs(self.pasta_cache, exist_ok=True)
+        tmp = self._caminho_indice() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._indice, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._caminho_indice())
+        self._alterado = False
+
+    def esquema_layout(self, impressao: str) -> dict:
+        path = self._caminho_esquema(impressao)
+        if not os.path.exists(path):
+            return {}
+        try:
+            return dict(pl.read_ipc_schema(path))
+        except Exception:
+            return {}
+
+    def _gravar_esquema(self, impressao: str, esquema: dict):
+        os.makedirs(self.pasta_cache, exist_ok=True)
+        path = self._caminho_esquema(impressao)
+        pl.DataFrame(schema=esquema).write_ipc(path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    # ------------------------------------------------------------
+    # Mapeamento de nomes
+    # ------------------------------------------------------------
+    def _normalizados(self, colunas: list) -> list[str]:
+        nomes = ["" if c is None else str(c) for c in colunas]
+        if self.normalizar is not None:
+            nomes = list(self.normalizar(nomes))
+        return nomes
+
+    def mapear(self, colunas: list) -> list[str]:
+        """Nome canônico de cada posição do cabeçalho."""
+        nomes = self._normalizados(colunas)
+
+        for canonica, candidatas in self.sinonimos.items():
+            nomes = [canonica if n in candidatas else n for n in nomes]
+        return nomes
+
+    def _ordem_fontes(self, canonica: str, nome_original: str) -> int:
+        candidatas = self.sinonimos.get(canonica)
+        if not candidatas or nome_original == canonica:
+            return 0
+        return candidatas.index(nome_original) + 1 if nome_original in candidatas else len(candidatas) + 1
+
+    # ------------------------------------------------------------
+    # Classificação (só cabeçalho)
+    # ------------------------------------------------------------
+    def classificar(self, path: str) -> str | None:
+        try:
+            colunas = ler_cabecalho(path)
+        except Exception as e:
+            self.log(f"   ❌ Erro ao ler cabeçalho de {os.path.basename(path)}: {e}")
+            return None
+
+        return self._registrar_cabecalho(colunas, path)
+
+    def _registrar_cabecalho(self, colunas: list, path: str) -> str:
+        impressao = impressao_cabecalho(colunas, self.versao)
+        if impressao not in self._indice:
+            self._indice[impressao] = {
+                "cabecalho": ["" if c is None else str(c) for c in colunas],
+                "canonicas": self.mapear(colunas),
+                "exemplo": os.path.basename(path),
+            }
+            self._alterado = True
+        return impressao
+
+    def classificar_arquivos(self, arquivos: list[str]) -> dict[str, str]:
+        impressoes = {}
+        for arq in arquivos:
+            impressao = self.classificar(arq)
+            if impressao:
+                impressoes[arq] = impressao
+
+        distintas = set(impressoes.values())
+        conhecidas = sum(1 for i in distintas if os.path.exists(self._caminho_esquema(i)))
+        self.log(f"🧬 {len(impressoes)} arquivo(s) em {len(distintas)} layout(s) "
+                 f"({conhecidas} já conhecido(s), {len(distintas) - conhecidas} novo(s)).")
+        return impressoes
+
+    def colunas_layout(self, impressao: str) -> list[str]:
+        return list(dict.fromkeys(self._indice[impressao]["canonicas"]))
+
+    # ------------------------------------------------------------
+    # Plano de conversão
+    # ------------------------------------------------------------
+    def _fontes(self, df: pl.DataFrame, impressao: str) -> dict[str, list[str]]:
+        """
+        Coluna canônica -> colunas do DataFrame que a alimentam (na ordem de prioridade).
+        Só os sinônimos são unidos; cabeçalhos vazios ou repetidos (que o leitor já
+        desambiguou, ex.: Qtd / Qtd_1) continuam como colunas separadas.
+        """
+        cabecalho = self._indice[impressao]["cabecalho"] if impressao in self._indice else []
+        if len(cabecalho) != len(df.columns):
+            # Leitor devolveu outro formato que o cabeçalho (ex.: colunas vazias descartadas).
+            cabecalho = df.columns
+
+        normalizados = self._normalizados(cabecalho)
+        canonicas = self.mapear(cabecalho)
+
+        fontes: dict[str, list[str]] = {}
+        vistos: dict[str, set] = {}
+        for original, normalizado, canonica in zip(df.columns, normalizados, canonicas):
+            juntar = canonica in self.sinonimos and normalizado not in vistos.get(canonica, ())
+            if not canonica or (canonica in fontes and not juntar):
+                chave, n = original, 1
+                while chave in fontes:
+                    chave, n = f"{original}_{n}", n + 1
+                fontes[chave] = [original]
+                continue
+            vistos.setdefault(canonica, set()).add(normalizado)
+            fontes.setdefault(canonica, []).append(original)
+        for canonica, cols in fontes.items():
+            cols.sort(key=lambda c: self._ordem_fontes(canonica, c))
+        return fontes
+
+    def _esquema_df(self, df: pl.DataFrame, fontes: dict[str, list[str]]) -> dict:
+        esquema = {}
+        for canonica, cols in fontes.items():
+            tipos = [df.schema[c] for c in cols]
+            esquema[canonica] = tipos[0] if len(tipos) == 1 else unificar_esquemas([{canonica: t} for t in tipos])[canonica]
+        return esquema
+
+    def registrar_tipos(self, impressao: str, dfs: list[pl.DataFrame]):
+        """
+        Grava os tipos do layout vistos nos arquivos desta execução. Substitui o que
+        havia no cache: um tipo alargado por um arquivo antigo não fica para sempre.
+        """
+        visto = unificar_esquemas([self._esquema_df(df, self._fontes(df, impressao)) for df in dfs])
+        if visto != self.esquema_layout(impressao):
+            self._gravar_esquema(impressao, visto)
+
+    def plano(self, impressoes) -> dict:
+        """Esquema canônico único para o conjunto de layouts."""
+        return unificar_esquemas([self.esquema_layout(i) for i in dict.fromkeys(impressoes)])
+
+    def aplicar(self, df: pl.DataFrame, impressao: str, esquema: dict) -> pl.DataFrame:
+        """Renomeia, une sinônimos, completa colunas faltantes e converte — em um único select."""
+        fontes = self._fontes(df, impressao)
+        exprs = []
+        for canonica, dtype in esquema.items():
+            cols = fontes.get(canonica)
+            if not cols:
+                expr = pl.lit(None, dtype=dtype)
+            elif len(cols) == 1:
+                expr = pl.col(cols[0]).cast(dtype, strict=False)
+            else:
+                expr = pl.coalesce([pl.col(c).cast(dtype, strict=False) for c in cols])
+            exprs.append(expr.alias(canonica))
+        return df.select(exprs)
+
+    # ------------------------------------------------------------
+    # Consolidação
+    # ------------------------------------------------------------
+    def consolidar(self, lidos: list[tuple[str, pl.DataFrame]], impressoes: dict[str, str],
+                   coluna_origem: str | None = None) -> pl.DataFrame:
+        """
+        lidos: [(caminho, DataFrame como veio do leitor)].
+        coluna_origem: se informada, recebe o nome do arquivo de cada linha.
+        Regrava o cache com os tipos vistos, resolve o plano e concatena na vertical.
+        """
+        if not lidos:
+            return pl.DataFrame()
+
+        por_layout: dict[str, list[pl.DataFrame]] = {}
+        for arq, df in lidos:
+            if arq not in impressoes:
+                impressoes[arq] = self._registrar_cabecalho(df.columns, arq)
+            por_layout.setdefault(impressoes[arq], []).append(df)
+        for impressao, dfs in por_layout.items():
+            self.registrar_tipos(impressao, dfs)
+        self.salvar()
+
+        esquema = self.plano(impressoes[arq] for arq, _ in lidos)
+        frames = []
+        for arq, df in lidos:
+            df = self.aplicar(df, impressoes[arq], esquema)
+            if coluna_origem:
+                df = df.with_columns(pl.lit(os.path.basename(arq)).alias(coluna_origem))
+            frames.append(df)
+        return pl.concat(frames, how="vertical")
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Snapshots diários em parquet (estado "de ontem" dos relatórios).
+
+Cada execução grava uma partição datada com o estado por pacote e a contagem
+por base:
+
+    <pasta>/<nome>/data=AAAA-MM-DD/pacotes.parquet   (1 linha por pacote, ordenado pelo id; ver `deduplicar`)
+    <pasta>/<nome>/data=AAAA-MM-DD/bases.parquet     (base -> qtd de pacotes)
+    <pasta>/<nome>/indice.parquet                    (id -> primeira/última data em que apareceu)
+
+A comparação dia a dia (novos / resolvidos / ainda em aberto) é feita com
+anti-join/semi-join pelo id do pacote, lendo da partição de referência só a
+coluna de id — contra qualquer data já gravada, não apenas ontem.
+"""
+import os
+import shutil
+from datetime import date, datetime, timedelta
+
+import polars as pl
+
+PREFIXO_PARTICAO = "data="
+ARQ_PACOTES = "pacotes.parquet"
+ARQ_BASES = "bases.parquet"
+ARQ_INDICE = "indice.parquet"
+
+
+def _como_data(valor) -> date:
+    if valor is None:
+        return date.today()
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor).strip()
+    for fmt in ("%Y-%m-%d", "%Y%m%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(texto, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Data de snapshot inválida: '{valor}'")
+
+
+def _gravar_parquet(df: pl.DataFrame, caminho: str):
+    tmp = caminho + ".tmp"
+    df.write_parquet(tmp, statistics=True)
+    os.replace(tmp, caminho)
+
+
+class SnapshotsDiarios:
+    def __init__(self, pasta: str, nome: str, col_id: str, col_base: str | None = None,
+                 colunas: list[str] | None = None, deduplicar: bool = True, log=print):
+        """
+        col_id:     coluna que identifica o pacote (Remessa / pedido).
+        col_base:   coluna da base — gera bases.parquet em cada partição.
+        colunas:    colunas guardadas por pacote além do id (None = todas).
+        deduplicar: mantém 1 linha por id. False grava as linhas como vieram, para quem
+                    conta linhas (e não pacotes) e compara com o DataFrame do dia sem deduplicar.
+        """
+        self.pasta = os.path.join(pasta, nome)
+        self.nome = nome
+        self.col_id = col_id
+        self.col_base = col_base
+        self.colunas = colunas
+        self.deduplicar = deduplicar
+        self.log = log
+
+    # ------------------------------------------------------------
+    # Partições
+    # ------------------------------------------------------------
+    def _pasta_data(self, data) -> str:
+        return os.path.join(self.pasta, f"{PREFIXO_PARTICAO}{_como_data(data):%Y-%m-%d}")
+
+    def datas(self) -> list[date]:
+        """Datas com snapshot gravado (crescente)."""
+        if not os.path.isdir(self.pasta):
+            return []
+        saida = []
+        for nome in os.listdir(self.pasta):
+            if not nome.startswith(PREFIXO_PARTICAO):
+                continue
+            if not os.path.exists(os.path.join(self.pasta, nome, ARQ_PACOTES)):
+                continue
+            try:
+                saida.append(_como_data(nome[len(PREFIXO_PARTICAO):]))
+            except ValueError:
+                continue
+        return sorted(saida)
+
+    def data_anterior(self, antes_de=None, inclusive: bool = False) -> date | None:
+        """Snapshot mais recente antes de `antes_de` (padrão: hoje). Sem ontem, pega o último disponível."""
+        limite = _como_data(antes_de)
+        candidatas = [d for d in self.datas() if d < limite or (inclusive and d == limite)]
+        return candidatas[-1] if candidatas else None
+
+    def existe(self, data) -> bool:
+        return os.path.exists(os.path.join(self._pasta_data(data), ARQ_PACOTES))
+
+    # ------------------------------------------------------------
+    # Gravação
+    # ------------------------------------------------------------
+    def salvar(self, df: pl.DataFrame, data=None) -> str:
+        """Grava (ou substitui) a partição do dia e atualiza o índice de pacotes."""
+        data = _como_data(data)
+        if self.col_id not in df.columns:
+            raise KeyError(f"Coluna de id '{self.col_id}' ausente no snapshot '{self.nome}'.")
+
+        if self.colunas is None:
+            colunas = df.columns
+        else:
+            colunas = [self.col_id] + [c for c in self.colunas if c in df.columns and c != self.col_id]
+            if self.col_base and self.col_base in df.columns and self.col_base not in colunas:
+                colunas.append(self.col_base)
+
+        pacotes = df.select(colunas).filter(pl.col(self.col_id).is_not_null())
+        if self.deduplicar:
+            pacotes = pacotes.unique(subset=[self.col_id], keep="first", maintain_order=True)
+        pacotes = pacotes.sort(self.col_id, maintain_order=True)
+
+        pasta = self._pasta_data(data)
+        os.makedirs(pasta, exist_ok=True)
+        _gravar_parquet(pacotes, os.path.join(pasta, ARQ_PACOTES))
+
+        if self.col_base and self.col_base in pacotes.columns:
+            bases = pacotes.group_by(self.col_base).agg(pl.len().cast(pl.Int64).alias("Qtd"))
+            _gravar_parquet(bases.sort(self.col_base), os.path.join(pasta, ARQ_BASES))
+
+        self._atualizar_indice(pacotes.select(self.col_id).unique(), data)
+        self.log(f"📦 Snapshot '{self.nome}' de {data:%d/%m/%Y} salvo ({pacotes.height} linhas).")
+        return pasta
+
+    def salvar_tabela(self, nome: str, df: pl.DataFrame, data=None) -> str:
+        """Tabela derivada (ex.: delta por base) gravada junto da partição da data."""
+        pasta = self._pasta_data(data)
+        os.makedirs(pasta, exist_ok=True)
+        caminho = os.path.join(pasta, f"{nome}.parquet")
+        _gravar_parquet(df, caminho)
+        return caminho
+
+    def _atualizar_indice(self, ids: pl.DataFrame, data: date):
+        caminho = os.path.join(self.pasta, ARQ_INDICE)
+        novos = ids.with_columns(
+            pl.lit(data).alias("primeira_data"),
+            pl.lit(data).alias("ultima_data"),
+        )
+        if os.path.exists(caminho):
+            antigo = pl.read_parquet(caminho)
+            novos = novos.with_columns(pl.col(self.col_id).cast(antigo.schema[self.col_id], strict=False))
+            indice = (
+                pl.concat([antigo, novos], how="vertical_relaxed")
+                .group_by(self.col_id)
+                .agg(pl.col("primeira_data").min(), pl.col("ultima_data").max())
+            )
+        else:
+            indice = novos
+        _gravar_parquet(indice.sort(self.col_id), caminho)
+
+    # ------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------
+    def scan(self, data) -> pl.LazyFrame:
+        return pl.scan_parquet(os.path.join(self._pasta_data(data), ARQ_PACOTES))
+
+    def carregar(self, data, colunas: list[str] | None = None) -> pl.DataFrame:
+        """Estado por pacote de uma data (vazio se não houver snapshot)."""
+        if data is None or not self.existe(data):
+            return pl.DataFrame()
+        lf = self.scan(data)
+        if colunas is not None:
+            presentes = set(lf.collect_schema().names())
+            lf = lf.select([c for c in dict.fromkeys([self.col_id, *colunas]) if c in presentes])
+        return lf.collect()
+
+    def carregar_anterior(self, antes_de=None, colunas: list[str] | None = None) -> tuple[date | None, pl.DataFrame]:
+        data = self.data_anterior(antes_de)
+        return data, self.carregar(data, colunas)
+
+    def bases(self, data) -> pl.DataFrame:
+        """Contagem por base da data (lê só o bases.parquet)."""
+        caminho = os.path.join(self._pasta_data(data), ARQ_BASES)
+        if data is None or not os.path.exists(caminho):
+            return pl.DataFrame(schema={self.col_base or "Base": pl.Utf8, "Qtd": pl.Int64})
+        return pl.read_parquet(caminho)
+
+    def carregar_tabela(self, nome: str, data) -> pl.DataFrame:
+        caminho = os.path.join(self._pasta_data(data), f"{nome}.parquet")
+        if data is None or not os.path.exists(caminho):
+            return pl.DataFrame()
+        return pl.read_parquet(caminho)
+
+    def indice(self) -> pl.DataFrame:
+        caminho = os.path.join(self.pasta, ARQ_INDICE)
+        if not os.path.exists(caminho):
+            return pl.DataFrame(schema={self.col_id: pl.Utf8, "primeira_data": pl.Date, "ultima_data": pl.Date})
+        return pl.read_parquet(caminho)
+
+    def primeira_vez(self, df: pl.DataFrame) -> pl.DataFrame:
+        """Acrescenta a data em que cada pacote apareceu pela primeira vez nos snapshots."""
+        indice = self.indice().select(self.col_id, "primeira_data")
+        indice = indice.with_columns(pl.col(self.col_id).cast(df.schema[self.col_id], strict=False))
+        return df.join(indice, on=self.col_id, how="left")
+
+    # ------------------------------------------------------------
+    # Comparação (vetorizada)
+    # ------------------------------------------------------------
+    def diferenca(self, df_atual: pl.DataFrame, data_ref=None, colunas_ref: list[str] | None = None) -> dict:
+        """
+        Compara o estado atual com o snapshot de `data_ref` (padrão: o último antes de hoje).
+        Retorna {"data_ref", "novos", "resolvidos", "em_aberto"}:
+          novos      = pacotes de hoje que não estavam na referência (anti-join)
+          resolvidos = pacotes da referência que sumiram hoje (anti-join inverso; colunas da referência)
+          em_aberto  = pacotes de hoje que já estavam na referência (semi-join)
+        """
+        if data_ref is None:
+            data_ref = self.data_anterior()
+        else:
+            data_ref = _como_data(data_ref)
+
+        atual = df_atual.filter(pl.col(self.col_id).is_not_null()).unique(subset=[self.col_id], maintain_order=True)
+        if data_ref is None or not self.existe(data_ref):
+            return {
+                "data_ref": None,
+                "novos": atual,
+                "resolvidos": atual.clear(),
+                "em_aberto": atual.clear(),
+            }
+
+        ref = self.scan(data_ref)
+        ids_ref = ref.select(pl.col(self.col_id).cast(atual.schema[self.col_id], strict=False)).collect()
+
+        colunas = [self.col_id, *(colunas_ref or [])]
+        presentes = set(ref.collect_schema().names())
+        resolvidos = (
+            ref.select([c for c in dict.fromkeys(colunas) if c in presentes])
+            .with_columns(pl.col(self.col_id).cast(atual.schema[self.col_id], strict=False))
+            .collect()
+            .join(atual.select(self.col_id), on=self.col_id, how="anti")
+        )
+        return {
+            "data_ref": data_ref,
+            "novos": atual.join(ids_ref, on=self.col_id, how="anti"),
+            "resolvidos": resolvidos,
+            "em_aberto": atual.join(ids_ref, on=self.col_id, how="semi"),
+        }
+
+    # ------------------------------------------------------------
+    # Manutenção
+    # ------------------------------------------------------------
+    def limpar(self, max_dias: int = 90):
+        """Remove partições mais antigas que `max_dias` (o índice é mantido)."""
+        limite = date.today() - timedelta(days=max_dias)
+        for data in self.datas():
+            if data < limite:
+                shutil.rmtree(self._pasta_data(data), ignore_errors=True)